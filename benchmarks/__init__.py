@@ -0,0 +1 @@
+"""Benchmarks for the Analyst turn pipeline, run with simulated providers."""
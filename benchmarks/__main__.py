@@ -0,0 +1,38 @@
+"""Run the benchmark suite: ``PYTHONPATH=src python -m benchmarks [--quick] [--output FILE]``."""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+
+from .suite import SCENARIOS, compare, run_suite
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Starray benchmark suite")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations and shorter simulated delays")
+    parser.add_argument("--output", "-o", default=None, help="Write results JSON here instead of stdout")
+    parser.add_argument("--baseline", default=None, help="Earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    try:
+        results = run_suite(args.scenarios, quick=args.quick)
+    except ValueError as exc:
+        parser.error(str(exc))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        for line in compare(baseline, results):
+            print(line, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+"""A ``ModelProvider`` with scripted latency, streaming, failures and hangs."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+import math
+import random
+import threading
+import time
+from typing import Any
+
+from starray.providers import ChatMessage, LocalEchoProvider, ModelProvider, ProviderError
+
+
+@dataclass(slots=True)
+class Latency:
+    """A delay distribution in seconds: ``fixed`` (a), ``uniform`` (a..b) or ``lognormal`` (median a, sigma b)."""
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def fixed(cls, seconds: float) -> "Latency":
+        return cls("fixed", seconds)
+
+    @classmethod
+    def uniform(cls, low: float, high: float) -> "Latency":
+        return cls("uniform", low, high)
+
+    @classmethod
+    def lognormal(cls, median: float, sigma: float) -> "Latency":
+        return cls("lognormal", median, sigma)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        return self.a
+
+
+@dataclass(slots=True)
+class SimulatedProfile:
+    """How one simulated provider behaves on each request.
+
+    ``failure_rate`` requests fail after ``first_token`` latency; ``hang_rate`` requests stall
+    for ``hang_seconds`` (capped at the request timeout) and then time out, as a real client would.
+    """
+
+    first_token: Latency = field(default_factory=Latency)
+    chunk_interval: Latency = field(default_factory=Latency)
+    chunks: int = 8
+    failure_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_seconds: float = 30.0
+
+
+class SimulatedProvider(ModelProvider):
+    def __init__(self, name: str, profile: SimulatedProfile, seed: int | None = None) -> None:
+        self.name = name
+        self.profile = profile
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.busy_seconds = 0.0
+
+    def _draw(self) -> tuple[float, list[float], bool, bool]:
+        with self._lock:
+            self.calls += 1
+            first = self.profile.first_token.sample(self._rng)
+            intervals = [self.profile.chunk_interval.sample(self._rng) for _ in range(self.profile.chunks - 1)]
+            hang = self._rng.random() < self.profile.hang_rate
+            fail = not hang and self._rng.random() < self.profile.failure_rate
+        return first, intervals, hang, fail
+
+    def _sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+        with self._lock:
+            self.busy_seconds += seconds
+
+    def chat_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> Iterator[str]:
+        first, intervals, hang, fail = self._draw()
+        if hang:
+            waited = min(self.profile.hang_seconds, timeout_seconds)
+            self._sleep(waited)
+            raise ProviderError(f"{self.name} provider request failed: timed out after {waited:g}s")
+        self._sleep(first)
+        if fail:
+            raise ProviderError(f"{self.name} provider request failed: simulated error")
+        words = f"simulated answer from {self.name}:{model}".split()
+        for index in range(self.profile.chunks):
+            if index:
+                self._sleep(intervals[index - 1])
+            yield words[index % len(words)] + " "
+
+    def chat(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> str:
+        return "".join(
+            self.chat_stream(messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds)
+        ).strip()
+
+    def structured_output(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> dict[str, Any]:
+        content = self.chat(messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds)
+        return {"content": content}
+
+
+class SimulatedFactory:
+    """Provider factory serving ``SimulatedProvider`` per configured name; ``local`` stays the echo."""
+
+    def __init__(self, profiles: dict[str, SimulatedProfile], seed: int = 0) -> None:
+        self.providers = {
+            name: SimulatedProvider(name, profile, seed=seed + index)
+            for index, (name, profile) in enumerate(sorted(profiles.items()))
+        }
+        self._local = LocalEchoProvider()
+
+    def get(self, provider_name: str) -> ModelProvider:
+        if provider_name == "local":
+            return self._local
+        try:
+            return self.providers[provider_name]
+        except KeyError:
+            raise ProviderError(f"Unsupported provider: {provider_name}") from None
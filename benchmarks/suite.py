@@ -0,0 +1,237 @@
+"""Benchmark scenarios for the Analyst turn pipeline; each returns a JSON-serializable dict."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, UTC
+import logging
+import os
+from pathlib import Path
+import platform
+import statistics
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+import time
+from typing import Any
+
+from starray.analyst import AnalystRuntime
+from starray.app import run_turn
+from starray.config import AppConfig
+from starray.metrics import percentile
+from starray.session import SessionState, load_session
+
+from .simulated import Latency, SimulatedFactory, SimulatedProfile
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCHEMA_VERSION = 1
+
+Scenario = Callable[[bool], dict[str, Any]]
+
+_COLD_START = """
+from starray import cli
+try:
+    cli.main(["--help"])
+except SystemExit:
+    pass
+"""
+
+
+def _ms(values: list[float]) -> dict[str, Any]:
+    return {
+        "n": len(values),
+        "mean_ms": round(statistics.fmean(values) * 1000, 3),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "max_ms": round(max(values) * 1000, 3),
+    }
+
+
+def _config(data_dir: Path, **overrides: Any) -> AppConfig:
+    values: dict[str, Any] = dict(
+        provider="openai",
+        provider_fallbacks=["anthropic"],
+        default_model="gpt-4.1",
+        role_models={"analyst": "gpt-4.1"},
+        role_fallback_models={"analyst": []},
+        temperature=0.2,
+        request_timeout_seconds=30.0,
+        data_dir=data_dir,
+        # Keep every route eligible so each turn pays the full fallback cost being measured.
+        breaker_failure_threshold=10**9,
+    )
+    values.update(overrides)
+    return AppConfig(**values)
+
+
+def _logger() -> logging.Logger:
+    logger = logging.getLogger("starray.benchmarks")
+    logger.propagate = False
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def _run_turns(
+    profiles: dict[str, SimulatedProfile], turns: int, **overrides: Any
+) -> tuple[list[float], SimulatedFactory]:
+    factory = SimulatedFactory(profiles)
+    latencies: list[float] = []
+    with TemporaryDirectory() as tmp:
+        cfg = _config(Path(tmp), **overrides)
+        runtime = AnalystRuntime(cfg, provider_factory=factory)
+        state = SessionState.new()
+        for index in range(turns):
+            started = time.perf_counter()
+            run_turn(f"benchmark question {index}", runtime, state, Path(tmp) / "sessions", _logger())
+            latencies.append(time.perf_counter() - started)
+    return latencies, factory
+
+
+def turn_latency(quick: bool) -> dict[str, Any]:
+    """End-to-end ``run_turn`` latency against a healthy streaming provider, and runtime overhead."""
+    scale = 0.25 if quick else 1.0
+    profile = SimulatedProfile(
+        first_token=Latency.lognormal(0.02 * scale, 0.3),
+        chunk_interval=Latency.fixed(0.002 * scale),
+    )
+    turns = 10 if quick else 50
+    latencies, factory = _run_turns({"openai": profile}, turns)
+    provider = factory.providers["openai"]
+    overhead = max(0.0, sum(latencies) - provider.busy_seconds) / turns
+    return {**_ms(latencies), "overhead_mean_ms": round(overhead * 1000, 3), "provider_calls": provider.calls}
+
+
+def fallback_cost(quick: bool) -> dict[str, Any]:
+    """Latency when the primary fails fast or hangs, sequentially and with hedging."""
+    scale = 0.25 if quick else 1.0
+    turns = 5 if quick else 20
+    healthy = SimulatedProfile(first_token=Latency.fixed(0.02 * scale), chunk_interval=Latency.fixed(0.001))
+    failing = SimulatedProfile(first_token=Latency.fixed(0.01 * scale), failure_rate=1.0)
+    hanging = SimulatedProfile(hang_rate=1.0, hang_seconds=0.2 * scale)
+
+    baseline, _ = _run_turns({"openai": healthy, "anthropic": healthy}, turns)
+    failed, _ = _run_turns({"openai": failing, "anthropic": healthy}, turns)
+    hung, _ = _run_turns({"openai": hanging, "anthropic": healthy}, turns)
+    hedged, _ = _run_turns(
+        {"openai": hanging, "anthropic": healthy}, turns, hedging=True, hedge_delay_seconds=0.05 * scale
+    )
+    baseline_p50 = percentile(baseline, 50)
+    return {
+        "baseline": _ms(baseline),
+        "primary_fails": _ms(failed),
+        "primary_hangs": _ms(hung),
+        "primary_hangs_hedged": _ms(hedged),
+        "fail_penalty_p50_ms": round((percentile(failed, 50) - baseline_p50) * 1000, 3),
+        "hang_penalty_p50_ms": round((percentile(hung, 50) - baseline_p50) * 1000, 3),
+        "hedged_hang_penalty_p50_ms": round((percentile(hedged, 50) - baseline_p50) * 1000, 3),
+    }
+
+
+def session_io(quick: bool) -> dict[str, Any]:
+    """Session save/append/load time against transcript size."""
+    sizes = [100, 1000] if quick else [100, 1000, 10000]
+    content = "A realistic-length analyst turn with a few sentences of detail. " * 3
+    results: dict[str, Any] = {}
+    with TemporaryDirectory() as tmp:
+        session_dir = Path(tmp)
+        for size in sizes:
+            state = SessionState.new()
+            for index in range(size):
+                state.add_turn("user" if index % 2 == 0 else "analyst", content)
+
+            started = time.perf_counter()
+            state.save(session_dir)
+            full_save = time.perf_counter() - started
+
+            state.add_turn("user", content)
+            started = time.perf_counter()
+            state.save(session_dir)
+            append_save = time.perf_counter() - started
+
+            started = time.perf_counter()
+            load_session(session_dir, state.session_id)
+            full_load = time.perf_counter() - started
+
+            started = time.perf_counter()
+            load_session(session_dir, state.session_id, tail_turns=50)
+            tail_load = time.perf_counter() - started
+
+            results[str(size)] = {
+                "full_save_ms": round(full_save * 1000, 3),
+                "append_save_ms": round(append_save * 1000, 3),
+                "full_load_ms": round(full_load * 1000, 3),
+                "tail50_load_ms": round(tail_load * 1000, 3),
+            }
+    return results
+
+
+def cli_cold_start(quick: bool) -> dict[str, Any]:
+    """Wall time of a fresh interpreter running ``starray --help``."""
+    runs = 3 if quick else 10
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT / "src"), NO_COLOR="1")
+    command = [sys.executable, "-c", _COLD_START]
+    durations: list[float] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, env=env, capture_output=True, check=True)
+        durations.append(time.perf_counter() - started)
+    return _ms(durations)
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "turn_latency": turn_latency,
+    "fallback_cost": fallback_cost,
+    "session_io": session_io,
+    "cli_cold_start": cli_cold_start,
+}
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_suite(names: list[str] | None = None, *, quick: bool = False) -> dict[str, Any]:
+    selected = names or list(SCENARIOS)
+    unknown = [name for name in selected if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+    return {
+        "schema": SCHEMA_VERSION,
+        "created_at": datetime.now(UTC).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "scenarios": {name: SCENARIOS[name](quick) for name in selected},
+    }
+
+
+def _flatten(value: Any, prefix: str = "") -> dict[str, float]:
+    if isinstance(value, dict):
+        flat: dict[str, float] = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and prefix.endswith("_ms"):
+        return {prefix: float(value)}
+    return {}
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """Lines describing how each ``*_ms`` metric moved from ``baseline`` to ``current``."""
+    before = _flatten(baseline.get("scenarios", {}))
+    after = _flatten(current.get("scenarios", {}))
+    lines = []
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        change = f"{(new - old) / old:+.0%}" if old else "n/a"
+        lines.append(f"{key}: {old:g} -> {new:g} ({change})")
+    return lines
@@ -1,9 +1,36 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+import queue
+import threading
+import time
+from typing import Any
 
+from . import tracing
+from .cache import collect_cache_hits
 from .config import AppConfig
-from .providers import ChatMessage, ProviderError, ProviderFactory
+from .health import CLOSED, HALF_OPEN, RouteHealthTracker
+from .memory import ContextBuilder, extractive_summary
+from .metrics import CallEvent, MetricsRecorder
+from .providers import Cancellation, ChatMessage, ProviderError, ProviderFactory, cancel_scope
+from .ratelimit import RateLimiter, tenant_scope
+from .routing import RouteStatsStore, build_router
+from .session import SessionState
+from .structured import (
+    CompiledSchema,
+    StructuredOutputError,
+    StructuredReply,
+    aread_structured,
+    compile_schema,
+    format_errors,
+    read_structured,
+    repair_messages,
+    schema_messages,
+)
+from .tokens import TokenEstimator
 
 
 ANALYST_SYSTEM_PROMPT = (
@@ -11,6 +38,19 @@ ANALYST_SYSTEM_PROMPT = (
     "When uncertain, ask a short clarifying question."
 )
 
+# Recorded successes a route needs before its p95 first-token time replaces the configured hedge delay.
+HEDGE_MIN_SAMPLES = 20
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and the StarRay Analyst. "
+    "Fold the new turns into the previous summary. Keep decisions, open questions, and facts; "
+    "drop pleasantries. Reply with the updated summary only."
+)
+
+
+class _TrialInFlight(ProviderError):
+    """Another caller holds the single trial of a half-open route."""
+
 
 @dataclass(slots=True)
 class AnalystResponse:
@@ -19,20 +59,156 @@ class AnalystResponse:
     model: str
     fallback_used: bool
     fallback_reason: str | None = None
+    first_token_seconds: float | None = None
+    latency_seconds: float = 0.0
+    hedged_calls: int = 0
+    cached: bool = False
+
+
+@dataclass(slots=True)
+class StructuredResponse:
+    payload: dict[str, Any]
+    provider: str
+    model: str
+    fallback_used: bool
+    fallback_reason: str | None = None
+    repairs: int = 0
+    latency_seconds: float = 0.0
+    cached: bool = False
+
+
+TokenCallback = Callable[[str], None]
+
+
+@dataclass(slots=True)
+class _Turn:
+    """Per-request state shared by the sequential, hedged and async response paths."""
+
+    messages: list[ChatMessage]
+    primary: tuple[str, str] | None
+    prompt_tokens: int
+    role: str = "analyst"
+    session_id: str | None = None
+    started: float = field(default_factory=time.perf_counter)
+
+
+@dataclass(slots=True)
+class _Attempt:
+    """One provider call within a turn; ``number`` is its 1-based position in the route order."""
+
+    provider_name: str
+    model: str
+    number: int
+    started: float = field(default_factory=time.perf_counter)
+    first_token_seconds: float | None = None
+    span: tracing.Span | tracing.NoopSpan = tracing.NOOP_SPAN
+    cancellation: Cancellation = field(default_factory=Cancellation)
+    cache_hits: list[str] = field(default_factory=list)
+    trial: bool = False
+
+    @property
+    def route(self) -> str:
+        return _route_key(self.provider_name, self.model)
+
+    @property
+    def cached(self) -> bool:
+        """Whether the answer was replayed from the response cache rather than the provider."""
+        return bool(self.cache_hits)
+
+    @contextmanager
+    def scope(self) -> Iterator[None]:
+        """Context for the provider call: its span, cancellation and cache-hit tracking."""
+        with tracing.use_span(self.span), cancel_scope(self.cancellation), collect_cache_hits(self.cache_hits):
+            yield
+
+
+def _first_chunk(chunks: Iterator[str]) -> str:
+    """Advance ``chunks`` to the first non-blank chunk, returning it left-stripped."""
+    for chunk in chunks:
+        text = chunk.lstrip()
+        if text:
+            return text
+    return ""
+
+
+async def _afirst_chunk(chunks: AsyncIterator[str]) -> str:
+    async for chunk in chunks:
+        text = chunk.lstrip()
+        if text:
+            return text
+    return ""
+
+
+def _route_key(provider_name: str, model: str) -> str:
+    return f"{provider_name}:{model}"
+
+
+def _tenant(role: str, session: SessionState | None) -> str:
+    """Rate-limit queue for a request: one per session and role, so neither starves the other."""
+    return f"{role}:{session.session_id}" if session is not None else role
+
+
+def _annotate(span: tracing.Span | tracing.NoopSpan, response: AnalystResponse) -> None:
+    span.set_attribute("route", _route_key(response.provider, response.model))
+    span.set_attribute("fallback_used", response.fallback_used)
+    span.set_attribute("hedged_calls", response.hedged_calls)
+    span.set_attribute("cached", response.cached)
 
 
 class AnalystRuntime:
-    def __init__(self, cfg: AppConfig, provider_factory: ProviderFactory | None = None) -> None:
+    def __init__(
+        self,
+        cfg: AppConfig,
+        provider_factory: ProviderFactory | None = None,
+        health: RouteHealthTracker | None = None,
+        stats: RouteStatsStore | None = None,
+        metrics: MetricsRecorder | None = None,
+        tokens: TokenEstimator | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ) -> None:
         self._cfg = cfg
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics or MetricsRecorder()
+        self.tokens = tokens or TokenEstimator(context_windows=cfg.context_windows)
         self._providers = provider_factory or ProviderFactory()
+        self._health = health or RouteHealthTracker(
+            failure_threshold=cfg.breaker_failure_threshold,
+            cooldown_seconds=cfg.breaker_cooldown_seconds,
+        )
+        self._router = build_router(
+            stats or RouteStatsStore(),
+            policy=cfg.routing_policy,
+            role_policies=cfg.routing_role_policies,
+            max_p95_ms=cfg.routing_max_p95_ms,
+            max_cost_per_call=cfg.routing_max_cost_per_call,
+            max_error_rate=cfg.routing_max_error_rate,
+            min_samples=cfg.routing_min_samples,
+            prices=cfg.routing_prices,
+        )
+        analyst_budget = cfg.role_token_budgets.get("analyst")
+        self._context = ContextBuilder(
+            token_budget=min(cfg.memory_context_tokens, analyst_budget or cfg.memory_context_tokens),
+            estimate=self._estimate_analyst_tokens,
+            recent_turns=cfg.memory_recent_turns,
+            summary_chunk_turns=cfg.memory_summary_chunk_turns,
+            summarizer=(self._model_summary if cfg.memory_summarizer == "model" else extractive_summary),
+        )
 
-    def _provider_order(self) -> list[str]:
+    def _configured_providers(self) -> list[str]:
         ordered: list[str] = []
         for candidate in [self._cfg.provider, *self._cfg.provider_fallbacks, "local"]:
             if candidate and candidate not in ordered:
                 ordered.append(candidate)
         return ordered
 
+    def _provider_order(self) -> list[str]:
+        # The local provider is the last resort and is never skipped.
+        return [
+            name
+            for name in self._configured_providers()
+            if name == "local" or not self._health.provider_open(name)
+        ]
+
     def _model_order(self, role: str) -> list[str]:
         primary = self._cfg.role_models.get(role, self._cfg.default_model)
         ordered: list[str] = []
@@ -41,48 +217,822 @@ class AnalystRuntime:
                 ordered.append(candidate)
         return ordered
 
-    def respond(self, user_text: str) -> AnalystResponse:
-        messages = [
-            ChatMessage(role="system", content=ANALYST_SYSTEM_PROMPT),
-            ChatMessage(role="user", content=user_text),
+    def _candidate_routes(self, role: str) -> list[tuple[str, str]]:
+        models = self._model_order(role)
+        return [(provider_name, model) for provider_name in self._configured_providers() for model in models]
+
+    def _planned_routes(self, role: str) -> list[tuple[str, str]]:
+        """All configured routes for ``role`` in the order the routing policy prefers."""
+        ranked = self._router.rank(role, self._candidate_routes(role))
+        return [(entry.provider, entry.model) for entry in ranked]
+
+    def _routes(self, role: str) -> list[tuple[str, str]]:
+        available = set(self._provider_order())
+        return [
+            (provider_name, model)
+            for provider_name, model in self._planned_routes(role)
+            if provider_name == "local"
+            or (provider_name in available and self._health.allows(_route_key(provider_name, model)))
         ]
 
-        provider_errors: list[str] = []
-        models = self._model_order("analyst")
+    def _estimate_analyst_tokens(self, text: str) -> int:
+        return self.tokens.count(text, self._model_order("analyst")[0], self._cfg.provider)
+
+    def _fit_routes(self, routes: list[tuple[str, str]], turn: _Turn) -> tuple[list[tuple[str, str]], list[str]]:
+        """Split ``routes`` into those that can take the prompt and reasons for the rest.
+
+        Routes are dropped before any network call when the prompt exceeds the role's token
+        budget, or when it plus ``reserve_output_tokens`` does not fit the model's context window.
+        """
+        budget = self._cfg.role_token_budgets.get(turn.role)
+        reserve = self._cfg.reserve_output_tokens
+        fitting: list[tuple[str, str]] = []
+        oversized: list[str] = []
+        for provider_name, model in routes:
+            if provider_name == "local":
+                fitting.append((provider_name, model))
+                continue
+            prompt = self.tokens.count_messages(turn.messages, model, provider_name)
+            window = self.tokens.context_window(provider_name, model)
+            route = _route_key(provider_name, model)
+            if budget is not None and prompt > budget:
+                oversized.append(f"{route}: prompt ~{prompt} tokens exceeds the {turn.role} budget of {budget}")
+            elif window is not None and prompt + reserve > window:
+                oversized.append(
+                    f"{route}: prompt ~{prompt} tokens (+{reserve} reserved) exceeds the {window}-token context window"
+                )
+            else:
+                fitting.append((provider_name, model))
+        return fitting, oversized
+
+    def _skipped_routes(self, role: str) -> list[str]:
+        available = {_route_key(*route) for route in self._routes(role)}
+        return [
+            f"{route}: circuit open"
+            for route in (_route_key(*candidate) for candidate in self._planned_routes(role))
+            if route not in available
+        ]
+
+    def _new_turn(
+        self, messages: list[ChatMessage], session: SessionState | None = None, role: str = "analyst"
+    ) -> _Turn:
+        planned = self._planned_routes(role)
+        return _Turn(
+            messages=messages,
+            primary=planned[0] if planned else None,
+            prompt_tokens=(
+                self.tokens.count_messages(messages, planned[0][1], planned[0][0])
+                if planned
+                else self.tokens.count_messages(messages)
+            ),
+            role=role,
+            session_id=session.session_id if session is not None else None,
+        )
+
+    @staticmethod
+    def _start_attempt(attempt: _Attempt, turn: _Turn) -> None:
+        attempt.span = tracing.span(
+            "analyst.attempt", role=turn.role, route=attempt.route, attempt=attempt.number
+        )
+
+    @contextmanager
+    def _attempt_scope(self, attempt: _Attempt) -> Iterator[None]:
+        """Claim the route from its breaker, then run the call in the attempt's scope."""
+        if attempt.provider_name != "local":
+            state = self._health.acquire(attempt.route)
+            if state is None:
+                raise _TrialInFlight(f"{attempt.route} is half-open and already has a trial in flight")
+            attempt.trial = state == HALF_OPEN
+        with attempt.scope():
+            yield
+
+    def _release_trial(self, attempt: _Attempt) -> None:
+        """Free a half-open route's trial slot when the attempt ends without an outcome."""
+        if attempt.trial:
+            self._health.release(attempt.route)
+
+    def _abandon(self, attempt: _Attempt) -> None:
+        """End the span of a hedged attempt that lost the race."""
+        self._release_trial(attempt)
+        attempt.span.set_attribute("abandoned", True)
+        attempt.span.end()
+
+    def _emit(self, attempt: _Attempt, turn: _Turn, completion_tokens: int, cost: float, error: str | None) -> None:
+        self.metrics.emit(
+            CallEvent(
+                timestamp=time.time(),
+                session_id=turn.session_id,
+                role=turn.role,
+                route=attempt.route,
+                attempt=attempt.number,
+                ttfb_seconds=attempt.first_token_seconds,
+                latency_seconds=time.perf_counter() - attempt.started,
+                prompt_tokens=turn.prompt_tokens,
+                completion_tokens=completion_tokens,
+                cost=cost,
+                error_class=error,
+            )
+        )
+
+    def _record_failure(self, attempt: _Attempt, turn: _Turn, reason: str, exc: BaseException) -> None:
+        if isinstance(exc, _TrialInFlight):
+            # The route was never called, so it has no outcome to record.
+            attempt.span.end(reason)
+            return
+        self._health.record_failure(attempt.route, reason)
+        self._router.record_failure(attempt.route)
+        cause = exc.__cause__ if exc.__cause__ is not None else exc
+        self._emit(attempt, turn, completion_tokens=0, cost=0.0, error=type(cause).__name__)
+        attempt.span.end(reason)
 
-        for provider_name in self._provider_order():
-            for model in models:
-                try:
-                    provider = self._providers.get(provider_name)
-                    content = provider.chat(
+    def _record_success(self, attempt: _Attempt, turn: _Turn, content: str) -> None:
+        if attempt.cached:
+            # A replayed answer says nothing about the route's latency or health.
+            self._release_trial(attempt)
+            attempt.span.set_attribute("cache_hit", True)
+            attempt.span.end()
+            return
+        completion_tokens = self.tokens.count(content, attempt.model, attempt.provider_name)
+        cost = self._router.cost(attempt.route, turn.prompt_tokens, completion_tokens)
+        self._health.record_success(attempt.route)
+        self._router.record_success(
+            attempt.route,
+            latency_seconds=time.perf_counter() - attempt.started,
+            first_token_seconds=attempt.first_token_seconds,
+            prompt_tokens=turn.prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+        self._emit(attempt, turn, completion_tokens=completion_tokens, cost=cost, error=None)
+        attempt.span.set_attribute("completion_tokens", completion_tokens)
+        attempt.span.end()
+
+    def _hedge_delay(self, provider_name: str, model: str) -> float:
+        """Start the next route once this one is slower to its first token than its recorded p95.
+
+        The race is won by the first token, so total completion latency would hedge far too late
+        on streaming routes. Until enough samples exist, the configured delay applies.
+        """
+        route = _route_key(provider_name, model)
+        p95 = self._router.p95_first_token(route, min_samples=HEDGE_MIN_SAMPLES)
+        if p95 is not None:
+            return p95
+        return self._cfg.hedge_delays.get(route, self._cfg.hedge_delay_seconds)
+
+    def _open_stream(self, attempt: _Attempt, turn: _Turn) -> tuple[str, Iterator[str]]:
+        self._start_attempt(attempt, turn)
+        try:
+            with self._attempt_scope(attempt):
+                provider = self._providers.get(attempt.provider_name)
+                chunks = provider.chat_stream(
+                    turn.messages,
+                    model=attempt.model,
+                    temperature=self._cfg.temperature,
+                    timeout_seconds=self._cfg.request_timeout_seconds,
+                )
+                first = _first_chunk(chunks)
+        except ProviderError as exc:
+            # A hedge loser aborted by ``cancel()`` did not fail; its route keeps a clean record.
+            if attempt.cancellation.cancelled:
+                self._abandon(attempt)
+            else:
+                self._record_failure(attempt, turn, str(exc), exc)
+            raise
+        attempt.first_token_seconds = time.perf_counter() - attempt.started
+        return first, chunks
+
+    def _model_summary(self, previous: str | None, turns: list[dict[str, str]]) -> str:
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        messages = [
+            ChatMessage(role="system", content=SUMMARY_SYSTEM_PROMPT),
+            ChatMessage(
+                role="user",
+                content=f"Previous summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}",
+            ),
+        ]
+        turn = self._new_turn(messages, role="summarizer")
+        routes, _ = self._fit_routes(self._routes("summarizer"), turn)
+        for number, (provider_name, model) in enumerate(routes, start=1):
+            if provider_name == "local":
+                break
+            attempt = _Attempt(provider_name, model, number)
+            self._start_attempt(attempt, turn)
+            try:
+                with self._attempt_scope(attempt):
+                    summary = self._providers.get(provider_name).chat(
                         messages,
                         model=model,
-                        temperature=self._cfg.temperature,
+                        temperature=0.0,
                         timeout_seconds=self._cfg.request_timeout_seconds,
-                    )
-                    return AnalystResponse(
-                        content=content.strip(),
-                        provider=provider_name,
-                        model=model,
-                        fallback_used=provider_name != self._cfg.provider or model != models[0],
-                        fallback_reason=(provider_errors[0] if provider_errors else None),
-                    )
-                except ProviderError as exc:
-                    provider_errors.append(f"{provider_name}:{model}: {exc}")
+                    ).strip()
+            except ProviderError as exc:
+                self._record_failure(attempt, turn, str(exc), exc)
+                continue
+            self._record_success(attempt, turn, summary)
+            return summary
+        # The local echo provider cannot summarize; fall back to the offline summary.
+        return extractive_summary(previous, turns)
+
+    def build_messages(self, user_text: str, session: SessionState | None = None) -> list[ChatMessage]:
+        if session is None:
+            return [
+                ChatMessage(role="system", content=ANALYST_SYSTEM_PROMPT),
+                ChatMessage(role="user", content=user_text),
+            ]
+        return self._context.build(session, ANALYST_SYSTEM_PROMPT, user_text)
+
+    def available_routes(self, role: str = "analyst") -> list[tuple[str, str]]:
+        """Routes ``role`` would try next, after the routing policy and circuit breakers."""
+        return self._routes(role)
+
+    def warm_provider(self, provider_name: str, connect: bool = True) -> None:
+        self._providers.get(provider_name).warm(connect)
+
+    def prepare_context(self, session: SessionState) -> None:
+        """Checkpoint the session summary and count its recent turns ahead of the next prompt."""
+        self.build_messages("", session)
+
+    def respond(
+        self,
+        user_text: str,
+        on_token: TokenCallback | None = None,
+        session: SessionState | None = None,
+    ) -> AnalystResponse:
+        return self.complete(self.build_messages(user_text, session), on_token=on_token, session=session)
+
+    def complete(
+        self,
+        messages: list[ChatMessage],
+        *,
+        role: str = "analyst",
+        on_token: TokenCallback | None = None,
+        session: SessionState | None = None,
+    ) -> AnalystResponse:
+        """Answer prepared ``messages`` as ``role``, over that role's routes.
+
+        ``respond`` is this plus the Analyst prompt and session memory; specialist roles
+        (see ``starray.roles``) share the same routing, health, metrics and fallback rules.
+        """
+        with tracing.span(f"{role}.respond", role=role) as span, tenant_scope(_tenant(role, session)):
+            response = self._complete(messages, role, on_token, session)
+            _annotate(span, response)
+            return response
 
+    def _complete(
+        self,
+        messages: list[ChatMessage],
+        role: str,
+        on_token: TokenCallback | None,
+        session: SessionState | None,
+    ) -> AnalystResponse:
+        turn = self._new_turn(messages, session, role)
+        routes, oversized = self._fit_routes(self._routes(role), turn)
+        skipped = [*self._skipped_routes(role), *oversized]
+
+        if self._cfg.hedging and len(routes) > 1:
+            return self._respond_hedged(routes, turn, on_token, skipped)
+
+        provider_errors = list(skipped)
+        for number, (provider_name, model) in enumerate(routes, start=1):
+            # Failures before the first token fall through to the next route; once text
+            # has been rendered the route is committed and a mid-stream error only truncates.
+            attempt = _Attempt(provider_name, model, number)
+            try:
+                first, chunks = self._open_stream(attempt, turn)
+            except ProviderError as exc:
+                provider_errors.append(f"{attempt.route}: {exc}")
+                continue
+            return self._finish(attempt, first, chunks, on_token, provider_errors, turn, hedged_calls=0)
+
+        return self._unreachable(provider_errors, turn)
+
+    def _respond_hedged(
+        self,
+        routes: list[tuple[str, str]],
+        turn: _Turn,
+        on_token: TokenCallback | None,
+        skipped: list[str],
+    ) -> AnalystResponse:
+        """Race the fallback chain, starting the next route after its hedge delay or a failure.
+
+        The first route to produce a token wins. Losers still waiting are cancelled at once,
+        which releases their rate-limit permits and closes their streams; late finishers close
+        their streams.
+        """
+        results: queue.Queue[tuple[_Attempt, str, Iterator[str] | None, ProviderError | None]] = queue.Queue()
+        lock = threading.Lock()
+        decided = False
+
+        def run_attempt(attempt: _Attempt) -> None:
+            try:
+                first, chunks = self._open_stream(attempt, turn)
+            except ProviderError as exc:
+                outcome: tuple[_Attempt, str, Iterator[str] | None, ProviderError | None] = (attempt, "", None, exc)
+            except Exception as exc:  # noqa: BLE001 - the race must hear from every attempt
+                # A provider bug would otherwise kill this thread silently and hang the race.
+                error = ProviderError(f"{attempt.provider_name} provider failed: {type(exc).__name__}: {exc}")
+                error.__cause__ = exc
+                self._record_failure(attempt, turn, str(error), error)
+                outcome = (attempt, "", None, error)
+            else:
+                outcome = (attempt, first, chunks, None)
+            with lock:
+                if not decided:
+                    results.put(outcome)
+                    return
+            if outcome[2] is not None:
+                outcome[2].close()
+                self._abandon(attempt)
+
+        attempts: list[_Attempt] = []
+        in_flight = 0
+        hedged_calls = 0
+        hedge_at = 0.0
+        errors: dict[int, str] = {}
+
+        def launch() -> None:
+            nonlocal in_flight, hedge_at
+            attempt = _Attempt(*routes[len(attempts)], number=len(attempts) + 1)
+            attempts.append(attempt)
+            # Each thread runs in its own copy of the context so its spans join this trace.
+            context = tracing.copy_context()
+            threading.Thread(
+                target=context.run, args=(run_attempt, attempt), name="starray-hedge", daemon=True
+            ).start()
+            hedge_at = time.perf_counter() + self._hedge_delay(attempt.provider_name, attempt.model)
+            in_flight += 1
+
+        launch()
+        while in_flight:
+            timeout = max(0.0, hedge_at - time.perf_counter()) if len(attempts) < len(routes) else None
+            try:
+                attempt, first, chunks, exc = results.get(timeout=timeout)
+            except queue.Empty:
+                hedged_calls += 1
+                launch()
+                continue
+            in_flight -= 1
+            if exc is not None or chunks is None:
+                errors[attempt.number] = f"{attempt.route}: {exc}"
+                if len(attempts) < len(routes):
+                    launch()
+                continue
+
+            with lock:
+                decided = True
+            for loser in attempts:
+                if loser is not attempt and loser.number not in errors:
+                    loser.cancellation.cancel()
+                    self._abandon(loser)
+            while not results.empty():
+                late = results.get_nowait()
+                if late[2] is not None:
+                    late[2].close()
+            provider_errors = [*skipped, *(errors[i] for i in sorted(errors))]
+            return self._finish(attempt, first, chunks, on_token, provider_errors, turn, hedged_calls)
+
+        return self._unreachable([*skipped, *(errors[i] for i in sorted(errors))], turn, hedged_calls)
+
+    def _finish(
+        self,
+        attempt: _Attempt,
+        first: str,
+        chunks: Iterator[str],
+        on_token: TokenCallback | None,
+        provider_errors: list[str],
+        turn: _Turn,
+        hedged_calls: int,
+    ) -> AnalystResponse:
+        first_token_seconds = time.perf_counter() - turn.started
+        parts = [first]
+        if first and on_token is not None:
+            on_token(first)
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                if on_token is not None:
+                    on_token(chunk)
+        except ProviderError as exc:
+            provider_errors.append(f"{attempt.route}: stream interrupted: {exc}")
+            self._record_failure(attempt, turn, f"stream interrupted: {exc}", exc)
+            return self._response(attempt, parts, provider_errors, turn, first_token_seconds, hedged_calls)
+        response = self._response(attempt, parts, provider_errors, turn, first_token_seconds, hedged_calls)
+        self._record_success(attempt, turn, response.content)
+        return response
+
+    def _response(
+        self,
+        attempt: _Attempt,
+        parts: list[str],
+        provider_errors: list[str],
+        turn: _Turn,
+        first_token_seconds: float,
+        hedged_calls: int,
+    ) -> AnalystResponse:
+        return AnalystResponse(
+            content="".join(parts).strip(),
+            provider=attempt.provider_name,
+            model=attempt.model,
+            fallback_used=(attempt.provider_name, attempt.model) != turn.primary,
+            fallback_reason=(provider_errors[0] if provider_errors else None),
+            first_token_seconds=first_token_seconds,
+            latency_seconds=time.perf_counter() - turn.started,
+            hedged_calls=hedged_calls,
+            cached=attempt.cached,
+        )
+
+    def _unreachable(
+        self, provider_errors: list[str], turn: _Turn, hedged_calls: int = 0
+    ) -> AnalystResponse:
         # Should never happen because local fallback exists, but keep a hard fallback message.
         return AnalystResponse(
             content=(
-                "Analyst: I could not reach any configured providers. "
+                f"{turn.role.capitalize()}: I could not reach any configured providers. "
                 "Run '/provider' to inspect routes and verify credentials."
             ),
             provider="none",
             model="none",
             fallback_used=True,
             fallback_reason=(provider_errors[0] if provider_errors else None),
+            latency_seconds=time.perf_counter() - turn.started,
+            hedged_calls=hedged_calls,
+        )
+
+    async def arespond(
+        self,
+        user_text: str,
+        on_token: TokenCallback | None = None,
+        session: SessionState | None = None,
+    ) -> AnalystResponse:
+        """Async counterpart of ``respond`` with the same routing, hedging and health rules.
+
+        Each route must produce its first token, and every later chunk, within
+        ``request_timeout_seconds``. Cancelling the awaiting task cancels in-flight provider
+        calls and closes their streams.
+        """
+        # Building the prompt may call a summarizer model, so keep it off the event loop.
+        messages = await asyncio.to_thread(self.build_messages, user_text, session)
+        return await self.acomplete(messages, on_token=on_token, session=session)
+
+    async def acomplete(
+        self,
+        messages: list[ChatMessage],
+        *,
+        role: str = "analyst",
+        on_token: TokenCallback | None = None,
+        session: SessionState | None = None,
+    ) -> AnalystResponse:
+        """Async counterpart of ``complete``."""
+        with tracing.span(f"{role}.respond", role=role) as span, tenant_scope(_tenant(role, session)):
+            response = await self._acomplete(messages, role, on_token, session)
+            _annotate(span, response)
+            return response
+
+    async def _acomplete(
+        self,
+        messages: list[ChatMessage],
+        role: str,
+        on_token: TokenCallback | None,
+        session: SessionState | None,
+    ) -> AnalystResponse:
+        turn = self._new_turn(messages, session, role)
+        routes, oversized = self._fit_routes(self._routes(role), turn)
+        skipped = [*self._skipped_routes(role), *oversized]
+
+        if self._cfg.hedging and len(routes) > 1:
+            return await self._arespond_hedged(routes, turn, on_token, skipped)
+
+        provider_errors = list(skipped)
+        for number, (provider_name, model) in enumerate(routes, start=1):
+            attempt = _Attempt(provider_name, model, number)
+            try:
+                first, chunks = await self._aopen_stream(attempt, turn)
+            except ProviderError as exc:
+                provider_errors.append(f"{attempt.route}: {exc}")
+                continue
+            return await self._afinish(attempt, first, chunks, on_token, provider_errors, turn, hedged_calls=0)
+
+        return self._unreachable(provider_errors, turn)
+
+    async def _aopen_stream(self, attempt: _Attempt, turn: _Turn) -> tuple[str, AsyncIterator[str]]:
+        timeout = self._cfg.request_timeout_seconds
+        chunks: AsyncIterator[str] | None = None
+        self._start_attempt(attempt, turn)
+        try:
+            with self._attempt_scope(attempt):
+                provider = self._providers.get(attempt.provider_name)
+                chunks = provider.achat_stream(
+                    turn.messages,
+                    model=attempt.model,
+                    temperature=self._cfg.temperature,
+                    timeout_seconds=timeout,
+                )
+                async with asyncio.timeout(timeout):
+                    first = await _afirst_chunk(chunks)
+        except ProviderError as exc:
+            if chunks is not None:
+                await chunks.aclose()
+            self._record_failure(attempt, turn, str(exc), exc)
+            raise
+        except TimeoutError as exc:
+            if chunks is not None:
+                await chunks.aclose()
+            reason = f"no response within {timeout:g}s"
+            self._record_failure(attempt, turn, reason, exc)
+            raise ProviderError(reason) from exc
+        except asyncio.CancelledError:
+            if chunks is not None:
+                await chunks.aclose()
+            raise
+        attempt.first_token_seconds = time.perf_counter() - attempt.started
+        return first, chunks
+
+    async def _arespond_hedged(
+        self,
+        routes: list[tuple[str, str]],
+        turn: _Turn,
+        on_token: TokenCallback | None,
+        skipped: list[str],
+    ) -> AnalystResponse:
+        """Race the fallback chain as tasks; the first route to produce a token wins."""
+        tasks: dict[asyncio.Task[tuple[str, AsyncIterator[str]]], _Attempt] = {}
+        errors: dict[int, str] = {}
+        hedged_calls = 0
+        winner: asyncio.Task[tuple[str, AsyncIterator[str]]] | None = None
+
+        def launch() -> None:
+            attempt = _Attempt(*routes[len(tasks)], number=len(tasks) + 1)
+            tasks[asyncio.create_task(self._aopen_stream(attempt, turn))] = attempt
+
+        launch()
+        try:
+            while True:
+                pending = [task for task in tasks if not task.done()]
+                if not pending:
+                    break
+                delay = self._hedge_delay(*routes[len(tasks) - 1]) if len(tasks) < len(routes) else None
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged_calls += 1
+                    launch()
+                    continue
+                for task in done:
+                    attempt = tasks[task]
+                    exc = task.exception()
+                    if exc is None:
+                        winner = task
+                        first, chunks = task.result()
+                        provider_errors = [*skipped, *(errors[i] for i in sorted(errors))]
+                        await self._cancel_losers(tasks, winner=task)
+                        return await self._afinish(
+                            attempt, first, chunks, on_token, provider_errors, turn, hedged_calls
+                        )
+                    errors[attempt.number] = f"{attempt.route}: {exc}"
+                if len(tasks) < len(routes):
+                    launch()
+        finally:
+            # Also runs when the caller cancels us, so no attempt outlives the request.
+            await self._cancel_losers(tasks, winner=winner)
+
+        return self._unreachable([*skipped, *(errors[i] for i in sorted(errors))], turn, hedged_calls)
+
+    async def _cancel_losers(
+        self,
+        tasks: dict[asyncio.Task[tuple[str, AsyncIterator[str]]], _Attempt],
+        winner: asyncio.Task[tuple[str, AsyncIterator[str]]] | None,
+    ) -> None:
+        for task in tasks:
+            if task is winner:
+                continue
+            if not task.done():
+                task.cancel()
+                with suppress(asyncio.CancelledError, ProviderError):
+                    await task
+                self._abandon(tasks[task])
+            elif not task.cancelled() and task.exception() is None:
+                # A second route answered in the same tick; close its stream unread.
+                await task.result()[1].aclose()
+                self._abandon(tasks[task])
+
+    async def _afinish(
+        self,
+        attempt: _Attempt,
+        first: str,
+        chunks: AsyncIterator[str],
+        on_token: TokenCallback | None,
+        provider_errors: list[str],
+        turn: _Turn,
+        hedged_calls: int,
+    ) -> AnalystResponse:
+        first_token_seconds = time.perf_counter() - turn.started
+        parts = [first]
+        if first and on_token is not None:
+            on_token(first)
+        try:
+            while True:
+                async with asyncio.timeout(self._cfg.request_timeout_seconds):
+                    chunk = await anext(chunks, None)
+                if chunk is None:
+                    break
+                parts.append(chunk)
+                if on_token is not None:
+                    on_token(chunk)
+        except (ProviderError, TimeoutError) as exc:
+            reason = f"stream interrupted: {str(exc) or 'timed out'}"
+            provider_errors.append(f"{attempt.route}: {reason}")
+            self._record_failure(attempt, turn, reason, exc)
+            return self._response(attempt, parts, provider_errors, turn, first_token_seconds, hedged_calls)
+        finally:
+            await chunks.aclose()
+        response = self._response(attempt, parts, provider_errors, turn, first_token_seconds, hedged_calls)
+        self._record_success(attempt, turn, response.content)
+        return response
+
+    def structured(
+        self,
+        messages: list[ChatMessage],
+        schema: dict[str, Any],
+        *,
+        role: str = "analyst",
+        session: SessionState | None = None,
+    ) -> StructuredResponse:
+        """A JSON object answering ``messages`` that validates against ``schema``.
+
+        Each reply is streamed through a ``JsonStreamChecker`` and closed as soon as it cannot
+        become valid. The same route is then re-asked with the errors, up to
+        ``structured_max_repairs`` times, before the next route is tried. Raises
+        ``StructuredOutputError`` if no route produces a valid object.
+        """
+        compiled = compile_schema(schema)
+        with tracing.span(f"{role}.structured", role=role) as span, tenant_scope(_tenant(role, session)):
+            turn, routes, provider_errors = self._structured_plan(messages, compiled, role, session)
+            number, base_tokens = 0, turn.prompt_tokens
+            for provider_name, model in routes:
+                conversation, turn.prompt_tokens = turn.messages, base_tokens
+                for repair in range(self._cfg.structured_max_repairs + 1):
+                    number += 1
+                    attempt = _Attempt(provider_name, model, number)
+                    self._start_attempt(attempt, turn)
+                    try:
+                        with self._attempt_scope(attempt):
+                            chunks = self._providers.get(provider_name).structured_stream(
+                                conversation,
+                                model=model,
+                                schema=compiled.schema,
+                                temperature=self._cfg.temperature,
+                                timeout_seconds=self._cfg.request_timeout_seconds,
+                            )
+                            reply = read_structured(chunks, compiled)
+                    except ProviderError as exc:
+                        self._record_failure(attempt, turn, str(exc), exc)
+                        provider_errors.append(f"{attempt.route}: {exc}")
+                        break
+                    if self._settle_reply(attempt, turn, reply, provider_errors):
+                        return self._structured_response(span, attempt, turn, reply, provider_errors, repair)
+                    conversation = self._reask(attempt, turn, conversation, reply)
+            raise StructuredOutputError(self._structured_failure(provider_errors, role))
+
+    async def astructured(
+        self,
+        messages: list[ChatMessage],
+        schema: dict[str, Any],
+        *,
+        role: str = "analyst",
+        session: SessionState | None = None,
+    ) -> StructuredResponse:
+        """Async counterpart of ``structured``; every chunk must arrive within ``request_timeout_seconds``."""
+        compiled = compile_schema(schema)
+        timeout = self._cfg.request_timeout_seconds
+        with tracing.span(f"{role}.structured", role=role) as span, tenant_scope(_tenant(role, session)):
+            turn, routes, provider_errors = self._structured_plan(messages, compiled, role, session)
+            number, base_tokens = 0, turn.prompt_tokens
+            for provider_name, model in routes:
+                conversation, turn.prompt_tokens = turn.messages, base_tokens
+                for repair in range(self._cfg.structured_max_repairs + 1):
+                    number += 1
+                    attempt = _Attempt(provider_name, model, number)
+                    self._start_attempt(attempt, turn)
+                    try:
+                        with self._attempt_scope(attempt):
+                            chunks = self._providers.get(provider_name).astructured_stream(
+                                conversation,
+                                model=model,
+                                schema=compiled.schema,
+                                temperature=self._cfg.temperature,
+                                timeout_seconds=timeout,
+                            )
+                            reply = await aread_structured(chunks, compiled, timeout)
+                    except (ProviderError, TimeoutError) as exc:
+                        reason = str(exc) if isinstance(exc, ProviderError) else f"no response within {timeout:g}s"
+                        self._record_failure(attempt, turn, reason, exc)
+                        provider_errors.append(f"{attempt.route}: {reason}")
+                        break
+                    if self._settle_reply(attempt, turn, reply, provider_errors):
+                        return self._structured_response(span, attempt, turn, reply, provider_errors, repair)
+                    conversation = self._reask(attempt, turn, conversation, reply)
+            raise StructuredOutputError(self._structured_failure(provider_errors, role))
+
+    def _structured_plan(
+        self, messages: list[ChatMessage], compiled: CompiledSchema, role: str, session: SessionState | None
+    ) -> tuple[_Turn, list[tuple[str, str]], list[str]]:
+        turn = self._new_turn(schema_messages(messages, compiled), session, role)
+        routes, oversized = self._fit_routes(self._routes(role), turn)
+        return turn, routes, [*self._skipped_routes(role), *oversized]
+
+    def _settle_reply(
+        self, attempt: _Attempt, turn: _Turn, reply: StructuredReply, provider_errors: list[str]
+    ) -> bool:
+        """Record a reply that arrived; returns whether it was valid."""
+        if reply.payload is not None:
+            self._record_success(attempt, turn, reply.text)
+            return True
+        reason = f"invalid structured output: {format_errors(reply.errors)}"
+        provider_errors.append(f"{attempt.route}: {reason}")
+        # The route is up, so health and routing stats are untouched; the metric records the miss.
+        completion_tokens = self.tokens.count(reply.text, attempt.model, attempt.provider_name)
+        cost = self._router.cost(attempt.route, turn.prompt_tokens, completion_tokens)
+        self._emit(attempt, turn, completion_tokens, cost, error=StructuredOutputError.__name__)
+        self._release_trial(attempt)
+        attempt.span.end(reason)
+        return False
+
+    def _reask(
+        self, attempt: _Attempt, turn: _Turn, conversation: list[ChatMessage], reply: StructuredReply
+    ) -> list[ChatMessage]:
+        conversation = repair_messages(conversation, reply)
+        turn.prompt_tokens = self.tokens.count_messages(conversation, attempt.model, attempt.provider_name)
+        return conversation
+
+    @staticmethod
+    def _structured_response(
+        span: tracing.Span | tracing.NoopSpan,
+        attempt: _Attempt,
+        turn: _Turn,
+        reply: StructuredReply,
+        provider_errors: list[str],
+        repairs: int,
+    ) -> StructuredResponse:
+        assert reply.payload is not None
+        response = StructuredResponse(
+            payload=reply.payload,
+            provider=attempt.provider_name,
+            model=attempt.model,
+            fallback_used=(attempt.provider_name, attempt.model) != turn.primary,
+            fallback_reason=(provider_errors[0] if provider_errors else None),
+            repairs=repairs,
+            latency_seconds=time.perf_counter() - turn.started,
+            cached=attempt.cached,
         )
+        span.set_attribute("route", attempt.route)
+        span.set_attribute("fallback_used", response.fallback_used)
+        span.set_attribute("repairs", repairs)
+        return response
+
+    @staticmethod
+    def _structured_failure(provider_errors: list[str], role: str) -> str:
+        if not provider_errors:
+            return f"No routes are available for {role} structured output"
+        return f"No route produced valid {role} structured output: " + "; ".join(provider_errors)
+
+    def close(self) -> None:
+        """Release provider resources such as pooled HTTP connections and flush route state."""
+        close = getattr(self._providers, "close", None)
+        if close is not None:
+            close()
+        self._health.close()
+        self._router.close()
 
     def provider_summary(self) -> str:
-        providers = " -> ".join(self._provider_order())
+        available = self._provider_order()
+        providers = " -> ".join(
+            name if name in available else f"{name} (circuit open)"
+            for name in self._configured_providers()
+        )
         models = " -> ".join(self._model_order("analyst"))
-        return f"Provider route: {providers}\nAnalyst model route: {models}"
+        summary = f"Provider route: {providers}\nAnalyst model route: {models}"
+        if self._cfg.hedging:
+            summary += f"\nHedging: after {self._cfg.hedge_delay_seconds:g}s (per-route overrides: {len(self._cfg.hedge_delays)})"
+        return summary + "\n" + self.routing_summary() + "\n" + self.health_summary()
+
+    def routing_summary(self, role: str = "analyst") -> str:
+        return self._router.explain(role, self._candidate_routes(role))
+
+    def health_summary(self) -> str:
+        snapshot = self._health.snapshot()
+        lines = ["Route health:"]
+        for provider_name in self._configured_providers():
+            for model in self._model_order("analyst"):
+                route = _route_key(provider_name, model)
+                health = snapshot.get(route)
+                if health is None:
+                    lines.append(f"  {route}: {CLOSED}")
+                    continue
+                line = f"  {route}: {health.state}"
+                if health.consecutive_failures:
+                    line += f", {health.consecutive_failures} consecutive failures"
+                retry_in = self._health.retry_in(route)
+                if retry_in is not None:
+                    line += f", retry in {retry_in:.0f}s"
+                if health.state != CLOSED and health.last_error:
+                    line += f" ({health.last_error})"
+                lines.append(line)
+        return "\n".join(lines)
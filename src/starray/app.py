@@ -0,0 +1,186 @@
+"""Wiring shared by the interactive CLI, the daemon and batch runs."""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+from . import tracing
+from .analyst import AnalystResponse, AnalystRuntime, TokenCallback
+from .cache import CachingProvider, ResponseCache
+from .config import AppConfig
+from .health import RouteHealthTracker
+from .httpclients import HttpClientPool, HttpPoolConfig
+from .logging_utils import LogWriterConfig, SessionLogWriter
+from .metrics import METRICS_FILE, MetricsRecorder
+from .prefetch import Prefetcher
+from .providers import ModelProvider, ProviderFactory
+from .ratelimit import RateLimit, RateLimitedProvider, RateLimiter
+from .routing import RouteStatsStore
+from .session import SessionState
+from .session_index import SessionIndex, SessionIndexError
+from .tokens import TokenEstimator
+from .workflow import WorkflowExecutor
+
+
+RESUME_TAIL_TURNS = 50
+
+
+def resolve_storage_paths(cfg: AppConfig) -> tuple[Path, Path]:
+    data_dir = cfg.data_dir.expanduser()
+    session_dir = data_dir / "sessions"
+    log_dir = data_dir / "logs"
+    return session_dir, log_dir
+
+
+def build_response_cache(cfg: AppConfig) -> ResponseCache | None:
+    if not cfg.cache_enabled:
+        return None
+    return ResponseCache(
+        cfg.data_dir.expanduser() / "cache",
+        ttl_seconds=cfg.cache_ttl_seconds,
+        max_memory_entries=cfg.cache_max_memory_entries,
+        max_disk_bytes=cfg.cache_max_disk_bytes,
+    )
+
+
+def configure_tracing(cfg: AppConfig) -> None:
+    """Install a file-exporting tracer when ``[tracing]`` is enabled; otherwise leave the no-op one."""
+    if not cfg.tracing_enabled or tracing.get_tracer().enabled:
+        return
+    path = cfg.tracing_path or cfg.data_dir / tracing.TRACES_FILE
+    tracing.set_tracer(tracing.Tracer(tracing.OtlpJsonFileExporter(path.expanduser())))
+
+
+def build_rate_limiter(cfg: AppConfig) -> RateLimiter | None:
+    if not cfg.ratelimit_enabled:
+        return None
+    limits = {
+        key: RateLimit(
+            rpm=limit.get("rpm"),
+            tpm=limit.get("tpm"),
+            concurrency=int(limit["concurrency"]) if "concurrency" in limit else None,
+        )
+        for key, limit in cfg.ratelimit_limits.items()
+    }
+    return RateLimiter(limits, max_wait_seconds=cfg.ratelimit_max_wait_seconds)
+
+
+def build_analyst_runtime(cfg: AppConfig, cache: ResponseCache | None = None) -> AnalystRuntime:
+    configure_tracing(cfg)
+    health = RouteHealthTracker.load(
+        cfg.data_dir.expanduser() / "health.json",
+        failure_threshold=cfg.breaker_failure_threshold,
+        cooldown_seconds=cfg.breaker_cooldown_seconds,
+    )
+    stats = RouteStatsStore.load(cfg.data_dir.expanduser() / "routing.json")
+    metrics = MetricsRecorder(cfg.data_dir.expanduser() / METRICS_FILE)
+    tokens = TokenEstimator(context_windows=cfg.context_windows)
+    limiter = build_rate_limiter(cfg)
+
+    # Rate limiting sits under the cache, so cache hits never wait for capacity.
+    def wrap(provider: ModelProvider) -> ModelProvider:
+        if limiter is not None:
+            provider = RateLimitedProvider(provider, limiter, tokens)
+        if cache is not None:
+            provider = CachingProvider(provider, cache, max_temperature=cfg.cache_max_temperature)
+        return provider
+
+    http = HttpClientPool(
+        HttpPoolConfig(
+            max_connections=cfg.http_max_connections,
+            max_keepalive_connections=cfg.http_max_keepalive_connections,
+            keepalive_expiry_seconds=cfg.http_keepalive_expiry_seconds,
+            http2=cfg.http_http2,
+        )
+    )
+    return AnalystRuntime(
+        cfg,
+        provider_factory=ProviderFactory(wrap=wrap, http=http),
+        health=health,
+        stats=stats,
+        metrics=metrics,
+        tokens=tokens,
+        rate_limiter=limiter,
+    )
+
+
+def build_workflow_executor(cfg: AppConfig, analyst_runtime: AnalystRuntime) -> WorkflowExecutor:
+    return WorkflowExecutor(
+        analyst_runtime,
+        max_concurrency=cfg.workflow_max_concurrency,
+        role_concurrency=cfg.workflow_role_concurrency,
+        role_deadlines=cfg.workflow_role_deadlines,
+    )
+
+
+def build_log_writer(cfg: AppConfig) -> SessionLogWriter:
+    _, logs_dir = resolve_storage_paths(cfg)
+    return SessionLogWriter(
+        logs_dir,
+        LogWriterConfig(
+            max_bytes=cfg.log_max_bytes,
+            max_age_seconds=cfg.log_max_age_seconds,
+            backup_count=cfg.log_backup_count,
+            queue_size=cfg.log_queue_size,
+        ),
+    )
+
+
+def build_session_index(cfg: AppConfig) -> SessionIndex | None:
+    """Open the session search index, or ``None`` when disabled or unavailable."""
+    if not cfg.session_index_enabled:
+        return None
+    sessions_dir, _ = resolve_storage_paths(cfg)
+    try:
+        return SessionIndex.for_sessions_dir(sessions_dir)
+    except SessionIndexError:
+        return None
+
+
+def build_prefetcher(cfg: AppConfig, analyst_runtime: AnalystRuntime) -> Prefetcher | None:
+    if not cfg.prefetch_enabled:
+        return None
+    return Prefetcher(
+        analyst_runtime,
+        warm_connections=cfg.prefetch_warm_connections,
+        rewarm_seconds=cfg.http_keepalive_expiry_seconds / 2,
+    )
+
+
+def run_turn(
+    user_text: str,
+    analyst_runtime: AnalystRuntime,
+    state: SessionState,
+    sessions_dir: Path,
+    logger: logging.Logger,
+    on_token: TokenCallback | None = None,
+    index: SessionIndex | None = None,
+) -> AnalystResponse:
+    """Answer one user message, record both turns, log them and persist the session."""
+    with tracing.span("starray.turn", session_id=state.session_id):
+        analyst_response = analyst_runtime.respond(user_text, on_token=on_token, session=state)
+        state.add_turn("user", user_text)
+        state.add_turn(
+            "analyst",
+            analyst_response.content,
+            provider=analyst_response.provider,
+            model=analyst_response.model,
+        )
+        with tracing.span("session.log"):
+            # Records only reference the texts; serialization happens on the log writer thread.
+            logger.info("user", extra={"content": user_text})
+            logger.info(
+                "analyst",
+                extra={
+                    "provider": analyst_response.provider,
+                    "model": analyst_response.model,
+                    "fallback": analyst_response.fallback_used,
+                    "hedged": analyst_response.hedged_calls,
+                    "ttft_seconds": analyst_response.first_token_seconds,
+                    "latency_seconds": analyst_response.latency_seconds,
+                    "content": analyst_response.content,
+                },
+            )
+        state.save(sessions_dir, index)
+        return analyst_response
@@ -0,0 +1,234 @@
+"""Compressed archive tier for idle sessions and their logs.
+
+Idle transcripts move from ``sessions/<id>.jsonl`` to ``sessions/archive/<id>.jsonl.gz`` or,
+with monthly packing, into ``sessions/archive/<YYYY-MM>.zip``. ``load_session`` restores an
+archived session to the active tier on demand, so resuming one needs no extra step.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, UTC
+import gzip
+import json
+import os
+from pathlib import Path
+import shutil
+import time
+import zipfile
+
+from .session import SessionError, _index_path, compact_session, session_path
+
+
+ARCHIVE_DIR = "archive"
+PACK_MODES = ("none", "monthly")
+_DAY = 24 * 3600
+
+
+@dataclass(slots=True)
+class ArchiveReport:
+    archived: list[str] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+    logs_compressed: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+
+def archive_dir(session_dir: Path) -> Path:
+    return session_dir / ARCHIVE_DIR
+
+
+def _gzip_path(session_dir: Path, session_id: str) -> Path:
+    return archive_dir(session_dir) / f"{session_id}.jsonl.gz"
+
+
+def _member(session_id: str) -> str:
+    return f"{session_id}.jsonl"
+
+
+def _packs(session_dir: Path) -> list[Path]:
+    return sorted(archive_dir(session_dir).glob("*.zip"), reverse=True)
+
+
+def _last_activity(path: Path) -> float:
+    """Latest activity an archive can hold.
+
+    A ``<YYYY-MM>.zip`` pack only holds sessions last active in that month, so it counts as
+    the end of the month however recently the pack file itself was rewritten. A gzip keeps
+    its transcript's modification time.
+    """
+    if path.suffix == ".zip":
+        try:
+            start = datetime.strptime(path.stem, "%Y-%m").replace(tzinfo=UTC)
+        except ValueError:
+            pass
+        else:
+            month_end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+            return month_end.timestamp()
+    return path.stat().st_mtime
+
+
+def _gzip_file(source: Path, target: Path) -> None:
+    """Compress ``source`` to ``target`` atomically, keeping its modification time."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    with source.open("rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    stat = source.stat()
+    os.utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp, target)
+
+
+def _add_to_pack(pack: Path, source: Path, member: str) -> int:
+    """Append ``source`` to ``pack`` as ``member``; returns its compressed size."""
+    pack.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(pack, "a", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+        if member in zf.namelist():
+            raise SessionError(f"{pack.name} already holds {member}")
+        info = zipfile.ZipInfo.from_file(source, member)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with source.open("rb") as src, zf.open(info, "w") as dst:
+            shutil.copyfileobj(src, dst)
+        return zf.getinfo(member).compress_size
+
+
+def _remove_from_pack(pack: Path, member: str) -> None:
+    """Rewrite ``pack`` without ``member``; the pack is deleted once it is empty."""
+    tmp = pack.with_name(f"{pack.name}.{os.getpid()}.tmp")
+    with zipfile.ZipFile(pack) as src, zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as dst:
+        kept = [info for info in src.infolist() if info.filename != member]
+        for info in kept:
+            with src.open(info) as fh, dst.open(info, "w") as out:
+                shutil.copyfileobj(fh, out)
+    if kept:
+        os.replace(tmp, pack)
+    else:
+        tmp.unlink()
+        pack.unlink()
+
+
+def restore_session(session_dir: Path, session_id: str) -> bool:
+    """Move an archived session back to ``<id>.jsonl``; returns ``False`` if none is archived."""
+    target = session_path(session_dir, session_id)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.restore")
+    compressed = _gzip_path(session_dir, session_id)
+    if compressed.exists():
+        with gzip.open(compressed, "rb") as src, tmp.open("wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp, target)
+        compressed.unlink()
+        return True
+    member = _member(session_id)
+    for pack in _packs(session_dir):
+        with zipfile.ZipFile(pack) as zf:
+            if member not in zf.namelist():
+                continue
+            with zf.open(member) as src, tmp.open("wb") as dst:
+                shutil.copyfileobj(src, dst)
+        os.replace(tmp, target)
+        _remove_from_pack(pack, member)
+        return True
+    return False
+
+
+def iter_archived(session_dir: Path) -> Iterator[tuple[str, list[dict]]]:
+    """Yield ``(session_id, records)`` for every archived session without restoring it."""
+    for path in sorted(archive_dir(session_dir).glob("*.jsonl.gz")):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                records = [json.loads(line) for line in fh if line.strip()]
+        except (OSError, ValueError):
+            continue
+        yield path.name.removesuffix(".jsonl.gz"), records
+    for pack in _packs(session_dir):
+        try:
+            with zipfile.ZipFile(pack) as zf:
+                for name in sorted(zf.namelist()):
+                    lines = zf.read(name).decode("utf-8").splitlines()
+                    yield name.removesuffix(".jsonl"), [json.loads(line) for line in lines if line.strip()]
+        except (OSError, ValueError, zipfile.BadZipFile):
+            continue
+
+
+def archive_sessions(
+    session_dir: Path,
+    log_dir: Path | None = None,
+    *,
+    idle_days: float,
+    pack: str = "none",
+    retention_days: float = 0,
+    dry_run: bool = False,
+    now: float | None = None,
+) -> ArchiveReport:
+    """Archive sessions untouched for ``idle_days`` and apply the archive retention policy.
+
+    Each transcript is compacted, then gzipped (``pack="none"``) or added to the zip for the
+    month of its last activity (``pack="monthly"``). Its offset index is dropped and its log
+    files are gzipped under ``<log_dir>/archive``. With ``retention_days`` > 0, archives and
+    archived logs whose last activity is older than that are deleted; a monthly pack goes once
+    its whole month is. ``dry_run`` only reports what would happen.
+    """
+    if pack not in PACK_MODES:
+        raise ValueError(f"Unknown archive pack mode {pack!r}; expected one of {', '.join(PACK_MODES)}")
+    now = time.time() if now is None else now
+    report = ArchiveReport()
+    cutoff = now - idle_days * _DAY
+
+    for path in sorted(session_dir.glob("*.jsonl")):
+        stat = path.stat()
+        if stat.st_mtime > cutoff:
+            continue
+        session_id = path.stem
+        report.archived.append(session_id)
+        report.bytes_before += stat.st_size
+        if dry_run:
+            continue
+        try:
+            # Drop superseded summary checkpoints first; archives are never appended to.
+            compact_session(session_dir, session_id)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            if pack == "monthly":
+                month = datetime.fromtimestamp(stat.st_mtime, UTC).strftime("%Y-%m")
+                size = _add_to_pack(archive_dir(session_dir) / f"{month}.zip", path, _member(session_id))
+            else:
+                target = _gzip_path(session_dir, session_id)
+                _gzip_file(path, target)
+                size = target.stat().st_size
+        except (OSError, SessionError):
+            report.archived.pop()
+            report.bytes_before -= stat.st_size
+            continue
+        path.unlink()
+        _index_path(path).unlink(missing_ok=True)
+        report.bytes_after += size
+        if log_dir is not None:
+            report.logs_compressed += _archive_logs(log_dir, session_id)
+
+    if retention_days > 0:
+        expired = now - retention_days * _DAY
+        for path in [*archive_dir(session_dir).glob("*.jsonl.gz"), *_packs(session_dir)]:
+            if _last_activity(path) <= expired:
+                if path.suffix == ".zip":
+                    with zipfile.ZipFile(path) as zf:
+                        report.deleted.extend(name.removesuffix(".jsonl") for name in zf.namelist())
+                else:
+                    report.deleted.append(path.name.removesuffix(".jsonl.gz"))
+                if not dry_run:
+                    path.unlink()
+        if log_dir is not None and not dry_run:
+            for path in (log_dir / ARCHIVE_DIR).glob("*.log.gz"):
+                if path.stat().st_mtime <= expired:
+                    path.unlink()
+    return report
+
+
+def _archive_logs(log_dir: Path, session_id: str) -> int:
+    """Gzip ``<id>.log`` and its rotated ``<id>.N.log`` files into ``<log_dir>/archive``."""
+    compressed = 0
+    for path in [log_dir / f"{session_id}.log", *log_dir.glob(f"{session_id}.*.log")]:
+        if path.exists():
+            _gzip_file(path, log_dir / ARCHIVE_DIR / f"{path.name}.gz")
+            path.unlink()
+            compressed += 1
+    return compressed
@@ -0,0 +1,193 @@
+"""Run a JSONL file of prompts through one shared Analyst runtime with bounded parallelism."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from .analyst import AnalystRuntime
+
+
+class BatchError(RuntimeError):
+    """Raised when a batch input file cannot be read."""
+
+
+@dataclass(slots=True)
+class BatchItem:
+    id: str
+    prompt: str
+
+
+@dataclass(slots=True)
+class BatchSummary:
+    total: int
+    skipped: int
+    completed: int
+    failed: int
+
+
+def read_items(input_path: Path) -> Iterator[BatchItem]:
+    """Yield prompts from ``input_path``.
+
+    Each line is either a JSON object with ``prompt`` (or ``message``) and an optional ``id``,
+    or a bare JSON string. Items without an id are keyed by their 1-based line number.
+    """
+    try:
+        fh = input_path.open("r", encoding="utf-8")
+    except OSError as exc:
+        raise BatchError(f"Cannot read batch input: {input_path}") from exc
+    with fh:
+        for line_number, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise BatchError(f"Invalid JSON on line {line_number} of {input_path}") from exc
+            if isinstance(raw, str):
+                yield BatchItem(id=str(line_number), prompt=raw)
+                continue
+            if not isinstance(raw, dict) or not isinstance(raw.get("prompt", raw.get("message")), str):
+                raise BatchError(f"Line {line_number} of {input_path} has no 'prompt' string")
+            yield BatchItem(id=str(raw.get("id", line_number)), prompt=raw.get("prompt", raw.get("message")))
+
+
+def _succeeded(line: str) -> str | None:
+    """The id of a complete, successful result line, or None for errors and torn lines."""
+    if not line.endswith("\n"):
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(record, dict) and "id" in record and not record.get("error"):
+        return str(record["id"])
+    return None
+
+
+def completed_ids(output_path: Path) -> set[str]:
+    """Ids already written to ``output_path`` by an earlier, possibly interrupted, run."""
+    if not output_path.exists():
+        return set()
+    # A torn final line may end inside a multi-byte character; that item is simply redone.
+    with output_path.open("r", encoding="utf-8", errors="replace") as fh:
+        return {record_id for record_id in map(_succeeded, fh) if record_id is not None}
+
+
+def _drop_superseded(output_path: Path) -> None:
+    """Rewrite ``output_path`` keeping one successful record per id.
+
+    Error records and a torn last line belong to items that a resumed run retries; keeping
+    them would leave two records for one id. The file is only rewritten when something goes.
+    """
+    if not output_path.exists():
+        return
+    with output_path.open("r", encoding="utf-8", errors="replace") as fh:
+        seen: set[str] = set()
+        for record_id in map(_succeeded, fh):
+            if record_id is None or record_id in seen:
+                break
+            seen.add(record_id)
+        else:
+            return
+    scratch = output_path.with_name(output_path.name + ".tmp")
+    with output_path.open("r", encoding="utf-8", errors="replace") as src, scratch.open(
+        "w", encoding="utf-8"
+    ) as dst:
+        seen = set()
+        for line in src:
+            record_id = _succeeded(line)
+            if record_id is not None and record_id not in seen:
+                seen.add(record_id)
+                dst.write(line)
+    os.replace(scratch, output_path)
+
+
+def _run_item(runtime: AnalystRuntime, item: BatchItem) -> dict[str, Any]:
+    try:
+        response = runtime.respond(item.prompt)
+    except Exception as exc:  # noqa: BLE001 - one bad prompt must not sink the batch
+        return {"id": item.id, "prompt": item.prompt, "error": f"{type(exc).__name__}: {exc}"}
+    return {"id": item.id, "prompt": item.prompt, **asdict(response)}
+
+
+def run_batch(
+    runtime: AnalystRuntime,
+    input_path: Path,
+    output_path: Path,
+    *,
+    concurrency: int = 4,
+    ordered: bool = True,
+    resume: bool = True,
+    on_result: Callable[[dict[str, Any]], None] | None = None,
+) -> BatchSummary:
+    """Answer every prompt in ``input_path`` and append one JSON result per line.
+
+    At most ``concurrency`` prompts are in flight. With ``ordered`` results are written in
+    input order; otherwise as they complete. With ``resume`` items whose ids already have a
+    successful result in ``output_path`` are skipped, earlier error records are dropped so
+    each id keeps a single record, and new results are appended. If reading ``input_path``
+    fails part-way, results already in flight are written before the error propagates.
+    """
+    concurrency = max(1, concurrency)
+    skip = completed_ids(output_path) if resume else set()
+    if resume:
+        _drop_superseded(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    summary = BatchSummary(total=0, skipped=0, completed=0, failed=0)
+
+    # Ordered mode parks finished results until every earlier one has been written.
+    parked: dict[int, dict[str, Any]] = {}
+    pending: dict[Future[dict[str, Any]], int] = {}
+    next_to_write = 0
+
+    with output_path.open("a" if resume else "w", encoding="utf-8") as out, ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="starray-batch"
+    ) as pool:
+
+        def emit(record: dict[str, Any]) -> None:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if record.get("error"):
+                summary.failed += 1
+            else:
+                summary.completed += 1
+            if on_result is not None:
+                on_result(record)
+
+        def collect() -> None:
+            nonlocal next_to_write
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                if ordered:
+                    parked[index] = future.result()
+                else:
+                    emit(future.result())
+            while next_to_write in parked:
+                emit(parked.pop(next_to_write))
+                next_to_write += 1
+
+        index = 0
+        try:
+            for item in read_items(input_path):
+                summary.total += 1
+                if item.id in skip:
+                    summary.skipped += 1
+                    continue
+                # Ordered mode also bounds the parked backlog behind one slow prompt.
+                while len(pending) + len(parked) >= concurrency * (2 if ordered else 1):
+                    collect()
+                pending[pool.submit(_run_item, runtime, item)] = index
+                index += 1
+        finally:
+            # A bad input line must not cost the answers already paid for.
+            while pending:
+                collect()
+
+    return summary
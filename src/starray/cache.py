@@ -0,0 +1,471 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import aclosing, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any
+
+from .providers import ChatMessage, ModelProvider
+from .structured import StructuredOutputError, parse_structured
+
+
+@dataclass(slots=True)
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+
+_hits: ContextVar[list[str] | None] = ContextVar("starray_cache_hits", default=None)
+
+
+@contextmanager
+def collect_cache_hits(into: list[str]) -> Iterator[None]:
+    """Append the key of every cache hit served in this context to ``into``.
+
+    Callers use it to tell a replayed answer from a real provider call, whose latency and
+    outcome are worth recording.
+    """
+    token = _hits.set(into)
+    try:
+        yield
+    finally:
+        _hits.reset(token)
+
+
+def cache_key(
+    kind: str,
+    provider_name: str,
+    model: str,
+    temperature: float,
+    messages: list[ChatMessage],
+    schema: dict[str, Any] | None = None,
+) -> str:
+    """Hash the normalized request so equivalent calls share one entry."""
+    payload = {
+        "kind": kind,
+        "provider": provider_name,
+        "model": model,
+        "temperature": round(temperature, 4),
+        "messages": [[m.role.strip().lower(), m.content.strip()] for m in messages],
+        "schema": schema,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier response cache: an in-memory LRU in front of a size-bounded directory.
+
+    Entries expire after ``ttl_seconds``. The disk tier evicts least recently used files
+    (by mtime, refreshed on every hit) once ``max_disk_bytes`` is exceeded.
+    """
+
+    def __init__(
+        self,
+        directory: Path | None,
+        *,
+        ttl_seconds: float = 86400.0,
+        max_memory_entries: int = 256,
+        max_disk_bytes: int = 64 * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._directory = directory
+        self._ttl_seconds = ttl_seconds
+        self._max_memory_entries = max_memory_entries
+        self._max_disk_bytes = max_disk_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._disk_bytes: int | None = None
+        self.stats = CacheStats()
+
+    def _path(self, key: str) -> Path:
+        assert self._directory is not None
+        return self._directory / key[:2] / f"{key}.json"
+
+    def _expired(self, created_at: float) -> bool:
+        return self._clock() - created_at > self._ttl_seconds
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            entry = self._read_disk(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self.stats.disk_hits += 1
+            self._remember(key, entry)
+            return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        entry = (self._clock(), value)
+        with self._lock:
+            self._remember(key, entry)
+            self._write_disk(key, entry)
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.stats.bypassed += 1
+
+    def summary(self) -> str:
+        stats = self.stats
+        return (
+            f"hits={stats.hits} (memory={stats.memory_hits}, disk={stats.disk_hits}) "
+            f"misses={stats.misses} bypassed={stats.bypassed} evictions={stats.evictions}"
+        )
+
+    def _remember(self, key: str, entry: tuple[float, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> tuple[float, Any] | None:
+        if self._directory is None:
+            return None
+        path = self._path(key)
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            entry = (float(raw["created_at"]), raw["value"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            self._unlink(path)
+            return None
+        if self._expired(entry[0]):
+            self._unlink(path)
+            return None
+        os.utime(path)
+        return entry
+
+    def _write_disk(self, key: str, entry: tuple[float, Any]) -> None:
+        if self._directory is None:
+            return
+        path = self._path(key)
+        data = json.dumps({"created_at": entry[0], "value": entry[1]}, ensure_ascii=False)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        usage = self._disk_usage()
+        previous = path.stat().st_size if path.exists() else 0
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(data, encoding="utf-8")
+        os.replace(tmp_path, path)
+        self._disk_bytes = usage - previous + path.stat().st_size
+        if self._disk_bytes > self._max_disk_bytes:
+            self._evict_disk()
+
+    def _disk_usage(self) -> int:
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(p.stat().st_size for p in self._entries())
+        return self._disk_bytes
+
+    def _entries(self) -> list[Path]:
+        assert self._directory is not None
+        return [p for p in self._directory.glob("*/*.json") if p.is_file()]
+
+    def _evict_disk(self) -> None:
+        # Hits refresh mtime, so the oldest mtimes are the least recently used entries.
+        entries = sorted(self._entries(), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in entries)
+        for path in entries:
+            if total <= self._max_disk_bytes:
+                break
+            total -= path.stat().st_size
+            self._unlink(path)
+            self.stats.evictions += 1
+        self._disk_bytes = total
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class CachingProvider(ModelProvider):
+    """Serves repeated low-temperature requests from a ``ResponseCache``."""
+
+    def __init__(self, inner: ModelProvider, cache: ResponseCache, *, max_temperature: float) -> None:
+        self.name = inner.name
+        self._inner = inner
+        self._cache = cache
+        self._max_temperature = max_temperature
+
+    def warm(self, connect: bool = True) -> None:
+        self._inner.warm(connect)
+
+    def _lookup(self, key: str) -> Any:
+        cached = self._cache.get(key)
+        hits = _hits.get()
+        if cached is not None and hits is not None:
+            hits.append(key)
+        return cached
+
+    def _cacheable(self, temperature: float) -> bool:
+        if temperature > self._max_temperature:
+            self._cache.record_bypass()
+            return False
+        return True
+
+    def chat(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> str:
+        if not self._cacheable(temperature):
+            return self._inner.chat(
+                messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds
+            )
+        key = cache_key("chat", self.name, model, temperature, messages)
+        cached = self._lookup(key)
+        if isinstance(cached, str):
+            return cached
+        content = self._inner.chat(
+            messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds
+        )
+        self._cache.put(key, content)
+        return content
+
+    def chat_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> Iterator[str]:
+        if not self._cacheable(temperature):
+            yield from self._inner.chat_stream(
+                messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds
+            )
+            return
+        key = cache_key("chat", self.name, model, temperature, messages)
+        cached = self._lookup(key)
+        if isinstance(cached, str):
+            yield cached
+            return
+        parts: list[str] = []
+        for chunk in self._inner.chat_stream(
+            messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds
+        ):
+            parts.append(chunk)
+            yield chunk
+        # Only completed streams are stored; an interrupted stream raises before this point.
+        self._cache.put(key, "".join(parts))
+
+    def structured_output(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> dict[str, Any]:
+        if not self._cacheable(temperature):
+            return self._inner.structured_output(
+                messages,
+                model=model,
+                schema=schema,
+                temperature=temperature,
+                timeout_seconds=timeout_seconds,
+            )
+        key = cache_key("structured_output", self.name, model, temperature, messages, schema)
+        cached = self._lookup(key)
+        if isinstance(cached, dict):
+            return cached
+        payload = self._inner.structured_output(
+            messages,
+            model=model,
+            schema=schema,
+            temperature=temperature,
+            timeout_seconds=timeout_seconds,
+        )
+        self._cache.put(key, payload)
+        return payload
+
+    def structured_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> Iterator[str]:
+        if not self._cacheable(temperature):
+            yield from self._inner.structured_stream(
+                messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+            )
+            return
+        # Shares entries with ``structured_output``; a hit replays the payload as one chunk.
+        key = cache_key("structured_output", self.name, model, temperature, messages, schema)
+        cached = self._lookup(key)
+        if isinstance(cached, dict):
+            yield json.dumps(cached)
+            return
+        parts: list[str] = []
+        try:
+            for chunk in self._inner.structured_stream(
+                messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+            ):
+                parts.append(chunk)
+                yield chunk
+        finally:
+            # Readers close the stream once the document is complete, so store on close too.
+            self._store_structured(key, "".join(parts), schema)
+
+    def _store_structured(self, key: str, text: str, schema: dict[str, Any]) -> None:
+        """Cache a completed structured reply, but only once it validates against ``schema``."""
+        try:
+            payload = parse_structured(text, schema)
+        except StructuredOutputError:
+            return
+        self._cache.put(key, payload)
+
+    async def achat(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> str:
+        if not self._cacheable(temperature):
+            return await self._inner.achat(
+                messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds
+            )
+        key = cache_key("chat", self.name, model, temperature, messages)
+        cached = self._lookup(key)
+        if isinstance(cached, str):
+            return cached
+        content = await self._inner.achat(
+            messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds
+        )
+        self._cache.put(key, content)
+        return content
+
+    async def achat_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> AsyncIterator[str]:
+        if not self._cacheable(temperature):
+            async with aclosing(
+                self._inner.achat_stream(
+                    messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds
+                )
+            ) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+        key = cache_key("chat", self.name, model, temperature, messages)
+        cached = self._lookup(key)
+        if isinstance(cached, str):
+            yield cached
+            return
+        parts: list[str] = []
+        async with aclosing(
+            self._inner.achat_stream(
+                messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds
+            )
+        ) as chunks:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        self._cache.put(key, "".join(parts))
+
+    async def astructured_output(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> dict[str, Any]:
+        if not self._cacheable(temperature):
+            return await self._inner.astructured_output(
+                messages,
+                model=model,
+                schema=schema,
+                temperature=temperature,
+                timeout_seconds=timeout_seconds,
+            )
+        key = cache_key("structured_output", self.name, model, temperature, messages, schema)
+        cached = self._lookup(key)
+        if isinstance(cached, dict):
+            return cached
+        payload = await self._inner.astructured_output(
+            messages,
+            model=model,
+            schema=schema,
+            temperature=temperature,
+            timeout_seconds=timeout_seconds,
+        )
+        self._cache.put(key, payload)
+        return payload
+
+    async def astructured_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> AsyncIterator[str]:
+        if not self._cacheable(temperature):
+            async with aclosing(
+                self._inner.astructured_stream(
+                    messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+                )
+            ) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+        key = cache_key("structured_output", self.name, model, temperature, messages, schema)
+        cached = self._lookup(key)
+        if isinstance(cached, dict):
+            yield json.dumps(cached)
+            return
+        parts: list[str] = []
+        try:
+            async with aclosing(
+                self._inner.astructured_stream(
+                    messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+                )
+            ) as chunks:
+                async for chunk in chunks:
+                    parts.append(chunk)
+                    yield chunk
+        finally:
+            self._store_structured(key, "".join(parts), schema)
@@ -4,13 +4,16 @@ import argparse
 import os
 from pathlib import Path
 import sys
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from . import __version__
-from .analyst import AnalystRuntime
 from .config import AppConfig, ConfigError, load_config
-from .logging_utils import build_session_logger
-from .session import SessionState, SessionError, load_session
+
+# Runtime, provider and session modules are imported inside the commands that use them so
+# that `status`, `init` and `--version` start without loading any of the chat machinery.
+if TYPE_CHECKING:
+    from .analyst import AnalystResponse, AnalystRuntime
+    from .session import SessionState
 
 
 class Ui:
@@ -39,13 +42,6 @@ ENV_CONFIG = "STARRAY_CONFIG"
 CONFIG_FILENAME = "starray.toml"
 
 
-def _resolve_storage_paths(cfg: AppConfig) -> tuple[Path, Path]:
-    data_dir = cfg.data_dir.expanduser()
-    session_dir = data_dir / "sessions"
-    log_dir = data_dir / "logs"
-    return session_dir, log_dir
-
-
 def _user_config_path() -> Path:
     xdg_config_home = os.getenv("XDG_CONFIG_HOME")
     base = Path(xdg_config_home).expanduser() if xdg_config_home else Path.home() / ".config"
@@ -94,6 +90,13 @@ fallbacks = ["anthropic", "gemini", "local"]
 default_model = "gpt-4.1"
 temperature = 0.2
 request_timeout_seconds = 30
+hedging = false
+hedge_delay_seconds = 2.0
+reserve_output_tokens = 1024
+
+[provider.circuit_breaker]
+failure_threshold = 3
+cooldown_seconds = 60
 
 [provider.role_models]
 analyst = "gpt-4.1"
@@ -106,8 +109,70 @@ security = "gpt-4.1"
 [provider.role_fallback_models]
 analyst = ["gpt-4.1-mini"]
 
+[provider.role_token_budgets]
+analyst = 8000
+summarizer = 4000
+
+[memory]
+context_tokens = 6000
+recent_turns = 12
+summary_chunk_turns = 20
+summarizer = "local"
+
+[routing]
+policy = "static"
+max_error_rate = 0.5
+min_samples = 3
+
+[workflow]
+max_concurrency = 4
+
+[workflow.role_concurrency]
+implementer = 1
+
+[workflow.role_deadlines]
+tester = 120
+security = 120
+
+[tracing]
+enabled = false
+
+[http]
+max_connections = 20
+max_keepalive_connections = 10
+keepalive_expiry_seconds = 30
+http2 = false
+
+[logging]
+max_mb = 10
+max_age_days = 7
+backup_count = 5
+queue_size = 10000
+
+[prefetch]
+enabled = false
+warm_connections = true
+
+[structured]
+max_repairs = 1
+
+[ratelimit]
+enabled = true
+max_wait_seconds = 60
+
+[cache]
+enabled = false
+ttl_seconds = 86400
+max_memory_entries = 256
+max_disk_mb = 64
+max_temperature = 0.3
+
 [storage]
 data_dir = "{state_dir}"
+index = true
+archive_after_days = 30
+archive_pack = "none"
+archive_retention_days = 0
 """
 
 
@@ -130,49 +195,74 @@ def cmd_status(config_path: Path) -> int:
     print(f"{ui.c('Provider fallbacks:', Ui.CYAN)} {', '.join(cfg.provider_fallbacks) or '(none)'}")
     print(f"{ui.c('Default model:', Ui.CYAN)} {cfg.default_model}")
     print(f"{ui.c('Data dir:', Ui.CYAN)} {cfg.data_dir}")
+    print(
+        f"{ui.c('Response cache:', Ui.CYAN)} "
+        f"{'enabled' if cfg.cache_enabled else 'disabled'}"
+    )
+    from .daemon import daemon_pid, socket_path
+
+    pid = daemon_pid(socket_path(cfg))
+    print(f"{ui.c('Daemon:', Ui.CYAN)} {f'running (pid {pid})' if pid else 'not running'}")
     return 0
 
 
+class _AnalystPanel:
+    """Renders the Analyst panel incrementally as response tokens arrive."""
+
+    def __init__(self) -> None:
+        self._opened = False
+
+    def _open(self) -> None:
+        self._opened = True
+        print(ui.c("┌─ Analyst", Ui.BOLD, Ui.MAGENTA))
+        sys.stdout.write(f"{ui.c('│', Ui.MAGENTA)} ")
+
+    def write(self, text: str) -> None:
+        if not self._opened:
+            self._open()
+        sys.stdout.write(text.replace("\n", f"\n{ui.c('│', Ui.MAGENTA)} "))
+        sys.stdout.flush()
+
+    def close(self, analyst_response: AnalystResponse) -> None:
+        if not self._opened:
+            self.write(analyst_response.content)
+        provider_line = (
+            f"{ui.c('│', Ui.MAGENTA)} "
+            f"{ui.c('[provider]', Ui.DIM)} {analyst_response.provider}/{analyst_response.model}"
+        )
+        reason_line = ""
+        if analyst_response.fallback_reason:
+            reason_line = (
+                f"{ui.c('│', Ui.MAGENTA)} "
+                f"{ui.c('[fallback]', Ui.DIM)} {analyst_response.fallback_reason}\n"
+            )
+        print(
+            "\n"
+            f"{provider_line}\n"
+            f"{reason_line}"
+            f"{ui.c('└────────', Ui.MAGENTA)}"
+        )
+
+
 def _handle_turn(
     user_text: str,
     analyst_runtime: AnalystRuntime,
     state: SessionState,
     sessions_dir: Path,
     logger,
+    index=None,
 ) -> None:
+    from .app import run_turn
+
     user_text = user_text.strip()
     if not user_text:
         return
 
-    analyst_response = analyst_runtime.respond(user_text)
-    state.add_turn("user", user_text)
-    state.add_turn("analyst", analyst_response.content)
-    logger.info("user=%s", user_text)
-    logger.info(
-        "analyst provider=%s model=%s fallback=%s",
-        analyst_response.provider,
-        analyst_response.model,
-        analyst_response.fallback_used,
-    )
-    logger.info("analyst=%s", analyst_response.content)
-    state.save(sessions_dir)
-    provider_line = (
-        f"{ui.c('│', Ui.MAGENTA)} "
-        f"{ui.c('[provider]', Ui.DIM)} {analyst_response.provider}/{analyst_response.model}"
-    )
-    reason_line = ""
-    if analyst_response.fallback_reason:
-        reason_line = (
-            f"{ui.c('│', Ui.MAGENTA)} "
-            f"{ui.c('[fallback]', Ui.DIM)} {analyst_response.fallback_reason}\n"
-        )
-    print(
-        f"{ui.c('┌─ Analyst', Ui.BOLD, Ui.MAGENTA)}\n"
-        f"{provider_line}\n"
-        f"{reason_line}"
-        f"{ui.c('│', Ui.MAGENTA)} {analyst_response.content}\n"
-        f"{ui.c('└────────', Ui.MAGENTA)}"
+    panel = _AnalystPanel()
+    analyst_response = run_turn(
+        user_text, analyst_runtime, state, sessions_dir, logger, on_token=panel.write, index=index
     )
+    panel.close(analyst_response)
 
 
 def _print_intro(cfg: AppConfig, session_id: str) -> None:
@@ -201,71 +291,332 @@ def cmd_provider(config_path: Path) -> int:
     except ConfigError as exc:
         return _print_config_error(exc, config_path)
 
-    analyst_runtime = AnalystRuntime(cfg)
-    print(ui.c("Provider routing", Ui.BOLD, Ui.GREEN))
-    print(f"{ui.c('Config:', Ui.CYAN)} {config_path}")
-    print(analyst_runtime.provider_summary())
+    from .app import build_analyst_runtime
+
+    analyst_runtime = build_analyst_runtime(cfg)
+    try:
+        print(ui.c("Provider routing", Ui.BOLD, Ui.GREEN))
+        print(f"{ui.c('Config:', Ui.CYAN)} {config_path}")
+        print(analyst_runtime.provider_summary())
+    finally:
+        analyst_runtime.close()
+    return 0
+
+
+def _chat_via_daemon(
+    cfg: AppConfig, config_path: Path, message: str, session_id: Optional[str]
+) -> Optional[int]:
+    """Forward a one-shot chat turn to a running `starray serve`; None when none is running."""
+    from .analyst import AnalystResponse
+    from .daemon import DaemonError, forward_chat, socket_path
+
+    def on_session(event: dict) -> None:
+        if event["resumed"]:
+            print(
+                ui.c(
+                    f"Resumed session: {event['session_id']} ({event['turn_count']} turns)",
+                    Ui.YELLOW,
+                )
+            )
+        _print_intro(cfg, event["session_id"])
+
+    text = message.strip()
+    if not text:
+        return None
+    panel = _AnalystPanel()
+    try:
+        done = forward_chat(
+            socket_path(cfg),
+            config_path,
+            text,
+            session_id,
+            on_session=on_session,
+            on_token=panel.write,
+        )
+    except DaemonError as exc:
+        print(ui.c(f"Daemon error: {exc}", Ui.RED))
+        return 1
+    if done is None:
+        return None
+    panel.close(AnalystResponse(**done["response"]))
+    print(ui.c(f"Session saved: {done['session_id']}", Ui.GREEN))
     return 0
 
 
-def cmd_chat(config_path: Path, message: Optional[str], session_id: Optional[str]) -> int:
+def cmd_chat(
+    config_path: Path,
+    message: Optional[str],
+    session_id: Optional[str],
+    use_daemon: bool = True,
+) -> int:
     try:
         cfg = load_config(config_path)
     except ConfigError as exc:
         return _print_config_error(exc, config_path)
 
-    sessions_dir, logs_dir = _resolve_storage_paths(cfg)
-    analyst_runtime = AnalystRuntime(cfg)
+    if message is not None and use_daemon:
+        rc = _chat_via_daemon(cfg, config_path, message, session_id)
+        if rc is not None:
+            return rc
+
+    from .app import (
+        RESUME_TAIL_TURNS,
+        build_analyst_runtime,
+        build_log_writer,
+        build_prefetcher,
+        build_response_cache,
+        build_session_index,
+        resolve_storage_paths,
+    )
+    from .logging_utils import build_session_logger, release_session_logger
+    from .providers import warm_provider_imports
+    from .session import SessionError, SessionState, load_session
 
+    sessions_dir, logs_dir = resolve_storage_paths(cfg)
     try:
         if session_id:
-            state = load_session(sessions_dir, session_id)
-            print(ui.c(f"Resumed session: {state.session_id}", Ui.YELLOW))
+            state = load_session(sessions_dir, session_id, tail_turns=RESUME_TAIL_TURNS)
+            print(ui.c(f"Resumed session: {state.session_id} ({state.turn_count} turns)", Ui.YELLOW))
         else:
             state = SessionState.new()
     except SessionError as exc:
         print(ui.c(str(exc), Ui.RED))
         return 1
 
-    logger = build_session_logger(logs_dir, state.session_id)
-
-    _print_intro(cfg, state.session_id)
-
-    if message is not None:
-        _handle_turn(message, analyst_runtime, state, sessions_dir, logger)
+    cache = build_response_cache(cfg)
+    analyst_runtime = build_analyst_runtime(cfg, cache)
+    logger = build_session_logger(logs_dir, state.session_id, build_log_writer(cfg))
+    index = build_session_index(cfg)
+    try:
+        _print_intro(cfg, state.session_id)
+
+        if message is not None:
+            _handle_turn(message, analyst_runtime, state, sessions_dir, logger, index)
+            release_session_logger(logger)
+            print(ui.c(f"Session saved: {state.session_id}", Ui.GREEN))
+            return 0
+
+        # Load provider SDKs in the background while the user types the first prompt.
+        warm_provider_imports()
+        prefetcher = build_prefetcher(cfg, analyst_runtime)
+        print(ui.c("Type 'exit' to quit.", Ui.DIM))
+        try:
+            while True:
+                print(ui.c("┌─ Input", Ui.BOLD, Ui.CYAN))
+                if prefetcher is not None:
+                    prefetcher.start(state)
+                try:
+                    user_text = input(ui.c("│ ", Ui.CYAN))
+                finally:
+                    if prefetcher is not None:
+                        prefetcher.cancel()
+                if user_text.strip().lower() in {"exit", "quit"}:
+                    state.save(sessions_dir, index)
+                    break
+                if user_text.strip() == "/help":
+                    print(ui.c("Commands: /help, /provider, /session, /stats, /status, exit", Ui.DIM))
+                    continue
+                if user_text.strip() == "/stats":
+                    print(analyst_runtime.metrics.aggregator.format_table("route"))
+                    if analyst_runtime.rate_limiter is not None:
+                        print(analyst_runtime.rate_limiter.format_table())
+                    continue
+                if user_text.strip() == "/provider":
+                    print(analyst_runtime.provider_summary())
+                    continue
+                if user_text.strip() == "/session":
+                    print(ui.c(f"Current session: {state.session_id}", Ui.YELLOW))
+                    continue
+                if user_text.strip() == "/status":
+                    print(
+                        f"{ui.c('Provider:', Ui.CYAN)} {cfg.provider}   "
+                        f"{ui.c('Model:', Ui.CYAN)} {cfg.default_model}"
+                    )
+                    if cache is not None:
+                        print(f"{ui.c('Cache:', Ui.CYAN)} {cache.summary()}")
+                    continue
+                _handle_turn(user_text, analyst_runtime, state, sessions_dir, logger, index)
+        except (KeyboardInterrupt, EOFError):
+            state.save(sessions_dir, index)
+            print()
+
+        release_session_logger(logger)
         print(ui.c(f"Session saved: {state.session_id}", Ui.GREEN))
+        print(ui.c(f"Resume with: starray --session-id {state.session_id}", Ui.YELLOW))
         return 0
+    finally:
+        if index is not None:
+            index.close()
+        analyst_runtime.close()
 
-    print(ui.c("Type 'exit' to quit.", Ui.DIM))
+
+def cmd_serve(config_path: Path) -> int:
     try:
-        while True:
-            print(ui.c("┌─ Input", Ui.BOLD, Ui.CYAN))
-            user_text = input(ui.c("│ ", Ui.CYAN))
-            if user_text.strip().lower() in {"exit", "quit"}:
-                state.save(sessions_dir)
-                break
-            if user_text.strip() == "/help":
-                print(ui.c("Commands: /help, /provider, /session, /status, exit", Ui.DIM))
-                continue
-            if user_text.strip() == "/provider":
-                print(analyst_runtime.provider_summary())
-                continue
-            if user_text.strip() == "/session":
-                print(ui.c(f"Current session: {state.session_id}", Ui.YELLOW))
-                continue
-            if user_text.strip() == "/status":
-                print(
-                    f"{ui.c('Provider:', Ui.CYAN)} {cfg.provider}   "
-                    f"{ui.c('Model:', Ui.CYAN)} {cfg.default_model}"
-                )
-                continue
-            _handle_turn(user_text, analyst_runtime, state, sessions_dir, logger)
-    except (KeyboardInterrupt, EOFError):
-        state.save(sessions_dir)
+        cfg = load_config(config_path)
+    except ConfigError as exc:
+        return _print_config_error(exc, config_path)
+
+    from .daemon import DaemonError, serve, socket_path
+
+    path = socket_path(cfg)
+    print(ui.c(f"Starray daemon listening on {path}", Ui.GREEN))
+    print(ui.c("Press Ctrl-C to stop.", Ui.DIM))
+    try:
+        serve(path)
+    except DaemonError as exc:
+        print(ui.c(str(exc), Ui.RED))
+        return 1
+    except KeyboardInterrupt:
+        print()
+    print(ui.c("Starray daemon stopped.", Ui.YELLOW))
+    return 0
+
+
+def cmd_batch(
+    config_path: Path, input_path: Path, output_path: Path, concurrency: int, order: str, resume: bool
+) -> int:
+    try:
+        cfg = load_config(config_path)
+    except ConfigError as exc:
+        return _print_config_error(exc, config_path)
+
+    from .app import build_analyst_runtime, build_response_cache
+    from .batch import BatchError, run_batch
+
+    analyst_runtime = build_analyst_runtime(cfg, build_response_cache(cfg))
+
+    def on_result(record: dict) -> None:
+        if record.get("error"):
+            print(ui.c(f"[{record['id']}] error: {record['error']}", Ui.RED), file=sys.stderr)
+        else:
+            route = f"{record['provider']}:{record['model']}"
+            print(ui.c(f"[{record['id']}] {route} {record['latency_seconds']:.2f}s", Ui.DIM), file=sys.stderr)
+
+    try:
+        summary = run_batch(
+            analyst_runtime,
+            input_path.expanduser(),
+            output_path.expanduser(),
+            concurrency=concurrency,
+            ordered=order == "input",
+            resume=resume,
+            on_result=on_result,
+        )
+    except BatchError as exc:
+        print(ui.c(str(exc), Ui.RED))
+        return 1
+    except KeyboardInterrupt:
+        print(ui.c("\nBatch interrupted; rerun the same command to resume.", Ui.YELLOW))
+        return 130
+    finally:
+        analyst_runtime.close()
+
+    print(
+        ui.c(
+            f"Batch done: {summary.completed} completed, {summary.failed} failed, "
+            f"{summary.skipped} skipped of {summary.total}",
+            Ui.GREEN if summary.failed == 0 else Ui.YELLOW,
+        )
+    )
+    return 0 if summary.failed == 0 else 2
+
+
+def cmd_stats(config_path: Path, session_id: Optional[str], since: Optional[str], group_by: str) -> int:
+    try:
+        cfg = load_config(config_path)
+    except ConfigError as exc:
+        return _print_config_error(exc, config_path)
+
+    import time
+
+    from .metrics import METRICS_FILE, MetricsAggregator, parse_window, read_events
+
+    try:
+        cutoff = time.time() - parse_window(since) if since else None
+    except ValueError as exc:
+        print(ui.c(str(exc), Ui.RED))
+        return 1
+
+    aggregator = MetricsAggregator(
+        read_events(cfg.data_dir.expanduser() / METRICS_FILE, session_id=session_id, since=cutoff)
+    )
+    scope = f"session {session_id}" if session_id else "all sessions"
+    if since:
+        scope += f", last {since}"
+    print(ui.c(f"Provider call stats ({scope}, {len(aggregator)} calls)", Ui.BOLD, Ui.GREEN))
+    for key in (["route", "role"] if group_by == "both" else [group_by]):
         print()
+        print(aggregator.format_table(key))
+    return 0
+
+
+def cmd_sessions(
+    config_path: Path,
+    action: str,
+    query: Optional[str],
+    limit: int,
+    idle_days: Optional[float] = None,
+    pack: Optional[str] = None,
+    dry_run: bool = False,
+) -> int:
+    try:
+        cfg = load_config(config_path)
+    except ConfigError as exc:
+        return _print_config_error(exc, config_path)
 
-    print(ui.c(f"Session saved: {state.session_id}", Ui.GREEN))
-    print(ui.c(f"Resume with: starray --session-id {state.session_id}", Ui.YELLOW))
+    from .session_index import SessionIndex, SessionIndexError
+
+    sessions_dir = cfg.data_dir.expanduser() / "sessions"
+    try:
+        index = SessionIndex.for_sessions_dir(sessions_dir)
+        try:
+            if action == "archive":
+                from .archive import archive_sessions
+
+                report = archive_sessions(
+                    sessions_dir,
+                    cfg.data_dir.expanduser() / "logs",
+                    idle_days=cfg.archive_after_days if idle_days is None else idle_days,
+                    pack=pack or cfg.archive_pack,
+                    retention_days=cfg.archive_retention_days,
+                    dry_run=dry_run,
+                )
+                if report.deleted and not dry_run:
+                    index.remove(report.deleted)
+                verb = "Would archive" if dry_run else "Archived"
+                sizes = f"{report.bytes_before / 1024:.1f} KiB"
+                if not dry_run:
+                    sizes += f" -> {report.bytes_after / 1024:.1f} KiB"
+                print(ui.c(f"{verb} {len(report.archived)} idle sessions ({sizes})", Ui.GREEN))
+                if report.logs_compressed:
+                    print(ui.c(f"Compressed {report.logs_compressed} log files", Ui.DIM))
+                if report.deleted:
+                    verb = "Would delete" if dry_run else "Deleted"
+                    print(ui.c(f"{verb} {len(report.deleted)} sessions past archive retention", Ui.YELLOW))
+            elif action == "rebuild":
+                indexed = index.rebuild(sessions_dir)
+                print(ui.c(f"Indexed {indexed} sessions into {index.path}", Ui.GREEN))
+            elif action == "search":
+                hits = index.search(query or "", limit=limit)
+                if not hits:
+                    print(ui.c(f"No turns match {query!r}.", Ui.YELLOW))
+                for hit in hits:
+                    print(f"{ui.c(hit.session_id, Ui.CYAN)} #{hit.turn} {hit.role:<8} {(hit.timestamp or '')[:19]}")
+                    print(f"  {' '.join(hit.snippet.split())}")
+            else:
+                sessions = index.list_sessions(limit=limit)
+                print(ui.c(f"Sessions ({len(sessions)} of {index.count()}, most recent first)", Ui.BOLD, Ui.GREEN))
+                for item in sessions:
+                    providers = ",".join(item.providers) or "-"
+                    print(
+                        f"{ui.c(item.session_id, Ui.CYAN)}  {(item.last_activity or '')[:19]}  "
+                        f"{item.turn_count:>4} turns  {providers:<16} {item.title}"
+                    )
+        finally:
+            index.close()
+    except SessionIndexError as exc:
+        print(ui.c(str(exc), Ui.RED))
+        return 1
     return 0
 
 
@@ -300,6 +651,40 @@ def build_parser() -> argparse.ArgumentParser:
     chat_parser.add_argument("--config", "-c", dest="sub_config")
     chat_parser.add_argument("--message", "-m")
     chat_parser.add_argument("--session-id", dest="sub_session_id")
+    chat_parser.add_argument(
+        "--no-daemon", action="store_true", help="Run in-process even if `starray serve` is running"
+    )
+
+    serve_parser = subparsers.add_parser("serve", help="Run a local daemon that keeps providers warm")
+    serve_parser.add_argument("--config", "-c", dest="sub_config")
+
+    batch_parser = subparsers.add_parser("batch", help="Answer a JSONL file of prompts concurrently")
+    batch_parser.add_argument("--config", "-c", dest="sub_config")
+    batch_parser.add_argument("--input", "-i", required=True, help="JSONL prompts: {\"id\": ..., \"prompt\": ...}")
+    batch_parser.add_argument("--output", "-o", required=True, help="JSONL results, appended to on resume")
+    batch_parser.add_argument("--concurrency", "-j", type=int, default=4)
+    batch_parser.add_argument("--order", choices=("input", "completion"), default="input")
+    batch_parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming")
+
+    stats_parser = subparsers.add_parser("stats", help="Show provider call latency percentiles")
+    stats_parser.add_argument("--config", "-c", dest="sub_config")
+    stats_parser.add_argument("--session-id", dest="sub_session_id")
+    stats_parser.add_argument("--since", help="Only calls in this window, e.g. 30m, 12h, 7d")
+    stats_parser.add_argument("--by", choices=("route", "role", "both"), default="both")
+
+    sessions_parser = subparsers.add_parser("sessions", help="List and search stored sessions")
+    sessions_parser.add_argument("--config", "-c", dest="sub_config")
+    sessions_actions = sessions_parser.add_subparsers(dest="sessions_command")
+    list_parser = sessions_actions.add_parser("list", help="Most recently active sessions")
+    list_parser.add_argument("--limit", "-n", type=int, default=20)
+    search_parser = sessions_actions.add_parser("search", help="Full-text search over all turns")
+    search_parser.add_argument("query", help="Words to match; end a word with * for a prefix match")
+    search_parser.add_argument("--limit", "-n", type=int, default=20)
+    sessions_actions.add_parser("rebuild", help="Rebuild the index from the session files")
+    archive_parser = sessions_actions.add_parser("archive", help="Compress idle sessions and apply retention")
+    archive_parser.add_argument("--idle-days", type=float, help="Override [storage] archive_after_days")
+    archive_parser.add_argument("--pack", choices=("none", "monthly"), help="Override [storage] archive_pack")
+    archive_parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived")
 
     init_parser = subparsers.add_parser("init", help="Create a user config file")
     init_parser.add_argument("--config", "-c", dest="sub_config")
@@ -324,7 +709,31 @@ def main(argv: Optional[list[str]] = None) -> int:
         return cmd_provider(config_path)
     if args.command == "chat":
         session_id = getattr(args, "sub_session_id", None) or args.session_id
-        return cmd_chat(config_path, args.message, session_id)
+        return cmd_chat(config_path, args.message, session_id, use_daemon=not args.no_daemon)
+    if args.command == "serve":
+        return cmd_serve(config_path)
+    if args.command == "batch":
+        return cmd_batch(
+            config_path,
+            Path(args.input),
+            Path(args.output),
+            args.concurrency,
+            args.order,
+            resume=not args.no_resume,
+        )
+    if args.command == "stats":
+        session_id = getattr(args, "sub_session_id", None) or args.session_id
+        return cmd_stats(config_path, session_id, args.since, args.by)
+    if args.command == "sessions":
+        return cmd_sessions(
+            config_path,
+            args.sessions_command or "list",
+            getattr(args, "query", None),
+            getattr(args, "limit", 20),
+            idle_days=getattr(args, "idle_days", None),
+            pack=getattr(args, "pack", None),
+            dry_run=getattr(args, "dry_run", False),
+        )
     if args.command == "init":
         return cmd_init(config_path, args.force)
     if args.command is None:
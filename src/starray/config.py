@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import tomllib
 
@@ -15,6 +15,53 @@ class AppConfig:
     temperature: float
     request_timeout_seconds: float
     data_dir: Path
+    hedging: bool = False
+    hedge_delay_seconds: float = 2.0
+    hedge_delays: dict[str, float] = field(default_factory=dict)
+    breaker_failure_threshold: int = 3
+    breaker_cooldown_seconds: float = 60.0
+    cache_enabled: bool = False
+    cache_ttl_seconds: float = 86400.0
+    cache_max_memory_entries: int = 256
+    cache_max_disk_bytes: int = 64 * 1024 * 1024
+    cache_max_temperature: float = 0.3
+    memory_context_tokens: int = 6000
+    memory_recent_turns: int = 12
+    memory_summary_chunk_turns: int = 20
+    memory_summarizer: str = "local"
+    routing_policy: str = "static"
+    routing_role_policies: dict[str, str] = field(default_factory=dict)
+    routing_max_p95_ms: float | None = None
+    routing_max_cost_per_call: float | None = None
+    routing_max_error_rate: float = 0.5
+    routing_min_samples: int = 3
+    routing_prices: dict[str, tuple[float, float]] = field(default_factory=dict)
+    tracing_enabled: bool = False
+    tracing_path: Path | None = None
+    role_token_budgets: dict[str, int] = field(default_factory=dict)
+    context_windows: dict[str, int] = field(default_factory=dict)
+    reserve_output_tokens: int = 1024
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry_seconds: float = 30.0
+    http_http2: bool = False
+    workflow_max_concurrency: int = 4
+    workflow_role_concurrency: dict[str, int] = field(default_factory=dict)
+    workflow_role_deadlines: dict[str, float] = field(default_factory=dict)
+    prefetch_enabled: bool = False
+    prefetch_warm_connections: bool = True
+    session_index_enabled: bool = True
+    archive_after_days: float = 30.0
+    archive_pack: str = "none"
+    archive_retention_days: float = 0.0
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_max_age_seconds: float = 7 * 24 * 3600.0
+    log_backup_count: int = 5
+    log_queue_size: int = 10_000
+    structured_max_repairs: int = 1
+    ratelimit_enabled: bool = True
+    ratelimit_max_wait_seconds: float = 60.0
+    ratelimit_limits: dict[str, dict[str, float]] = field(default_factory=dict)
 
 
 class ConfigError(RuntimeError):
@@ -32,6 +79,16 @@ def load_config(config_path: Path) -> AppConfig:
 
     provider_cfg = raw.get("provider", {})
     storage_cfg = raw.get("storage", {})
+    cache_cfg = raw.get("cache", {})
+    memory_cfg = raw.get("memory", {})
+    routing_cfg = raw.get("routing", {})
+    tracing_cfg = raw.get("tracing", {})
+    http_cfg = raw.get("http", {})
+    workflow_cfg = raw.get("workflow", {})
+    prefetch_cfg = raw.get("prefetch", {})
+    logging_cfg = raw.get("logging", {})
+    structured_cfg = raw.get("structured", {})
+    ratelimit_cfg = raw.get("ratelimit", {})
 
     provider = provider_cfg.get("name", "openai")
     provider_fallbacks = list(provider_cfg.get("fallbacks", []))
@@ -41,11 +98,110 @@ def load_config(config_path: Path) -> AppConfig:
         role: list(models)
         for role, models in dict(provider_cfg.get("role_fallback_models", {})).items()
     }
+    role_token_budgets = {
+        role: int(budget) for role, budget in dict(provider_cfg.get("role_token_budgets", {})).items()
+    }
+    context_windows = {
+        key: int(window) for key, window in dict(provider_cfg.get("context_windows", {})).items()
+    }
+    reserve_output_tokens = int(provider_cfg.get("reserve_output_tokens", 1024))
     temperature = float(provider_cfg.get("temperature", 0.2))
     request_timeout_seconds = float(provider_cfg.get("request_timeout_seconds", 30))
+    hedging = bool(provider_cfg.get("hedging", False))
+    hedge_delay_seconds = float(provider_cfg.get("hedge_delay_seconds", 2.0))
+    hedge_delays = {
+        route: float(delay) for route, delay in dict(provider_cfg.get("hedge_delays", {})).items()
+    }
+
+    breaker_cfg = dict(provider_cfg.get("circuit_breaker", {}))
+    breaker_failure_threshold = int(breaker_cfg.get("failure_threshold", 3))
+    breaker_cooldown_seconds = float(breaker_cfg.get("cooldown_seconds", 60))
+
+    cache_enabled = bool(cache_cfg.get("enabled", False))
+    cache_ttl_seconds = float(cache_cfg.get("ttl_seconds", 86400))
+    cache_max_memory_entries = int(cache_cfg.get("max_memory_entries", 256))
+    cache_max_disk_bytes = int(float(cache_cfg.get("max_disk_mb", 64)) * 1024 * 1024)
+    cache_max_temperature = float(cache_cfg.get("max_temperature", 0.3))
+
+    memory_context_tokens = int(memory_cfg.get("context_tokens", 6000))
+    memory_recent_turns = int(memory_cfg.get("recent_turns", 12))
+    memory_summary_chunk_turns = int(memory_cfg.get("summary_chunk_turns", 20))
+    memory_summarizer = str(memory_cfg.get("summarizer", "local"))
+    if memory_summarizer not in {"local", "model"}:
+        raise ConfigError(f"Unsupported memory summarizer: {memory_summarizer}")
+
+    routing_policy = str(routing_cfg.get("policy", "static"))
+    routing_role_policies = {role: str(name) for role, name in dict(routing_cfg.get("roles", {})).items()}
+    for name in [routing_policy, *routing_role_policies.values()]:
+        if name not in {"static", "fastest", "cheapest"}:
+            raise ConfigError(f"Unsupported routing policy: {name}")
+    max_p95_ms = routing_cfg.get("max_p95_ms")
+    routing_max_p95_ms = float(max_p95_ms) if max_p95_ms is not None else None
+    max_cost_per_call = routing_cfg.get("max_cost_per_call")
+    routing_max_cost_per_call = float(max_cost_per_call) if max_cost_per_call is not None else None
+    routing_max_error_rate = float(routing_cfg.get("max_error_rate", 0.5))
+    routing_min_samples = int(routing_cfg.get("min_samples", 3))
+    routing_prices = {
+        route: (float(price.get("input_per_1k", 0.0)), float(price.get("output_per_1k", 0.0)))
+        for route, price in dict(routing_cfg.get("prices", {})).items()
+    }
+
+    tracing_enabled = bool(tracing_cfg.get("enabled", False))
+    tracing_path = Path(tracing_cfg["path"]) if tracing_cfg.get("path") else None
+
+    http_max_connections = int(http_cfg.get("max_connections", 20))
+    http_max_keepalive_connections = int(http_cfg.get("max_keepalive_connections", 10))
+    http_keepalive_expiry_seconds = float(http_cfg.get("keepalive_expiry_seconds", 30))
+    http_http2 = bool(http_cfg.get("http2", False))
+
+    workflow_max_concurrency = int(workflow_cfg.get("max_concurrency", 4))
+    workflow_role_concurrency = {
+        role: int(limit) for role, limit in dict(workflow_cfg.get("role_concurrency", {})).items()
+    }
+    workflow_role_deadlines = {
+        role: float(seconds) for role, seconds in dict(workflow_cfg.get("role_deadlines", {})).items()
+    }
+
+    prefetch_enabled = bool(prefetch_cfg.get("enabled", False))
+    prefetch_warm_connections = bool(prefetch_cfg.get("warm_connections", True))
+
+    log_max_bytes = int(float(logging_cfg.get("max_mb", 10)) * 1024 * 1024)
+    log_max_age_seconds = float(logging_cfg.get("max_age_days", 7)) * 24 * 3600
+    log_backup_count = int(logging_cfg.get("backup_count", 5))
+    log_queue_size = int(logging_cfg.get("queue_size", 10_000))
+
+    structured_max_repairs = int(structured_cfg.get("max_repairs", 1))
+    if structured_max_repairs < 0:
+        raise ConfigError(f"Unsupported structured max_repairs: {structured_max_repairs}")
+
+    ratelimit_enabled = bool(ratelimit_cfg.get("enabled", True))
+    try:
+        ratelimit_max_wait_seconds = float(ratelimit_cfg.get("max_wait_seconds", 60))
+    except (TypeError, ValueError) as exc:
+        raise ConfigError("Rate limit max_wait_seconds must be a number") from exc
+    ratelimit_limits: dict[str, dict[str, float]] = {}
+    for key, limit in dict(ratelimit_cfg.get("limits", {})).items():
+        if not isinstance(limit, dict):
+            raise ConfigError(f"Rate limits for {key} must be a table of rpm, tpm and concurrency")
+        unknown = set(limit) - {"rpm", "tpm", "concurrency"}
+        if unknown:
+            raise ConfigError(f"Unsupported rate limit setting for {key}: {', '.join(sorted(unknown))}")
+        try:
+            values = {name: float(value) for name, value in limit.items()}
+        except (TypeError, ValueError) as exc:
+            raise ConfigError(f"Rate limits for {key} must be numbers") from exc
+        if any(value <= 0 for value in values.values()):
+            raise ConfigError(f"Rate limits for {key} must be positive")
+        ratelimit_limits[key] = values
 
     data_dir_raw = storage_cfg.get("data_dir", ".starray")
     data_dir = Path(data_dir_raw)
+    session_index_enabled = bool(storage_cfg.get("index", True))
+    archive_after_days = float(storage_cfg.get("archive_after_days", 30))
+    archive_pack = str(storage_cfg.get("archive_pack", "none"))
+    if archive_pack not in {"none", "monthly"}:
+        raise ConfigError(f"Unsupported archive pack mode: {archive_pack}")
+    archive_retention_days = float(storage_cfg.get("archive_retention_days", 0))
 
     return AppConfig(
         provider=provider,
@@ -56,4 +212,51 @@ def load_config(config_path: Path) -> AppConfig:
         temperature=temperature,
         request_timeout_seconds=request_timeout_seconds,
         data_dir=data_dir,
+        hedging=hedging,
+        hedge_delay_seconds=hedge_delay_seconds,
+        hedge_delays=hedge_delays,
+        breaker_failure_threshold=breaker_failure_threshold,
+        breaker_cooldown_seconds=breaker_cooldown_seconds,
+        cache_enabled=cache_enabled,
+        cache_ttl_seconds=cache_ttl_seconds,
+        cache_max_memory_entries=cache_max_memory_entries,
+        cache_max_disk_bytes=cache_max_disk_bytes,
+        cache_max_temperature=cache_max_temperature,
+        memory_context_tokens=memory_context_tokens,
+        memory_recent_turns=memory_recent_turns,
+        memory_summary_chunk_turns=memory_summary_chunk_turns,
+        memory_summarizer=memory_summarizer,
+        routing_policy=routing_policy,
+        routing_role_policies=routing_role_policies,
+        routing_max_p95_ms=routing_max_p95_ms,
+        routing_max_cost_per_call=routing_max_cost_per_call,
+        routing_max_error_rate=routing_max_error_rate,
+        routing_min_samples=routing_min_samples,
+        routing_prices=routing_prices,
+        tracing_enabled=tracing_enabled,
+        tracing_path=tracing_path,
+        role_token_budgets=role_token_budgets,
+        context_windows=context_windows,
+        reserve_output_tokens=reserve_output_tokens,
+        http_max_connections=http_max_connections,
+        http_max_keepalive_connections=http_max_keepalive_connections,
+        http_keepalive_expiry_seconds=http_keepalive_expiry_seconds,
+        http_http2=http_http2,
+        workflow_max_concurrency=workflow_max_concurrency,
+        workflow_role_concurrency=workflow_role_concurrency,
+        workflow_role_deadlines=workflow_role_deadlines,
+        prefetch_enabled=prefetch_enabled,
+        prefetch_warm_connections=prefetch_warm_connections,
+        session_index_enabled=session_index_enabled,
+        archive_after_days=archive_after_days,
+        archive_pack=archive_pack,
+        archive_retention_days=archive_retention_days,
+        log_max_bytes=log_max_bytes,
+        log_max_age_seconds=log_max_age_seconds,
+        log_backup_count=log_backup_count,
+        log_queue_size=log_queue_size,
+        structured_max_repairs=structured_max_repairs,
+        ratelimit_enabled=ratelimit_enabled,
+        ratelimit_max_wait_seconds=ratelimit_max_wait_seconds,
+        ratelimit_limits=ratelimit_limits,
     )
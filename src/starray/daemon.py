@@ -0,0 +1,365 @@
+"""Local daemon that keeps warm runtimes and answers CLI requests over a Unix socket.
+
+The wire protocol is newline-delimited JSON. A client sends one request object and reads
+events until ``done`` or ``error``:
+
+- ``{"op": "ping"}`` -> ``{"event": "pong", "pid": ...}``
+- ``{"op": "chat", "config": ..., "message": ..., "session_id": ...}`` ->
+  ``session``, zero or more ``token`` events, then ``done`` with the response fields.
+- ``{"op": "shutdown"}`` -> ``{"event": "bye"}``
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+import json
+import os
+from pathlib import Path
+import socket
+import socketserver
+import threading
+from typing import Any
+
+from .config import AppConfig, ConfigError, load_config
+
+
+SOCKET_NAME = "daemon.sock"
+CONNECT_TIMEOUT_SECONDS = 0.2
+# Ping and shutdown answer at once; a daemon silent for this long is treated as unreachable.
+CONTROL_TIMEOUT_SECONDS = 5.0
+
+
+def socket_path(cfg: AppConfig) -> Path:
+    return cfg.data_dir.expanduser() / SOCKET_NAME
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon reports a failure or the connection drops mid-request."""
+
+
+@dataclass(slots=True)
+class _WarmRuntime:
+    mtime_ns: int
+    cfg: AppConfig
+    runtime: Any
+    sessions_dir: Path
+    logs_dir: Path
+    index: Any = None
+    log_writer: Any = None
+    # Turns currently using this runtime, and whether a newer config has replaced it.
+    users: int = 0
+    retired: bool = False
+
+    def close(self) -> None:
+        self.runtime.close()
+        if self.index is not None:
+            self.index.close()
+        if self.log_writer is not None:
+            self.log_writer.close()
+
+
+@dataclass(slots=True)
+class _SessionLock:
+    lock: threading.Lock
+    holders: int = 0
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "StarrayDaemon"
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            op = request.get("op")
+            if op == "ping":
+                self._send({"event": "pong", "pid": os.getpid()})
+            elif op == "chat":
+                self.server.handle_chat(request, self._send)
+            elif op == "shutdown":
+                self._send({"event": "bye"})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                self._send({"event": "error", "message": f"Unknown op: {op}"})
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        except Exception as exc:  # noqa: BLE001 - report every failure to the client
+            try:
+                self._send({"event": "error", "message": f"{type(exc).__name__}: {exc}"})
+            except OSError:
+                pass
+
+    def _send(self, event: dict[str, Any]) -> None:
+        self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+class StarrayDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves chat turns from warm ``AnalystRuntime`` instances, one per config file."""
+
+    daemon_threads = True
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._runtimes: dict[Path, _WarmRuntime] = {}
+        self._runtimes_lock = threading.Lock()
+        self._session_locks: dict[str, _SessionLock] = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _remove_stale_socket(path)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(path), _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        with self._runtimes_lock:
+            warms = list(self._runtimes.values())
+            self._runtimes.clear()
+        for warm in warms:
+            warm.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _acquire_runtime(self, config_path: Path) -> _WarmRuntime:
+        """The warm runtime for ``config_path``, rebuilt when the file changed; pair with ``_release_runtime``."""
+        from .app import (
+            build_analyst_runtime,
+            build_log_writer,
+            build_response_cache,
+            build_session_index,
+            resolve_storage_paths,
+        )
+
+        mtime_ns = config_path.stat().st_mtime_ns
+        replaced: _WarmRuntime | None = None
+        with self._runtimes_lock:
+            warm = self._runtimes.get(config_path)
+            if warm is None or warm.mtime_ns != mtime_ns:
+                cfg = load_config(config_path)
+                sessions_dir, logs_dir = resolve_storage_paths(cfg)
+                if warm is not None:
+                    # The replaced runtime closes once the turns still using it finish.
+                    warm.retired = True
+                    replaced = warm if warm.users == 0 else None
+                runtime = build_analyst_runtime(cfg, build_response_cache(cfg))
+                warm = _WarmRuntime(
+                    mtime_ns,
+                    cfg,
+                    runtime,
+                    sessions_dir,
+                    logs_dir,
+                    index=build_session_index(cfg),
+                    log_writer=build_log_writer(cfg),
+                )
+                self._runtimes[config_path] = warm
+            warm.users += 1
+        if replaced is not None:
+            replaced.close()
+        return warm
+
+    def _release_runtime(self, warm: _WarmRuntime) -> None:
+        with self._runtimes_lock:
+            warm.users -= 1
+            idle_and_retired = warm.retired and warm.users == 0
+        if idle_and_retired:
+            warm.close()
+
+    @contextmanager
+    def _session_lock(self, session_id: str) -> Iterator[None]:
+        """Serialize turns on ``session_id``; the lock is dropped once nobody holds or awaits it."""
+        with self._runtimes_lock:
+            entry = self._session_locks.setdefault(session_id, _SessionLock(threading.Lock()))
+            entry.holders += 1
+        try:
+            with entry.lock:
+                yield
+        finally:
+            with self._runtimes_lock:
+                entry.holders -= 1
+                if entry.holders == 0:
+                    del self._session_locks[session_id]
+
+    def handle_chat(self, request: dict[str, Any], send: Callable[[dict[str, Any]], None]) -> None:
+        try:
+            warm = self._acquire_runtime(Path(request["config"]))
+        except (OSError, ConfigError) as exc:
+            send({"event": "error", "message": str(exc)})
+            return
+        try:
+            self._chat(warm, request, send)
+        finally:
+            self._release_runtime(warm)
+
+    def _chat(self, warm: _WarmRuntime, request: dict[str, Any], send: Callable[[dict[str, Any]], None]) -> None:
+        from .app import RESUME_TAIL_TURNS, run_turn
+        from .logging_utils import build_session_logger, release_session_logger
+        from .session import SessionError, SessionState, load_session
+
+        session_id = request.get("session_id")
+        state = None if session_id else SessionState.new()
+        # Hold the session lock from load to save so concurrent turns see each other's exchanges.
+        with self._session_lock(session_id or state.session_id):
+            if state is None:
+                try:
+                    state = load_session(warm.sessions_dir, session_id, tail_turns=RESUME_TAIL_TURNS)
+                except SessionError as exc:
+                    send({"event": "error", "message": str(exc)})
+                    return
+
+            send(
+                {
+                    "event": "session",
+                    "session_id": state.session_id,
+                    "resumed": bool(session_id),
+                    "turn_count": state.turn_count,
+                }
+            )
+            logger = build_session_logger(warm.logs_dir, state.session_id, warm.log_writer)
+            try:
+                response = run_turn(
+                    request["message"].strip(),
+                    warm.runtime,
+                    state,
+                    warm.sessions_dir,
+                    logger,
+                    on_token=_token_sink(send),
+                    index=warm.index,
+                )
+            finally:
+                release_session_logger(logger)
+        send({"event": "done", "session_id": state.session_id, "response": asdict(response)})
+
+
+def _token_sink(send: Callable[[dict[str, Any]], None]) -> Callable[[str], None]:
+    """Forward tokens until the client goes away; the turn still completes and is saved."""
+    connected = True
+
+    def on_token(text: str) -> None:
+        nonlocal connected
+        if not connected:
+            return
+        try:
+            send({"event": "token", "text": text})
+        except OSError:
+            connected = False
+
+    return on_token
+
+
+def _remove_stale_socket(path: Path) -> None:
+    if not path.exists():
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.settimeout(CONNECT_TIMEOUT_SECONDS)
+        probe.connect(str(path))
+    except OSError:
+        path.unlink()
+        return
+    finally:
+        probe.close()
+    raise DaemonError(f"A daemon is already listening on {path}")
+
+
+def _connect(path: Path, read_timeout: float | None) -> socket.socket | None:
+    """Connect to the daemon; ``read_timeout`` bounds each read (``None`` waits for a long turn)."""
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT_SECONDS)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(read_timeout)
+    return sock
+
+
+def _exchange(sock: socket.socket, payload: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    with sock, sock.makefile("rwb") as fh:
+        fh.write((json.dumps(payload) + "\n").encode("utf-8"))
+        fh.flush()
+        for line in fh:
+            yield json.loads(line)
+
+
+def daemon_pid(path: Path) -> int | None:
+    """Return the pid of the daemon listening on ``path``, if any."""
+    sock = _connect(path, CONTROL_TIMEOUT_SECONDS)
+    if sock is None:
+        return None
+    try:
+        for event in _exchange(sock, {"op": "ping"}):
+            if event.get("event") == "pong":
+                return int(event["pid"])
+    except OSError:
+        # Includes a read timeout: a wedged daemon counts as not running.
+        return None
+    return None
+
+
+def shutdown_daemon(path: Path) -> bool:
+    sock = _connect(path, CONTROL_TIMEOUT_SECONDS)
+    if sock is None:
+        return False
+    try:
+        return any(event.get("event") == "bye" for event in _exchange(sock, {"op": "shutdown"}))
+    except OSError:
+        return False
+
+
+def forward_chat(
+    path: Path,
+    config_path: Path,
+    message: str,
+    session_id: str | None,
+    *,
+    on_session: Callable[[dict[str, Any]], None],
+    on_token: Callable[[str], None],
+) -> dict[str, Any] | None:
+    """Run one chat turn through the daemon.
+
+    Returns the ``done`` event, or ``None`` when no daemon is reachable so the caller can run
+    the turn in-process. Raises ``DaemonError`` if the daemon fails after accepting the turn.
+    """
+    sock = _connect(path, None)
+    if sock is None:
+        return None
+    payload = {
+        "op": "chat",
+        "config": str(config_path.expanduser().resolve()),
+        "message": message,
+        "session_id": session_id,
+    }
+    for event in _exchange(sock, payload):
+        kind = event.get("event")
+        if kind == "session":
+            on_session(event)
+        elif kind == "token":
+            on_token(event["text"])
+        elif kind == "done":
+            return event
+        elif kind == "error":
+            raise DaemonError(event.get("message", "daemon error"))
+    raise DaemonError("Daemon closed the connection before finishing the request")
+
+
+def serve(path: Path) -> None:
+    """Run the daemon in the foreground until interrupted or asked to shut down."""
+    from .providers import warm_provider_imports
+
+    warm_provider_imports()
+    server = StarrayDaemon(path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
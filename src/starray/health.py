@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import atexit
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass(slots=True)
+class RouteHealth:
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    total_failures: int = 0
+    total_successes: int = 0
+    opened_at: float | None = None
+    last_error: str | None = None
+
+
+class RouteHealthTracker:
+    """Circuit breaker state per ``provider:model`` route, optionally persisted to JSON.
+
+    A route opens after ``failure_threshold`` consecutive failures and is skipped until
+    ``cooldown_seconds`` have passed. It then becomes half-open: a single attempt, claimed
+    with ``acquire``, is a trial that closes the breaker on success or re-opens it on failure.
+    An unfinished trial gives up its slot after another ``cooldown_seconds``.
+
+    Breaker transitions are written to ``path`` at once; counter-only changes are written at
+    most every ``save_interval_seconds``, and at ``close`` or interpreter exit.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 60.0,
+        save_interval_seconds: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._path = path
+        self._failure_threshold = max(1, failure_threshold)
+        self._cooldown_seconds = cooldown_seconds
+        self._save_interval_seconds = save_interval_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._routes: dict[str, RouteHealth] = {}
+        # Half-open routes with a trial in flight, and when it was claimed.
+        self._probes: dict[str, float] = {}
+        self._version = 0
+        self._saved_version = 0
+        self._saved_at: float | None = None
+        self._atexit_registered = False
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        *,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 60.0,
+        save_interval_seconds: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ) -> "RouteHealthTracker":
+        tracker = cls(
+            path,
+            failure_threshold=failure_threshold,
+            cooldown_seconds=cooldown_seconds,
+            save_interval_seconds=save_interval_seconds,
+            clock=clock,
+        )
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            routes = payload.get("routes", {})
+            tracker._routes = {route: RouteHealth(**raw) for route, raw in routes.items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError):
+            # A corrupt health file only costs us the remembered state; start fresh.
+            tracker._routes = {}
+        return tracker
+
+    def _refresh(self, health: RouteHealth) -> RouteHealth:
+        if (
+            health.state == OPEN
+            and health.opened_at is not None
+            and self._clock() - health.opened_at >= self._cooldown_seconds
+        ):
+            health.state = HALF_OPEN
+        return health
+
+    def state(self, route: str) -> str:
+        with self._lock:
+            health = self._routes.get(route)
+            return self._refresh(health).state if health else CLOSED
+
+    def _probing(self, route: str) -> bool:
+        claimed = self._probes.get(route)
+        return claimed is not None and self._clock() - claimed < self._cooldown_seconds
+
+    def allows(self, route: str) -> bool:
+        """Whether ``route`` can take an attempt now; a half-open route takes one at a time."""
+        with self._lock:
+            health = self._routes.get(route)
+            if health is None:
+                return True
+            state = self._refresh(health).state
+            return state == CLOSED or (state == HALF_OPEN and not self._probing(route))
+
+    def acquire(self, route: str) -> str | None:
+        """Claim an attempt on ``route``: its state, or None when the breaker turns it away.
+
+        A ``HALF_OPEN`` result is the route's single trial; the caller must settle it with
+        ``record_success``, ``record_failure`` or ``release``.
+        """
+        with self._lock:
+            health = self._routes.get(route)
+            state = self._refresh(health).state if health else CLOSED
+            if state == OPEN or (state == HALF_OPEN and self._probing(route)):
+                return None
+            if state == HALF_OPEN:
+                self._probes[route] = self._clock()
+            return state
+
+    def release(self, route: str) -> None:
+        """Give up a trial claimed by ``acquire`` without an outcome, e.g. a cancelled hedge."""
+        with self._lock:
+            self._probes.pop(route, None)
+
+    def provider_open(self, provider_name: str) -> bool:
+        """True when every route seen for ``provider_name`` has an open breaker."""
+        prefix = f"{provider_name}:"
+        with self._lock:
+            states = [
+                self._refresh(health).state
+                for route, health in self._routes.items()
+                if route.startswith(prefix)
+            ]
+        return bool(states) and all(state == OPEN for state in states)
+
+    def retry_in(self, route: str) -> float | None:
+        with self._lock:
+            health = self._routes.get(route)
+            if health is None or self._refresh(health).state != OPEN or health.opened_at is None:
+                return None
+            return max(0.0, health.opened_at + self._cooldown_seconds - self._clock())
+
+    def record_success(self, route: str) -> None:
+        with self._lock:
+            health = self._routes.setdefault(route, RouteHealth())
+            transition = health.state != CLOSED
+            health.state = CLOSED
+            health.consecutive_failures = 0
+            health.total_successes += 1
+            health.opened_at = None
+            self._probes.pop(route, None)
+            self._changed(immediate=transition)
+
+    def record_failure(self, route: str, error: str) -> None:
+        with self._lock:
+            health = self._refresh(self._routes.setdefault(route, RouteHealth()))
+            health.consecutive_failures += 1
+            health.total_failures += 1
+            health.last_error = error
+            previous = health.state
+            if health.state == HALF_OPEN or health.consecutive_failures >= self._failure_threshold:
+                health.state = OPEN
+                health.opened_at = self._clock()
+            self._probes.pop(route, None)
+            self._changed(immediate=health.state != previous)
+
+    def snapshot(self) -> dict[str, RouteHealth]:
+        with self._lock:
+            return {
+                route: RouteHealth(**asdict(self._refresh(health)))
+                for route, health in self._routes.items()
+            }
+
+    def save(self) -> None:
+        """Write any unsaved state to ``path`` now."""
+        with self._lock:
+            self._write()
+
+    def close(self) -> None:
+        self.save()
+        if self._atexit_registered:
+            atexit.unregister(self.save)
+            self._atexit_registered = False
+
+    def _changed(self, *, immediate: bool) -> None:
+        # Called with the lock held, so writes land in version order and never go stale.
+        self._version += 1
+        if self._path is None:
+            return
+        due = self._saved_at is None or self._clock() - self._saved_at >= self._save_interval_seconds
+        if immediate or due:
+            self._write()
+        elif not self._atexit_registered:
+            atexit.register(self.save)
+            self._atexit_registered = True
+
+    def _write(self) -> None:
+        if self._path is None or self._version == self._saved_version:
+            return
+        payload = {"routes": {route: asdict(health) for route, health in self._routes.items()}}
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(f"{self._path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self._path)
+        self._saved_version = self._version
+        self._saved_at = self._clock()
@@ -0,0 +1,160 @@
+"""Long-lived pooled HTTP clients shared by remote providers.
+
+httpx ships with LiteLLM, so pooling needs no extra dependency; without httpx the pool is
+inert and providers fall back to LiteLLM's defaults.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+from dataclasses import dataclass
+import importlib.util
+import threading
+from typing import Any
+import weakref
+
+
+@dataclass(slots=True)
+class HttpPoolConfig:
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry_seconds: float = 30.0
+    http2: bool = False
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class HttpClientPool:
+    """One pooled ``httpx.Client`` plus one ``httpx.AsyncClient`` per event loop.
+
+    httpx keeps separate keep-alive connections per origin, so each provider's host gets its
+    own pool of warm connections. The sync client is thread-safe; async clients are bound to
+    the loop that created them. ``close()`` runs at interpreter exit if nobody called it.
+    """
+
+    def __init__(self, config: HttpPoolConfig | None = None) -> None:
+        self.config = config or HttpPoolConfig()
+        self._lock = threading.Lock()
+        self._client: Any = None
+        self._async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any] = weakref.WeakKeyDictionary()
+        self._loop_client: Any = None
+        self._installed: Any = None
+        self._closed = False
+        self._atexit_registered = False
+
+    @staticmethod
+    def available() -> bool:
+        return importlib.util.find_spec("httpx") is not None
+
+    def _options(self, httpx: Any) -> dict[str, Any]:
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive_connections,
+                keepalive_expiry=self.config.keepalive_expiry_seconds,
+            ),
+            # HTTP/2 needs the optional ``h2`` package; fall back to HTTP/1.1 keep-alive.
+            "http2": self.config.http2 and _http2_available(),
+        }
+
+    def _register_atexit(self) -> None:
+        if not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+
+    def client(self) -> Any:
+        """The shared sync client, or ``None`` when httpx is missing or the pool is closed."""
+        if self._client is not None or self._closed or not self.available():
+            return self._client
+        with self._lock:
+            if self._client is None and not self._closed:
+                import httpx
+
+                self._client = httpx.Client(**self._options(httpx))
+                self._register_atexit()
+        return self._client
+
+    def async_client(self) -> Any:
+        """The async client for the running event loop, or ``None`` as for ``client()``."""
+        if self._closed or not self.available():
+            return None
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                import httpx
+
+                client = httpx.AsyncClient(**self._options(httpx))
+                self._async_clients[loop] = client
+                self._register_atexit()
+        return client
+
+    def loop_client(self) -> Any:
+        """One ``httpx.AsyncClient`` that can be shared across event loops.
+
+        Each request is sent through ``async_client()`` of the loop that awaits it, so code that
+        keeps the client (LiteLLM, the OpenAI SDK) never touches another loop's connections.
+        """
+        if self._closed or not self.available():
+            return None
+        with self._lock:
+            if self._loop_client is None:
+                self._loop_client = _loop_bound_client(self)
+        return self._loop_client
+
+    def install(self, litellm: Any) -> None:
+        """Point LiteLLM's module-level sessions at this pool once; ``close()`` undoes it."""
+        if self._installed is not None or self._closed or not self.available():
+            return
+        client, loop_client = self.client(), self.loop_client()
+        with self._lock:
+            if self._installed is None and not self._closed:
+                litellm.client_session = client
+                litellm.aclient_session = loop_client
+                self._installed = litellm
+
+    async def aclose(self) -> None:
+        """Close the running loop's async client; call before the loop shuts down."""
+        with self._lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            client, self._client = self._client, None
+            async_clients = list(self._async_clients.items())
+            self._async_clients.clear()
+            litellm, self._installed = self._installed, None
+            loop_client, self._loop_client = self._loop_client, None
+        if litellm is not None:
+            if litellm.client_session is client:
+                litellm.client_session = None
+            if litellm.aclient_session is loop_client:
+                litellm.aclient_session = None
+        if client is not None:
+            client.close()
+        for loop, async_client in async_clients:
+            # Connections of a closed loop are already gone; an idle loop can still run aclose().
+            if not loop.is_closed() and not loop.is_running():
+                loop.run_until_complete(async_client.aclose())
+        if self._atexit_registered:
+            atexit.unregister(self.close)
+            self._atexit_registered = False
+
+
+def _loop_bound_client(pool: HttpClientPool) -> Any:
+    import httpx
+
+    class LoopBoundAsyncClient(httpx.AsyncClient):
+        async def send(self, request: Any, **kwargs: Any) -> Any:
+            client = pool.async_client()
+            if client is None:
+                raise RuntimeError("HTTP client pool is closed")
+            return await client.send(request, **kwargs)
+
+    return LoopBoundAsyncClient()
@@ -1,26 +1,282 @@
+"""Per-session JSON logs written by one background thread.
+
+Callers only enqueue ``LogRecord`` objects; formatting, batching, file I/O and rotation all
+happen on the writer thread, so logging stays off the turn's critical path. Session loggers
+are not registered in ``logging``'s global manager and are released with
+``release_session_logger``, so a long-lived daemon does not accumulate them.
+"""
+
 from __future__ import annotations
 
+import atexit
+from dataclasses import dataclass
+from datetime import datetime, UTC
+import json
 import logging
+import os
 from pathlib import Path
+import queue
+import threading
+import time
+from typing import IO, Any
 
 
-def build_session_logger(log_dir: Path, session_id: str) -> logging.Logger:
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_path = log_dir / f"{session_id}.log"
+LOG_SUFFIX = ".log"
+# Attributes every LogRecord has; anything else came in through ``extra`` and is logged as a field.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
 
-    logger = logging.getLogger(f"starray.session.{session_id}")
-    logger.setLevel(logging.INFO)
-    logger.propagate = False
 
-    if logger.handlers:
-        return logger
+@dataclass(slots=True)
+class LogWriterConfig:
+    max_bytes: int = 10 * 1024 * 1024
+    max_age_seconds: float = 7 * 24 * 3600
+    backup_count: int = 5
+    queue_size: int = 10_000
+    batch_size: int = 256
+    flush_interval_seconds: float = 0.2
+
+
+class _Release:
+    __slots__ = ("session_id",)
+
+    def __init__(self, session_id: str) -> None:
+        self.session_id = session_id
+
+
+class _Flush:
+    __slots__ = ("done",)
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+@dataclass(slots=True)
+class _OpenLog:
+    path: Path
+    fh: IO[bytes]
+    size: int
+    started: float
+
+
+def format_record(session_id: str, record: logging.LogRecord) -> dict[str, Any]:
+    """The JSON object written for ``record``: time, level, session, event and extra fields."""
+    payload: dict[str, Any] = {
+        "ts": datetime.fromtimestamp(record.created, UTC).isoformat(),
+        "level": record.levelname,
+        "session_id": session_id,
+        "event": record.getMessage(),
+    }
+    for key, value in vars(record).items():
+        if key not in _RECORD_ATTRS and not key.startswith("_"):
+            payload[key] = value
+    if record.exc_info:
+        payload["exception"] = logging.Formatter().formatException(record.exc_info)
+    return payload
+
+
+class SessionLogWriter:
+    """Bounded queue plus one writer thread for all session logs under ``log_dir``.
+
+    Records are written in batches of up to ``batch_size`` with one flush per file per batch.
+    When the queue is full, records are dropped rather than blocking the caller, and the
+    count is logged as a ``dropped`` event once there is room. A session's file is rotated
+    to ``<session_id>.1.log``, ``.2.log``... when it exceeds ``max_bytes`` or when its first
+    record is older than ``max_age_seconds``.
+    """
+
+    def __init__(self, log_dir: Path, config: LogWriterConfig | None = None) -> None:
+        self.log_dir = log_dir
+        self.config = config or LogWriterConfig()
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=max(1, self.config.queue_size))
+        self._files: dict[str, _OpenLog] = {}
+        self._dropped: dict[str, int] = {}
+        self.dropped_total = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="starray-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, session_id: str, record: logging.LogRecord) -> None:
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait((session_id, record))
+        except queue.Full:
+            with self._lock:
+                self._dropped[session_id] = self._dropped.get(session_id, 0) + 1
+                self.dropped_total += 1
+
+    def release(self, session_id: str) -> None:
+        """Close the session's file once everything queued before this call is written."""
+        if not self._closed:
+            self._queue.put(_Release(session_id))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until everything queued so far is on disk; returns ``False`` on timeout."""
+        if self._closed or not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._closed:
+            return
+        self._queue.put(None)
+        self._closed = True
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
 
-    handler = logging.FileHandler(log_path, encoding="utf-8")
-    formatter = logging.Formatter(
-        fmt="%(asctime)s %(levelname)s %(message)s",
-        datefmt="%Y-%m-%dT%H:%M:%S",
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.config.flush_interval_seconds)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.config.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not self._write_batch(batch):
+                break
+        for log in self._files.values():
+            log.fh.close()
+        self._files.clear()
 
+    def _write_batch(self, batch: list[Any]) -> bool:
+        """Write one batch; returns ``False`` once the stop sentinel has been seen."""
+        pending: dict[str, list[bytes]] = {}
+        running = True
+
+        def write_pending() -> None:
+            for session_id, lines in pending.items():
+                self._write(session_id, lines)
+            pending.clear()
+
+        for item in batch:
+            if item is None:
+                running = False
+            elif isinstance(item, _Release):
+                write_pending()
+                log = self._files.pop(item.session_id, None)
+                if log is not None:
+                    log.fh.close()
+            elif isinstance(item, _Flush):
+                write_pending()
+                item.done.set()
+            else:
+                session_id, record = item
+                try:
+                    line = json.dumps(format_record(session_id, record), ensure_ascii=False, default=str)
+                except Exception:  # noqa: BLE001 - a bad record must not stop the writer
+                    continue
+                pending.setdefault(session_id, []).append(line.encode("utf-8") + b"\n")
+        with self._lock:
+            dropped, self._dropped = self._dropped, {}
+        for session_id, count in dropped.items():
+            event = {
+                "ts": datetime.now(UTC).isoformat(),
+                "level": "WARNING",
+                "session_id": session_id,
+                "event": "dropped",
+                "count": count,
+            }
+            pending.setdefault(session_id, []).append(json.dumps(event).encode("utf-8") + b"\n")
+        write_pending()
+        return running
+
+    def _write(self, session_id: str, lines: list[bytes]) -> None:
+        try:
+            log = self._open(session_id)
+            if log.size and (
+                log.size >= self.config.max_bytes or time.time() - log.started >= self.config.max_age_seconds
+            ):
+                log = self._rotate(session_id, log)
+            data = b"".join(lines)
+            log.fh.write(data)
+            log.fh.flush()
+            log.size += len(data)
+        except OSError:
+            # Logs are best effort; the transcript is the record of the conversation.
+            log = self._files.pop(session_id, None)
+            if log is not None:
+                log.fh.close()
+
+    def _open(self, session_id: str) -> _OpenLog:
+        log = self._files.get(session_id)
+        if log is None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            path = self.log_dir / f"{session_id}{LOG_SUFFIX}"
+            fh = path.open("ab")
+            size = fh.tell()
+            log = _OpenLog(path, fh, size, _first_record_time(path) if size else time.time())
+            self._files[session_id] = log
+        return log
+
+    def _rotate(self, session_id: str, log: _OpenLog) -> _OpenLog:
+        log.fh.close()
+        del self._files[session_id]
+        for number in range(self.config.backup_count - 1, 0, -1):
+            older = self.log_dir / f"{session_id}.{number}{LOG_SUFFIX}"
+            if older.exists():
+                os.replace(older, self.log_dir / f"{session_id}.{number + 1}{LOG_SUFFIX}")
+        if self.config.backup_count > 0:
+            os.replace(log.path, self.log_dir / f"{session_id}.1{LOG_SUFFIX}")
+        else:
+            log.path.unlink()
+        return self._open(session_id)
+
+
+def _first_record_time(path: Path) -> float:
+    try:
+        with path.open("rb") as fh:
+            first = json.loads(fh.readline())
+        return datetime.fromisoformat(first["ts"]).timestamp()
+    except (OSError, ValueError, KeyError, TypeError):
+        return time.time()
+
+
+class _SessionHandler(logging.Handler):
+    def __init__(self, writer: SessionLogWriter, session_id: str) -> None:
+        super().__init__()
+        self.writer = writer
+        self.session_id = session_id
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.writer.submit(self.session_id, record)
+
+
+_default_writers: dict[Path, SessionLogWriter] = {}
+_default_writers_lock = threading.Lock()
+
+
+def _default_writer(log_dir: Path) -> SessionLogWriter:
+    with _default_writers_lock:
+        writer = _default_writers.get(log_dir)
+        if writer is None or writer._closed:
+            writer = _default_writers[log_dir] = SessionLogWriter(log_dir)
+        return writer
+
+
+def build_session_logger(
+    log_dir: Path, session_id: str, writer: SessionLogWriter | None = None
+) -> logging.Logger:
+    """A logger whose records go to ``<log_dir>/<session_id>.log`` through ``writer``.
+
+    Without ``writer``, one shared default writer per ``log_dir`` is used.
+    """
+    logger = logging.Logger(f"starray.session.{session_id}", logging.INFO)
+    logger.propagate = False
+    logger.addHandler(_SessionHandler(writer or _default_writer(log_dir), session_id))
     return logger
+
+
+def release_session_logger(logger: logging.Logger) -> None:
+    """Detach the logger's handlers and close its file once its queued records are written."""
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        if isinstance(handler, _SessionHandler):
+            handler.writer.release(handler.session_id)
+        handler.close()
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from functools import lru_cache
+import threading
+
+from .providers import ChatMessage
+from .session import SessionState
+
+
+Summarizer = Callable[[str | None, list[dict[str, str]]], str]
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+_ROLE_MAP = {"user": "user", "analyst": "assistant"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap prompt-size estimate (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def extractive_summary(previous: str | None, turns: list[dict[str, str]], max_chars: int = 4000) -> str:
+    """Fold ``turns`` into ``previous`` by keeping the first sentence of each turn.
+
+    Deterministic and offline; the oldest lines are dropped once ``max_chars`` is exceeded.
+    """
+    lines = previous.splitlines() if previous else []
+    for turn in turns:
+        text = " ".join(turn.get("content", "").split())
+        sentence = text.split(". ", 1)[0]
+        if len(sentence) > 160:
+            sentence = sentence[:157] + "..."
+        lines.append(f"- {turn.get('role', 'user')}: {sentence}")
+    while lines and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ContextBuilder:
+    """Packs a session into a bounded prompt: rolling summary + recent turns verbatim.
+
+    Turns older than the ``recent_turns`` window are folded into the session's summary in
+    checkpoints of ``summary_chunk_turns``. Each checkpoint extends the previous summary, so
+    older spans are summarized once and the result is stored with the session. ``estimate``
+    counts the tokens in a string; the runtime passes its model-aware estimator. Counts are
+    memoized per string, so a turn is tokenized once rather than on every prompt.
+    """
+
+    def __init__(
+        self,
+        *,
+        token_budget: int,
+        recent_turns: int = 12,
+        summary_chunk_turns: int = 20,
+        summarizer: Summarizer = extractive_summary,
+        estimate: Callable[[str], int] = estimate_tokens,
+    ) -> None:
+        self._token_budget = token_budget
+        self._estimate = lru_cache(maxsize=1024)(estimate)
+        self._recent_turns = recent_turns
+        self._summary_chunk_turns = max(1, summary_chunk_turns)
+        self._summarizer = summarizer
+        self._lock = threading.Lock()
+
+    def checkpoint(self, session: SessionState) -> bool:
+        """Extend the session summary if enough turns have aged out of the recent window.
+
+        Aged turns are folded in ``summary_chunk_turns`` at a time, so a long backlog (e.g. a
+        resumed session) never reaches the summarizer as a single oversized call.
+        """
+        with self._lock:
+            boundary = session.turn_count - self._recent_turns
+            extended = False
+            while boundary - session.summary_upto >= self._summary_chunk_turns:
+                end = session.summary_upto + self._summary_chunk_turns
+                aged = session.turns_between(session.summary_upto, end)
+                session.set_summary(self._summarizer(session.summary, aged), end)
+                extended = True
+            return extended
+
+    def build(self, session: SessionState, system_prompt: str, user_text: str) -> list[ChatMessage]:
+        self.checkpoint(session)
+
+        head = [ChatMessage(role="system", content=system_prompt)]
+        if session.summary:
+            head.append(ChatMessage(role="system", content=SUMMARY_PREFIX + session.summary))
+        tail = ChatMessage(role="user", content=user_text)
+        remaining = self._token_budget - sum(self._estimate(m.content) for m in [*head, tail])
+
+        # Newest turns first until the budget is spent; anything older is covered by the
+        # summary or, if it has not been checkpointed yet, dropped from this prompt.
+        recent: list[ChatMessage] = []
+        for turn in reversed(session.turns_between(session.summary_upto, session.turn_count)):
+            cost = self._estimate(turn["content"])
+            if cost > remaining:
+                break
+            remaining -= cost
+            recent.append(ChatMessage(role=_ROLE_MAP.get(turn["role"], "user"), content=turn["content"]))
+
+        return [*head, *reversed(recent), tail]
@@ -0,0 +1,225 @@
+"""Structured per-call telemetry: one event per provider attempt, to JSONL and an in-process aggregator."""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass, fields
+import json
+import math
+from pathlib import Path
+import threading
+
+METRICS_FILE = "metrics.jsonl"
+# Fields the aggregator can group by.
+GROUP_BY = ("route", "role")
+# Latency samples kept per group for percentiles; counts, tokens and cost stay exact.
+DEFAULT_WINDOW = 1000
+
+
+@dataclass(slots=True)
+class CallEvent:
+    timestamp: float
+    session_id: str | None
+    role: str
+    route: str
+    attempt: int
+    ttfb_seconds: float | None
+    latency_seconds: float
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+    error_class: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error_class is None
+
+
+_EVENT_FIELDS = {f.name for f in fields(CallEvent)}
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile; ``q`` is in [0, 100]."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+@dataclass(slots=True)
+class GroupSummary:
+    calls: int
+    errors: int
+    p50: float | None
+    p95: float | None
+    p99: float | None
+    ttfb_p50: float | None
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+
+
+class _Rolling:
+    """Running totals for one group plus its most recent ``window`` latency samples."""
+
+    __slots__ = ("calls", "errors", "prompt_tokens", "completion_tokens", "cost", "latencies", "ttfbs")
+
+    def __init__(self, window: int) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.ttfbs: deque[float] = deque(maxlen=window)
+
+    def add(self, event: CallEvent) -> None:
+        self.calls += 1
+        self.prompt_tokens += event.prompt_tokens
+        self.completion_tokens += event.completion_tokens
+        self.cost += event.cost
+        # Percentiles describe completed calls; failures are counted separately.
+        if event.ok:
+            self.latencies.append(event.latency_seconds)
+        else:
+            self.errors += 1
+        if event.ttfb_seconds is not None:
+            self.ttfbs.append(event.ttfb_seconds)
+
+    def summary(self) -> GroupSummary:
+        latencies = list(self.latencies)
+        ttfbs = list(self.ttfbs)
+        return GroupSummary(
+            calls=self.calls,
+            errors=self.errors,
+            p50=percentile(latencies, 50),
+            p95=percentile(latencies, 95),
+            p99=percentile(latencies, 99),
+            ttfb_p50=percentile(ttfbs, 50),
+            prompt_tokens=self.prompt_tokens,
+            completion_tokens=self.completion_tokens,
+            cost=self.cost,
+        )
+
+
+class MetricsAggregator:
+    """Rolling per-route and per-role aggregates of call events.
+
+    Totals are exact; latency percentiles cover each group's last ``window`` calls, so a
+    long-lived daemon or a large batch keeps constant memory.
+    """
+
+    def __init__(self, events: Iterable[CallEvent] = (), window: int = DEFAULT_WINDOW) -> None:
+        self._lock = threading.Lock()
+        self._window = max(1, window)
+        self._groups: dict[str, dict[str, _Rolling]] = {field: {} for field in GROUP_BY}
+        self._count = 0
+        for event in events:
+            self.add(event)
+
+    def add(self, event: CallEvent) -> None:
+        with self._lock:
+            self._count += 1
+            for field, groups in self._groups.items():
+                key = getattr(event, field)
+                rolling = groups.get(key)
+                if rolling is None:
+                    rolling = groups[key] = _Rolling(self._window)
+                rolling.add(event)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def summarize(self, group_by: str = "route") -> dict[str, GroupSummary]:
+        if group_by not in self._groups:
+            raise ValueError(f"Cannot group call metrics by {group_by!r} (use one of {', '.join(GROUP_BY)})")
+        with self._lock:
+            groups = self._groups[group_by]
+            return {key: groups[key].summary() for key in sorted(groups)}
+
+    def format_table(self, group_by: str = "route") -> str:
+        summaries = self.summarize(group_by)
+        if not summaries:
+            return f"No calls recorded (by {group_by})."
+
+        def ms(value: float | None) -> str:
+            return "-" if value is None else f"{value * 1000:.0f}ms"
+
+        header = (group_by, "calls", "errors", "p50", "p95", "p99", "ttfb p50", "tokens in/out", "cost")
+        rows = [
+            (
+                key,
+                str(s.calls),
+                str(s.errors),
+                ms(s.p50),
+                ms(s.p95),
+                ms(s.p99),
+                ms(s.ttfb_p50),
+                f"{s.prompt_tokens}/{s.completion_tokens}",
+                f"${s.cost:.4f}",
+            )
+            for key, s in summaries.items()
+        ]
+        widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+        return "\n".join(
+            "  ".join(cell.ljust(widths[i]) for i, cell in enumerate(row)).rstrip() for row in [header, *rows]
+        )
+
+
+class MetricsRecorder:
+    """Appends events to a JSONL file (when ``path`` is set) and feeds an aggregator.
+
+    The file is opened per event: there is one event per provider call, and no handle is
+    left for long-lived CLI or daemon processes to close.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self.aggregator = MetricsAggregator()
+
+    def emit(self, event: CallEvent) -> None:
+        self.aggregator.add(event)
+        if self._path is None:
+            return
+        line = json.dumps(asdict(event), ensure_ascii=False) + "\n"
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with self._path.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+
+
+def read_events(
+    path: Path, *, session_id: str | None = None, since: float | None = None
+) -> Iterator[CallEvent]:
+    """Yield events from a metrics file, optionally for one session or after ``since`` (epoch)."""
+    try:
+        fh = path.open("r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with fh:
+        for line in fh:
+            try:
+                raw = json.loads(line)
+                event = CallEvent(**{k: v for k, v in raw.items() if k in _EVENT_FIELDS})
+            except (ValueError, TypeError, AttributeError):
+                # Torn or foreign lines are skipped rather than failing the report.
+                continue
+            if session_id is not None and event.session_id != session_id:
+                continue
+            if since is not None and event.timestamp < since:
+                continue
+            yield event
+
+
+def parse_window(value: str) -> float:
+    """Parse a window such as ``30m``, ``12h`` or ``7d`` into seconds."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    value = value.strip().lower()
+    try:
+        if value and value[-1] in units:
+            return float(value[:-1]) * units[value[-1]]
+        return float(value)
+    except ValueError as exc:
+        raise ValueError(f"Invalid time window: {value!r} (use e.g. 30m, 12h, 7d)") from exc
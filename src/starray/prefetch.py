@@ -0,0 +1,118 @@
+"""Prepare the next turn in the background while the interactive prompt waits for input."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import threading
+import time
+
+from . import tracing
+from .analyst import AnalystRuntime
+from .session import SessionState
+
+
+@dataclass(slots=True)
+class PrefetchReport:
+    routes: list[str] = field(default_factory=list)
+    warmed: list[str] = field(default_factory=list)
+    context_ready: bool = False
+    cancelled: bool = False
+    errors: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+class Prefetcher:
+    """Uses the time spent in ``input()`` to get the next Analyst call ready.
+
+    Stages run in order on a daemon thread: check route health (moving cooled-down routes to
+    half-open), warm the providers on those routes (SDK import and a pooled keep-alive
+    connection), then checkpoint the session summary and count its recent turns. The thread
+    never prints. ``cancel()`` returns at once and the run stops before its next stage; work
+    already done stays valid because the runtime's caches and the summary checkpoint are
+    thread-safe. A provider is warmed again only after ``rewarm_seconds``, before its idle
+    connection would expire.
+    """
+
+    def __init__(
+        self,
+        runtime: AnalystRuntime,
+        *,
+        warm_connections: bool = True,
+        rewarm_seconds: float = 15.0,
+    ) -> None:
+        self._runtime = runtime
+        self._warm_connections = warm_connections
+        self._rewarm_seconds = rewarm_seconds
+        self._warmed_at: dict[str, float] = {}
+        self._cancel = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.last_report: PrefetchReport | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, session: SessionState | None = None) -> bool:
+        """Start a run unless one is still going; returns whether a new run started."""
+        if self.running:
+            return False
+        self._cancel = threading.Event()
+        cancel = self._cancel
+        self._thread = threading.Thread(
+            target=tracing.copy_context().run,
+            args=(self._run, session, cancel),
+            name="starray-prefetch",
+            daemon=True,
+        )
+        self._thread.start()
+        return True
+
+    def cancel(self) -> None:
+        """Stop the current run at its next stage boundary; never waits for it."""
+        self._cancel.set()
+
+    def wait(self, timeout: float | None = None) -> PrefetchReport | None:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.last_report
+
+    def _run(self, session: SessionState | None, cancel: threading.Event) -> None:
+        report = PrefetchReport()
+        started = time.perf_counter()
+        with tracing.span("prefetch") as span:
+            try:
+                self._stages(session, cancel, report)
+            except Exception as exc:  # the foreground turn redoes whatever failed here
+                report.errors.append(f"{type(exc).__name__}: {exc}")
+            report.cancelled = cancel.is_set()
+            report.seconds = time.perf_counter() - started
+            span.set_attribute("cancelled", report.cancelled)
+            span.set_attribute("warmed", len(report.warmed))
+        self.last_report = report
+
+    def _stages(self, session: SessionState | None, cancel: threading.Event, report: PrefetchReport) -> None:
+        if cancel.is_set():
+            return
+        routes = self._runtime.available_routes("analyst")
+        report.routes = [f"{provider_name}:{model}" for provider_name, model in routes]
+
+        for provider_name in dict.fromkeys(provider_name for provider_name, _ in routes):
+            if cancel.is_set():
+                return
+            if provider_name == "local":
+                continue
+            now = time.monotonic()
+            if now - self._warmed_at.get(provider_name, float("-inf")) < self._rewarm_seconds:
+                continue
+            try:
+                self._runtime.warm_provider(provider_name, connect=self._warm_connections)
+            except Exception as exc:
+                report.errors.append(f"{provider_name}: {exc}")
+                continue
+            self._warmed_at[provider_name] = now
+            report.warmed.append(provider_name)
+
+        if session is not None and not cancel.is_set():
+            self._runtime.prepare_context(session)
+            report.context_ready = True
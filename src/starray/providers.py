@@ -1,16 +1,107 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+import asyncio
 import contextlib
+from contextvars import ContextVar
 from dataclasses import dataclass
-import io
-from typing import Any
+import email.utils
+import importlib.util
+import json
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from . import tracing
+from .httpclients import HttpClientPool
 
 
 class ProviderError(RuntimeError):
     """Raised when a model provider cannot satisfy a request."""
 
 
+class RateLimitError(ProviderError):
+    """The provider refused the request with HTTP 429; ``retry_after`` is in seconds when known."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(headers: Any) -> float | None:
+    """Parse ``retry-after-ms`` or ``Retry-After`` (seconds or an HTTP date) from response headers."""
+    if not headers:
+        return None
+    try:
+        millis = headers.get("retry-after-ms")
+        if millis is not None:
+            return max(0.0, float(millis) / 1000)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class Cancellation:
+    """Abort hooks for one in-flight provider call, fired from another thread by ``cancel()``.
+
+    A blocking sync call cannot be interrupted directly, so providers register what would
+    unblock or free it (closing the HTTP response, releasing a rate-limit permit) with
+    ``on_cancel`` while running under ``cancel_scope``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+        self.cancelled = False
+
+    def add(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:  # noqa: BLE001 - cancelling is best effort
+                pass
+
+
+_cancellation: ContextVar[Cancellation | None] = ContextVar("starray_cancellation", default=None)
+
+
+@contextlib.contextmanager
+def cancel_scope(cancellation: Cancellation) -> Iterator[None]:
+    """Make provider calls in this context abortable through ``cancellation``."""
+    token = _cancellation.set(cancellation)
+    try:
+        yield
+    finally:
+        _cancellation.reset(token)
+
+
+def on_cancel(callback: Callable[[], None]) -> None:
+    """Run ``callback`` if the current call is cancelled; a no-op outside ``cancel_scope``."""
+    cancellation = _cancellation.get()
+    if cancellation is not None:
+        cancellation.add(callback)
+
+
 @dataclass(slots=True)
 class ChatMessage:
     role: str
@@ -33,6 +124,25 @@ class ModelProvider(ABC):
     ) -> str:
         raise NotImplementedError
 
+    def chat_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> Iterator[str]:
+        """Yield completion text as it arrives.
+
+        Providers without native streaming yield the finished ``chat`` result as one chunk.
+        """
+        yield self.chat(
+            messages,
+            model=model,
+            temperature=temperature,
+            timeout_seconds=timeout_seconds,
+        )
+
     @abstractmethod
     def structured_output(
         self,
@@ -45,6 +155,176 @@ class ModelProvider(ABC):
     ) -> dict[str, Any]:
         raise NotImplementedError
 
+    def structured_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> Iterator[str]:
+        """Yield the JSON reply text as it arrives, for incremental validation.
+
+        Providers without native streaming yield the ``structured_output`` payload as one chunk.
+        """
+        yield json.dumps(
+            self.structured_output(
+                messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+            )
+        )
+
+    def warm(self, connect: bool = True) -> None:
+        """Prepare for the next request without sending one; the default does nothing.
+
+        With ``connect`` a provider may open a keep-alive connection to its API host so the
+        next request skips DNS and the TLS handshake.
+        """
+
+    async def achat(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> str:
+        """Async counterpart of ``chat``; the default runs ``chat`` on a worker thread."""
+        return await asyncio.to_thread(
+            self.chat,
+            messages,
+            model=model,
+            temperature=temperature,
+            timeout_seconds=timeout_seconds,
+        )
+
+    async def achat_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> AsyncIterator[str]:
+        """Async counterpart of ``chat_stream``.
+
+        Providers without native streaming yield the finished ``achat`` result as one chunk.
+        Otherwise the default drives the synchronous stream on a worker thread, so blocking
+        providers never stall the event loop; closing or cancelling the iterator stops the
+        worker at the next chunk boundary.
+        """
+        if type(self).chat_stream is ModelProvider.chat_stream:
+            yield await self.achat(
+                messages,
+                model=model,
+                temperature=temperature,
+                timeout_seconds=timeout_seconds,
+            )
+            return
+        async with contextlib.aclosing(
+            _stream_in_thread(
+                lambda: self.chat_stream(
+                    messages,
+                    model=model,
+                    temperature=temperature,
+                    timeout_seconds=timeout_seconds,
+                )
+            )
+        ) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    async def astructured_output(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> dict[str, Any]:
+        """Async counterpart of ``structured_output``; the default runs it on a worker thread."""
+        return await asyncio.to_thread(
+            self.structured_output,
+            messages,
+            model=model,
+            schema=schema,
+            temperature=temperature,
+            timeout_seconds=timeout_seconds,
+        )
+
+    async def astructured_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> AsyncIterator[str]:
+        """Async counterpart of ``structured_stream``, following the rules of ``achat_stream``."""
+        if type(self).structured_stream is ModelProvider.structured_stream:
+            payload = await self.astructured_output(
+                messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+            )
+            yield json.dumps(payload)
+            return
+        async with contextlib.aclosing(
+            _stream_in_thread(
+                lambda: self.structured_stream(
+                    messages,
+                    model=model,
+                    schema=schema,
+                    temperature=temperature,
+                    timeout_seconds=timeout_seconds,
+                )
+            )
+        ) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+
+async def _stream_in_thread(open_stream: Callable[[], Iterator[str]]) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue[tuple[str, Any]] = asyncio.Queue()
+    stop = threading.Event()
+
+    def post(kind: str, value: Any) -> None:
+        with contextlib.suppress(RuntimeError):  # the loop may already be closed
+            loop.call_soon_threadsafe(events.put_nowait, (kind, value))
+
+    def pump() -> None:
+        chunks: Iterator[str] | None = None
+        try:
+            chunks = open_stream()
+            for chunk in chunks:
+                if stop.is_set():
+                    return
+                post("chunk", chunk)
+        except Exception as exc:  # noqa: BLE001 - re-raised on the event loop
+            post("error", exc)
+        else:
+            post("end", None)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    # Run the pump in a copy of the caller's context so provider spans join its trace.
+    context = tracing.copy_context()
+    threading.Thread(target=context.run, args=(pump,), name="starray-stream", daemon=True).start()
+    try:
+        while True:
+            kind, value = await events.get()
+            if kind == "chunk":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+    finally:
+        stop.set()
+
 
 class LocalEchoProvider(ModelProvider):
     """Deterministic local fallback for development/offline usage."""
@@ -74,22 +354,130 @@ class LocalEchoProvider(ModelProvider):
         temperature: float,
         timeout_seconds: float,
     ) -> dict[str, Any]:
-        properties = schema.get("properties", {})
-        return {k: None for k in properties}
+        from .structured import placeholder
+
+        return placeholder(schema)
+
+    async def achat(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> str:
+        return self.chat(messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds)
+
+    async def astructured_output(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> dict[str, Any]:
+        return self.structured_output(
+            messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+        )
+
+
+_LITELLM_LOGGERS = ("LiteLLM", "LiteLLM Router", "LiteLLM Proxy")
+_LITELLM_MISSING = "LiteLLM is not installed. Install optional dependencies to use remote providers."
+_litellm_lock = threading.Lock()
+_litellm_module: Any = None
+
+
+def _litellm_available() -> bool:
+    return importlib.util.find_spec("litellm") is not None
+
+
+def _load_litellm() -> Any:
+    """Import LiteLLM on first use; it takes seconds on a cold cache."""
+    global _litellm_module
+    if _litellm_module is None:
+        with _litellm_lock:
+            if _litellm_module is None:
+                try:
+                    import litellm  # type: ignore
+                except ImportError as exc:
+                    raise ProviderError(_LITELLM_MISSING) from exc
+                _quiet_litellm(litellm)
+                _litellm_module = litellm
+    return _litellm_module
+
+
+def _quiet_litellm(litellm: Any) -> None:
+    """Silence LiteLLM's own debug/help banners and log chatter.
+
+    Errors still reach callers as exceptions wrapped in ``ProviderError``. Only LiteLLM's
+    settings are changed, so concurrent callers' stdout/stderr stay untouched.
+    """
+    litellm.suppress_debug_info = True
+    litellm.set_verbose = False
+    for name in _LITELLM_LOGGERS:
+        logging.getLogger(name).setLevel(logging.CRITICAL)
+
+
+def warm_provider_imports() -> threading.Thread | None:
+    """Start importing provider SDKs on a daemon thread so the first call does not pay for it."""
+    if _litellm_module is not None or not _litellm_available():
+        return None
+
+    def warm() -> None:
+        try:
+            _load_litellm()
+        except Exception:  # pragma: no cover - the foreground call reports the failure
+            pass
+
+    thread = threading.Thread(target=warm, name="starray-warm-imports", daemon=True)
+    thread.start()
+    return thread
+
+
+# Providers LiteLLM serves through the OpenAI SDK, which reads ``litellm.client_session``.
+_OPENAI_SDK_PROVIDERS = frozenset({"openai"})
+
+# Hosts that ``LiteLLMProvider.warm`` connects to ahead of the first request.
+PROVIDER_BASE_URLS = {
+    "openai": "https://api.openai.com",
+    "anthropic": "https://api.anthropic.com",
+    "gemini": "https://generativelanguage.googleapis.com",
+}
 
 
 class LiteLLMProvider(ModelProvider):
-    """Adapter for providers exposed through LiteLLM."""
+    """Adapter for providers exposed through LiteLLM.
+
+    Construction only checks that LiteLLM is installed; the module is imported on the first call.
+    With ``http`` set, LiteLLM sends requests through that pool's long-lived clients: OpenAI
+    routes use the module-level sessions the pool installs, other routes get a per-call
+    LiteLLM HTTP handler backed by the same pool.
+    """
 
-    def __init__(self, provider_name: str) -> None:
+    def __init__(self, provider_name: str, http: HttpClientPool | None = None) -> None:
         self.name = provider_name
+        self._http = http
+        self._handlers: dict[bool, Any] = {}
+        if not _litellm_available():
+            raise ProviderError(_LITELLM_MISSING)
+
+    @property
+    def _litellm(self) -> Any:
+        return _load_litellm()
+
+    def warm(self, connect: bool = True) -> None:
+        """Import LiteLLM and, with a shared pool, open a keep-alive connection to the API host."""
+        _load_litellm()
+        client = self._http.client() if connect and self._http is not None else None
+        url = PROVIDER_BASE_URLS.get(self.name)
+        if client is None or url is None:
+            return
         try:
-            import litellm  # type: ignore
-        except ImportError as exc:
-            raise ProviderError(
-                "LiteLLM is not installed. Install optional dependencies to use remote providers."
-            ) from exc
-        self._litellm = litellm
+            # Any status will do: the point is the pooled, already-negotiated connection.
+            client.head(url, timeout=5.0)
+        except Exception:
+            pass
 
     def _qualified_model(self, model: str) -> str:
         # litellm expects e.g. openai/gpt-4.1, anthropic/claude-3-7-sonnet, gemini/gemini-2.0-flash
@@ -98,10 +486,79 @@ class LiteLLMProvider(ModelProvider):
         return f"{self.name}/{model}"
 
     def _call_completion(self, **kwargs: Any) -> Any:
-        # LiteLLM can print noisy debug/help banners to stdout/stderr on errors.
-        # Suppress those so CLI output stays readable and we control error surfacing.
-        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
-            return self._litellm.completion(**kwargs)
+        with tracing.span(
+            "provider.request", provider=self.name, model=kwargs["model"], stream=bool(kwargs.get("stream"))
+        ):
+            litellm = self._litellm
+            return litellm.completion(**kwargs, **self._pooled_client(litellm, asynchronous=False))
+
+    async def _acall_completion(self, **kwargs: Any) -> Any:
+        with tracing.span(
+            "provider.request", provider=self.name, model=kwargs["model"], stream=bool(kwargs.get("stream"))
+        ):
+            litellm = self._litellm
+            return await litellm.acompletion(**kwargs, **self._pooled_client(litellm, asynchronous=True))
+
+    def _pooled_client(self, litellm: Any, asynchronous: bool) -> dict[str, Any]:
+        """Extra ``completion`` arguments that route the call through the shared pool."""
+        if self._http is None:
+            return {}
+        self._http.install(litellm)
+        if self.name in _OPENAI_SDK_PROVIDERS:
+            # The OpenAI SDK takes only its own client per call; it reads the installed sessions.
+            return {}
+        if asynchronous not in self._handlers:
+            self._handlers[asynchronous] = self._http_handler(asynchronous)
+        handler = self._handlers[asynchronous]
+        return {} if handler is None else {"client": handler}
+
+    def _http_handler(self, asynchronous: bool) -> Any:
+        try:
+            from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler, HTTPHandler  # type: ignore
+        except ImportError:
+            return None
+        if not asynchronous:
+            client = self._http.client()
+            return None if client is None else HTTPHandler(client=client)
+        client = self._http.loop_client()
+        if client is None:
+            return None
+        handler = AsyncHTTPHandler()
+        handler.client = client
+        return handler
+
+    def _error(self, stage: str, exc: Exception) -> ProviderError:
+        """Wrap an SDK exception; HTTP 429s become ``RateLimitError`` carrying ``Retry-After``."""
+        message = f"{self.name} provider {stage} failed: {exc}"
+        if getattr(exc, "status_code", None) == 429 or type(exc).__name__ == "RateLimitError":
+            headers = getattr(getattr(exc, "response", None), "headers", None)
+            return RateLimitError(message, retry_after_seconds(headers))
+        return ProviderError(message)
+
+    def _request(
+        self, messages: list[ChatMessage], model: str, temperature: float, timeout_seconds: float
+    ) -> dict[str, Any]:
+        return {
+            "model": self._qualified_model(model),
+            "messages": [{"role": m.role, "content": m.content} for m in messages],
+            "temperature": temperature,
+            "timeout": timeout_seconds,
+        }
+
+    def _message_content(self, response: Any) -> str:
+        try:
+            return response["choices"][0]["message"]["content"]
+        except Exception as exc:  # pragma: no cover - defensive parse path
+            raise ProviderError(f"{self.name} provider returned an invalid response payload") from exc
+
+    def _structured_payload(self, response: Any, schema: dict[str, Any]) -> dict[str, Any]:
+        from .structured import StructuredOutputError, parse_structured
+
+        content = self._message_content(response)
+        try:
+            return parse_structured(content or "", schema)
+        except StructuredOutputError as exc:
+            raise StructuredOutputError(f"{self.name} provider returned invalid structured output: {exc}") from exc
 
     def chat(
         self,
@@ -112,19 +569,79 @@ class LiteLLMProvider(ModelProvider):
         timeout_seconds: float,
     ) -> str:
         try:
-            response = self._call_completion(
-                model=self._qualified_model(model),
-                messages=[{"role": m.role, "content": m.content} for m in messages],
-                temperature=temperature,
-                timeout=timeout_seconds,
+            response = self._call_completion(**self._request(messages, model, temperature, timeout_seconds))
+        except Exception as exc:  # pragma: no cover - depends on external client/runtime
+            raise self._error("request", exc) from exc
+        return self._message_content(response)
+
+    async def achat(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> str:
+        try:
+            response = await self._acall_completion(
+                **self._request(messages, model, temperature, timeout_seconds)
             )
         except Exception as exc:  # pragma: no cover - depends on external client/runtime
-            raise ProviderError(f"{self.name} provider request failed: {exc}") from exc
+            raise self._error("request", exc) from exc
+        return self._message_content(response)
 
+    def chat_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> Iterator[str]:
         try:
-            return response["choices"][0]["message"]["content"]
-        except Exception as exc:  # pragma: no cover - defensive parse path
-            raise ProviderError(f"{self.name} provider returned an invalid response payload") from exc
+            stream = self._call_completion(
+                **self._request(messages, model, temperature, timeout_seconds), stream=True
+            )
+        except Exception as exc:  # pragma: no cover - depends on external client/runtime
+            raise self._error("request", exc) from exc
+
+        close = _stream_closer(stream)
+        if close is not None:
+            on_cancel(close)
+        try:
+            for chunk in stream:
+                text = _delta_content(chunk)
+                if text:
+                    yield text
+        except Exception as exc:  # pragma: no cover - depends on external client/runtime
+            raise self._error("stream", exc) from exc
+
+    async def achat_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        temperature: float,
+        timeout_seconds: float,
+    ) -> AsyncIterator[str]:
+        try:
+            stream = await self._acall_completion(
+                **self._request(messages, model, temperature, timeout_seconds), stream=True
+            )
+        except Exception as exc:  # pragma: no cover - depends on external client/runtime
+            raise self._error("request", exc) from exc
+
+        try:
+            async for chunk in stream:
+                text = _delta_content(chunk)
+                if text:
+                    yield text
+        except Exception as exc:  # pragma: no cover - depends on external client/runtime
+            raise self._error("stream", exc) from exc
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
 
     def structured_output(
         self,
@@ -137,34 +654,120 @@ class LiteLLMProvider(ModelProvider):
     ) -> dict[str, Any]:
         try:
             response = self._call_completion(
-                model=self._qualified_model(model),
-                messages=[{"role": m.role, "content": m.content} for m in messages],
-                temperature=temperature,
-                timeout=timeout_seconds,
+                **self._request(messages, model, temperature, timeout_seconds),
                 response_format={"type": "json_object"},
             )
         except Exception as exc:  # pragma: no cover
-            raise ProviderError(f"{self.name} provider request failed: {exc}") from exc
+            raise self._error("request", exc) from exc
+        return self._structured_payload(response, schema)
 
+    async def astructured_output(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> dict[str, Any]:
         try:
-            import json
-
-            content = response["choices"][0]["message"]["content"]
-            payload = json.loads(content)
-            if not isinstance(payload, dict):
-                raise ProviderError(f"{self.name} provider returned non-object JSON")
-            return payload
-        except ProviderError:
-            raise
+            response = await self._acall_completion(
+                **self._request(messages, model, temperature, timeout_seconds),
+                response_format={"type": "json_object"},
+            )
         except Exception as exc:  # pragma: no cover
-            raise ProviderError(f"{self.name} provider returned invalid JSON structured output") from exc
+            raise self._error("request", exc) from exc
+        return self._structured_payload(response, schema)
+
+    def structured_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> Iterator[str]:
+        try:
+            stream = self._call_completion(
+                **self._request(messages, model, temperature, timeout_seconds),
+                response_format={"type": "json_object"},
+                stream=True,
+            )
+        except Exception as exc:  # pragma: no cover - depends on external client/runtime
+            raise self._error("request", exc) from exc
+
+        try:
+            for chunk in stream:
+                text = _delta_content(chunk)
+                if text:
+                    yield text
+        except Exception as exc:  # pragma: no cover - depends on external client/runtime
+            raise self._error("stream", exc) from exc
+
+    async def astructured_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> AsyncIterator[str]:
+        try:
+            stream = await self._acall_completion(
+                **self._request(messages, model, temperature, timeout_seconds),
+                response_format={"type": "json_object"},
+                stream=True,
+            )
+        except Exception as exc:  # pragma: no cover - depends on external client/runtime
+            raise self._error("request", exc) from exc
+
+        try:
+            async for chunk in stream:
+                text = _delta_content(chunk)
+                if text:
+                    yield text
+        except Exception as exc:  # pragma: no cover - depends on external client/runtime
+            raise self._error("stream", exc) from exc
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+def _stream_closer(stream: Any) -> Callable[[], None] | None:
+    """``close`` of a LiteLLM sync stream, or of the SDK stream it wraps, if there is one."""
+    for candidate in (stream, getattr(stream, "completion_stream", None)):
+        close = getattr(candidate, "close", None)
+        if callable(close):
+            return close
+    return None
+
+
+def _delta_content(chunk: Any) -> str | None:
+    delta = chunk["choices"][0]["delta"]
+    if isinstance(delta, dict):
+        return delta.get("content")
+    return getattr(delta, "content", None)
 
 
 class ProviderFactory:
-    """Constructs provider adapters from provider names."""
+    """Constructs provider adapters from provider names.
 
-    def __init__(self) -> None:
+    When ``wrap`` is given, every remote provider is passed through it once after
+    construction (for example to add response caching). Remote providers share the ``http``
+    connection pool, which ``close()`` shuts down.
+    """
+
+    def __init__(
+        self,
+        wrap: Callable[[ModelProvider], ModelProvider] | None = None,
+        http: HttpClientPool | None = None,
+    ) -> None:
         self._cache: dict[str, ModelProvider] = {}
+        self._wrap = wrap
+        self._http = http
 
     def get(self, provider_name: str) -> ModelProvider:
         if provider_name in self._cache:
@@ -173,9 +776,15 @@ class ProviderFactory:
         if provider_name == "local":
             provider: ModelProvider = LocalEchoProvider()
         elif provider_name in {"openai", "anthropic", "gemini"}:
-            provider = LiteLLMProvider(provider_name)
+            provider = LiteLLMProvider(provider_name, http=self._http)
+            if self._wrap is not None:
+                provider = self._wrap(provider)
         else:
             raise ProviderError(f"Unsupported provider: {provider_name}")
 
         self._cache[provider_name] = provider
         return provider
+
+    def close(self) -> None:
+        if self._http is not None:
+            self._http.close()
@@ -0,0 +1,622 @@
+"""Per-provider rate limiting: token buckets, fair queueing and ``Retry-After`` handling.
+
+A ``RateLimiter`` keeps one lane per ``[ratelimit.limits]`` key (``"provider:model"`` or a
+whole ``"provider"``). Each lane enforces requests per minute and tokens per minute with
+token buckets, plus an optional cap on concurrent calls. Requests that cannot start yet
+queue per tenant (session or role) and are served round-robin, so one busy batch or workflow
+cannot starve the rest. ``RateLimitedProvider`` applies the limiter in front of a provider
+and, when the API still answers 429, pauses the lane for ``Retry-After`` and retries on the
+same route instead of falling back.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import closing, contextmanager, suppress
+from contextvars import ContextVar
+from dataclasses import dataclass
+import json
+import math
+import threading
+import time
+from typing import Any
+
+from . import tracing
+from .metrics import percentile
+from .providers import ChatMessage, ModelProvider, RateLimitError, on_cancel
+from .tokens import TokenEstimator
+
+
+DEFAULT_TENANT = "default"
+# Used when a 429 carries no Retry-After header.
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+_RECENT_WAITS = 1024
+
+_tenant: ContextVar[str] = ContextVar("starray_ratelimit_tenant", default=DEFAULT_TENANT)
+
+
+@contextmanager
+def tenant_scope(name: str) -> Iterator[None]:
+    """Queue provider calls made in this context (and threads copied from it) as ``name``."""
+    token = _tenant.set(name)
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+def current_tenant() -> str:
+    return _tenant.get()
+
+
+@dataclass(slots=True)
+class RateLimit:
+    rpm: float | None = None
+    tpm: float | None = None
+    concurrency: int | None = None
+
+
+class TokenBucket:
+    """Holds up to ``per_minute`` tokens and refills continuously at ``per_minute / 60`` per second.
+
+    Debits may take the balance below zero (completion tokens are only known afterwards),
+    which delays later requests until it has refilled.
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, per_minute: float, now: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` (capped at the capacity) can be taken; 0 when it can now."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.tokens -= amount
+
+
+@dataclass(slots=True)
+class LaneStats:
+    queued: int
+    active: int
+    granted: int
+    waited: int
+    rate_limited: int
+    wait_p50: float | None
+    wait_p95: float | None
+    max_queue_depth: int
+
+
+class _Waiter:
+    __slots__ = ("tenant", "tokens", "event", "loop", "future")
+
+    def __init__(self, tenant: str, tokens: int, loop: asyncio.AbstractEventLoop | None = None) -> None:
+        self.tenant = tenant
+        self.tokens = tokens
+        self.event = threading.Event() if loop is None else None
+        self.loop = loop
+        self.future: asyncio.Future[None] | None = None
+
+    def arm(self) -> None:
+        """Reset the wake-up signal; called under the lane lock before each wait."""
+        if self.event is not None:
+            self.event.clear()
+        else:
+            assert self.loop is not None
+            self.future = self.loop.create_future()
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        elif self.future is not None:
+            future = self.future
+            self.loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+
+class _Lane:
+    """Buckets, concurrency count and per-tenant wait queues for one limit key."""
+
+    def __init__(self, key: str, limit: RateLimit, now: float) -> None:
+        self.key = key
+        self.limit = limit
+        self.requests = TokenBucket(limit.rpm, now) if limit.rpm else None
+        self.tokens = TokenBucket(limit.tpm, now) if limit.tpm else None
+        self.active = 0
+        self.blocked_until = 0.0
+        self.queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self.queued = 0
+        self.max_queue_depth = 0
+        self.granted = 0
+        self.waited = 0
+        self.rate_limited = 0
+        self.waits: deque[float] = deque(maxlen=_RECENT_WAITS)
+
+    def head(self) -> _Waiter | None:
+        for waiters in self.queues.values():
+            return waiters[0]
+        return None
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        """Seconds until a request of ``tokens`` may start; ``inf`` while the concurrency cap is hit."""
+        if self.limit.concurrency is not None and self.active >= self.limit.concurrency:
+            return math.inf
+        wait = max(0.0, self.blocked_until - now)
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def grant(self, tokens: int, now: float) -> None:
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None:
+            self.tokens.take(tokens, now)
+        self.active += 1
+        self.granted += 1
+
+    def enqueue(self, waiter: _Waiter) -> None:
+        self.queues.setdefault(waiter.tenant, deque()).append(waiter)
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+
+    def dequeue(self, waiter: _Waiter, served: bool) -> None:
+        waiters = self.queues.get(waiter.tenant)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self.queued -= 1
+        if not waiters:
+            del self.queues[waiter.tenant]
+        elif served:
+            # Round-robin: the tenant just served goes behind every other waiting tenant.
+            self.queues.move_to_end(waiter.tenant)
+
+    def wake_head(self) -> None:
+        head = self.head()
+        if head is not None:
+            head.wake()
+
+
+class Permit:
+    """Capacity granted for one provider call; ``release`` it exactly once when the call ends."""
+
+    __slots__ = ("_limiter", "_lane", "_released", "waited_seconds")
+
+    def __init__(self, limiter: RateLimiter, lane: _Lane, waited_seconds: float) -> None:
+        self._limiter = limiter
+        self._lane = lane
+        self._released = False
+        self.waited_seconds = waited_seconds
+
+    @property
+    def key(self) -> str:
+        return self._lane.key
+
+    def release(self, completion_tokens: int = 0) -> None:
+        self._limiter._release(self, completion_tokens)
+
+
+class RateLimiter:
+    """Token-bucket scheduler shared by every provider a ``ProviderFactory`` creates.
+
+    ``limits`` maps ``"provider:model"`` or ``"provider"`` to a ``RateLimit``; the most
+    specific key wins. Routes without a configured limit still get a lane, so a 429's
+    ``Retry-After`` pauses them too. A request that cannot start within ``max_wait_seconds``
+    raises ``RateLimitError``, which falls back like any other provider error.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, RateLimit] | None = None,
+        *,
+        max_wait_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._limits = dict(limits or {})
+        self.max_wait_seconds = max_wait_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._lanes: dict[str, _Lane] = {}
+
+    def _lane(self, provider_name: str, model: str) -> _Lane:
+        route = f"{provider_name}:{model}"
+        key = route if route in self._limits or provider_name not in self._limits else provider_name
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane(key, self._limits.get(key, RateLimit()), self._clock())
+        return lane
+
+    def deadline(self) -> float:
+        return self._clock() + self.max_wait_seconds
+
+    def _try_acquire(self, lane: _Lane, waiter: _Waiter, now: float) -> float:
+        """Grant ``waiter`` if it is at the head of the lane's queue; otherwise return how long to wait."""
+        if lane.head() is not waiter:
+            return math.inf
+        wait = lane.wait_time(waiter.tokens, now)
+        if wait > 0:
+            return wait
+        lane.grant(waiter.tokens, now)
+        lane.dequeue(waiter, served=True)
+        lane.wake_head()
+        return 0.0
+
+    def _start(self, lane: _Lane, tokens: int, now: float) -> bool:
+        """Fast path: grant immediately when nobody is queued and capacity is free."""
+        if not lane.queues and lane.wait_time(tokens, now) == 0:
+            lane.grant(tokens, now)
+            lane.waits.append(0.0)
+            return True
+        return False
+
+    def _timeout(self, lane: _Lane, started: float) -> RateLimitError:
+        return RateLimitError(
+            f"{lane.key}: no rate limit capacity within {self._clock() - started:.1f}s "
+            f"({lane.queued} queued)"
+        )
+
+    def acquire(
+        self, provider_name: str, model: str, tokens: int = 0, *, deadline: float | None = None
+    ) -> Permit:
+        """Block until the call may start; waiting requests are served round-robin by tenant."""
+        started = self._clock()
+        deadline = started + self.max_wait_seconds if deadline is None else deadline
+        with self._lock:
+            lane = self._lane(provider_name, model)
+            if self._start(lane, tokens, started):
+                return Permit(self, lane, 0.0)
+            waiter = _Waiter(current_tenant(), tokens)
+            lane.enqueue(waiter)
+        with tracing.span("ratelimit.wait", key=lane.key, tenant=waiter.tenant) as span:
+            try:
+                while True:
+                    with self._lock:
+                        now = self._clock()
+                        wait = self._try_acquire(lane, waiter, now)
+                        if wait == 0:
+                            return self._granted(lane, started, now, span)
+                        if now >= deadline or (wait != math.inf and now + wait > deadline):
+                            raise self._timeout(lane, started)
+                        waiter.arm()
+                    waiter.event.wait(min(wait, deadline - now))  # type: ignore[union-attr]
+            finally:
+                self._abandon(lane, waiter)
+
+    async def aacquire(
+        self, provider_name: str, model: str, tokens: int = 0, *, deadline: float | None = None
+    ) -> Permit:
+        """Async counterpart of ``acquire``; cancelling the caller leaves the queue cleanly."""
+        started = self._clock()
+        deadline = started + self.max_wait_seconds if deadline is None else deadline
+        with self._lock:
+            lane = self._lane(provider_name, model)
+            if self._start(lane, tokens, started):
+                return Permit(self, lane, 0.0)
+            waiter = _Waiter(current_tenant(), tokens, asyncio.get_running_loop())
+            lane.enqueue(waiter)
+        with tracing.span("ratelimit.wait", key=lane.key, tenant=waiter.tenant) as span:
+            try:
+                while True:
+                    with self._lock:
+                        now = self._clock()
+                        wait = self._try_acquire(lane, waiter, now)
+                        if wait == 0:
+                            return self._granted(lane, started, now, span)
+                        if now >= deadline or (wait != math.inf and now + wait > deadline):
+                            raise self._timeout(lane, started)
+                        waiter.arm()
+                        future = waiter.future
+                    assert future is not None
+                    with suppress(TimeoutError):
+                        async with asyncio.timeout(min(wait, deadline - now)):
+                            await future
+            finally:
+                self._abandon(lane, waiter)
+
+    def _granted(
+        self, lane: _Lane, started: float, now: float, span: tracing.Span | tracing.NoopSpan
+    ) -> Permit:
+        waited = now - started
+        lane.waited += 1
+        lane.waits.append(waited)
+        span.set_attribute("wait_seconds", waited)
+        return Permit(self, lane, waited)
+
+    def _abandon(self, lane: _Lane, waiter: _Waiter) -> None:
+        """Drop a waiter that timed out or was cancelled, handing its turn to the next one."""
+        with self._lock:
+            was_head = lane.head() is waiter
+            lane.dequeue(waiter, served=False)
+            if was_head:
+                lane.wake_head()
+
+    def _release(self, permit: Permit, completion_tokens: int) -> None:
+        # Under the lock: a cancelled call's permit may be released from another thread.
+        with self._lock:
+            if permit._released:
+                return
+            permit._released = True
+            lane = permit._lane
+            lane.active -= 1
+            if lane.tokens is not None and completion_tokens:
+                lane.tokens.take(completion_tokens, self._clock())
+            lane.wake_head()
+
+    def throttled(self, provider_name: str, model: str, retry_after: float | None) -> float:
+        """Pause the route's lane after a 429; returns the pause in seconds."""
+        pause = DEFAULT_RETRY_AFTER_SECONDS if retry_after is None else max(0.0, retry_after)
+        with self._lock:
+            lane = self._lane(provider_name, model)
+            lane.blocked_until = max(lane.blocked_until, self._clock() + pause)
+            lane.rate_limited += 1
+        return pause
+
+    def remaining(self, deadline: float) -> float:
+        return deadline - self._clock()
+
+    def stats(self) -> dict[str, LaneStats]:
+        with self._lock:
+            return {
+                key: LaneStats(
+                    queued=lane.queued,
+                    active=lane.active,
+                    granted=lane.granted,
+                    waited=lane.waited,
+                    rate_limited=lane.rate_limited,
+                    wait_p50=percentile(list(lane.waits), 50),
+                    wait_p95=percentile(list(lane.waits), 95),
+                    max_queue_depth=lane.max_queue_depth,
+                )
+                for key, lane in sorted(self._lanes.items())
+            }
+
+    def format_table(self) -> str:
+        stats = self.stats()
+        if not stats:
+            return "No rate-limited calls yet."
+
+        def ms(value: float | None) -> str:
+            return "-" if value is None else f"{value * 1000:.0f}"
+
+        lines = [f"{'lane':<28} {'queued':>6} {'active':>6} {'calls':>6} {'waited':>6} {'429s':>5} {'wait p50':>9} {'wait p95':>9}"]
+        for key, lane in stats.items():
+            lines.append(
+                f"{key:<28} {lane.queued:>6} {lane.active:>6} {lane.granted:>6} {lane.waited:>6} "
+                f"{lane.rate_limited:>5} {ms(lane.wait_p50):>9} {ms(lane.wait_p95):>9}"
+            )
+        return "\n".join(lines)
+
+
+class RateLimitedProvider(ModelProvider):
+    """Runs every call of ``inner`` under a ``RateLimiter`` permit.
+
+    A ``RateLimitError`` from ``inner`` (HTTP 429) pauses the lane for its ``Retry-After`` and
+    the call is retried on the same route while ``max_wait_seconds`` allows. Streams are only
+    retried before their first chunk.
+    """
+
+    def __init__(self, inner: ModelProvider, limiter: RateLimiter, tokens: TokenEstimator | None = None) -> None:
+        self.name = inner.name
+        self._inner = inner
+        self._limiter = limiter
+        self._tokens = tokens or TokenEstimator()
+
+    def warm(self, connect: bool = True) -> None:
+        self._inner.warm(connect)
+
+    def _prompt_tokens(self, messages: list[ChatMessage], model: str) -> int:
+        return self._tokens.count_messages(messages, model, self.name)
+
+    def _completion_tokens(self, text: str, model: str) -> int:
+        return self._tokens.count(text, model, self.name) if text else 0
+
+    def _backoff(self, model: str, exc: RateLimitError, deadline: float) -> None:
+        """Pause the lane after a 429, or re-raise when the pause would outlast ``deadline``."""
+        pause = self._limiter.throttled(self.name, model, exc.retry_after)
+        if pause >= self._limiter.remaining(deadline):
+            raise exc
+
+    def _call(self, model: str, messages: list[ChatMessage], call: Callable[[], Any]) -> Any:
+        deadline = self._limiter.deadline()
+        while True:
+            permit = self._limiter.acquire(self.name, model, self._prompt_tokens(messages, model), deadline=deadline)
+            # A cancelled caller gives its capacity back even while the call is still blocked.
+            on_cancel(permit.release)
+            try:
+                result = call()
+            except RateLimitError as exc:
+                permit.release()
+                self._backoff(model, exc, deadline)
+                continue
+            except BaseException:
+                permit.release()
+                raise
+            text = result if isinstance(result, str) else json.dumps(result)
+            permit.release(self._completion_tokens(text, model))
+            return result
+
+    async def _acall(self, model: str, messages: list[ChatMessage], call: Callable[[], Any]) -> Any:
+        deadline = self._limiter.deadline()
+        while True:
+            permit = await self._limiter.aacquire(
+                self.name, model, self._prompt_tokens(messages, model), deadline=deadline
+            )
+            try:
+                result = await call()
+            except RateLimitError as exc:
+                permit.release()
+                self._backoff(model, exc, deadline)
+                continue
+            except BaseException:
+                permit.release()
+                raise
+            text = result if isinstance(result, str) else json.dumps(result)
+            permit.release(self._completion_tokens(text, model))
+            return result
+
+    def _stream(self, model: str, messages: list[ChatMessage], open_stream: Callable[[], Iterator[str]]) -> Iterator[str]:
+        deadline = self._limiter.deadline()
+        while True:
+            permit = self._limiter.acquire(self.name, model, self._prompt_tokens(messages, model), deadline=deadline)
+            on_cancel(permit.release)
+            parts: list[str] = []
+            try:
+                # Closing the inner stream on early exit frees its connection with the permit.
+                with closing(open_stream()) as chunks:
+                    for chunk in chunks:
+                        parts.append(chunk)
+                        yield chunk
+            except RateLimitError as exc:
+                permit.release()
+                if parts:
+                    raise
+                self._backoff(model, exc, deadline)
+                continue
+            finally:
+                permit.release(self._completion_tokens("".join(parts), model))
+            return
+
+    async def _astream(
+        self, model: str, messages: list[ChatMessage], open_stream: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        deadline = self._limiter.deadline()
+        while True:
+            permit = await self._limiter.aacquire(
+                self.name, model, self._prompt_tokens(messages, model), deadline=deadline
+            )
+            parts: list[str] = []
+            chunks = open_stream()
+            try:
+                async for chunk in chunks:
+                    parts.append(chunk)
+                    yield chunk
+            except RateLimitError as exc:
+                permit.release()
+                if parts:
+                    raise
+                self._backoff(model, exc, deadline)
+                continue
+            finally:
+                await chunks.aclose()
+                permit.release(self._completion_tokens("".join(parts), model))
+            return
+
+    def chat(self, messages: list[ChatMessage], *, model: str, temperature: float, timeout_seconds: float) -> str:
+        return self._call(
+            model,
+            messages,
+            lambda: self._inner.chat(messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds),
+        )
+
+    def chat_stream(
+        self, messages: list[ChatMessage], *, model: str, temperature: float, timeout_seconds: float
+    ) -> Iterator[str]:
+        return self._stream(
+            model,
+            messages,
+            lambda: self._inner.chat_stream(
+                messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds
+            ),
+        )
+
+    def structured_output(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> dict[str, Any]:
+        return self._call(
+            model,
+            messages,
+            lambda: self._inner.structured_output(
+                messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+            ),
+        )
+
+    def structured_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> Iterator[str]:
+        return self._stream(
+            model,
+            messages,
+            lambda: self._inner.structured_stream(
+                messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+            ),
+        )
+
+    async def achat(
+        self, messages: list[ChatMessage], *, model: str, temperature: float, timeout_seconds: float
+    ) -> str:
+        return await self._acall(
+            model,
+            messages,
+            lambda: self._inner.achat(messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds),
+        )
+
+    def achat_stream(
+        self, messages: list[ChatMessage], *, model: str, temperature: float, timeout_seconds: float
+    ) -> AsyncIterator[str]:
+        return self._astream(
+            model,
+            messages,
+            lambda: self._inner.achat_stream(
+                messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds
+            ),
+        )
+
+    async def astructured_output(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> dict[str, Any]:
+        return await self._acall(
+            model,
+            messages,
+            lambda: self._inner.astructured_output(
+                messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+            ),
+        )
+
+    def astructured_stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        model: str,
+        schema: dict[str, Any],
+        temperature: float,
+        timeout_seconds: float,
+    ) -> AsyncIterator[str]:
+        return self._astream(
+            model,
+            messages,
+            lambda: self._inner.astructured_stream(
+                messages, model=model, schema=schema, temperature=temperature, timeout_seconds=timeout_seconds
+            ),
+        )
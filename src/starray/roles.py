@@ -0,0 +1,77 @@
+"""Specialist roles that run on the shared ``AnalystRuntime`` routing stack."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from .analyst import ANALYST_SYSTEM_PROMPT, AnalystResponse, AnalystRuntime, StructuredResponse, TokenCallback
+from .providers import ChatMessage
+
+
+ROLE_SYSTEM_PROMPTS = {
+    "analyst": ANALYST_SYSTEM_PROMPT,
+    "planner": (
+        "You are the Planner agent in StarRay. Break the request into small, ordered, testable steps. "
+        "List assumptions and open questions separately."
+    ),
+    "architect": (
+        "You are the Architect agent in StarRay. Propose the design: components, interfaces, data flow "
+        "and trade-offs. Prefer the smallest design that satisfies the plan."
+    ),
+    "implementer": (
+        "You are the Implementer agent in StarRay. Produce the code changes for the design as unified "
+        "diffs, touching only what the plan requires."
+    ),
+    "tester": (
+        "You are the Tester agent in StarRay. Review the change for correctness and list the tests to "
+        "add or run, with expected results."
+    ),
+    "security": (
+        "You are the Security agent in StarRay. Review the change for vulnerabilities, unsafe actions "
+        "and secrets handling. Rate each finding by severity."
+    ),
+}
+
+
+class RoleRuntime:
+    """One role (``planner``, ``tester``, ...) answering through a shared ``AnalystRuntime``.
+
+    Routes come from ``[provider.role_models]``/``role_fallback_models`` for the role, while
+    health, routing statistics and metrics stay shared across roles.
+    """
+
+    def __init__(self, runtime: AnalystRuntime, role: str, system_prompt: str | None = None) -> None:
+        self.runtime = runtime
+        self.role = role
+        self.system_prompt = system_prompt or ROLE_SYSTEM_PROMPTS.get(
+            role, f"You are the {role.capitalize()} agent in StarRay. Be concise and concrete."
+        )
+
+    def build_messages(self, task: str, inputs: dict[str, str] | None = None) -> list[ChatMessage]:
+        """System prompt, then upstream outputs (in the given order), then the task."""
+        messages = [ChatMessage(role="system", content=self.system_prompt)]
+        for name, content in (inputs or {}).items():
+            messages.append(ChatMessage(role="user", content=f"Output of {name}:\n{content}"))
+        messages.append(ChatMessage(role="user", content=task))
+        return messages
+
+    def run(
+        self, task: str, inputs: dict[str, str] | None = None, on_token: TokenCallback | None = None
+    ) -> AnalystResponse:
+        return self.runtime.complete(self.build_messages(task, inputs), role=self.role, on_token=on_token)
+
+    async def arun(
+        self, task: str, inputs: dict[str, str] | None = None, on_token: TokenCallback | None = None
+    ) -> AnalystResponse:
+        return await self.runtime.acomplete(self.build_messages(task, inputs), role=self.role, on_token=on_token)
+
+    def run_structured(
+        self, task: str, schema: dict[str, Any], inputs: dict[str, str] | None = None
+    ) -> StructuredResponse:
+        """The role's answer as a JSON object validated against ``schema``."""
+        return self.runtime.structured(self.build_messages(task, inputs), schema, role=self.role)
+
+    async def arun_structured(
+        self, task: str, schema: dict[str, Any], inputs: dict[str, str] | None = None
+    ) -> StructuredResponse:
+        return await self.runtime.astructured(self.build_messages(task, inputs), schema, role=self.role)
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import atexit
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+import json
+import math
+import os
+from pathlib import Path
+import threading
+import time
+
+
+STATIC = "static"
+FASTEST = "fastest"
+CHEAPEST = "cheapest"
+POLICIES = (STATIC, FASTEST, CHEAPEST)
+
+# Token counts assumed for routes that have not completed a call yet.
+DEFAULT_PROMPT_TOKENS = 1000
+DEFAULT_COMPLETION_TOKENS = 300
+
+
+@dataclass(slots=True)
+class RoutePrice:
+    input_per_1k: float = 0.0
+    output_per_1k: float = 0.0
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.input_per_1k + completion_tokens * self.output_per_1k) / 1000
+
+
+@dataclass(slots=True)
+class RouteStats:
+    successes: int = 0
+    failures: int = 0
+    ewma_latency: float | None = None
+    ewma_first_token: float | None = None
+    ewma_error_rate: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    first_token_latencies: list[float] = field(default_factory=list)
+
+    @property
+    def calls(self) -> int:
+        return self.successes + self.failures
+
+    @property
+    def p95_latency(self) -> float | None:
+        return _p95(self.latencies)
+
+    @property
+    def p95_first_token(self) -> float | None:
+        return _p95(self.first_token_latencies)
+
+
+def _p95(values: list[float]) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+def _ewma(previous: float | None, sample: float, alpha: float) -> float:
+    return sample if previous is None else alpha * sample + (1 - alpha) * previous
+
+
+class RouteStatsStore:
+    """Latency, error and cost statistics per ``provider:model`` route, optionally persisted.
+
+    Latency and error rate are tracked as EWMAs (weight ``alpha`` on the newest call); p95
+    latency and time to first token are computed over the last ``window`` successful calls. Updates are written to
+    ``path`` at most every ``save_interval_seconds``, and at ``close`` or interpreter exit.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        alpha: float = 0.2,
+        window: int = 100,
+        save_interval_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._path = path
+        self._alpha = alpha
+        self._window = max(1, window)
+        self._save_interval_seconds = save_interval_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._routes: dict[str, RouteStats] = {}
+        self._version = 0
+        self._saved_version = 0
+        self._saved_at: float | None = None
+        self._atexit_registered = False
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        *,
+        alpha: float = 0.2,
+        window: int = 100,
+        save_interval_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> "RouteStatsStore":
+        store = cls(
+            path, alpha=alpha, window=window, save_interval_seconds=save_interval_seconds, clock=clock
+        )
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            store._routes = {route: RouteStats(**raw) for route, raw in payload.get("routes", {}).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError):
+            # Statistics are an optimization; a corrupt file just means relearning them.
+            store._routes = {}
+        return store
+
+    def get(self, route: str) -> RouteStats | None:
+        with self._lock:
+            stats = self._routes.get(route)
+            return None if stats is None else RouteStats(**asdict(stats))
+
+    def snapshot(self) -> dict[str, RouteStats]:
+        with self._lock:
+            return {route: RouteStats(**asdict(stats)) for route, stats in self._routes.items()}
+
+    def record_success(
+        self,
+        route: str,
+        *,
+        latency_seconds: float,
+        first_token_seconds: float | None,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost: float,
+    ) -> None:
+        with self._lock:
+            stats = self._routes.setdefault(route, RouteStats())
+            stats.successes += 1
+            stats.ewma_latency = _ewma(stats.ewma_latency, latency_seconds, self._alpha)
+            if first_token_seconds is not None:
+                stats.ewma_first_token = _ewma(stats.ewma_first_token, first_token_seconds, self._alpha)
+                stats.first_token_latencies.append(round(first_token_seconds, 4))
+                del stats.first_token_latencies[: -self._window]
+            stats.ewma_error_rate = _ewma(stats.ewma_error_rate, 0.0, self._alpha)
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost += cost
+            stats.latencies.append(round(latency_seconds, 4))
+            del stats.latencies[: -self._window]
+            self._changed()
+
+    def record_failure(self, route: str) -> None:
+        with self._lock:
+            stats = self._routes.setdefault(route, RouteStats())
+            stats.failures += 1
+            stats.ewma_error_rate = _ewma(stats.ewma_error_rate, 1.0, self._alpha)
+            self._changed()
+
+    def save(self) -> None:
+        """Write any unsaved statistics to ``path`` now."""
+        with self._lock:
+            self._write()
+
+    def close(self) -> None:
+        self.save()
+        if self._atexit_registered:
+            atexit.unregister(self.save)
+            self._atexit_registered = False
+
+    def _changed(self) -> None:
+        # Called with the lock held, so writes land in version order and never go stale.
+        self._version += 1
+        if self._path is None:
+            return
+        if self._saved_at is None or self._clock() - self._saved_at >= self._save_interval_seconds:
+            self._write()
+        elif not self._atexit_registered:
+            atexit.register(self.save)
+            self._atexit_registered = True
+
+    def _write(self) -> None:
+        if self._path is None or self._version == self._saved_version:
+            return
+        payload = {"routes": {route: asdict(stats) for route, stats in self._routes.items()}}
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(f"{self._path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp_path, self._path)
+        self._saved_version = self._version
+        self._saved_at = self._clock()
+
+
+@dataclass(slots=True)
+class RoutingPolicy:
+    name: str = STATIC
+    max_p95_ms: float | None = None
+    max_cost_per_call: float | None = None
+    max_error_rate: float = 0.5
+    min_samples: int = 3
+
+    def describe(self) -> str:
+        if self.name == CHEAPEST and self.max_p95_ms is not None:
+            return f"{CHEAPEST} under {self.max_p95_ms:g}ms p95"
+        if self.name == FASTEST and self.max_cost_per_call is not None:
+            return f"{FASTEST} within ${self.max_cost_per_call:g}/call"
+        return self.name
+
+
+@dataclass(slots=True)
+class RankedRoute:
+    provider: str
+    model: str
+    reason: str
+
+
+class Router:
+    """Orders candidate routes for a role using recorded statistics and a ``RoutingPolicy``.
+
+    ``static`` keeps the configured order. ``fastest`` sorts by p95 latency and ``cheapest``
+    by expected cost per call; routes without ``min_samples`` successful calls are treated
+    optimistically so they get measured. Routes breaking the policy's bound, or failing more
+    often than ``max_error_rate``, move behind the ones that qualify. The local provider
+    always stays last.
+    """
+
+    def __init__(
+        self,
+        stats: RouteStatsStore,
+        *,
+        default_policy: RoutingPolicy | None = None,
+        role_policies: dict[str, RoutingPolicy] | None = None,
+        prices: dict[str, RoutePrice] | None = None,
+    ) -> None:
+        self._stats = stats
+        self._default_policy = default_policy or RoutingPolicy()
+        self._role_policies = role_policies or {}
+        self._prices = prices or {}
+
+    def policy(self, role: str) -> RoutingPolicy:
+        return self._role_policies.get(role, self._default_policy)
+
+    def cost(self, route: str, prompt_tokens: int, completion_tokens: int) -> float:
+        price = self._prices.get(route)
+        return price.cost(prompt_tokens, completion_tokens) if price else 0.0
+
+    def workload(self) -> tuple[int, int]:
+        """Mean prompt/completion tokens per call across all routes, used to compare prices."""
+        snapshot = self._stats.snapshot().values()
+        successes = sum(stats.successes for stats in snapshot)
+        if not successes:
+            return DEFAULT_PROMPT_TOKENS, DEFAULT_COMPLETION_TOKENS
+        return (
+            sum(stats.prompt_tokens for stats in snapshot) // successes,
+            sum(stats.completion_tokens for stats in snapshot) // successes,
+        )
+
+    def expected_cost(self, route: str, workload: tuple[int, int] | None = None) -> float | None:
+        price = self._prices.get(route)
+        if price is None:
+            return None
+        return price.cost(*(workload or self.workload()))
+
+    def p95_first_token(self, route: str, min_samples: int) -> float | None:
+        """Recorded p95 time to first token of ``route``, or ``None`` until it has ``min_samples``."""
+        stats = self._stats.get(route)
+        if stats is None or len(stats.first_token_latencies) < min_samples:
+            return None
+        return stats.p95_first_token
+
+    def record_success(
+        self,
+        route: str,
+        *,
+        latency_seconds: float,
+        first_token_seconds: float | None,
+        prompt_tokens: int,
+        completion_tokens: int,
+    ) -> None:
+        self._stats.record_success(
+            route,
+            latency_seconds=latency_seconds,
+            first_token_seconds=first_token_seconds,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=self.cost(route, prompt_tokens, completion_tokens),
+        )
+
+    def record_failure(self, route: str) -> None:
+        self._stats.record_failure(route)
+
+    def close(self) -> None:
+        self._stats.close()
+
+    def rank(self, role: str, routes: list[tuple[str, str]]) -> list[RankedRoute]:
+        policy = self.policy(role)
+        remote = [(index, route) for index, route in enumerate(routes) if route[0] != "local"]
+        local = [RankedRoute(provider, model, "last resort") for provider, model in routes if provider == "local"]
+        if policy.name == STATIC:
+            return [RankedRoute(provider, model, "configured order") for _, (provider, model) in remote] + local
+
+        workload = self.workload()
+        qualifying: list[tuple[tuple[float, int], RankedRoute]] = []
+        over_bound: list[tuple[tuple[float, int], RankedRoute]] = []
+        failing: list[tuple[tuple[float, int], RankedRoute]] = []
+        for index, (provider, model) in remote:
+            route = f"{provider}:{model}"
+            stats = self._stats.get(route)
+            measured = stats is not None and stats.successes >= policy.min_samples
+            p95 = stats.p95_latency if measured and stats is not None else None
+            cost = self.expected_cost(route, workload)
+            reason = self._describe(stats, p95, cost, policy)
+
+            if stats is not None and stats.calls >= policy.min_samples and stats.ewma_error_rate > policy.max_error_rate:
+                failing.append(((0.0, index), RankedRoute(provider, model, f"{reason}; error rate above limit")))
+                continue
+            if policy.name == FASTEST:
+                key = p95 if p95 is not None else 0.0
+                within = policy.max_cost_per_call is None or cost is None or cost <= policy.max_cost_per_call
+                bound = "over cost budget"
+            else:
+                key = cost if cost is not None else math.inf
+                within = policy.max_p95_ms is None or p95 is None or p95 * 1000 <= policy.max_p95_ms
+                bound = "p95 over limit"
+            if within:
+                qualifying.append(((key, index), RankedRoute(provider, model, reason)))
+            else:
+                over_bound.append(((key, index), RankedRoute(provider, model, f"{reason}; {bound}")))
+
+        ranked = [entry for _, entry in sorted(qualifying, key=lambda item: item[0])]
+        ranked += [entry for _, entry in sorted(over_bound, key=lambda item: item[0])]
+        ranked += [entry for _, entry in sorted(failing, key=lambda item: item[0])]
+        return ranked + local
+
+    def explain(self, role: str, routes: list[tuple[str, str]]) -> str:
+        lines = [f"Routing policy ({role}): {self.policy(role).describe()}"]
+        for position, entry in enumerate(self.rank(role, routes), start=1):
+            lines.append(f"  {position}. {entry.provider}:{entry.model} - {entry.reason}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _describe(
+        stats: RouteStats | None, p95: float | None, cost: float | None, policy: RoutingPolicy
+    ) -> str:
+        parts: list[str] = []
+        if stats is None or stats.successes < policy.min_samples:
+            parts.append(f"unmeasured ({stats.successes if stats else 0}/{policy.min_samples} samples)")
+        else:
+            parts.append(f"p95 {p95 * 1000:.0f}ms" if p95 is not None else "p95 n/a")
+            if stats.ewma_latency is not None:
+                parts.append(f"ewma {stats.ewma_latency * 1000:.0f}ms")
+        if stats is not None and stats.calls:
+            parts.append(f"errors {stats.ewma_error_rate:.0%}")
+        if cost is not None:
+            parts.append(f"~${cost:.4f}/call")
+        return ", ".join(parts)
+
+
+def build_router(
+    stats: RouteStatsStore,
+    *,
+    policy: str,
+    role_policies: dict[str, str],
+    max_p95_ms: float | None,
+    max_cost_per_call: float | None,
+    max_error_rate: float,
+    min_samples: int,
+    prices: dict[str, tuple[float, float]],
+) -> Router:
+    def make(name: str) -> RoutingPolicy:
+        return RoutingPolicy(
+            name=name,
+            max_p95_ms=max_p95_ms,
+            max_cost_per_call=max_cost_per_call,
+            max_error_rate=max_error_rate,
+            min_samples=max(1, min_samples),
+        )
+
+    return Router(
+        stats,
+        default_policy=make(policy),
+        role_policies={role: make(name) for role, name in role_policies.items()},
+        prices={route: RoutePrice(*price) for route, price in prices.items()},
+    )
@@ -1,17 +1,47 @@
 from __future__ import annotations
 
+from array import array
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass, field
 from datetime import datetime, UTC
 import json
+import os
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 from uuid import uuid4
 
+from . import tracing
+
+if TYPE_CHECKING:
+    from .session_index import SessionIndex
+
+
+SESSION_FORMAT_VERSION = 2
+DEFAULT_HISTORY_PAGE = 50
+# First entry of an ``.idx`` sidecar that also indexes summary records; older sidecars held
+# turn offsets only and are rebuilt on load.
+_INDEX_MAGIC = 2**64 - 1
+# Set on sidecar entries that point at a summary record rather than a turn.
+_SUMMARY_FLAG = 1 << 63
+
 
 @dataclass(slots=True)
 class SessionState:
+    """A chat session whose ``turns`` hold the in-memory window of the transcript.
+
+    Sessions resumed with ``tail_turns`` keep only the most recent turns in memory;
+    ``turn_count``, ``iter_turns`` and ``iter_history`` read older turns from disk on demand.
+    """
+
     session_id: str
     created_at: str
     turns: list[dict[str, str]] = field(default_factory=list)
+    _persisted_turns: int = field(default=0, init=False, repr=False, compare=False)
+    _source: Path | None = field(default=None, init=False, repr=False, compare=False)
+    _offset_turns: int = field(default=0, init=False, repr=False, compare=False)
+    summary: str | None = field(default=None, init=False)
+    summary_upto: int = field(default=0, init=False)
+    _summary_dirty: bool = field(default=False, init=False, repr=False, compare=False)
 
     @classmethod
     def new(cls) -> "SessionState":
@@ -21,43 +51,350 @@ class SessionState:
             turns=[],
         )
 
-    def add_turn(self, role: str, content: str) -> None:
+    @property
+    def turn_count(self) -> int:
+        """Total number of turns, including older turns that were not loaded."""
+        return self._offset_turns + len(self.turns)
+
+    def add_turn(self, role: str, content: str, **metadata: str) -> None:
+        """Append a turn; ``metadata`` (e.g. ``provider``, ``model``) is stored with it."""
         self.turns.append(
             {
                 "timestamp": datetime.now(UTC).isoformat(),
                 "role": role,
                 "content": content,
+                **metadata,
             }
         )
 
-    def save(self, session_dir: Path) -> Path:
+    def set_summary(self, content: str, upto: int) -> None:
+        """Record a rolling summary covering turns ``[0, upto)``; persisted on the next save."""
+        self.summary = content
+        self.summary_upto = upto
+        self._summary_dirty = True
+
+    def turns_between(self, start: int, end: int) -> list[dict[str, str]]:
+        """Return turns by absolute index, reading from disk when they are outside the window."""
+        start = max(0, start)
+        end = min(end, self.turn_count)
+        if start >= end:
+            return []
+        if start >= self._offset_turns or self._source is None:
+            base = self._offset_turns
+            return self.turns[max(0, start - base) : end - base]
+        offsets = _load_offsets(self._source)
+        older = _read_turns(self._source, offsets, start, min(end, self._offset_turns))
+        return older + self.turns[: max(0, end - self._offset_turns)]
+
+    def iter_turns(self) -> Iterator[dict[str, str]]:
+        """Yield the full transcript oldest-first, streaming unloaded turns from disk."""
+        if self._offset_turns and self._source is not None:
+            offsets = _load_offsets(self._source)
+            yield from _stream_turns(self._source, offsets, 0, self._offset_turns)
+        yield from self.turns
+
+    def iter_history(self, page_size: int = DEFAULT_HISTORY_PAGE) -> Iterator[list[dict[str, str]]]:
+        """Yield pages of turns older than the in-memory window, newest page first.
+
+        Each page is in chronological order. Pages are read by seeking through the offset index.
+        """
+        if not self._offset_turns or self._source is None:
+            return
+        offsets = _load_offsets(self._source)
+        end = self._offset_turns
+        while end > 0:
+            start = max(0, end - page_size)
+            yield _read_turns(self._source, offsets, start, end)
+            end = start
+
+    def save(self, session_dir: Path, index: SessionIndex | None = None) -> Path:
+        """Append turns added since the last save to ``<session_id>.jsonl`` and fsync.
+
+        The first save writes a header record carrying ``session_id`` and ``created_at``.
+        With ``index``, the newly written turns are also added to the session index.
+        """
         session_dir.mkdir(parents=True, exist_ok=True)
-        path = session_dir / f"{self.session_id}.json"
-        payload = {
+        path = session_path(session_dir, self.session_id)
+        if not path.exists():
+            # New session, or the file was removed underneath us: write what we still hold.
+            self._persisted_turns = 0
+            self._offset_turns = 0
+            _index_path(path).unlink(missing_ok=True)
+            records = [self._header(), *(_turn_record(turn) for turn in self.turns)]
+            self._summary_dirty = True
+        else:
+            records = [_turn_record(turn) for turn in self.turns[self._persisted_turns :]]
+        if self._summary_dirty and self.summary is not None:
+            records.append(self._summary_record())
+        if records:
+            with tracing.span("session.save", session_id=self.session_id, records=len(records)):
+                offsets = _append_records(path, records)
+                _append_offsets(path, _index_entries(zip(offsets, records)))
+        new_turns = self.turns[self._persisted_turns :]
+        if index is not None and new_turns:
+            index.record(self.session_id, self.created_at, self._offset_turns + self._persisted_turns, new_turns)
+        self._persisted_turns = len(self.turns)
+        self._summary_dirty = False
+        self._source = path
+        return path
+
+    def _records(self) -> list[dict[str, Any]]:
+        records = [self._header(), *(_turn_record(turn) for turn in self.iter_turns())]
+        if self.summary is not None:
+            records.append(self._summary_record())
+        return records
+
+    def _summary_record(self) -> dict[str, Any]:
+        return {"type": "summary", "upto": self.summary_upto, "content": self.summary}
+
+    def _header(self) -> dict[str, Any]:
+        return {
+            "type": "header",
+            "version": SESSION_FORMAT_VERSION,
             "session_id": self.session_id,
             "created_at": self.created_at,
-            "turns": self.turns,
         }
-        path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
-        return path
 
 
 class SessionError(RuntimeError):
     """Raised when loading a session fails."""
 
 
-def load_session(session_dir: Path, session_id: str) -> SessionState:
-    path = session_dir / f"{session_id}.json"
-    if not path.exists():
-        raise SessionError(f"Session not found: {session_id}")
+def session_path(session_dir: Path, session_id: str) -> Path:
+    return session_dir / f"{session_id}.jsonl"
+
+
+def _legacy_session_path(session_dir: Path, session_id: str) -> Path:
+    return session_dir / f"{session_id}.json"
+
+
+def _index_path(path: Path) -> Path:
+    return path.with_suffix(".idx")
+
+
+def _turn_record(turn: dict[str, str]) -> dict[str, Any]:
+    return {"type": "turn", **turn}
+
+
+def _turn_from_record(record: dict[str, Any]) -> dict[str, str]:
+    return {k: v for k, v in record.items() if k != "type"}
+
+
+def _encode(records: Iterable[dict[str, Any]]) -> list[bytes]:
+    return [(json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8") for record in records]
+
+
+def _append_records(path: Path, records: list[dict[str, Any]]) -> list[int]:
+    """Append and fsync ``records``, returning the byte offset of each one."""
+    lines = _encode(records)
+    with path.open("ab") as fh:
+        offset = fh.tell()
+        fh.write(b"".join(lines))
+        fh.flush()
+        os.fsync(fh.fileno())
+    offsets = []
+    for line in lines:
+        offsets.append(offset)
+        offset += len(line)
+    return offsets
+
+
+def _replace_records(path: Path, records: Iterable[dict[str, Any]]) -> None:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as fh:
+        fh.write(b"".join(_encode(records)))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+    # Offsets are stale after a rewrite; the index is rebuilt on the next load.
+    _index_path(path).unlink(missing_ok=True)
+
 
+def _iter_records(path: Path, start: int = 0, stop: int | None = None) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Stream ``(offset, record)`` pairs, repairing a torn final line left by a crash."""
+    good_offset = start
+    torn = False
+    with path.open("rb") as fh:
+        fh.seek(start)
+        for line in fh:
+            if stop is not None and good_offset >= stop:
+                return
+            if not line.endswith(b"\n"):
+                torn = True
+                break
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                torn = True
+                break
+            yield good_offset, record
+            good_offset += len(line)
+        else:
+            return
+        remainder = fh.read()
+    if torn and not remainder:
+        # Only the last line is damaged: trim it so later appends start on a clean line.
+        with path.open("r+b") as fh:
+            fh.truncate(good_offset)
+        return
+    raise SessionError(f"Session file is corrupt at byte {good_offset}: {path}")
+
+
+def _read_record_at(path: Path, offset: int) -> dict[str, Any] | None:
+    with path.open("rb") as fh:
+        fh.seek(offset)
+        line = fh.readline()
+    if not line.endswith(b"\n"):
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+def _index_entries(records: Iterable[tuple[int, dict[str, Any]]]) -> list[int]:
+    entries = []
+    for offset, record in records:
+        if record.get("type") == "turn":
+            entries.append(offset)
+        elif record.get("type") == "summary":
+            entries.append(offset | _SUMMARY_FLAG)
+    return entries
+
+
+def _append_offsets(path: Path, entries: list[int]) -> None:
+    if entries:
+        with _index_path(path).open("ab") as fh:
+            if fh.tell() == 0:
+                entries = [_INDEX_MAGIC, *entries]
+            fh.write(array("Q", entries).tobytes())
+
+
+def _load_index(path: Path) -> tuple[array, int | None]:
+    """Return the byte offset of every turn record and of the latest summary record.
+
+    The ``.idx`` file is a flat array of 64-bit offsets appended on every save, with summary
+    records flagged by the top bit. It is only a cache: a missing, stale or pre-summary index
+    is rebuilt from the transcript, and records appended after a crash between the two writes
+    are picked up by scanning past the last indexed record.
+    """
+    entries = array("Q")
+    index = _index_path(path)
+    try:
+        raw = index.read_bytes()
+        entries.frombytes(raw[: len(raw) - len(raw) % entries.itemsize])
+    except FileNotFoundError:
+        pass
+
+    resume = 0
+    if entries[:1] != array("Q", [_INDEX_MAGIC]):
+        entries = array("Q")
+    elif len(entries) > 1:
+        offset = entries[-1] & ~_SUMMARY_FLAG
+        last = _read_record_at(path, offset)
+        expected = "summary" if entries[-1] & _SUMMARY_FLAG else "turn"
+        if last is None or last.get("type") != expected:
+            entries = array("Q")
+        else:
+            with path.open("rb") as fh:
+                fh.seek(offset)
+                resume = offset + len(fh.readline())
+
+    found = _index_entries(_iter_records(path, start=resume))
+    if not entries:
+        entries = array("Q", [_INDEX_MAGIC, *found])
+        index.write_bytes(entries.tobytes())
+    elif found:
+        entries.extend(found)
+        _append_offsets(path, found)
+
+    turns = array("Q", (entry for entry in entries[1:] if not entry & _SUMMARY_FLAG))
+    summaries = [entry & ~_SUMMARY_FLAG for entry in entries[1:] if entry & _SUMMARY_FLAG]
+    return turns, (summaries[-1] if summaries else None)
+
+
+def _load_offsets(path: Path) -> array:
+    """Return the byte offset of every turn record (see ``_load_index``)."""
+    return _load_index(path)[0]
+
+
+def _stream_turns(path: Path, offsets: array, start: int, end: int) -> Iterator[dict[str, str]]:
+    if start >= end:
+        return
+    stop = offsets[end] if end < len(offsets) else None
+    for _, record in _iter_records(path, start=offsets[start], stop=stop):
+        if record.get("type") == "turn":
+            yield _turn_from_record(record)
+
+
+def _read_turns(path: Path, offsets: array, start: int, end: int) -> list[dict[str, str]]:
+    return list(_stream_turns(path, offsets, start, end))
+
+
+def _load_legacy(session_dir: Path, session_id: str) -> bool:
+    legacy = _legacy_session_path(session_dir, session_id)
+    if not legacy.exists():
+        return False
     try:
-        payload = json.loads(path.read_text(encoding="utf-8"))
+        payload = json.loads(legacy.read_text(encoding="utf-8"))
     except json.JSONDecodeError as exc:
-        raise SessionError(f"Session file is invalid JSON: {path}") from exc
+        raise SessionError(f"Session file is invalid JSON: {legacy}") from exc
 
-    return SessionState(
+    state = SessionState(
         session_id=payload["session_id"],
         created_at=payload["created_at"],
         turns=list(payload.get("turns", [])),
     )
+    path = session_path(session_dir, session_id)
+    _replace_records(path, [state._header(), *(_turn_record(turn) for turn in state.turns)])
+    legacy.unlink()
+    return True
+
+
+def _restore_archived(session_dir: Path, session_id: str) -> bool:
+    from .archive import restore_session
+
+    return restore_session(session_dir, session_id)
+
+
+def load_session(session_dir: Path, session_id: str, *, tail_turns: int | None = None) -> SessionState:
+    """Load a session, keeping only the last ``tail_turns`` turns in memory when given.
+
+    Archived sessions (see ``starray.archive``) are restored to the active tier first.
+    """
+    path = session_path(session_dir, session_id)
+    if (
+        not path.exists()
+        and not _load_legacy(session_dir, session_id)
+        and not _restore_archived(session_dir, session_id)
+    ):
+        raise SessionError(f"Session not found: {session_id}")
+
+    header = _read_record_at(path, 0)
+    if header is None or header.get("type") != "header":
+        raise SessionError(f"Session file has no header record: {path}")
+
+    offsets, summary_offset = _load_index(path)
+    start = 0 if tail_turns is None else max(0, len(offsets) - tail_turns)
+    state = SessionState(session_id=header["session_id"], created_at=header["created_at"])
+    state.turns = _read_turns(path, offsets, start, len(offsets))
+    state._persisted_turns = len(state.turns)
+    state._offset_turns = start
+    state._source = path
+    summary = None if summary_offset is None else _read_record_at(path, summary_offset)
+    if summary is not None:
+        state.summary = summary["content"]
+        state.summary_upto = int(summary["upto"])
+    return state
+
+
+def compact_session(session_dir: Path, session_id: str) -> Path:
+    """Rewrite a session file atomically as one header, its turns and the latest summary.
+
+    Superseded summary checkpoints are dropped. Migrates legacy ``.json`` sessions and drops
+    a torn trailing record.
+    """
+    state = load_session(session_dir, session_id, tail_turns=0)
+    path = session_path(session_dir, session_id)
+    _replace_records(path, state._records())
+    return path
@@ -0,0 +1,284 @@
+"""SQLite index of stored sessions: metadata for listing and FTS5 search over turn content.
+
+The transcripts under ``data_dir/sessions`` stay the source of truth. The index is kept up
+to date as sessions are saved and can be rebuilt from the files at any time.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import sqlite3
+import threading
+
+from .archive import iter_archived
+from .session import SessionError, _iter_records, _turn_from_record
+
+
+INDEX_FILE = "index.sqlite3"
+SCHEMA_VERSION = 1
+TITLE_CHARS = 80
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    turn_count INTEGER NOT NULL DEFAULT 0,
+    last_activity TEXT,
+    providers TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS sessions_by_activity ON sessions (last_activity);
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    timestamp TEXT,
+    provider TEXT,
+    content TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS turns_by_session ON turns (session_id, turn);
+CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5(
+    content, content='turns', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS turns_ai AFTER INSERT ON turns BEGIN
+    INSERT INTO turns_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS turns_ad AFTER DELETE ON turns BEGIN
+    INSERT INTO turns_fts (turns_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+
+class SessionIndexError(RuntimeError):
+    """Raised when the session index cannot be opened or queried."""
+
+
+@dataclass(slots=True)
+class SessionSummary:
+    session_id: str
+    created_at: str
+    turn_count: int
+    last_activity: str | None
+    providers: list[str]
+    title: str
+
+
+@dataclass(slots=True)
+class SearchHit:
+    session_id: str
+    turn: int
+    role: str
+    timestamp: str | None
+    snippet: str
+
+
+def fts_query(text: str) -> str:
+    """Quote each word so user input is never parsed as FTS5 syntax; ``word*`` stays a prefix."""
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*") and len(word) > 1
+        word = word.rstrip("*") if prefix else word
+        terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class SessionIndex:
+    """One SQLite database shared by the CLI and the daemon (WAL mode, thread-safe).
+
+    ``record`` is called from ``SessionState.save`` with the turns that were just written;
+    turns at or after ``start`` are replaced, so rewriting a session never duplicates rows.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise SessionIndexError(
+                    f"Session index {path} has schema version {version}; run `starray sessions rebuild`"
+                )
+            self._db.executescript(_SCHEMA)
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        except sqlite3.Error as exc:
+            raise SessionIndexError(f"Cannot open session index {path}: {exc}") from exc
+
+    @classmethod
+    def for_sessions_dir(cls, sessions_dir: Path) -> "SessionIndex":
+        return cls(sessions_dir / INDEX_FILE)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def record(self, session_id: str, created_at: str, start: int, turns: list[dict[str, str]]) -> bool:
+        """Index ``turns`` as turns ``start``.. of a session; returns ``False`` if SQLite failed.
+
+        A failure never propagates: the transcript is already on disk and ``rebuild`` repairs
+        the index.
+        """
+        try:
+            with self._lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    self._record(session_id, created_at, start, turns)
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._db.execute("COMMIT")
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _record(self, session_id: str, created_at: str, start: int, turns: list[dict[str, str]]) -> None:
+        db = self._db
+        db.execute("DELETE FROM turns WHERE session_id = ? AND turn >= ?", (session_id, start))
+        db.executemany(
+            "INSERT INTO turns (session_id, turn, role, timestamp, provider, content) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    session_id,
+                    start + offset,
+                    turn.get("role", ""),
+                    turn.get("timestamp"),
+                    turn.get("provider"),
+                    turn.get("content", ""),
+                )
+                for offset, turn in enumerate(turns)
+            ],
+        )
+        row = db.execute("SELECT providers, title FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        providers = set(filter(None, row[0].split(","))) if row else set()
+        providers.update(turn["provider"] for turn in turns if turn.get("provider"))
+        title = row[1] if row and row[1] else _title(turns)
+        last_activity = next((turn.get("timestamp") for turn in reversed(turns) if turn.get("timestamp")), None)
+        db.execute(
+            """
+            INSERT INTO sessions (session_id, created_at, turn_count, last_activity, providers, title)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (session_id) DO UPDATE SET
+                turn_count = excluded.turn_count,
+                last_activity = COALESCE(excluded.last_activity, sessions.last_activity),
+                providers = excluded.providers,
+                title = excluded.title
+            """,
+            (session_id, created_at, start + len(turns), last_activity or created_at, ",".join(sorted(providers)), title),
+        )
+
+    def remove(self, session_ids: Iterable[str]) -> None:
+        """Drop sessions whose transcripts were deleted."""
+        ids = [(session_id,) for session_id in session_ids]
+        try:
+            with self._lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    self._db.executemany("DELETE FROM turns WHERE session_id = ?", ids)
+                    self._db.executemany("DELETE FROM sessions WHERE session_id = ?", ids)
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._db.execute("COMMIT")
+        except sqlite3.Error as exc:
+            raise SessionIndexError(f"Session index update failed: {exc}") from exc
+
+    def list_sessions(self, limit: int = 20, offset: int = 0) -> list[SessionSummary]:
+        """Sessions ordered by most recent activity."""
+        rows = self._query(
+            "SELECT session_id, created_at, turn_count, last_activity, providers, title FROM sessions "
+            "ORDER BY last_activity DESC LIMIT ? OFFSET ?",
+            (limit, offset),
+        )
+        return [
+            SessionSummary(row[0], row[1], row[2], row[3], [p for p in row[4].split(",") if p], row[5])
+            for row in rows
+        ]
+
+    def count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM sessions", ())[0][0]
+
+    def search(self, text: str, limit: int = 20, session_id: str | None = None) -> list[SearchHit]:
+        """Best-matching turns (BM25), each with a highlighted snippet."""
+        query = fts_query(text)
+        if not query:
+            return []
+        sql = (
+            "SELECT t.session_id, t.turn, t.role, t.timestamp, "
+            "snippet(turns_fts, 0, '[', ']', '...', 12) "
+            "FROM turns_fts JOIN turns t ON t.id = turns_fts.rowid WHERE turns_fts MATCH ?"
+        )
+        params: tuple = (query,)
+        if session_id is not None:
+            sql += " AND t.session_id = ?"
+            params += (session_id,)
+        rows = self._query(sql + " ORDER BY rank LIMIT ?", (*params, limit))
+        return [SearchHit(*row) for row in rows]
+
+    def _query(self, sql: str, params: tuple) -> list[tuple]:
+        try:
+            with self._lock:
+                return self._db.execute(sql, params).fetchall()
+        except sqlite3.Error as exc:
+            raise SessionIndexError(f"Session index query failed: {exc}") from exc
+
+    def rebuild(self, sessions_dir: Path) -> int:
+        """Re-index every session under ``sessions_dir``, archived ones included; returns the count.
+
+        Files that cannot be read are skipped so one damaged transcript does not block the rest.
+        """
+        indexed = 0
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM sessions")
+                self._db.execute("DELETE FROM turns")
+                self._db.execute("INSERT INTO turns_fts (turns_fts) VALUES ('delete-all')")
+                for header, turns in _read_sessions(sessions_dir):
+                    self._record(header["session_id"], header["created_at"], 0, turns)
+                    indexed += 1
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return indexed
+
+
+def _title(turns: Iterable[dict[str, str]]) -> str:
+    for turn in turns:
+        if turn.get("role") == "user":
+            text = " ".join(turn.get("content", "").split())
+            return text if len(text) <= TITLE_CHARS else text[: TITLE_CHARS - 3] + "..."
+    return ""
+
+
+def _read_sessions(sessions_dir: Path) -> Iterable[tuple[dict, list[dict[str, str]]]]:
+    for path in sorted(sessions_dir.glob("*.jsonl")):
+        try:
+            records = iter(_iter_records(path))
+            _, header = next(records, (0, None))
+            if header is None or header.get("type") != "header":
+                continue
+            turns = [_turn_from_record(record) for _, record in records if record.get("type") == "turn"]
+        except (OSError, SessionError):
+            continue
+        yield header, turns
+    for path in sorted(sessions_dir.glob("*.json")):
+        # Legacy single-document sessions, migrated to JSONL the next time they are loaded.
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            header = {"session_id": payload["session_id"], "created_at": payload["created_at"]}
+        except (OSError, ValueError, KeyError):
+            continue
+        yield header, list(payload.get("turns", []))
+    for _, records in iter_archived(sessions_dir):
+        header = records[0] if records else None
+        if header is None or header.get("type") != "header":
+            continue
+        yield header, [_turn_from_record(record) for record in records if record.get("type") == "turn"]
@@ -0,0 +1,742 @@
+"""Schema-validated structured output: compiled validators and an incremental JSON checker.
+
+``compile_schema`` turns a JSON schema into nested validator closures once and caches them
+by the schema's canonical JSON. ``JsonStreamChecker`` follows a streamed reply character by
+character, so a reply that can no longer become a valid document (bad syntax, an unknown
+property, a property of the wrong type) is rejected before the rest of it is generated.
+``AnalystRuntime.structured`` uses both to re-ask the same route with the exact errors
+before it falls back to the next one.
+"""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import dataclass, field
+from functools import lru_cache
+import asyncio
+import json
+import re
+from typing import Any
+
+from .providers import ChatMessage, ProviderError
+
+
+STRUCTURED_SYSTEM_PROMPT = (
+    "Reply with one JSON object that conforms to this JSON schema and nothing else:\n{schema}"
+)
+REPAIR_PROMPT = (
+    "That reply was rejected: {errors}. Reply again with only the corrected JSON object."
+)
+# Prose or a code fence before the document is tolerated up to this many characters.
+MAX_PREAMBLE = 256
+MAX_REPORTED_ERRORS = 5
+
+
+class StructuredOutputError(ProviderError):
+    """Raised when a reply is not a JSON document that satisfies the requested schema."""
+
+
+_Check = Callable[[Any, str, list[str]], None]
+
+_TYPE_TESTS: dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool))
+    or (isinstance(v, float) and v.is_integer()),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    return "array" if isinstance(value, list) else "object"
+
+
+@dataclass(slots=True)
+class CompiledSchema:
+    """A schema compiled to validator closures, plus the facts the stream checker needs."""
+
+    schema: dict[str, Any]
+    text: str
+    check: _Check
+    root_types: frozenset[str] | None = None
+    property_types: dict[str, frozenset[str] | None] = field(default_factory=dict)
+    closed: bool = False
+
+    def validate(self, instance: Any) -> list[str]:
+        """Every violation as ``"<path>: <problem>"``; an empty list means ``instance`` is valid."""
+        errors: list[str] = []
+        self.check(instance, "$", errors)
+        return errors
+
+
+def compile_schema(schema: dict[str, Any]) -> CompiledSchema:
+    """Compile ``schema``, reusing the result for any equal schema.
+
+    Supports ``type``, ``enum``, ``const``, ``properties``, ``required``,
+    ``additionalProperties``, ``items``, ``min/maxItems``, ``min/maxLength``, ``pattern``,
+    numeric bounds, ``anyOf``/``oneOf``/``allOf`` and local ``$ref`` pointers. Other keywords
+    (``description``, ``title``, ``format``...) are ignored. Raises ``ValueError`` for
+    schemas that cannot be compiled.
+    """
+    return _compile_text(json.dumps(schema, sort_keys=True, separators=(",", ":")))
+
+
+@lru_cache(maxsize=256)
+def _compile_text(text: str) -> CompiledSchema:
+    schema = json.loads(text)
+    if not isinstance(schema, dict):
+        raise ValueError("A JSON schema must be an object")
+    check = _compile(schema, schema, {})
+    compiled = CompiledSchema(schema=schema, text=text, check=check, root_types=_declared_types(schema, schema))
+    properties = schema.get("properties", {})
+    compiled.property_types = {name: _declared_types(sub, schema) for name, sub in properties.items()}
+    compiled.closed = schema.get("additionalProperties", True) is False
+    return compiled
+
+
+def _resolve(root: dict[str, Any], ref: str) -> Any:
+    if not ref.startswith("#"):
+        raise ValueError(f"Only local $ref pointers are supported: {ref}")
+    node: Any = root
+    for part in ref[1:].split("/")[1:]:
+        part = part.replace("~1", "/").replace("~0", "~")
+        try:
+            node = node[int(part)] if isinstance(node, list) else node[part]
+        except (KeyError, IndexError, ValueError) as exc:
+            raise ValueError(f"Unresolvable $ref: {ref}") from exc
+    return node
+
+
+def _declared_types(schema: Any, root: dict[str, Any]) -> frozenset[str] | None:
+    """Types a value may take per ``schema``'s own ``type``, or ``None`` when unconstrained."""
+    seen = 0
+    while isinstance(schema, dict) and "$ref" in schema and "type" not in schema and seen < 32:
+        schema, seen = _resolve(root, schema["$ref"]), seen + 1
+    if not isinstance(schema, dict) or "type" not in schema:
+        return None
+    declared = schema["type"]
+    return frozenset([declared] if isinstance(declared, str) else declared)
+
+
+def _accept(value: Any, path: str, errors: list[str]) -> None:
+    return None
+
+
+def _reject(value: Any, path: str, errors: list[str]) -> None:
+    errors.append(f"{path}: no value is allowed here")
+
+
+def _compile(schema: Any, root: dict[str, Any], refs: dict[str, list[_Check]]) -> _Check:
+    if schema is True:
+        return _accept
+    if schema is False:
+        return _reject
+    if not isinstance(schema, dict):
+        raise ValueError(f"Invalid schema node: {schema!r}")
+    checks: list[_Check] = []
+
+    if "$ref" in schema:
+        checks.append(_compile_ref(schema["$ref"], root, refs))
+    if "type" in schema:
+        checks.append(_compile_type(schema["type"]))
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value: Any, path: str, errors: list[str]) -> None:
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed!r}")
+
+        checks.append(check_enum)
+    if "const" in schema:
+        constant = schema["const"]
+
+        def check_const(value: Any, path: str, errors: list[str]) -> None:
+            if value != constant:
+                errors.append(f"{path}: expected {constant!r}")
+
+        checks.append(check_const)
+    if any(key in schema for key in ("properties", "required", "additionalProperties")):
+        checks.append(_compile_object(schema, root, refs))
+    if any(key in schema for key in ("items", "minItems", "maxItems")):
+        checks.append(_compile_array(schema, root, refs))
+    if any(key in schema for key in ("minLength", "maxLength", "pattern")):
+        checks.append(_compile_string(schema))
+    if any(key in schema for key in ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum")):
+        checks.append(_compile_number(schema))
+    for keyword in ("anyOf", "oneOf", "allOf"):
+        if keyword in schema:
+            checks.append(_compile_combinator(keyword, [_compile(sub, root, refs) for sub in schema[keyword]]))
+
+    if not checks:
+        return _accept
+    if len(checks) == 1:
+        return checks[0]
+    all_checks = tuple(checks)
+
+    def check_all(value: Any, path: str, errors: list[str]) -> None:
+        for check in all_checks:
+            check(value, path, errors)
+
+    return check_all
+
+
+def _compile_ref(ref: str, root: dict[str, Any], refs: dict[str, list[_Check]]) -> _Check:
+    # Register the cell before compiling the target so recursive schemas terminate.
+    cell = refs.get(ref)
+    if cell is None:
+        cell = refs[ref] = [_accept]
+        cell[0] = _compile(_resolve(root, ref), root, refs)
+
+    def check_ref(value: Any, path: str, errors: list[str]) -> None:
+        cell[0](value, path, errors)
+
+    return check_ref
+
+
+def _compile_type(declared: str | list[str]) -> _Check:
+    names = [declared] if isinstance(declared, str) else list(declared)
+    unknown = [name for name in names if name not in _TYPE_TESTS]
+    if unknown:
+        raise ValueError(f"Unsupported schema type: {', '.join(unknown)}")
+    tests = tuple(_TYPE_TESTS[name] for name in names)
+    expected = " or ".join(names)
+
+    def check_type(value: Any, path: str, errors: list[str]) -> None:
+        for test in tests:
+            if test(value):
+                return
+        errors.append(f"{path}: expected {expected}, got {_type_name(value)}")
+
+    return check_type
+
+
+def _compile_object(schema: dict[str, Any], root: dict[str, Any], refs: dict[str, list[_Check]]) -> _Check:
+    properties = {name: _compile(sub, root, refs) for name, sub in schema.get("properties", {}).items()}
+    required = tuple(schema.get("required", ()))
+    additional = schema.get("additionalProperties", True)
+    extra = None if additional is True or additional is False else _compile(additional, root, refs)
+    closed = additional is False
+
+    def check_object(value: Any, path: str, errors: list[str]) -> None:
+        if not isinstance(value, dict):
+            return
+        for name in required:
+            if name not in value:
+                errors.append(f"{path}: missing required property {name!r}")
+        for name, item in value.items():
+            check = properties.get(name)
+            if check is not None:
+                check(item, f"{path}.{name}", errors)
+            elif closed:
+                errors.append(f"{path}: unexpected property {name!r}")
+            elif extra is not None:
+                extra(item, f"{path}.{name}", errors)
+
+    return check_object
+
+
+def _compile_array(schema: dict[str, Any], root: dict[str, Any], refs: dict[str, list[_Check]]) -> _Check:
+    items = _compile(schema["items"], root, refs) if isinstance(schema.get("items"), (dict, bool)) else None
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+
+    def check_array(value: Any, path: str, errors: list[str]) -> None:
+        if not isinstance(value, list):
+            return
+        if min_items is not None and len(value) < min_items:
+            errors.append(f"{path}: expected at least {min_items} items, got {len(value)}")
+        if max_items is not None and len(value) > max_items:
+            errors.append(f"{path}: expected at most {max_items} items, got {len(value)}")
+        if items is not None:
+            for index, item in enumerate(value):
+                items(item, f"{path}[{index}]", errors)
+
+    return check_array
+
+
+def _compile_string(schema: dict[str, Any]) -> _Check:
+    min_length = schema.get("minLength")
+    max_length = schema.get("maxLength")
+    pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+
+    def check_string(value: Any, path: str, errors: list[str]) -> None:
+        if not isinstance(value, str):
+            return
+        if min_length is not None and len(value) < min_length:
+            errors.append(f"{path}: shorter than {min_length} characters")
+        if max_length is not None and len(value) > max_length:
+            errors.append(f"{path}: longer than {max_length} characters")
+        if pattern is not None and pattern.search(value) is None:
+            errors.append(f"{path}: does not match {pattern.pattern!r}")
+
+    return check_string
+
+
+def _compile_number(schema: dict[str, Any]) -> _Check:
+    bounds = [
+        (schema.get("minimum"), lambda v, b: v >= b, "at least"),
+        (schema.get("maximum"), lambda v, b: v <= b, "at most"),
+        (schema.get("exclusiveMinimum"), lambda v, b: v > b, "greater than"),
+        (schema.get("exclusiveMaximum"), lambda v, b: v < b, "less than"),
+    ]
+    active = tuple((bound, test, label) for bound, test, label in bounds if isinstance(bound, (int, float)))
+
+    def check_number(value: Any, path: str, errors: list[str]) -> None:
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return
+        for bound, test, label in active:
+            if not test(value, bound):
+                errors.append(f"{path}: expected a value {label} {bound}")
+
+    return check_number
+
+
+def _compile_combinator(keyword: str, branches: list[_Check]) -> _Check:
+    def check_combinator(value: Any, path: str, errors: list[str]) -> None:
+        if keyword == "allOf":
+            for branch in branches:
+                branch(value, path, errors)
+            return
+        matched = 0
+        for branch in branches:
+            branch_errors: list[str] = []
+            branch(value, path, branch_errors)
+            if not branch_errors:
+                matched += 1
+                if keyword == "anyOf":
+                    return
+        if matched == 0:
+            errors.append(f"{path}: does not match any of the {keyword} schemas")
+        elif keyword == "oneOf" and matched > 1:
+            errors.append(f"{path}: matches {matched} of the oneOf schemas, expected exactly one")
+
+    return check_combinator
+
+
+def placeholder(schema: dict[str, Any]) -> Any:
+    """A deterministic value that satisfies ``schema``'s types, enums and bounds.
+
+    The local provider returns this, so offline runs exercise the same validation path as
+    live ones. ``pattern`` constraints are not synthesized, and optional properties of
+    recursive schemas stop after a few levels.
+    """
+    value = _placeholder(schema, schema, 0)
+    return None if value is _OMIT else value
+
+
+_OMIT = object()
+_MAX_PLACEHOLDER_DEPTH = 8
+
+
+def _placeholder(schema: Any, root: dict[str, Any], depth: int) -> Any:
+    if not isinstance(schema, dict):
+        return None
+    if "$ref" in schema:
+        if depth > _MAX_PLACEHOLDER_DEPTH:
+            return _OMIT
+        return _placeholder(_resolve(root, schema["$ref"]), root, depth + 1)
+    if "const" in schema:
+        return schema["const"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    for keyword in ("anyOf", "oneOf", "allOf"):
+        if schema.get(keyword):
+            return _placeholder(schema[keyword][0], root, depth + 1)
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((name for name in kind if name != "null"), "null")
+    if kind is None:
+        kind = "object" if "properties" in schema else "array" if "items" in schema else "null"
+    if kind == "object":
+        required = set(schema.get("required", ()))
+        payload = {}
+        for name, sub in schema.get("properties", {}).items():
+            value = _placeholder(sub, root, depth + 1)
+            if value is not _OMIT:
+                payload[name] = value
+            elif name in required:
+                payload[name] = None
+        return payload
+    if kind == "array":
+        item = _placeholder(schema.get("items", {}), root, depth + 1)
+        return [None if item is _OMIT else item] * schema.get("minItems", 0)
+    if kind == "string":
+        return "x" * schema.get("minLength", 0)
+    if kind in ("integer", "number"):
+        if "minimum" in schema:
+            value = schema["minimum"]
+        elif "exclusiveMinimum" in schema:
+            value = schema["exclusiveMinimum"] + 1
+        elif "maximum" in schema and schema["maximum"] < 0:
+            value = schema["maximum"]
+        else:
+            value = 0
+        return int(value) if kind == "integer" and float(value).is_integer() else value
+    if kind == "boolean":
+        return False
+    return None
+
+
+# Parser expectations.
+_START, _VALUE, _FIRST_VALUE, _FIRST_KEY, _KEY, _COLON, _NEXT, _DONE = range(8)
+_TOKEN_CHARS = frozenset("0123456789+-.eEtruefalsn")
+_TOKEN_STARTS = frozenset("-0123456789tfn")
+_LITERALS = {"t": "true", "f": "false", "n": "null"}
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_STRING_RUN = re.compile(r'[^"\\]+')
+_HEX = frozenset("0123456789abcdefABCDEF")
+_KINDS = {"{": "object", "[": "array", '"': "string", "t": "boolean", "f": "boolean", "n": "null"}
+
+
+class JsonStreamChecker:
+    """Follows a streamed reply and reports the first reason it cannot be a valid document.
+
+    Text before the first ``{`` (a short preamble or a code fence), trailing commas and
+    anything after the document are tolerated, since ``document`` removes them. With a
+    compiled schema, unknown top-level properties of a closed object and top-level values
+    of the wrong type are reported as soon as they start.
+    """
+
+    __slots__ = (
+        "_schema",
+        "_stack",
+        "_expect",
+        "_string",
+        "_escape",
+        "_key_parts",
+        "_key",
+        "_token",
+        "_comma",
+        "_commas",
+        "_offset",
+        "start",
+        "end",
+        "error",
+    )
+
+    def __init__(self, schema: CompiledSchema | None = None) -> None:
+        self._schema = schema
+        self._stack: list[str] = []
+        self._expect = _START
+        self._string = 0  # 0 outside strings, 1 inside a value, 2 inside a key
+        self._escape = 0  # -1 after a backslash, n > 0 while n hex digits of \u are due
+        self._key_parts: list[str] | None = None
+        self._key: str | None = None
+        self._token = ""
+        self._comma = -1
+        self._commas: list[int] = []
+        self._offset = 0
+        self.start: int | None = None
+        self.end: int | None = None
+        self.error: str | None = None
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    def feed(self, chunk: str) -> str | None:
+        """Consume ``chunk``; returns the error once the text can no longer be valid."""
+        if self.error is None and self.end is None:
+            self._feed(chunk)
+        self._offset += len(chunk)
+        return self.error
+
+    def finish(self) -> str | None:
+        """Call at the end of the stream; reports a missing or unterminated document."""
+        if self.error is None and self.end is None:
+            if self.start is None:
+                self.error = "the reply contains no JSON document"
+            else:
+                self.error = "the reply ended before the JSON document was complete"
+        return self.error
+
+    def document(self, text: str) -> str:
+        """The JSON document within the full reply ``text``, without tolerated trailing commas."""
+        if self.start is None:
+            return text
+        end = len(text) if self.end is None else self.end
+        parts: list[str] = []
+        cursor = self.start
+        for comma in self._commas:
+            parts.append(text[cursor:comma])
+            cursor = comma + 1
+        parts.append(text[cursor:end])
+        return "".join(parts)
+
+    def _fail(self, message: str) -> None:
+        self.error = message
+
+    def _feed(self, chunk: str) -> None:
+        i, n = 0, len(chunk)
+        while i < n:
+            if self._string:
+                i = self._scan_string(chunk, i)
+                if self.error is not None:
+                    return
+                continue
+            c = chunk[i]
+            if self._token:
+                if c in _TOKEN_CHARS:
+                    j = i + 1
+                    while j < n and chunk[j] in _TOKEN_CHARS:
+                        j += 1
+                    self._token += chunk[i:j]
+                    i = j
+                    literal = _LITERALS.get(self._token[0])
+                    if literal is not None and not literal.startswith(self._token):
+                        return self._fail(f"invalid token {self._token!r}")
+                    continue
+                if not self._end_token():
+                    return
+            if c in " \t\r\n":
+                i += 1
+                continue
+            expect = self._expect
+            if expect == _START:
+                if c in "{[" and self._allowed(_KINDS[c], self._schema.root_types if self._schema else None):
+                    self.start = self._offset + i
+                    self._open(c)
+                elif self._offset + i >= MAX_PREAMBLE:
+                    return self._fail(f"no JSON document within the first {MAX_PREAMBLE} characters")
+            elif expect in (_VALUE, _FIRST_VALUE):
+                if c == "]" and (expect == _FIRST_VALUE or self._comma >= 0):
+                    self._close(c, i)
+                elif not self._start_value(c):
+                    return
+            elif expect in (_FIRST_KEY, _KEY):
+                if c == '"':
+                    self._comma = -1
+                    self._string = 2
+                    self._key_parts = [] if len(self._stack) == 1 else None
+                elif c == "}":
+                    self._close(c, i)
+                else:
+                    return self._fail(f"expected a property name, got {c!r}")
+            elif expect == _COLON:
+                if c != ":":
+                    return self._fail(f"expected ':', got {c!r}")
+                self._expect = _VALUE
+            elif expect == _NEXT:
+                if c == ",":
+                    self._comma = self._offset + i
+                    self._expect = _KEY if self._stack[-1] == "{" else _VALUE
+                elif c == ("}" if self._stack[-1] == "{" else "]"):
+                    self._close(c, i)
+                else:
+                    return self._fail(f"expected ',' or a closing bracket, got {c!r}")
+            if self.end is not None:
+                return
+            i += 1
+
+    def _allowed(self, kind: str, types: frozenset[str] | None) -> bool:
+        if types is None or kind in types:
+            return True
+        return kind == "number" and "integer" in types
+
+    def _start_value(self, c: str) -> bool:
+        kind = _KINDS.get(c, "number" if c in _TOKEN_STARTS else None)
+        if kind is None:
+            self._fail(f"expected a value, got {c!r}")
+            return False
+        self._comma = -1
+        if self._schema is not None and len(self._stack) == 1 and self._stack[0] == "{" and self._key is not None:
+            types = self._schema.property_types.get(self._key)
+            if not self._allowed(kind, types):
+                self._fail(f"$.{self._key}: expected {' or '.join(sorted(types or ()))}, got {kind}")
+                return False
+        if c in "{[":
+            self._open(c)
+        elif c == '"':
+            self._string = 1
+        else:
+            self._token = c
+        return True
+
+    def _open(self, c: str) -> None:
+        self._stack.append(c)
+        self._expect = _FIRST_KEY if c == "{" else _FIRST_VALUE
+
+    def _close(self, c: str, i: int) -> None:
+        if self._comma >= 0:
+            self._commas.append(self._comma)
+            self._comma = -1
+        self._stack.pop()
+        if not self._stack:
+            self.end = self._offset + i + 1
+            self._expect = _DONE
+        else:
+            self._expect = _NEXT
+
+    def _end_token(self) -> bool:
+        token, self._token = self._token, ""
+        literal = _LITERALS.get(token[0])
+        if token != literal and (literal is not None or _NUMBER.fullmatch(token) is None):
+            self._fail(f"invalid token {token!r}")
+            return False
+        self._expect = _NEXT
+        return True
+
+    def _scan_string(self, chunk: str, i: int) -> int:
+        n = len(chunk)
+        parts = self._key_parts if self._string == 2 else None
+        while i < n:
+            c = chunk[i]
+            if self._escape:
+                if self._escape == -1:
+                    if c == "u":
+                        self._escape = 4
+                    elif c in '"\\/bfnrt':
+                        self._escape = 0
+                    else:
+                        self._fail(f"invalid escape sequence '\\{c}'")
+                        return i
+                elif c in _HEX:
+                    self._escape -= 1
+                else:
+                    self._fail("invalid \\u escape sequence")
+                    return i
+                if parts is not None:
+                    parts.append(c)
+                i += 1
+                continue
+            if c == '"':
+                self._end_string()
+                return i + 1
+            if c == "\\":
+                self._escape = -1
+                if parts is not None:
+                    parts.append(c)
+                i += 1
+                continue
+            match = _STRING_RUN.match(chunk, i)
+            assert match is not None
+            if parts is not None:
+                parts.append(match.group())
+            i = match.end()
+        return i
+
+    def _end_string(self) -> None:
+        if self._string == 1:
+            self._string = 0
+            self._expect = _NEXT
+            return
+        self._string = 0
+        self._expect = _COLON
+        if self._key_parts is None:
+            return
+        self._key = json.loads('"' + "".join(self._key_parts) + '"', strict=False)
+        self._key_parts = None
+        schema = self._schema
+        if schema is not None and schema.closed and self._key not in schema.property_types:
+            self._fail(f"$: unexpected property {self._key!r}")
+
+
+@dataclass(slots=True)
+class StructuredReply:
+    """One streamed reply: the parsed payload when it is valid, otherwise the errors."""
+
+    text: str
+    payload: dict[str, Any] | None = None
+    errors: list[str] = field(default_factory=list)
+
+
+def _conclude(text: str, checker: JsonStreamChecker, compiled: CompiledSchema) -> StructuredReply:
+    if checker.error is not None:
+        return StructuredReply(text, errors=[checker.error])
+    try:
+        payload = json.loads(checker.document(text), strict=False)
+    except ValueError as exc:
+        return StructuredReply(text, errors=[f"invalid JSON: {exc}"])
+    errors = compiled.validate(payload)
+    if not errors and not isinstance(payload, dict):
+        errors = [f"$: expected object, got {_type_name(payload)}"]
+    if errors:
+        return StructuredReply(text, errors=errors)
+    return StructuredReply(text, payload=payload)
+
+
+def parse_structured(text: str, schema: dict[str, Any] | CompiledSchema) -> dict[str, Any]:
+    """Parse and validate a complete reply; raises ``StructuredOutputError`` with every problem."""
+    compiled = schema if isinstance(schema, CompiledSchema) else compile_schema(schema)
+    checker = JsonStreamChecker(compiled)
+    checker.feed(text)
+    checker.finish()
+    reply = _conclude(text, checker, compiled)
+    if reply.payload is None:
+        raise StructuredOutputError(format_errors(reply.errors))
+    return reply.payload
+
+
+def read_structured(chunks: Iterator[str], compiled: CompiledSchema) -> StructuredReply:
+    """Consume a reply stream, closing it as soon as the reply is invalid or complete."""
+    checker = JsonStreamChecker(compiled)
+    parts: list[str] = []
+    try:
+        for chunk in chunks:
+            parts.append(chunk)
+            if checker.feed(chunk) is not None or checker.complete:
+                break
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    checker.finish()
+    return _conclude("".join(parts), checker, compiled)
+
+
+async def aread_structured(
+    chunks: AsyncIterator[str], compiled: CompiledSchema, chunk_timeout: float
+) -> StructuredReply:
+    """Async counterpart of ``read_structured``; each chunk must arrive within ``chunk_timeout``."""
+    checker = JsonStreamChecker(compiled)
+    parts: list[str] = []
+    try:
+        while True:
+            async with asyncio.timeout(chunk_timeout):
+                chunk = await anext(chunks, None)
+            if chunk is None:
+                break
+            parts.append(chunk)
+            if checker.feed(chunk) is not None or checker.complete:
+                break
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    checker.finish()
+    return _conclude("".join(parts), checker, compiled)
+
+
+def format_errors(errors: list[str]) -> str:
+    shown = "; ".join(errors[:MAX_REPORTED_ERRORS])
+    hidden = len(errors) - MAX_REPORTED_ERRORS
+    return shown + (f" (+{hidden} more)" if hidden > 0 else "")
+
+
+def schema_messages(messages: list[ChatMessage], compiled: CompiledSchema) -> list[ChatMessage]:
+    """``messages`` with the schema instruction inserted after the leading system messages."""
+    position = 0
+    while position < len(messages) and messages[position].role == "system":
+        position += 1
+    instruction = ChatMessage(role="system", content=STRUCTURED_SYSTEM_PROMPT.format(schema=compiled.text))
+    return [*messages[:position], instruction, *messages[position:]]
+
+
+def repair_messages(messages: list[ChatMessage], reply: StructuredReply) -> list[ChatMessage]:
+    """Re-ask with the rejected reply and exactly what was wrong with it."""
+    return [
+        *messages,
+        ChatMessage(role="assistant", content=reply.text),
+        ChatMessage(role="user", content=REPAIR_PROMPT.format(errors=format_errors(reply.errors))),
+    ]
@@ -0,0 +1,118 @@
+"""Pre-flight prompt-size estimates per model family, and model context windows."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+import math
+from typing import Protocol
+
+
+Tokenizer = Callable[[str], int]
+
+
+class _Message(Protocol):
+    role: str
+    content: str
+
+
+# Characters per token for English-heavy text, measured loosely against each family's
+# tokenizer. Non-ASCII text is counted in UTF-8 bytes, which tracks CJK and accents better.
+CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "anthropic": 3.5,
+    "google": 4.0,
+    "meta": 3.6,
+    "mistral": 3.6,
+}
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Role markers and separators each chat message adds on top of its content.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_FAMILY_PREFIXES = (
+    ("gpt", "openai"),
+    ("o1", "openai"),
+    ("o3", "openai"),
+    ("o4", "openai"),
+    ("text-", "openai"),
+    ("claude", "anthropic"),
+    ("gemini", "google"),
+    ("llama", "meta"),
+    ("mistral", "mistral"),
+    ("mixtral", "mistral"),
+    ("codestral", "mistral"),
+)
+
+_PROVIDER_FAMILIES = {"openai": "openai", "anthropic": "anthropic", "gemini": "google", "mistral": "mistral"}
+
+# Context windows (prompt + completion tokens) by model-name prefix; longest prefix wins.
+CONTEXT_WINDOWS = {
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4": 200_000,
+    "claude": 200_000,
+    "gemini": 1_048_576,
+    "mistral-large": 128_000,
+    "llama-3": 128_000,
+}
+
+
+def _base_model(model: str) -> str:
+    # LiteLLM-style names may carry provider prefixes ("openrouter/anthropic/claude-3").
+    return model.rsplit("/", 1)[-1].lower()
+
+
+def model_family(model: str, provider: str | None = None) -> str | None:
+    base = _base_model(model)
+    for prefix, family in _FAMILY_PREFIXES:
+        if base.startswith(prefix):
+            return family
+    return _PROVIDER_FAMILIES.get(provider or "")
+
+
+def heuristic_tokens(text: str, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN) -> int:
+    size = len(text) if text.isascii() else len(text.encode("utf-8"))
+    return math.ceil(size / chars_per_token)
+
+
+class TokenEstimator:
+    """Counts prompt tokens with a registered tokenizer per family, else a character heuristic.
+
+    ``context_windows`` overrides the built-in table; keys are ``provider:model`` routes or
+    bare model names.
+    """
+
+    def __init__(
+        self,
+        tokenizers: dict[str, Tokenizer] | None = None,
+        context_windows: dict[str, int] | None = None,
+    ) -> None:
+        self._tokenizers = dict(tokenizers or {})
+        self._context_windows = dict(context_windows or {})
+
+    def register(self, family: str, tokenizer: Tokenizer) -> None:
+        """Use ``tokenizer`` (text -> token count) for models of ``family``, e.g. a tiktoken encoder."""
+        self._tokenizers[family] = tokenizer
+
+    def count(self, text: str, model: str = "", provider: str | None = None) -> int:
+        family = model_family(model, provider)
+        tokenizer = self._tokenizers.get(family or "")
+        if tokenizer is not None:
+            return tokenizer(text)
+        return heuristic_tokens(text, CHARS_PER_TOKEN.get(family or "", DEFAULT_CHARS_PER_TOKEN))
+
+    def count_messages(self, messages: Iterable[_Message], model: str = "", provider: str | None = None) -> int:
+        return sum(self.count(m.content, model, provider) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+    def context_window(self, provider: str, model: str) -> int | None:
+        for key in (f"{provider}:{model}", model):
+            if key in self._context_windows:
+                return self._context_windows[key]
+        base = _base_model(model)
+        matches = [prefix for prefix in CONTEXT_WINDOWS if base.startswith(prefix)]
+        return CONTEXT_WINDOWS[max(matches, key=len)] if matches else None
@@ -0,0 +1,224 @@
+"""Optional span tracing with OTLP-compatible JSON export.
+
+Spans nest through a context variable, so a span started inside another becomes its child
+without passing objects around. Threads started by starray copy the context, asyncio tasks
+inherit it. With tracing disabled (the default) every call returns one shared no-op span.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+from dataclasses import dataclass, field
+import json
+from pathlib import Path
+import random
+import threading
+import time
+from typing import Any, Iterator, Protocol
+
+
+SERVICE_NAME = "starray"
+TRACES_FILE = "traces.jsonl"
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("starray_span", default=None)
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: list["Span"]) -> None: ...
+
+
+@dataclass(slots=True, eq=False)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    attributes: dict[str, Any] = field(default_factory=dict)
+    end_ns: int | None = None
+    error: str | None = None
+    _tracer: "Tracer | None" = None
+    _token: contextvars.Token["Span | None"] | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: BaseException | str | None = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        if self._tracer is not None:
+            self._tracer._finish(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        if self._token is not None:
+            _current_span.reset(self._token)
+            self._token = None
+        self.end(exc)
+
+
+class NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def end(self, error: BaseException | str | None = None) -> None:
+        pass
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class NoopTracer:
+    enabled = False
+
+    def start_span(self, name: str, attributes: dict[str, Any] | None = None) -> NoopSpan:
+        return NOOP_SPAN
+
+
+class Tracer:
+    """Records spans and hands each finished trace to ``exporter``.
+
+    Spans are buffered per trace until the root span ends. Spans that end after their root
+    (for example a hedged attempt that lost the race) are exported on their own.
+    """
+
+    enabled = True
+
+    def __init__(self, exporter: SpanExporter) -> None:
+        self._exporter = exporter
+        self._lock = threading.Lock()
+        self._open_traces: dict[str, list[Span]] = {}
+
+    def start_span(self, name: str, attributes: dict[str, Any] | None = None) -> Span:
+        parent = _current_span.get()
+        if parent is None:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            with self._lock:
+                self._open_traces[trace_id] = []
+        else:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        return Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=f"{random.getrandbits(64):016x}",
+            parent_id=parent_id,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes or {}),
+            _tracer=self,
+        )
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            buffered = self._open_traces.get(span.trace_id)
+            if buffered is not None:
+                buffered.append(span)
+                if span.parent_id is not None:
+                    return
+                batch = self._open_traces.pop(span.trace_id)
+            else:
+                batch = [span]
+        self._exporter.export(batch)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: list[Span]) -> dict[str, Any]:
+    """Encode spans as an OTLP/JSON ``ExportTraceServiceRequest``."""
+    encoded = []
+    for span in spans:
+        item: dict[str, Any] = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id is not None:
+            item["parentSpanId"] = span.parent_id
+        encoded.append(item)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]
+                },
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": encoded}],
+            }
+        ]
+    }
+
+
+class OtlpJsonFileExporter:
+    """Appends one OTLP/JSON request per line, the format of the OpenTelemetry file exporter."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        line = json.dumps(to_otlp(spans), separators=(",", ":")) + "\n"
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with self._path.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+
+
+_tracer: Tracer | NoopTracer = NoopTracer()
+
+
+def get_tracer() -> Tracer | NoopTracer:
+    return _tracer
+
+
+def set_tracer(tracer: Tracer | NoopTracer | None) -> None:
+    global _tracer
+    _tracer = tracer or NoopTracer()
+
+
+def span(name: str, **attributes: Any) -> Span | NoopSpan:
+    """Start a span under the current one; use it as a context manager or call ``end()``."""
+    return _tracer.start_span(name, attributes)
+
+
+@contextlib.contextmanager
+def use_span(current: Span | NoopSpan) -> Iterator[Span | NoopSpan]:
+    """Make ``current`` the parent of spans started inside the block without ending it."""
+    if not isinstance(current, Span):
+        yield current
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
+
+
+def copy_context() -> contextvars.Context:
+    """Context to run a new thread in, so its spans join the caller's trace."""
+    return contextvars.copy_context()
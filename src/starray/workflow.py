@@ -0,0 +1,229 @@
+"""DAG executor for specialist roles: independent steps run concurrently.
+
+Each step waits only for its own dependencies, so a workflow takes roughly as long as its
+critical path rather than the sum of its steps. Results come back in a fixed topological
+order regardless of which step finished first.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+import time
+
+from . import tracing
+from .analyst import AnalystRuntime
+from .roles import RoleRuntime
+
+
+OK = "ok"
+FAILED = "failed"
+TIMED_OUT = "timeout"
+SKIPPED = "skipped"
+
+
+class WorkflowError(RuntimeError):
+    """Raised for invalid workflow definitions."""
+
+
+@dataclass(slots=True)
+class WorkflowStep:
+    name: str
+    role: str
+    depends_on: tuple[str, ...] = ()
+    task: str | None = None
+    deadline_seconds: float | None = None
+
+
+@dataclass(slots=True)
+class StepResult:
+    name: str
+    role: str
+    status: str
+    content: str = ""
+    provider: str | None = None
+    model: str | None = None
+    started_seconds: float = 0.0
+    latency_seconds: float = 0.0
+    error: str | None = None
+
+
+@dataclass(slots=True)
+class WorkflowResult:
+    steps: list[StepResult]
+    latency_seconds: float
+    critical_path_seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return all(step.status == OK for step in self.steps)
+
+    def get(self, name: str) -> StepResult:
+        for step in self.steps:
+            if step.name == name:
+                return step
+        raise KeyError(name)
+
+    def merged(self) -> str:
+        """All step outputs in workflow order, one section per step."""
+        sections = []
+        for step in self.steps:
+            body = step.content if step.status == OK else f"[{step.status}] {step.error or ''}".rstrip()
+            sections.append(f"## {step.name} ({step.role})\n{body}")
+        return "\n\n".join(sections)
+
+
+class Workflow:
+    """A validated DAG of steps; ``order`` is topological, ties broken by definition order."""
+
+    def __init__(self, steps: list[WorkflowStep]) -> None:
+        self.steps = list(steps)
+        names = [step.name for step in self.steps]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise WorkflowError(f"Duplicate workflow step(s): {', '.join(duplicates)}")
+        for step in self.steps:
+            unknown = [dep for dep in step.depends_on if dep not in names]
+            if unknown:
+                raise WorkflowError(f"Step {step.name!r} depends on unknown step(s): {', '.join(unknown)}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> list[WorkflowStep]:
+        ordered: list[WorkflowStep] = []
+        done: set[str] = set()
+        remaining = list(self.steps)
+        while remaining:
+            ready = [step for step in remaining if all(dep in done for dep in step.depends_on)]
+            if not ready:
+                cycle = ", ".join(step.name for step in remaining)
+                raise WorkflowError(f"Workflow has a dependency cycle among: {cycle}")
+            ordered.extend(ready)
+            done.update(step.name for step in ready)
+            remaining = [step for step in remaining if step.name not in done]
+        return ordered
+
+
+def specialist_workflow() -> Workflow:
+    """The Phase 2 graph: plan, design, implement, then Tester and Security in parallel."""
+    return Workflow(
+        [
+            WorkflowStep("plan", "planner"),
+            WorkflowStep("design", "architect", ("plan",)),
+            WorkflowStep("implement", "implementer", ("plan", "design")),
+            WorkflowStep("test", "tester", ("implement",)),
+            WorkflowStep("security", "security", ("implement",)),
+        ]
+    )
+
+
+class WorkflowExecutor:
+    """Runs workflows on a shared runtime with global and per-role concurrency limits.
+
+    A step's deadline is its own ``deadline_seconds`` or the role's entry in
+    ``role_deadlines``; a step that misses it is cancelled (closing its provider streams) and
+    its dependents are skipped. A step that raises is marked failed and its dependents are
+    skipped too, while unrelated steps run to completion.
+    """
+
+    def __init__(
+        self,
+        runtime: AnalystRuntime,
+        *,
+        max_concurrency: int = 4,
+        role_concurrency: dict[str, int] | None = None,
+        role_deadlines: dict[str, float] | None = None,
+        system_prompts: dict[str, str] | None = None,
+    ) -> None:
+        self._runtime = runtime
+        self._max_concurrency = max(1, max_concurrency)
+        self._role_concurrency = {role: max(1, limit) for role, limit in (role_concurrency or {}).items()}
+        self._role_deadlines = dict(role_deadlines or {})
+        self._system_prompts = dict(system_prompts or {})
+
+    def run(self, workflow: Workflow, task: str) -> WorkflowResult:
+        """Blocking wrapper around ``arun``; call ``arun`` from inside an event loop."""
+        return asyncio.run(self.arun(workflow, task))
+
+    async def arun(self, workflow: Workflow, task: str) -> WorkflowResult:
+        started = time.perf_counter()
+        overall = asyncio.Semaphore(self._max_concurrency)
+        role_limits = {role: asyncio.Semaphore(limit) for role, limit in self._role_concurrency.items()}
+        tasks: dict[str, asyncio.Task[StepResult]] = {}
+
+        async def run_step(step: WorkflowStep) -> StepResult:
+            upstream = [await tasks[dep] for dep in step.depends_on]
+            blocked = [result.name for result in upstream if result.status != OK]
+            if blocked:
+                return StepResult(step.name, step.role, SKIPPED, error=f"blocked by {', '.join(blocked)}")
+            inputs = {result.name: result.content for result in upstream}
+            role = RoleRuntime(self._runtime, step.role, self._system_prompts.get(step.role))
+            deadline = step.deadline_seconds or self._role_deadlines.get(step.role)
+
+            async with AsyncExitStack() as limits:
+                if step.role in role_limits:
+                    await limits.enter_async_context(role_limits[step.role])
+                await limits.enter_async_context(overall)
+                step_started = time.perf_counter()
+                with tracing.span("workflow.step", step=step.name, role=step.role) as span:
+                    try:
+                        async with asyncio.timeout(deadline):
+                            response = await role.arun(step.task or task, inputs)
+                    except TimeoutError:
+                        span.set_attribute("status", TIMED_OUT)
+                        return StepResult(
+                            step.name,
+                            step.role,
+                            TIMED_OUT,
+                            started_seconds=step_started - started,
+                            latency_seconds=time.perf_counter() - step_started,
+                            error=f"no result within {deadline:g}s",
+                        )
+                    except Exception as exc:
+                        # Contain the failure to this step so siblings keep running.
+                        span.set_attribute("status", FAILED)
+                        return StepResult(
+                            step.name,
+                            step.role,
+                            FAILED,
+                            started_seconds=step_started - started,
+                            latency_seconds=time.perf_counter() - step_started,
+                            error=f"{type(exc).__name__}: {exc}",
+                        )
+            status = FAILED if response.provider == "none" else OK
+            return StepResult(
+                step.name,
+                step.role,
+                status,
+                content=response.content,
+                provider=response.provider,
+                model=response.model,
+                started_seconds=step_started - started,
+                latency_seconds=time.perf_counter() - step_started,
+                error=response.fallback_reason if status == FAILED else None,
+            )
+
+        with tracing.span("workflow.run", steps=len(workflow.steps)):
+            # Steps are created in topological order, so every dependency's task already exists.
+            for step in workflow.order:
+                tasks[step.name] = asyncio.create_task(run_step(step))
+            try:
+                results = {name: await step_task for name, step_task in tasks.items()}
+            finally:
+                for step_task in tasks.values():
+                    step_task.cancel()
+
+        return WorkflowResult(
+            steps=[results[step.name] for step in workflow.order],
+            latency_seconds=time.perf_counter() - started,
+            critical_path_seconds=_critical_path(workflow, results),
+        )
+
+
+def _critical_path(workflow: Workflow, results: dict[str, StepResult]) -> float:
+    """Longest chain of measured step latencies through the DAG."""
+    finish: dict[str, float] = {}
+    for step in workflow.order:
+        before = max((finish[dep] for dep in step.depends_on), default=0.0)
+        finish[step.name] = before + results[step.name].latency_seconds
+    return max(finish.values(), default=0.0)
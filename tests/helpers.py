@@ -0,0 +1,45 @@
+"""Fixtures shared by tests that drive an ``AnalystRuntime`` against fake providers."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+from src.starray.config import AppConfig
+from src.starray.providers import ModelProvider, ProviderError
+
+
+class StaticFactory:
+    """Provider factory that serves fixed provider instances by name.
+
+    Names missing from ``providers`` get ``default``; without one they raise ``ProviderError``
+    like an unsupported provider in ``ProviderFactory``.
+    """
+
+    def __init__(
+        self, providers: dict[str, ModelProvider] | None = None, *, default: ModelProvider | None = None
+    ) -> None:
+        self._providers = dict(providers or {})
+        self._default = default
+
+    def get(self, provider_name: str) -> ModelProvider:
+        provider = self._providers.get(provider_name, self._default)
+        if provider is None:
+            raise ProviderError(f"Unsupported provider: {provider_name}")
+        return provider
+
+
+def analyst_config(**overrides: Any) -> AppConfig:
+    """OpenAI-first config that routes the analyst to ``gpt-4.1``; keywords override fields."""
+    values: dict[str, Any] = dict(
+        provider="openai",
+        provider_fallbacks=[],
+        default_model="gpt-4.1",
+        role_models={"analyst": "gpt-4.1"},
+        role_fallback_models={"analyst": []},
+        temperature=0.2,
+        request_timeout_seconds=30.0,
+        data_dir=Path(".starray"),
+    )
+    values.update(overrides)
+    return AppConfig(**values)
@@ -1,22 +1,89 @@
+import asyncio
+import threading
+import time
 import unittest
-from pathlib import Path
 
 from src.starray.analyst import AnalystRuntime
-from src.starray.config import AppConfig
+from src.starray.health import HALF_OPEN, RouteHealthTracker
+from src.starray.providers import ChatMessage, LocalEchoProvider, ProviderError, on_cancel
+from src.starray.ratelimit import RateLimit, RateLimitedProvider, RateLimiter
+from src.starray.routing import RouteStatsStore
+from src.starray.session import SessionState
+from tests.helpers import StaticFactory, analyst_config
+
+
+class _StreamingProvider(LocalEchoProvider):
+    def __init__(self, name: str, chunks: list[str], fail_after: int | None = None) -> None:
+        self.name = name
+        self._chunks = chunks
+        self._fail_after = fail_after
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        for index, chunk in enumerate(self._chunks):
+            if index == self._fail_after:
+                raise ProviderError(f"{self.name} dropped")
+            yield chunk
+
+
+class _SlowProvider(LocalEchoProvider):
+    def __init__(self, name: str, delay: float) -> None:
+        self.name = name
+        self._delay = delay
+        self.closed = threading.Event()
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        time.sleep(self._delay)
+        try:
+            yield "slow answer"
+        finally:
+            self.closed.set()
+
+
+class _HungProvider(LocalEchoProvider):
+    """Never answers; only a cancellation unblocks it, as closing the HTTP response would."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.aborted = threading.Event()
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        unblock = threading.Event()
+        on_cancel(unblock.set)
+        unblock.wait(5)
+        self.aborted.set()
+        raise ProviderError(f"{self.name} stream closed")
+        yield ""
+
+
+class _BuggyProvider(LocalEchoProvider):
+    """Fails with an error the provider layer forgot to wrap."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        raise RuntimeError("unexpected response shape")
+        yield ""
+
+
+class _AsyncSlowProvider(LocalEchoProvider):
+    def __init__(self, name: str, delay: float) -> None:
+        self.name = name
+        self._delay = delay
+        self.cancelled = False
+
+    async def achat_stream(self, messages, *, model, temperature, timeout_seconds):
+        try:
+            await asyncio.sleep(self._delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        yield "slow answer"
 
 
 class TestAnalystRuntime(unittest.TestCase):
     def test_respond_uses_local_fallback_when_remote_provider_unavailable(self) -> None:
-        cfg = AppConfig(
-            provider="openai",
-            provider_fallbacks=[],
-            default_model="gpt-4.1",
-            role_models={"analyst": "gpt-4.1"},
-            role_fallback_models={"analyst": ["gpt-4.1-mini"]},
-            temperature=0.2,
-            request_timeout_seconds=30.0,
-            data_dir=Path(".starray"),
-        )
+        cfg = analyst_config(role_fallback_models={"analyst": ["gpt-4.1-mini"]})
         runtime = AnalystRuntime(cfg)
 
         response = runtime.respond("draft a plan")
@@ -25,16 +92,20 @@ class TestAnalystRuntime(unittest.TestCase):
         self.assertEqual(response.provider, "local")
         self.assertTrue(response.fallback_used)
 
+    def test_respond_includes_session_history(self) -> None:
+        runtime = AnalystRuntime(analyst_config())
+        session = SessionState.new()
+        session.add_turn("user", "my project is called Orion")
+        session.add_turn("analyst", "noted")
+
+        messages = runtime.build_messages("what is it called?", session)
+
+        self.assertEqual([m.role for m in messages], ["system", "user", "assistant", "user"])
+        self.assertEqual(messages[1].content, "my project is called Orion")
+
     def test_provider_summary_lists_route_order(self) -> None:
-        cfg = AppConfig(
-            provider="openai",
-            provider_fallbacks=["anthropic", "gemini"],
-            default_model="gpt-4.1",
-            role_models={"analyst": "gpt-4.1"},
-            role_fallback_models={"analyst": ["gpt-4.1-mini"]},
-            temperature=0.2,
-            request_timeout_seconds=30.0,
-            data_dir=Path(".starray"),
+        cfg = analyst_config(
+            provider_fallbacks=["anthropic", "gemini"], role_fallback_models={"analyst": ["gpt-4.1-mini"]}
         )
         runtime = AnalystRuntime(cfg)
 
@@ -44,5 +115,258 @@ class TestAnalystRuntime(unittest.TestCase):
         self.assertIn("gpt-4.1 -> gpt-4.1-mini", summary)
 
 
+class TestAnalystStreaming(unittest.TestCase):
+    def test_respond_streams_tokens_and_records_latency(self) -> None:
+        factory = StaticFactory({"openai": _StreamingProvider("openai", ["  Hel", "lo", " there"])})
+        runtime = AnalystRuntime(analyst_config(), provider_factory=factory)
+        seen: list[str] = []
+
+        response = runtime.respond("hi", on_token=seen.append)
+
+        self.assertEqual(seen, ["Hel", "lo", " there"])
+        self.assertEqual(response.content, "Hello there")
+        self.assertFalse(response.fallback_used)
+        self.assertIsNotNone(response.first_token_seconds)
+        self.assertGreaterEqual(response.latency_seconds, response.first_token_seconds)
+
+    def test_stream_failure_before_first_token_falls_back(self) -> None:
+        factory = StaticFactory(
+            {
+                "openai": _StreamingProvider("openai", ["never"], fail_after=0),
+                "anthropic": _StreamingProvider("anthropic", ["backup"]),
+            }
+        )
+        runtime = AnalystRuntime(analyst_config(provider_fallbacks=["anthropic"]), provider_factory=factory)
+        seen: list[str] = []
+
+        response = runtime.respond("hi", on_token=seen.append)
+
+        self.assertEqual(seen, ["backup"])
+        self.assertEqual(response.provider, "anthropic")
+        self.assertTrue(response.fallback_used)
+        self.assertIn("openai dropped", response.fallback_reason or "")
+
+    def test_stream_failure_after_first_token_keeps_partial_answer(self) -> None:
+        factory = StaticFactory(
+            {
+                "openai": _StreamingProvider("openai", ["partial", " answer"], fail_after=1),
+                "anthropic": _StreamingProvider("anthropic", ["backup"]),
+            }
+        )
+        runtime = AnalystRuntime(analyst_config(provider_fallbacks=["anthropic"]), provider_factory=factory)
+
+        response = runtime.respond("hi")
+
+        self.assertEqual(response.provider, "openai")
+        self.assertEqual(response.content, "partial")
+        self.assertIn("stream interrupted", response.fallback_reason or "")
+
+
+class TestAnalystCircuitBreaker(unittest.TestCase):
+    def test_open_route_is_skipped_on_later_turns(self) -> None:
+        failing = _StreamingProvider("openai", ["never"], fail_after=0)
+        factory = StaticFactory({"openai": failing, "anthropic": _StreamingProvider("anthropic", ["ok"])})
+        health = RouteHealthTracker(failure_threshold=1, cooldown_seconds=60)
+        runtime = AnalystRuntime(analyst_config(provider_fallbacks=["anthropic"]), provider_factory=factory, health=health)
+
+        first = runtime.respond("hi")
+        second = runtime.respond("again")
+
+        self.assertIn("openai dropped", first.fallback_reason or "")
+        self.assertEqual(second.provider, "anthropic")
+        self.assertEqual(second.fallback_reason, "openai:gpt-4.1: circuit open")
+        self.assertIn("openai (circuit open) -> anthropic", runtime.provider_summary())
+
+    def test_half_open_route_with_trial_in_flight_is_skipped_without_a_failure(self) -> None:
+        now = [1000.0]
+        health = RouteHealthTracker(failure_threshold=1, cooldown_seconds=60, clock=lambda: now[0])
+        health.record_failure("openai:gpt-4.1", "quota")
+        now[0] += 60
+        self.assertEqual(health.acquire("openai:gpt-4.1"), HALF_OPEN)
+        factory = StaticFactory(
+            {"openai": _StreamingProvider("openai", ["ok"]), "anthropic": _StreamingProvider("anthropic", ["ok"])}
+        )
+        runtime = AnalystRuntime(analyst_config(provider_fallbacks=["anthropic"]), provider_factory=factory, health=health)
+
+        response = runtime.respond("hi")
+
+        self.assertEqual(response.provider, "anthropic")
+        self.assertEqual(health.state("openai:gpt-4.1"), HALF_OPEN)
+        self.assertEqual(health.snapshot()["openai:gpt-4.1"].total_failures, 1)
+
+
+class TestAnalystHedging(unittest.TestCase):
+    def test_hedged_request_survives_a_non_provider_error(self) -> None:
+        factory = StaticFactory(
+            {"openai": _BuggyProvider("openai"), "anthropic": _StreamingProvider("anthropic", ["ok"])}
+        )
+        cfg = analyst_config(provider_fallbacks=["anthropic"])
+        cfg.hedging = True
+        cfg.hedge_delay_seconds = 5.0
+        health = RouteHealthTracker()
+        runtime = AnalystRuntime(cfg, provider_factory=factory, health=health)
+        outcome: list = []
+        worker = threading.Thread(target=lambda: outcome.append(runtime.respond("hi")), daemon=True)
+
+        worker.start()
+        worker.join(2.0)
+
+        self.assertFalse(worker.is_alive(), "respond() hung after an unwrapped provider error")
+        self.assertEqual(outcome[0].provider, "anthropic")
+        self.assertIn("RuntimeError: unexpected response shape", outcome[0].fallback_reason or "")
+        self.assertEqual(health.snapshot()["openai:gpt-4.1"].total_failures, 1)
+
+    def test_hedged_request_lets_faster_fallback_win(self) -> None:
+        slow = _SlowProvider("openai", delay=0.3)
+        factory = StaticFactory({"openai": slow, "anthropic": _StreamingProvider("anthropic", ["fast"])})
+        cfg = analyst_config(provider_fallbacks=["anthropic"])
+        cfg.hedging = True
+        cfg.hedge_delay_seconds = 0.02
+        runtime = AnalystRuntime(cfg, provider_factory=factory)
+
+        started = time.perf_counter()
+        response = runtime.respond("hi")
+
+        self.assertLess(time.perf_counter() - started, 0.3)
+        self.assertEqual(response.provider, "anthropic")
+        self.assertEqual(response.content, "fast")
+        self.assertEqual(response.hedged_calls, 1)
+        self.assertTrue(slow.closed.wait(1.0))
+
+    def test_hung_loser_is_cancelled_and_releases_its_rate_limit_permit(self) -> None:
+        hung = _HungProvider("openai")
+        limiter = RateLimiter({"openai": RateLimit(concurrency=1)}, max_wait_seconds=5)
+        factory = StaticFactory(
+            {
+                "openai": RateLimitedProvider(hung, limiter),
+                "anthropic": _StreamingProvider("anthropic", ["fast"]),
+            }
+        )
+        cfg = analyst_config(provider_fallbacks=["anthropic"])
+        cfg.hedging = True
+        cfg.hedge_delay_seconds = 0.02
+        health = RouteHealthTracker()
+        runtime = AnalystRuntime(cfg, provider_factory=factory, health=health)
+
+        response = runtime.respond("hi")
+
+        self.assertEqual(response.provider, "anthropic")
+        self.assertEqual(limiter.stats()["openai"].active, 0)
+        self.assertTrue(hung.aborted.wait(1.0))
+        # Cancelling a loser is not a route failure.
+        self.assertNotIn("openai:gpt-4.1", runtime.metrics.aggregator.summarize())
+        self.assertNotIn("openai:gpt-4.1", health.snapshot())
+
+    def test_hedge_delay_follows_recorded_p95_first_token_time(self) -> None:
+        stats = RouteStatsStore()
+        for _ in range(20):
+            # Long completions, quick first tokens: only the latter says when a stream is late.
+            stats.record_success(
+                "openai:gpt-4.1", latency_seconds=10.0, first_token_seconds=0.01, prompt_tokens=1, completion_tokens=1, cost=0.0
+            )
+        factory = StaticFactory(
+            {"openai": _SlowProvider("openai", delay=0.3), "anthropic": _StreamingProvider("anthropic", ["fast"])}
+        )
+        cfg = analyst_config(provider_fallbacks=["anthropic"])
+        cfg.hedging = True
+        cfg.hedge_delay_seconds = 5.0
+        runtime = AnalystRuntime(cfg, provider_factory=factory, stats=stats)
+
+        response = runtime.respond("hi")
+
+        self.assertEqual(response.provider, "anthropic")
+        self.assertEqual(response.hedged_calls, 1)
+
+    def test_hedging_keeps_primary_when_it_answers_within_delay(self) -> None:
+        factory = StaticFactory(
+            {
+                "openai": _StreamingProvider("openai", ["primary"]),
+                "anthropic": _StreamingProvider("anthropic", ["backup"]),
+            }
+        )
+        cfg = analyst_config(provider_fallbacks=["anthropic"])
+        cfg.hedging = True
+        cfg.hedge_delay_seconds = 1.0
+        runtime = AnalystRuntime(cfg, provider_factory=factory)
+
+        response = runtime.respond("hi")
+
+        self.assertEqual(response.provider, "openai")
+        self.assertEqual(response.hedged_calls, 0)
+        self.assertFalse(response.fallback_used)
+
+
+class TestAnalystAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_local_provider_implements_async_api(self) -> None:
+        provider = LocalEchoProvider()
+        messages = [ChatMessage(role="user", content="ping")]
+
+        text = await provider.achat(messages, model="m", temperature=0.0, timeout_seconds=1.0)
+        chunks = [c async for c in provider.achat_stream(messages, model="m", temperature=0.0, timeout_seconds=1.0)]
+        payload = await provider.astructured_output(
+            messages, model="m", schema={"properties": {"a": {}}}, temperature=0.0, timeout_seconds=1.0
+        )
+
+        self.assertTrue(text.endswith("ping"))
+        self.assertEqual(chunks, [text])
+        self.assertEqual(payload, {"a": None})
+
+    async def test_arespond_streams_sync_provider_and_falls_back(self) -> None:
+        factory = StaticFactory(
+            {
+                "openai": _StreamingProvider("openai", ["never"], fail_after=0),
+                "anthropic": _StreamingProvider("anthropic", ["  back", "up"]),
+            }
+        )
+        runtime = AnalystRuntime(analyst_config(provider_fallbacks=["anthropic"]), provider_factory=factory)
+        seen: list[str] = []
+
+        response = await runtime.arespond("hi", on_token=seen.append)
+
+        self.assertEqual(seen, ["back", "up"])
+        self.assertEqual(response.content, "backup")
+        self.assertEqual(response.provider, "anthropic")
+        self.assertIn("openai dropped", response.fallback_reason or "")
+
+    async def test_arespond_times_out_slow_route(self) -> None:
+        slow = _AsyncSlowProvider("openai", delay=5.0)
+        factory = StaticFactory({"openai": slow, "anthropic": _StreamingProvider("anthropic", ["ok"])})
+        cfg = analyst_config(provider_fallbacks=["anthropic"])
+        cfg.request_timeout_seconds = 0.05
+        runtime = AnalystRuntime(cfg, provider_factory=factory)
+
+        response = await runtime.arespond("hi")
+
+        self.assertEqual(response.provider, "anthropic")
+        self.assertIn("no response within 0.05s", response.fallback_reason or "")
+        self.assertTrue(slow.cancelled)
+
+    async def test_hedged_arespond_cancels_losing_route(self) -> None:
+        slow = _AsyncSlowProvider("openai", delay=5.0)
+        factory = StaticFactory({"openai": slow, "anthropic": _StreamingProvider("anthropic", ["fast"])})
+        cfg = analyst_config(provider_fallbacks=["anthropic"])
+        cfg.hedging = True
+        cfg.hedge_delay_seconds = 0.02
+        runtime = AnalystRuntime(cfg, provider_factory=factory)
+
+        response = await runtime.arespond("hi")
+
+        self.assertEqual(response.provider, "anthropic")
+        self.assertEqual(response.hedged_calls, 1)
+        self.assertTrue(slow.cancelled)
+
+    async def test_cancelling_arespond_cancels_provider_call(self) -> None:
+        slow = _AsyncSlowProvider("openai", delay=5.0)
+        runtime = AnalystRuntime(analyst_config(), provider_factory=StaticFactory({"openai": slow}))
+
+        task = asyncio.create_task(runtime.arespond("hi"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertTrue(slow.cancelled)
+
+
 if __name__ == "__main__":
     unittest.main()
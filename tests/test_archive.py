@@ -0,0 +1,157 @@
+import contextlib
+import io
+import os
+import time
+import unittest
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.archive import archive_dir, archive_sessions
+from src.starray.cli import main
+from src.starray.config import ConfigError, load_config
+from src.starray.session import SessionState, load_session, session_path
+from src.starray.session_index import SessionIndex
+
+DAY = 24 * 3600
+
+
+def _session(session_dir: Path, text: str, age_days: float = 0, turns: int = 3) -> SessionState:
+    state = SessionState.new()
+    for index in range(turns):
+        state.add_turn("user", f"{text} {index} " + "lorem ipsum " * 40)
+    path = state.save(session_dir)
+    stamp = time.time() - age_days * DAY
+    os.utime(path, (stamp, stamp))
+    return state
+
+
+class TestArchive(unittest.TestCase):
+    def test_idle_sessions_are_gzipped_and_load_transparently(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir, log_dir = Path(tmp) / "sessions", Path(tmp) / "logs"
+            idle = _session(session_dir, "idle", age_days=40)
+            active = _session(session_dir, "active")
+            log_dir.mkdir()
+            (log_dir / f"{idle.session_id}.log").write_text('{"event": "user"}\n', encoding="utf-8")
+            (log_dir / f"{idle.session_id}.1.log").write_text('{"event": "user"}\n', encoding="utf-8")
+
+            report = archive_sessions(session_dir, log_dir, idle_days=30)
+
+            self.assertEqual(report.archived, [idle.session_id])
+            self.assertLess(report.bytes_after, report.bytes_before / 4)
+            self.assertEqual(report.logs_compressed, 2)
+            self.assertFalse(session_path(session_dir, idle.session_id).exists())
+            self.assertFalse(session_path(session_dir, idle.session_id).with_suffix(".idx").exists())
+            self.assertTrue((archive_dir(session_dir) / f"{idle.session_id}.jsonl.gz").exists())
+            self.assertTrue(session_path(session_dir, active.session_id).exists())
+            self.assertEqual(
+                sorted(p.name for p in (log_dir / "archive").iterdir()),
+                [f"{idle.session_id}.1.log.gz", f"{idle.session_id}.log.gz"],
+            )
+
+            restored = load_session(session_dir, idle.session_id, tail_turns=1)
+            self.assertEqual(restored.turn_count, 3)
+            self.assertEqual(restored.turns_between(0, 1)[0]["content"], idle.turns[0]["content"])
+            self.assertEqual(list(archive_dir(session_dir).iterdir()), [])
+
+    def test_monthly_packs_hold_many_sessions_and_restore_one_at_a_time(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            first = _session(session_dir, "first", age_days=60)
+            second = _session(session_dir, "second", age_days=60)
+
+            report = archive_sessions(session_dir, idle_days=30, pack="monthly")
+
+            packs = list(archive_dir(session_dir).glob("*.zip"))
+            self.assertEqual(len(packs), 1)
+            self.assertEqual(sorted(report.archived), sorted([first.session_id, second.session_id]))
+            with zipfile.ZipFile(packs[0]) as zf:
+                self.assertEqual(len(zf.namelist()), 2)
+
+            self.assertEqual(load_session(session_dir, first.session_id).turn_count, 3)
+            with zipfile.ZipFile(packs[0]) as zf:
+                self.assertEqual(zf.namelist(), [f"{second.session_id}.jsonl"])
+            self.assertEqual(load_session(session_dir, second.session_id).turn_count, 3)
+            self.assertFalse(packs[0].exists())
+
+    def test_retention_deletes_old_archives_and_dry_run_changes_nothing(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            old = _session(session_dir, "old", age_days=400)
+            recent = _session(session_dir, "recent", age_days=40)
+
+            preview = archive_sessions(session_dir, idle_days=30, retention_days=365, dry_run=True)
+            self.assertEqual(len(preview.archived), 2)
+            self.assertTrue(session_path(session_dir, old.session_id).exists())
+
+            archive_sessions(session_dir, idle_days=30)
+            report = archive_sessions(session_dir, idle_days=30, retention_days=365)
+
+            self.assertEqual(report.deleted, [old.session_id])
+            self.assertEqual(
+                [p.name for p in archive_dir(session_dir).iterdir()], [f"{recent.session_id}.jsonl.gz"]
+            )
+
+    def test_monthly_pack_expires_by_its_month_even_when_recently_rewritten(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            old = _session(session_dir, "old", age_days=400)
+            restored = _session(session_dir, "restored", age_days=400)
+            recent = _session(session_dir, "recent", age_days=40)
+            archive_sessions(session_dir, idle_days=30, pack="monthly")
+            # Restoring one member rewrites the old pack, giving it a fresh modification time.
+            load_session(session_dir, restored.session_id)
+
+            report = archive_sessions(session_dir, idle_days=30, pack="monthly", retention_days=365)
+
+            self.assertEqual(report.deleted, [old.session_id])
+            remaining = list(archive_dir(session_dir).glob("*.zip"))
+            self.assertEqual(len(remaining), 1)
+            with zipfile.ZipFile(remaining[0]) as zf:
+                self.assertEqual(zf.namelist(), [f"{recent.session_id}.jsonl"])
+
+    def test_index_rebuild_covers_archived_sessions(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            gzipped = _session(session_dir, "zebra", age_days=40)
+            archive_sessions(session_dir, idle_days=30)
+            packed = _session(session_dir, "zebra", age_days=40)
+            archive_sessions(session_dir, idle_days=30, pack="monthly")
+
+            index = SessionIndex.for_sessions_dir(session_dir)
+            self.assertEqual(index.rebuild(session_dir), 2)
+            hits = {hit.session_id for hit in index.search("zebra")}
+            index.close()
+
+        self.assertEqual(hits, {gzipped.session_id, packed.session_id})
+
+
+class TestArchiveCommand(unittest.TestCase):
+    def test_archive_command_uses_storage_settings(self) -> None:
+        with TemporaryDirectory() as tmp:
+            cfg = Path(tmp) / "starray.toml"
+            cfg.write_text(
+                f"[storage]\ndata_dir = '{Path(tmp).as_posix()}'\narchive_after_days = 10\narchive_pack = 'monthly'\n",
+                encoding="utf-8",
+            )
+            _session(Path(tmp) / "sessions", "idle", age_days=11)
+            _session(Path(tmp) / "sessions", "fresh", age_days=9)
+
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.assertEqual(main(["sessions", "-c", str(cfg), "archive"]), 0)
+
+            self.assertIn("Archived 1 idle sessions", out.getvalue())
+            self.assertEqual(len(list(archive_dir(Path(tmp) / "sessions").glob("*.zip"))), 1)
+
+    def test_config_rejects_unknown_pack_mode(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "starray.toml"
+            path.write_text("[storage]\narchive_pack = 'yearly'\n", encoding="utf-8")
+            with self.assertRaises(ConfigError):
+                load_config(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
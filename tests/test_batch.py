@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.analyst import AnalystRuntime
+from src.starray.batch import BatchError, completed_ids, run_batch
+from src.starray.providers import LocalEchoProvider
+from tests.helpers import StaticFactory, analyst_config
+
+
+class _CountingProvider(LocalEchoProvider):
+    """Echo provider that sleeps longer for earlier prompts and tracks peak concurrency."""
+
+    def __init__(self) -> None:
+        self.name = "local"
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        prompt = messages[-1].content
+        with self._lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.05 if prompt == "p0" else 0.01)
+            yield f"answer to {prompt}"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _runtime(provider: LocalEchoProvider) -> AnalystRuntime:
+    cfg = analyst_config(provider="local", default_model="local-echo", role_models={"analyst": "local-echo"})
+    return AnalystRuntime(cfg, provider_factory=StaticFactory(default=provider))
+
+
+def _write_prompts(path: Path, count: int) -> None:
+    lines = [json.dumps({"id": f"q{i}", "prompt": f"p{i}"}) for i in range(count)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _read_results(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class TestBatch(unittest.TestCase):
+    def test_results_follow_input_order_with_bounded_concurrency(self) -> None:
+        with TemporaryDirectory() as tmp:
+            source, results = Path(tmp) / "in.jsonl", Path(tmp) / "out.jsonl"
+            _write_prompts(source, 8)
+            provider = _CountingProvider()
+
+            summary = run_batch(_runtime(provider), source, results, concurrency=3)
+
+            records = _read_results(results)
+            self.assertEqual([r["id"] for r in records], [f"q{i}" for i in range(8)])
+            self.assertEqual(records[0]["content"], "answer to p0")
+            self.assertEqual(records[0]["provider"], "local")
+            self.assertFalse(records[0]["fallback_used"])
+            self.assertIn("fallback_reason", records[0])
+            self.assertEqual(summary.completed, 8)
+            self.assertLessEqual(provider.peak, 3)
+            self.assertGreater(provider.peak, 1)
+
+    def test_completion_order_writes_fast_results_first(self) -> None:
+        with TemporaryDirectory() as tmp:
+            source, results = Path(tmp) / "in.jsonl", Path(tmp) / "out.jsonl"
+            _write_prompts(source, 3)
+
+            run_batch(_runtime(_CountingProvider()), source, results, concurrency=3, ordered=False)
+
+            self.assertEqual(_read_results(results)[-1]["id"], "q0")
+
+    def test_resume_skips_completed_ids_and_retries_torn_line(self) -> None:
+        with TemporaryDirectory() as tmp:
+            source, results = Path(tmp) / "in.jsonl", Path(tmp) / "out.jsonl"
+            _write_prompts(source, 4)
+            results.write_text(
+                json.dumps({"id": "q0", "content": "earlier"}) + "\n" + '{"id": "q1", "con',
+                encoding="utf-8",
+            )
+            self.assertEqual(completed_ids(results), {"q0"})
+            provider = _CountingProvider()
+
+            summary = run_batch(_runtime(provider), source, results, concurrency=2)
+
+            self.assertEqual((summary.total, summary.skipped, summary.completed), (4, 1, 3))
+            self.assertEqual(provider.calls, 3)
+            self.assertEqual(completed_ids(results), {"q0", "q1", "q2", "q3"})
+
+    def test_resume_replaces_error_records_instead_of_appending_beside_them(self) -> None:
+        with TemporaryDirectory() as tmp:
+            source, results = Path(tmp) / "in.jsonl", Path(tmp) / "out.jsonl"
+            _write_prompts(source, 3)
+            results.write_text(
+                json.dumps({"id": "q0", "content": "earlier"})
+                + "\n"
+                + json.dumps({"id": "q1", "error": "ProviderError: down"})
+                + "\n",
+                encoding="utf-8",
+            )
+
+            summary = run_batch(_runtime(_CountingProvider()), source, results, concurrency=2)
+
+            records = _read_results(results)
+            self.assertEqual([r["id"] for r in records], ["q0", "q1", "q2"])
+            self.assertEqual(records[0]["content"], "earlier")
+            self.assertNotIn("error", records[1])
+            self.assertEqual((summary.skipped, summary.completed, summary.failed), (1, 2, 0))
+
+    def test_bad_line_mid_input_still_writes_results_in_flight(self) -> None:
+        with TemporaryDirectory() as tmp:
+            source, results = Path(tmp) / "in.jsonl", Path(tmp) / "out.jsonl"
+            _write_prompts(source, 2)
+            with source.open("a", encoding="utf-8") as fh:
+                fh.write("{not json\n")
+
+            with self.assertRaises(BatchError):
+                run_batch(_runtime(_CountingProvider()), source, results, concurrency=4)
+
+            self.assertEqual([r["id"] for r in _read_results(results)], ["q0", "q1"])
+
+    def test_invalid_input_line_raises_batch_error(self) -> None:
+        with TemporaryDirectory() as tmp:
+            source = Path(tmp) / "in.jsonl"
+            source.write_text('{"id": 1}\n', encoding="utf-8")
+            with self.assertRaises(BatchError):
+                run_batch(_runtime(_CountingProvider()), source, Path(tmp) / "out.jsonl")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_quick_run_writes_comparable_json(self) -> None:
+        env = dict(os.environ, PYTHONPATH=str(REPO_ROOT / "src"), NO_COLOR="1")
+        with TemporaryDirectory() as tmp:
+            output = Path(tmp) / "results.json"
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks", "--quick", "turn_latency", "fallback_cost", "-o", str(output)],
+                cwd=REPO_ROOT,
+                env=env,
+                capture_output=True,
+                check=True,
+            )
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks", "--quick", "turn_latency", "--baseline", str(output)],
+                cwd=REPO_ROOT,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            results = json.loads(output.read_text(encoding="utf-8"))
+
+        scenarios = results["scenarios"]
+        self.assertEqual(results["schema"], 1)
+        self.assertEqual(scenarios["turn_latency"]["provider_calls"], 10)
+        fallback = scenarios["fallback_cost"]
+        self.assertGreater(fallback["primary_hangs"]["p50_ms"], fallback["primary_hangs_hedged"]["p50_ms"])
+        self.assertIn("turn_latency.p50_ms:", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.analyst import AnalystRuntime
+from src.starray.cache import CachingProvider, ResponseCache, cache_key
+from src.starray.metrics import MetricsRecorder
+from src.starray.providers import ChatMessage, LocalEchoProvider
+from src.starray.routing import RouteStatsStore
+from src.starray.session import SessionState
+from tests.helpers import StaticFactory, analyst_config
+
+
+class _CountingProvider(LocalEchoProvider):
+    def __init__(self) -> None:
+        self.name = "openai"
+        self.calls = 0
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        self.calls += 1
+        yield "cached "
+        yield "answer"
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+MESSAGES = [ChatMessage(role="system", content="sys"), ChatMessage(role="user", content="hi")]
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_key_normalizes_whitespace_and_includes_temperature(self) -> None:
+        padded = [ChatMessage(role="System", content=" sys "), ChatMessage(role="user", content="hi\n")]
+        self.assertEqual(
+            cache_key("chat", "openai", "gpt-4.1", 0.0, MESSAGES),
+            cache_key("chat", "openai", "gpt-4.1", 0.0, padded),
+        )
+        self.assertNotEqual(
+            cache_key("chat", "openai", "gpt-4.1", 0.0, MESSAGES),
+            cache_key("chat", "openai", "gpt-4.1", 0.1, MESSAGES),
+        )
+
+    def test_disk_tier_survives_new_instance_and_expires(self) -> None:
+        with TemporaryDirectory() as tmp:
+            clock = _Clock()
+            ResponseCache(Path(tmp), ttl_seconds=60, clock=clock).put("ab12", "value")
+
+            fresh = ResponseCache(Path(tmp), ttl_seconds=60, clock=clock)
+            self.assertEqual(fresh.get("ab12"), "value")
+            self.assertEqual(fresh.stats.disk_hits, 1)
+
+            clock.now += 61
+            expired = ResponseCache(Path(tmp), ttl_seconds=60, clock=clock)
+            self.assertIsNone(expired.get("ab12"))
+            self.assertEqual(expired.stats.misses, 1)
+
+    def test_memory_lru_and_disk_size_limits_evict(self) -> None:
+        with TemporaryDirectory() as tmp:
+            cache = ResponseCache(Path(tmp), max_memory_entries=1, max_disk_bytes=200)
+            for index in range(5):
+                cache.put(f"k{index}", "x" * 60)
+
+            self.assertGreater(cache.stats.evictions, 0)
+            disk_bytes = sum(p.stat().st_size for p in Path(tmp).glob("*/*.json"))
+            self.assertLessEqual(disk_bytes, 200)
+            self.assertEqual(cache.get("k4"), "x" * 60)
+            self.assertEqual(cache.stats.memory_hits, 1)
+
+
+class TestCachingProvider(unittest.TestCase):
+    def test_repeated_stream_is_served_from_cache(self) -> None:
+        inner = _CountingProvider()
+        provider = CachingProvider(inner, ResponseCache(None), max_temperature=0.3)
+
+        first = "".join(provider.chat_stream(MESSAGES, model="gpt-4.1", temperature=0.0, timeout_seconds=5))
+        second = "".join(provider.chat_stream(MESSAGES, model="gpt-4.1", temperature=0.0, timeout_seconds=5))
+
+        self.assertEqual(first, second)
+        self.assertEqual(inner.calls, 1)
+
+    def test_high_temperature_bypasses_cache(self) -> None:
+        inner = _CountingProvider()
+        cache = ResponseCache(None)
+        provider = CachingProvider(inner, cache, max_temperature=0.3)
+
+        for _ in range(2):
+            list(provider.chat_stream(MESSAGES, model="gpt-4.1", temperature=0.9, timeout_seconds=5))
+
+        self.assertEqual(inner.calls, 2)
+        self.assertEqual(cache.stats.bypassed, 2)
+
+    def test_cache_hits_stay_out_of_route_stats_and_metrics(self) -> None:
+        inner = _CountingProvider()
+        provider = CachingProvider(inner, ResponseCache(None), max_temperature=0.3)
+        with TemporaryDirectory() as tmp:
+            cfg = analyst_config(temperature=0.0, data_dir=Path(tmp))
+            path = Path(tmp) / "metrics.jsonl"
+            stats = RouteStatsStore()
+            runtime = AnalystRuntime(
+                cfg, provider_factory=StaticFactory(default=provider), metrics=MetricsRecorder(path), stats=stats
+            )
+
+            first = runtime.respond("hi", session=SessionState.new())
+            second = runtime.respond("hi", session=SessionState.new())
+            events = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+        self.assertEqual((first.content, second.content), ("cached answer", "cached answer"))
+        self.assertEqual((first.cached, second.cached), (False, True))
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(stats.get("openai:gpt-4.1").successes, 1)
+
+
+class TestCachingProviderAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_async_stream_shares_entries_with_sync_stream(self) -> None:
+        inner = _CountingProvider()
+        provider = CachingProvider(inner, ResponseCache(None), max_temperature=0.3)
+
+        first = [c async for c in provider.achat_stream(MESSAGES, model="m", temperature=0.0, timeout_seconds=5)]
+        second = "".join(provider.chat_stream(MESSAGES, model="m", temperature=0.0, timeout_seconds=5))
+
+        self.assertEqual("".join(first), "cached answer")
+        self.assertEqual(second, "cached answer")
+        self.assertEqual(inner.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
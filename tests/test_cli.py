@@ -1,9 +1,18 @@
+import io
+import json
 import os
+import subprocess
+import sys
 import unittest
 from pathlib import Path
+from contextlib import redirect_stdout
 from tempfile import TemporaryDirectory
+from unittest import mock
 
-from src.starray.cli import cmd_init, _resolve_config_path
+from src.starray import app
+from src.starray.analyst import AnalystRuntime
+from src.starray.cli import cmd_chat, cmd_init, cmd_provider, _resolve_config_path
+from src.starray.session_index import SessionIndex
 
 
 class TestCliConfigResolution(unittest.TestCase):
@@ -66,5 +75,118 @@ class TestCliInit(unittest.TestCase):
             self.assertIn("[storage]", text)
 
 
+class TestCliChat(unittest.TestCase):
+    def _config(self, tmp_path: Path) -> Path:
+        cfg = tmp_path / "starray.toml"
+        cfg.write_text(
+            f"[provider]\nname='local'\n[storage]\ndata_dir='{tmp_path.as_posix()}'\n",
+            encoding="utf-8",
+        )
+        return cfg
+
+    def _chat(self, tmp_path: Path, message: str | None, inputs: list[str]) -> list[SessionIndex]:
+        cfg = self._config(tmp_path)
+        opened: list[SessionIndex] = []
+
+        def build_session_index(config):
+            index = SessionIndex.for_sessions_dir(tmp_path / "sessions")
+            opened.append(index)
+            return index
+
+        with (
+            mock.patch.object(app, "build_session_index", build_session_index),
+            mock.patch.object(SessionIndex, "close", autospec=True, side_effect=SessionIndex.close) as close,
+            mock.patch("builtins.input", side_effect=inputs),
+            mock.patch.object(AnalystRuntime, "close", autospec=True) as close_runtime,
+            redirect_stdout(io.StringIO()),
+        ):
+            rc = cmd_chat(cfg, message, None, use_daemon=False)
+        self.assertEqual(rc, 0)
+        close_runtime.assert_called_once()
+        self.assertEqual([call.args[0] for call in close.call_args_list], opened)
+        return opened
+
+    def test_one_shot_chat_closes_the_session_index(self) -> None:
+        with TemporaryDirectory() as tmp:
+            opened = self._chat(Path(tmp), "ship it", [])
+        self.assertEqual(len(opened), 1)
+
+    def test_interactive_chat_indexes_and_closes_on_exit(self) -> None:
+        with TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            self._chat(tmp_path, None, ["walrus", "exit"])
+            index = SessionIndex.for_sessions_dir(tmp_path / "sessions")
+            hits = index.search("walrus")
+            index.close()
+        self.assertEqual({hit.turn for hit in hits}, {0, 1})
+
+    def test_provider_command_closes_the_runtime(self) -> None:
+        with TemporaryDirectory() as tmp:
+            cfg = self._config(Path(tmp))
+            with (
+                mock.patch.object(AnalystRuntime, "close", autospec=True) as close_runtime,
+                redirect_stdout(io.StringIO()),
+            ):
+                self.assertEqual(cmd_provider(cfg), 0)
+        close_runtime.assert_called_once()
+
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+IMPORT_BUDGET_SECONDS = 0.3
+HEAVY_MODULES = ("litellm", "httpx", "openai", "anthropic")
+
+_STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from starray import cli
+elapsed = time.perf_counter() - started
+before = set(sys.modules)
+try:
+    cli.main(sys.argv[1:])
+except SystemExit:
+    pass
+print(json.dumps({"import_seconds": elapsed, "modules": sorted(set(sys.modules) | before)}))
+"""
+
+
+def _probe_startup(*argv: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR), NO_COLOR="1")
+    result = subprocess.run(
+        [sys.executable, "-c", _STARTUP_PROBE, *argv],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestCliStartup(unittest.TestCase):
+    def test_cli_import_stays_within_budget(self) -> None:
+        probe = _probe_startup("--version")
+        self.assertLess(probe["import_seconds"], IMPORT_BUDGET_SECONDS)
+        self.assertNotIn("starray.providers", probe["modules"])
+
+    def test_lightweight_commands_never_import_provider_sdks(self) -> None:
+        with TemporaryDirectory() as tmp:
+            cfg = Path(tmp) / "starray.toml"
+            cfg.write_text(
+                f"[provider]\nname='openai'\n[storage]\ndata_dir='{Path(tmp).as_posix()}'\n",
+                encoding="utf-8",
+            )
+            for argv in (
+                ["status", "-c", str(cfg)],
+                ["init", "-c", str(Path(tmp) / "new.toml")],
+                ["sessions", "-c", str(cfg), "list"],
+            ):
+                modules = _probe_startup(*argv)["modules"]
+                self.assertNotIn("starray.providers", modules, argv)
+                self.assertNotIn("starray.analyst", modules, argv)
+
+            modules = _probe_startup("provider", "-c", str(cfg))["modules"]
+            for heavy in HEAVY_MODULES:
+                self.assertNotIn(heavy, modules)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,186 @@
+import os
+import socket
+import threading
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from src.starray import app
+
+from src.starray import daemon
+from src.starray.daemon import StarrayDaemon, daemon_pid, forward_chat, shutdown_daemon
+from src.starray.session import load_session
+from src.starray.session_index import SessionIndex
+
+
+class TestDaemon(unittest.TestCase):
+    def test_forward_chat_returns_none_without_daemon(self) -> None:
+        with TemporaryDirectory() as tmp:
+            result = forward_chat(
+                Path(tmp) / "daemon.sock",
+                Path(tmp) / "starray.toml",
+                "hello",
+                None,
+                on_session=lambda event: None,
+                on_token=lambda text: None,
+            )
+            self.assertIsNone(result)
+
+    def test_chat_turn_is_served_by_warm_daemon(self) -> None:
+        with TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            config = tmp_path / "starray.toml"
+            config.write_text(
+                f"[provider]\nname='local'\n[storage]\ndata_dir='{tmp_path.as_posix()}'\n",
+                encoding="utf-8",
+            )
+            sock = tmp_path / "daemon.sock"
+            server = StarrayDaemon(sock)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                self.assertIsNotNone(daemon_pid(sock))
+                sessions: list[dict] = []
+                tokens: list[str] = []
+
+                done = forward_chat(
+                    sock, config, "ship it", None, on_session=sessions.append, on_token=tokens.append
+                )
+
+                self.assertIsNotNone(done)
+                self.assertEqual(done["response"]["provider"], "local")
+                self.assertIn("ship it", "".join(tokens))
+                self.assertEqual(sessions[0]["session_id"], done["session_id"])
+                saved = load_session(tmp_path / "sessions", done["session_id"])
+                self.assertEqual([t["role"] for t in saved.turns], ["user", "analyst"])
+            finally:
+                self.assertTrue(shutdown_daemon(sock))
+                thread.join(timeout=5)
+                server.server_close()
+            self.assertFalse(sock.exists())
+
+    def test_concurrent_chats_on_one_session_keep_both_exchanges(self) -> None:
+        run_turn = app.run_turn
+        with TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            config = tmp_path / "starray.toml"
+            config.write_text(
+                f"[provider]\nname='local'\n[storage]\ndata_dir='{tmp_path.as_posix()}'\n",
+                encoding="utf-8",
+            )
+            sock = tmp_path / "daemon.sock"
+            server = StarrayDaemon(sock)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                first = forward_chat(
+                    sock, config, "opening", None, on_session=lambda event: None, on_token=lambda text: None
+                )
+                session_id = first["session_id"]
+                seen: list[int] = []
+
+                def slow_turn(user_text, runtime, state, *args, **kwargs):
+                    seen.append(state.turn_count)
+                    time.sleep(0.2)
+                    return run_turn(user_text, runtime, state, *args, **kwargs)
+
+                def chat(message: str) -> None:
+                    forward_chat(
+                        sock, config, message, session_id, on_session=lambda event: None, on_token=lambda text: None
+                    )
+
+                clients = [threading.Thread(target=chat, args=(word,)) for word in ("walrus", "pelican")]
+                with mock.patch.object(app, "run_turn", slow_turn):
+                    for client in clients:
+                        client.start()
+                    for client in clients:
+                        client.join(timeout=10)
+            finally:
+                shutdown_daemon(sock)
+                thread.join(timeout=5)
+                server.server_close()
+
+            saved = load_session(tmp_path / "sessions", session_id)
+            users = [t["content"] for t in saved.turns if t["role"] == "user"]
+            index = SessionIndex.for_sessions_dir(tmp_path / "sessions")
+            turns = sorted(hit.turn for word in ("walrus", "pelican") for hit in index.search(word))
+            summary = index.list_sessions()[0]
+            index.close()
+
+        self.assertEqual(sorted(seen), [2, 4])
+        self.assertEqual(users[0], "opening")
+        self.assertEqual(sorted(users[1:]), ["pelican", "walrus"])
+        self.assertEqual(summary.turn_count, 6)
+        self.assertEqual(len(set(turns)), len(turns))
+        self.assertEqual(turns[0], 2)
+
+    def test_client_disconnect_mid_stream_still_saves_the_turn(self) -> None:
+        with TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            config = tmp_path / "starray.toml"
+            config.write_text(
+                f"[provider]\nname='local'\n[storage]\ndata_dir='{tmp_path.as_posix()}'\n",
+                encoding="utf-8",
+            )
+            server = StarrayDaemon(tmp_path / "daemon.sock")
+            events: list[dict] = []
+
+            def send(event: dict) -> None:
+                if event["event"] == "token":
+                    raise BrokenPipeError(32, "Broken pipe")
+                events.append(event)
+
+            try:
+                server.handle_chat({"config": str(config), "message": "ship it"}, send)
+            finally:
+                server.server_close()
+            saved = load_session(tmp_path / "sessions", events[0]["session_id"])
+
+        self.assertEqual(events[-1]["event"], "done")
+        self.assertEqual([t["role"] for t in saved.turns], ["user", "analyst"])
+
+    def test_config_change_closes_the_replaced_runtime_after_its_turn(self) -> None:
+        with TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            config = tmp_path / "starray.toml"
+            config.write_text(
+                f"[provider]\nname='local'\n[storage]\ndata_dir='{tmp_path.as_posix()}'\n",
+                encoding="utf-8",
+            )
+            server = StarrayDaemon(tmp_path / "daemon.sock")
+            try:
+                old = server._acquire_runtime(config)
+                stat = config.stat()
+                os.utime(config, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+                with mock.patch.object(old.runtime, "close", wraps=old.runtime.close) as close_old:
+                    events: list[dict] = []
+                    server.handle_chat({"config": str(config), "message": "ship it"}, events.append)
+                    close_old.assert_not_called()
+                    server._release_runtime(old)
+                    close_old.assert_called_once()
+                self.assertEqual(events[-1]["event"], "done")
+                self.assertEqual(len(server._runtimes), 1)
+                self.assertEqual(server._session_locks, {})
+            finally:
+                server.server_close()
+
+    def test_status_gives_up_on_a_daemon_that_never_answers(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "daemon.sock"
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(str(path))
+            listener.listen(1)
+            try:
+                with mock.patch.object(daemon, "CONTROL_TIMEOUT_SECONDS", 0.2):
+                    started = time.monotonic()
+                    self.assertIsNone(daemon_pid(path))
+                    self.assertFalse(shutdown_daemon(path))
+                self.assertLess(time.monotonic() - started, 5)
+            finally:
+                listener.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import json
+import threading
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.health import CLOSED, HALF_OPEN, OPEN, RouteHealthTracker
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRouteHealthTracker(unittest.TestCase):
+    def test_breaker_opens_then_half_opens_after_cooldown(self) -> None:
+        clock = _Clock()
+        tracker = RouteHealthTracker(failure_threshold=2, cooldown_seconds=30, clock=clock)
+
+        tracker.record_failure("openai:gpt-4.1", "quota")
+        self.assertEqual(tracker.state("openai:gpt-4.1"), CLOSED)
+        tracker.record_failure("openai:gpt-4.1", "quota")
+        self.assertEqual(tracker.state("openai:gpt-4.1"), OPEN)
+        self.assertFalse(tracker.allows("openai:gpt-4.1"))
+        self.assertTrue(tracker.provider_open("openai"))
+
+        clock.now += 30
+        self.assertEqual(tracker.state("openai:gpt-4.1"), HALF_OPEN)
+        tracker.record_failure("openai:gpt-4.1", "still down")
+        self.assertEqual(tracker.state("openai:gpt-4.1"), OPEN)
+
+        clock.now += 30
+        tracker.record_success("openai:gpt-4.1")
+        self.assertEqual(tracker.state("openai:gpt-4.1"), CLOSED)
+
+    def test_state_persists_across_loads(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "health.json"
+            tracker = RouteHealthTracker.load(path, failure_threshold=1)
+            tracker.record_failure("anthropic:claude", "missing key")
+
+            reloaded = RouteHealthTracker.load(path, failure_threshold=1)
+
+            self.assertEqual(reloaded.state("anthropic:claude"), OPEN)
+            self.assertEqual(reloaded.snapshot()["anthropic:claude"].last_error, "missing key")
+
+    def test_half_open_route_admits_a_single_trial(self) -> None:
+        clock = _Clock()
+        tracker = RouteHealthTracker(failure_threshold=1, cooldown_seconds=30, clock=clock)
+        tracker.record_failure("openai:gpt-4.1", "quota")
+        clock.now += 30
+
+        self.assertEqual(tracker.acquire("openai:gpt-4.1"), HALF_OPEN)
+        self.assertIsNone(tracker.acquire("openai:gpt-4.1"))
+        self.assertFalse(tracker.allows("openai:gpt-4.1"))
+
+        tracker.release("openai:gpt-4.1")
+        self.assertEqual(tracker.acquire("openai:gpt-4.1"), HALF_OPEN)
+        clock.now += 30
+        self.assertEqual(tracker.acquire("openai:gpt-4.1"), HALF_OPEN, "a stuck trial gives up its slot")
+
+        tracker.record_success("openai:gpt-4.1")
+        self.assertEqual(tracker.acquire("openai:gpt-4.1"), CLOSED)
+        self.assertEqual(tracker.acquire("openai:gpt-4.1"), CLOSED)
+
+    def test_counter_updates_are_debounced_but_transitions_are_written_at_once(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "health.json"
+            clock = _Clock()
+            tracker = RouteHealthTracker(
+                path, failure_threshold=2, save_interval_seconds=10, clock=clock
+            )
+
+            def saved() -> dict:
+                return json.loads(path.read_text(encoding="utf-8"))["routes"]["openai:gpt-4.1"]
+
+            tracker.record_success("openai:gpt-4.1")
+            tracker.record_success("openai:gpt-4.1")
+            self.assertEqual(saved()["total_successes"], 1)
+
+            tracker.record_failure("openai:gpt-4.1", "quota")
+            tracker.record_failure("openai:gpt-4.1", "quota")
+            self.assertEqual((saved()["state"], saved()["total_failures"]), (OPEN, 2))
+
+            clock.now += 1
+            tracker.record_failure("openai:gpt-4.1", "quota")
+            self.assertEqual(saved()["total_failures"], 2)
+            tracker.close()
+            self.assertEqual(saved()["total_failures"], 3)
+
+    def test_concurrent_updates_never_leave_a_stale_file(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "health.json"
+            tracker = RouteHealthTracker(path, save_interval_seconds=0)
+
+            def record() -> None:
+                for _ in range(50):
+                    tracker.record_success("openai:gpt-4.1")
+
+            threads = [threading.Thread(target=record) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            routes = json.loads(path.read_text(encoding="utf-8"))["routes"]
+            self.assertEqual(routes["openai:gpt-4.1"]["total_successes"], 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
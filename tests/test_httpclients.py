@@ -0,0 +1,179 @@
+import asyncio
+import http.server
+import importlib.machinery
+import sys
+import threading
+import types
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray import providers
+from src.starray.config import load_config
+from src.starray.httpclients import HttpClientPool, HttpPoolConfig
+from src.starray.providers import ChatMessage, LiteLLMProvider
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        self.server.peers.append(self.client_address)
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.do_GET()
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - http.server signature
+        pass
+
+
+class _StandInServer:
+    def __enter__(self) -> "_StandInServer":
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.peers = []
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def connections(self) -> int:
+        return len(set(self.server.peers))
+
+
+@unittest.skipUnless(HttpClientPool.available(), "httpx is not installed")
+class TestHttpClientPool(unittest.TestCase):
+    def test_sync_client_reuses_one_keep_alive_connection(self) -> None:
+        pool = HttpClientPool(HttpPoolConfig(max_connections=4))
+        with _StandInServer() as server:
+            for _ in range(5):
+                pool.client().get(server.url).raise_for_status()
+            pool.close()
+
+            self.assertEqual(len(server.server.peers), 5)
+            self.assertEqual(server.connections, 1)
+        self.assertIsNone(pool.client())
+
+    def test_concurrent_threads_share_the_pool(self) -> None:
+        pool = HttpClientPool(HttpPoolConfig(max_connections=4, max_keepalive_connections=4))
+        with _StandInServer() as server:
+
+            def worker() -> None:
+                for _ in range(10):
+                    pool.client().get(server.url).raise_for_status()
+
+            threads = [threading.Thread(target=worker) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            pool.close()
+
+            self.assertEqual(len(server.server.peers), 40)
+            self.assertLessEqual(server.connections, 4)
+
+    def test_async_client_is_reused_within_a_loop(self) -> None:
+        pool = HttpClientPool()
+
+        async def run(url: str) -> None:
+            client = pool.async_client()
+            for _ in range(4):
+                (await client.get(url)).raise_for_status()
+            self.assertIs(pool.async_client(), client)
+            await pool.aclose()
+
+        with _StandInServer() as server:
+            asyncio.run(run(server.url))
+            self.assertEqual(server.connections, 1)
+        pool.close()
+
+
+def _litellm_over_http(url: str) -> types.ModuleType:
+    """Stand-in LiteLLM that posts the way its OpenAI route does: through the module sessions."""
+    module = types.ModuleType("litellm")
+    module.__spec__ = importlib.machinery.ModuleSpec("litellm", None)
+    module.client_session = None
+    module.aclient_session = None
+    module.async_sessions = []
+    reply = {"choices": [{"message": {"content": "ok"}}]}
+
+    def completion(**kwargs):
+        module.client_session.post(url, json={"model": kwargs["model"]}).raise_for_status()
+        return reply
+
+    async def acompletion(**kwargs):
+        module.async_sessions.append(module.aclient_session)
+        (await module.aclient_session.post(url, json={"model": kwargs["model"]})).raise_for_status()
+        return reply
+
+    module.completion = completion
+    module.acompletion = acompletion
+    return module
+
+
+@unittest.skipUnless(HttpClientPool.available(), "httpx is not installed")
+class TestLiteLLMPooling(unittest.TestCase):
+    def setUp(self) -> None:
+        self._saved_module = sys.modules.get("litellm")
+        providers._litellm_module = None
+
+    def tearDown(self) -> None:
+        providers._litellm_module = None
+        if self._saved_module is None:
+            sys.modules.pop("litellm", None)
+        else:
+            sys.modules["litellm"] = self._saved_module
+
+    def test_sequential_calls_reuse_one_connection_and_async_calls_stay_on_their_loop(self) -> None:
+        pool = HttpClientPool()
+        messages = [ChatMessage(role="user", content="hi")]
+
+        async def two_calls() -> None:
+            for _ in range(2):
+                await provider.achat(messages, model="gpt-4.1", temperature=0.0, timeout_seconds=5.0)
+            await pool.aclose()
+
+        with _StandInServer() as server:
+            litellm = sys.modules["litellm"] = _litellm_over_http(server.url)
+            provider = LiteLLMProvider("openai", http=pool)
+            for _ in range(2):
+                provider.chat(messages, model="gpt-4.1", temperature=0.0, timeout_seconds=5.0)
+            self.assertEqual(server.connections, 1)
+            asyncio.run(two_calls())
+            asyncio.run(two_calls())
+            pool.close()
+
+            self.assertEqual(len(server.server.peers), 6)
+            # One sync connection plus one per event loop, each reused for both of its calls.
+            self.assertEqual(server.connections, 3)
+        self.assertEqual(len({id(session) for session in litellm.async_sessions}), 1)
+        self.assertIsNone(litellm.client_session)
+        self.assertIsNone(litellm.aclient_session)
+
+
+class TestHttpConfig(unittest.TestCase):
+    def test_config_parses_http_section(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "starray.toml"
+            path.write_text("[http]\nmax_connections = 8\nkeepalive_expiry_seconds = 5\nhttp2 = true\n", encoding="utf-8")
+            cfg = load_config(path)
+
+        self.assertEqual(cfg.http_max_connections, 8)
+        self.assertEqual(cfg.http_max_keepalive_connections, 10)
+        self.assertEqual(cfg.http_keepalive_expiry_seconds, 5.0)
+        self.assertTrue(cfg.http_http2)
+
+
+if __name__ == "__main__":
+    unittest.main()
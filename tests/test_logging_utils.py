@@ -0,0 +1,124 @@
+import json
+import logging
+import threading
+import unittest
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.config import load_config
+from src.starray.logging_utils import (
+    LogWriterConfig,
+    SessionLogWriter,
+    build_session_logger,
+    release_session_logger,
+)
+
+
+def _records(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class _Blocker:
+    """Formats only once released, holding the writer thread inside a batch."""
+
+    def __init__(self) -> None:
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __str__(self) -> str:
+        self.entered.set()
+        self.release.wait(5)
+        return "blocker"
+
+
+class TestSessionLogWriter(unittest.TestCase):
+    def test_records_are_written_as_json_with_extra_fields(self) -> None:
+        with TemporaryDirectory() as tmp:
+            writer = SessionLogWriter(Path(tmp))
+            logger = build_session_logger(Path(tmp), "s1", writer)
+            logger.info("analyst", extra={"provider": "openai", "latency_seconds": 0.25, "content": "héllo"})
+            logger.info("user %s", "bob")
+            self.assertTrue(writer.flush(5))
+
+            records = _records(Path(tmp) / "s1.log")
+            writer.close()
+
+        self.assertEqual([r["event"] for r in records], ["analyst", "user bob"])
+        self.assertEqual(records[0]["provider"], "openai")
+        self.assertEqual(records[0]["content"], "héllo")
+        self.assertEqual(records[0]["session_id"], "s1")
+        self.assertEqual(records[0]["level"], "INFO")
+
+    def test_loggers_are_not_registered_and_release_closes_the_file(self) -> None:
+        with TemporaryDirectory() as tmp:
+            writer = SessionLogWriter(Path(tmp))
+            logger = build_session_logger(Path(tmp), "released", writer)
+            logger.info("user")
+            release_session_logger(logger)
+            self.assertTrue(writer.flush(5))
+
+            self.assertNotIn("starray.session.released", logging.root.manager.loggerDict)
+            self.assertEqual(logger.handlers, [])
+            self.assertEqual(writer._files, {})
+            self.assertEqual(len(_records(Path(tmp) / "released.log")), 1)
+            writer.close()
+
+    def test_rotates_by_size_and_keeps_backup_count(self) -> None:
+        with TemporaryDirectory() as tmp:
+            writer = SessionLogWriter(Path(tmp), LogWriterConfig(max_bytes=200, backup_count=2))
+            logger = build_session_logger(Path(tmp), "big", writer)
+            for index in range(12):
+                logger.info("user", extra={"content": "x" * 100, "n": index})
+                writer.flush(5)
+            writer.close()
+
+            names = sorted(path.name for path in Path(tmp).iterdir())
+            newest = _records(Path(tmp) / "big.log")
+
+        self.assertEqual(names, ["big.1.log", "big.2.log", "big.log"])
+        self.assertEqual(newest[-1]["n"], 11)
+
+    def test_rotates_files_whose_first_record_is_too_old(self) -> None:
+        with TemporaryDirectory() as tmp:
+            old = (datetime.now(UTC) - timedelta(days=2)).isoformat()
+            (Path(tmp) / "aged.log").write_text(json.dumps({"ts": old, "event": "user"}) + "\n", encoding="utf-8")
+            writer = SessionLogWriter(Path(tmp), LogWriterConfig(max_age_seconds=24 * 3600))
+            build_session_logger(Path(tmp), "aged", writer).info("analyst")
+            writer.close()
+
+            self.assertEqual(_records(Path(tmp) / "aged.1.log")[0]["ts"], old)
+            self.assertEqual([r["event"] for r in _records(Path(tmp) / "aged.log")], ["analyst"])
+
+    def test_full_queue_drops_records_instead_of_blocking(self) -> None:
+        with TemporaryDirectory() as tmp:
+            writer = SessionLogWriter(Path(tmp), LogWriterConfig(queue_size=2))
+            logger = build_session_logger(Path(tmp), "busy", writer)
+            blocker = _Blocker()
+            logger.info("first %s", blocker)
+            self.assertTrue(blocker.entered.wait(5))
+            for index in range(5):
+                logger.info("user", extra={"n": index})
+            blocker.release.set()
+            writer.close()
+
+            records = _records(Path(tmp) / "busy.log")
+
+        self.assertEqual(writer.dropped_total, 3)
+        self.assertEqual([r.get("n") for r in records if r["event"] == "user"], [0, 1])
+        self.assertEqual([r["count"] for r in records if r["event"] == "dropped"], [3])
+
+    def test_config_parses_logging_section(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "starray.toml"
+            path.write_text("[logging]\nmax_mb = 1\nmax_age_days = 0.5\nbackup_count = 2\n", encoding="utf-8")
+            cfg = load_config(path)
+
+        self.assertEqual(cfg.log_max_bytes, 1024 * 1024)
+        self.assertEqual(cfg.log_max_age_seconds, 12 * 3600)
+        self.assertEqual(cfg.log_backup_count, 2)
+        self.assertEqual(cfg.log_queue_size, 10_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
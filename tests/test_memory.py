@@ -0,0 +1,80 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.memory import SUMMARY_PREFIX, ContextBuilder, extractive_summary
+from src.starray.session import SessionState, load_session
+
+
+def _session(count: int) -> SessionState:
+    session = SessionState.new()
+    for index in range(count):
+        session.add_turn("user" if index % 2 == 0 else "analyst", f"message {index}. More detail.")
+    return session
+
+
+class TestContextBuilder(unittest.TestCase):
+    def test_recent_turns_are_sent_verbatim_with_roles(self) -> None:
+        builder = ContextBuilder(token_budget=1000, recent_turns=4, summary_chunk_turns=10)
+
+        messages = builder.build(_session(3), "system prompt", "next question")
+
+        self.assertEqual([m.role for m in messages], ["system", "user", "assistant", "user", "user"])
+        self.assertEqual(messages[1].content, "message 0. More detail.")
+        self.assertEqual(messages[-1].content, "next question")
+
+    def test_older_turns_are_checkpointed_once_and_stored_with_session(self) -> None:
+        calls: list[int] = []
+
+        def summarizer(previous, turns):
+            calls.append(len(turns))
+            return extractive_summary(previous, turns)
+
+        builder = ContextBuilder(token_budget=1000, recent_turns=4, summary_chunk_turns=5, summarizer=summarizer)
+        session = _session(10)
+
+        messages = builder.build(session, "system prompt", "q")
+        builder.build(session, "system prompt", "q")
+
+        self.assertEqual(calls, [5])
+        self.assertEqual(session.summary_upto, 5)
+        self.assertTrue(messages[1].content.startswith(SUMMARY_PREFIX))
+        self.assertIn("message 0", messages[1].content)
+        self.assertEqual(len(messages), 2 + 5 + 1)
+
+        with TemporaryDirectory() as tmp:
+            session.save(Path(tmp))
+            loaded = load_session(Path(tmp), session.session_id, tail_turns=2)
+            self.assertEqual(loaded.summary, session.summary)
+            self.assertEqual(loaded.summary_upto, 5)
+
+    def test_long_backlog_is_summarized_one_chunk_at_a_time(self) -> None:
+        calls: list[tuple[str | None, str, int]] = []
+
+        def summarizer(previous, turns):
+            calls.append((previous, turns[0]["content"], len(turns)))
+            return f"through {turns[-1]['content']}"
+
+        builder = ContextBuilder(token_budget=1000, recent_turns=4, summary_chunk_turns=5, summarizer=summarizer)
+        session = _session(30)
+
+        self.assertTrue(builder.checkpoint(session))
+        self.assertFalse(builder.checkpoint(session))
+
+        self.assertEqual([size for _, _, size in calls], [5, 5, 5, 5, 5])
+        self.assertEqual(calls[0][:2], (None, "message 0. More detail."))
+        self.assertEqual(calls[1][:2], ("through message 4. More detail.", "message 5. More detail."))
+        self.assertEqual(session.summary_upto, 25)
+        self.assertEqual(session.summary, "through message 24. More detail.")
+
+    def test_token_budget_bounds_recent_turns(self) -> None:
+        builder = ContextBuilder(token_budget=30, recent_turns=50, summary_chunk_turns=100)
+
+        messages = builder.build(_session(20), "sys", "q")
+
+        self.assertLess(len(messages), 22)
+        self.assertEqual(messages[-2].content, "message 19. More detail.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import json
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.analyst import AnalystRuntime
+from src.starray.metrics import (
+    CallEvent,
+    MetricsAggregator,
+    MetricsRecorder,
+    parse_window,
+    percentile,
+    read_events,
+)
+from src.starray.providers import LocalEchoProvider, ProviderError
+from src.starray.session import SessionState
+from tests.helpers import StaticFactory, analyst_config
+
+
+def _event(route: str, latency: float, *, role: str = "analyst", error: str | None = None, **kwargs) -> CallEvent:
+    values = dict(
+        timestamp=time.time(),
+        session_id="s1",
+        role=role,
+        route=route,
+        attempt=1,
+        ttfb_seconds=None if error else latency / 2,
+        latency_seconds=latency,
+        prompt_tokens=100,
+        completion_tokens=0 if error else 20,
+        cost=0.0,
+        error_class=error,
+    )
+    values.update(kwargs)
+    return CallEvent(**values)
+
+
+class _FailingProvider(LocalEchoProvider):
+    name = "openai"
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        try:
+            raise TimeoutError("read timed out")
+        except TimeoutError as exc:
+            raise ProviderError("openai provider request failed: read timed out") from exc
+        yield ""  # pragma: no cover - makes this a generator
+
+
+class TestMetricsAggregator(unittest.TestCase):
+    def test_percentiles_use_nearest_rank(self) -> None:
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 95), 95.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize_by_route_and_role_counts_errors_separately(self) -> None:
+        aggregator = MetricsAggregator(
+            [_event("openai:gpt-4.1", 0.1 * i) for i in range(1, 11)]
+            + [_event("openai:gpt-4.1", 9.0, error="RateLimitError")]
+            + [_event("local:gpt-4.1", 0.01, role="summarizer")]
+        )
+
+        by_route = aggregator.summarize("route")
+        by_role = aggregator.summarize("role")
+
+        self.assertEqual((by_route["openai:gpt-4.1"].calls, by_route["openai:gpt-4.1"].errors), (11, 1))
+        self.assertAlmostEqual(by_route["openai:gpt-4.1"].p50, 0.5)
+        self.assertAlmostEqual(by_route["openai:gpt-4.1"].p99, 1.0)
+        self.assertEqual(set(by_role), {"analyst", "summarizer"})
+        self.assertIn("openai:gpt-4.1", aggregator.format_table("route"))
+
+    def test_percentiles_cover_a_bounded_window_while_totals_stay_exact(self) -> None:
+        aggregator = MetricsAggregator(
+            [_event("openai:gpt-4.1", float(i)) for i in range(1, 21)]
+            + [_event("openai:gpt-4.1", 0.5, error="TimeoutError")],
+            window=5,
+        )
+
+        summary = aggregator.summarize()["openai:gpt-4.1"]
+
+        self.assertEqual((len(aggregator), summary.calls, summary.errors), (21, 21, 1))
+        self.assertEqual((summary.p50, summary.p99), (18.0, 20.0))
+        self.assertEqual(summary.prompt_tokens, 21 * _event("x", 0.0).prompt_tokens)
+        with self.assertRaises(ValueError):
+            aggregator.summarize("session_id")
+
+    def test_parse_window(self) -> None:
+        self.assertEqual(parse_window("30m"), 1800)
+        self.assertEqual(parse_window("2d"), 172800)
+        with self.assertRaises(ValueError):
+            parse_window("soon")
+
+
+class TestMetricsRecorder(unittest.TestCase):
+    def test_events_round_trip_through_jsonl_with_filters(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "metrics.jsonl"
+            recorder = MetricsRecorder(path)
+            recorder.emit(_event("openai:gpt-4.1", 0.2, timestamp=100.0))
+            recorder.emit(_event("openai:gpt-4.1", 0.3, session_id="s2"))
+            with path.open("a", encoding="utf-8") as fh:
+                fh.write('{"timestamp": 1, "rou')
+
+            self.assertEqual(len(recorder.aggregator), 2)
+            self.assertEqual(len(list(read_events(path))), 2)
+            self.assertEqual([e.session_id for e in read_events(path, session_id="s2")], ["s2"])
+            self.assertEqual(len(list(read_events(path, since=1000.0))), 1)
+
+    def test_runtime_emits_one_event_per_attempt(self) -> None:
+        factory = StaticFactory({"openai": _FailingProvider()}, default=LocalEchoProvider())
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "metrics.jsonl"
+            runtime = AnalystRuntime(analyst_config(), provider_factory=factory, metrics=MetricsRecorder(path))
+            session = SessionState.new()
+
+            runtime.respond("hi", session=session)
+            events = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+        self.assertEqual([e["route"] for e in events], ["openai:gpt-4.1", "local:gpt-4.1"])
+        self.assertEqual([e["attempt"] for e in events], [1, 2])
+        self.assertEqual(events[0]["error_class"], "TimeoutError")
+        self.assertIsNone(events[0]["ttfb_seconds"])
+        self.assertIsNone(events[1]["error_class"])
+        self.assertIsNotNone(events[1]["ttfb_seconds"])
+        self.assertGreater(events[1]["completion_tokens"], 0)
+        self.assertEqual({e["session_id"] for e in events}, {session.session_id})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import threading
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.analyst import AnalystRuntime
+from src.starray.app import build_prefetcher
+from src.starray.config import AppConfig, load_config
+from src.starray.prefetch import Prefetcher
+from src.starray.providers import LocalEchoProvider, ProviderError
+from src.starray.session import SessionState
+from tests.helpers import StaticFactory, analyst_config
+
+
+class _WarmableProvider(LocalEchoProvider):
+    name = "openai"
+
+    def __init__(self, gate: threading.Event | None = None) -> None:
+        self.gate = gate
+        self.warm_calls: list[bool] = []
+
+    def warm(self, connect: bool = True) -> None:
+        self.warm_calls.append(connect)
+        if self.gate is not None:
+            self.gate.wait(5)
+
+
+class _UnreachableProvider(_WarmableProvider):
+    def warm(self, connect: bool = True) -> None:
+        raise ProviderError("dns failed")
+
+
+def _config(**overrides) -> AppConfig:
+    return analyst_config(role_models={}, role_fallback_models={}, **overrides)
+
+
+def _runtime(provider: _WarmableProvider, **overrides) -> AnalystRuntime:
+    factory = StaticFactory({"openai": provider}, default=LocalEchoProvider())
+    return AnalystRuntime(_config(**overrides), provider_factory=factory)
+
+
+def _session(turns: int) -> SessionState:
+    state = SessionState.new()
+    for index in range(turns):
+        state.add_turn("user" if index % 2 == 0 else "analyst", f"Turn {index}. More detail here.")
+    return state
+
+
+class TestPrefetcher(unittest.TestCase):
+    def test_prepares_routes_providers_and_context(self) -> None:
+        provider = _WarmableProvider()
+        runtime = _runtime(provider, memory_recent_turns=2, memory_summary_chunk_turns=4)
+        state = _session(8)
+        prefetcher = Prefetcher(runtime, warm_connections=False)
+
+        self.assertTrue(prefetcher.start(state))
+        report = prefetcher.wait(5)
+
+        self.assertEqual(report.routes[0], "openai:gpt-4.1")
+        self.assertEqual(report.warmed, ["openai"])
+        self.assertEqual(provider.warm_calls, [False])
+        self.assertTrue(report.context_ready)
+        self.assertFalse(report.cancelled)
+        self.assertEqual(state.summary_upto, 4)
+        self.assertIn("Turn 0", state.summary)
+
+    def test_recently_warmed_providers_are_not_warmed_again(self) -> None:
+        provider = _WarmableProvider()
+        prefetcher = Prefetcher(_runtime(provider), rewarm_seconds=60)
+
+        prefetcher.start()
+        prefetcher.wait(5)
+        prefetcher.start()
+        report = prefetcher.wait(5)
+
+        self.assertEqual(provider.warm_calls, [True])
+        self.assertEqual(report.warmed, [])
+
+    def test_cancel_returns_immediately_and_stops_before_the_next_stage(self) -> None:
+        gate = threading.Event()
+        provider = _WarmableProvider(gate)
+        state = _session(40)
+        prefetcher = Prefetcher(_runtime(provider, memory_recent_turns=2, memory_summary_chunk_turns=4))
+
+        prefetcher.start(state)
+        while not provider.warm_calls:
+            time.sleep(0.01)
+        self.assertFalse(prefetcher.start(state))
+        prefetcher.cancel()
+        self.assertTrue(prefetcher.running)
+        gate.set()
+        report = prefetcher.wait(5)
+
+        self.assertTrue(report.cancelled)
+        self.assertFalse(report.context_ready)
+        self.assertIsNone(state.summary)
+
+    def test_provider_errors_are_reported_not_raised(self) -> None:
+        provider = _UnreachableProvider()
+        prefetcher = Prefetcher(_runtime(provider))
+
+        prefetcher.start(_session(2))
+        report = prefetcher.wait(5)
+
+        self.assertEqual(report.errors, ["openai: dns failed"])
+        self.assertTrue(report.context_ready)
+
+
+class TestPrefetchConfig(unittest.TestCase):
+    def test_config_enables_prefetch(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "starray.toml"
+            path.write_text("[prefetch]\nenabled = true\nwarm_connections = false\n", encoding="utf-8")
+            cfg = load_config(path)
+
+        self.assertTrue(cfg.prefetch_enabled)
+        self.assertFalse(cfg.prefetch_warm_connections)
+        self.assertIsInstance(build_prefetcher(cfg, _runtime(_WarmableProvider())), Prefetcher)
+        self.assertIsNone(build_prefetcher(_config(), None))
+
+
+if __name__ == "__main__":
+    unittest.main()
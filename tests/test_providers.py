@@ -0,0 +1,100 @@
+import contextlib
+import importlib.machinery
+import io
+import logging
+import sys
+import threading
+import time
+import types
+import unittest
+
+from src.starray import providers
+from src.starray.providers import ChatMessage, LiteLLMProvider, RateLimitError
+
+
+def _fake_litellm() -> types.ModuleType:
+    """Stand-in for LiteLLM that prints its help banner unless told not to."""
+    module = types.ModuleType("litellm")
+    module.__spec__ = importlib.machinery.ModuleSpec("litellm", None)
+    module.suppress_debug_info = False
+    module.set_verbose = True
+
+    def completion(**kwargs):
+        if not module.suppress_debug_info:
+            print("Give Feedback / Get Help: https://github.com/BerriAI/litellm/issues/new")
+        logging.getLogger("LiteLLM").warning("noisy LiteLLM log line")
+        time.sleep(0.01)
+        return {"choices": [{"message": {"content": kwargs["messages"][-1]["content"]}}]}
+
+    module.completion = completion
+    return module
+
+
+class TestLiteLLMOutput(unittest.TestCase):
+    def setUp(self) -> None:
+        self._saved_module = sys.modules.get("litellm")
+        self._saved_level = logging.getLogger("LiteLLM").level
+        sys.modules["litellm"] = _fake_litellm()
+        providers._litellm_module = None
+
+    def tearDown(self) -> None:
+        providers._litellm_module = None
+        logging.getLogger("LiteLLM").setLevel(self._saved_level)
+        if self._saved_module is None:
+            sys.modules.pop("litellm", None)
+        else:
+            sys.modules["litellm"] = self._saved_module
+
+    def test_concurrent_calls_never_swallow_other_output(self) -> None:
+        provider = LiteLLMProvider("openai")
+        stdout, stderr = io.StringIO(), io.StringIO()
+        answers: dict[int, str] = {}
+
+        def worker(index: int) -> None:
+            for turn in range(5):
+                print(f"worker {index} turn {turn}")
+                answers[index] = provider.chat(
+                    [ChatMessage(role="user", content=f"q{index}")],
+                    model="gpt-4.1",
+                    temperature=0.0,
+                    timeout_seconds=5.0,
+                )
+
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        lines = stdout.getvalue().splitlines()
+        for index in range(8):
+            for turn in range(5):
+                self.assertIn(f"worker {index} turn {turn}", lines)
+        self.assertEqual(answers, {i: f"q{i}" for i in range(8)})
+        self.assertNotIn("Give Feedback", stdout.getvalue())
+        self.assertNotIn("noisy LiteLLM", stderr.getvalue())
+
+    def test_http_429_becomes_rate_limit_error_with_retry_after(self) -> None:
+        def throttled(**kwargs):
+            raise _SdkRateLimitError({"retry-after-ms": "1500"})
+
+        sys.modules["litellm"].completion = throttled
+        with self.assertRaises(RateLimitError) as caught:
+            LiteLLMProvider("openai").chat(
+                [ChatMessage(role="user", content="hi")], model="m", temperature=0.0, timeout_seconds=5.0
+            )
+
+        self.assertEqual(caught.exception.retry_after, 1.5)
+
+
+class _SdkRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, headers: dict[str, str]) -> None:
+        super().__init__("Rate limit reached")
+        self.response = types.SimpleNamespace(headers=headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
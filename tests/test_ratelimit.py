@@ -0,0 +1,248 @@
+import asyncio
+import threading
+import time
+import unittest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.config import ConfigError, load_config
+from src.starray.providers import ChatMessage, LocalEchoProvider, RateLimitError, retry_after_seconds
+from src.starray.ratelimit import RateLimit, RateLimitedProvider, RateLimiter, tenant_scope
+
+
+MESSAGES = [ChatMessage(role="user", content="hello")]
+
+
+class _ResponseStream:
+    """Iterator with an explicit ``close`` and no finalizer, like a streamed HTTP response."""
+
+    def __init__(self, chunks: list[str]) -> None:
+        self._chunks = iter(chunks)
+        self.closed = False
+
+    def __iter__(self) -> "_ResponseStream":
+        return self
+
+    def __next__(self) -> str:
+        return next(self._chunks)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _StreamingProvider(LocalEchoProvider):
+    name = "openai"
+
+    def __init__(self) -> None:
+        self.streams: list[_ResponseStream] = []
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        self.streams.append(_ResponseStream(["a", "b", "c"]))
+        return self.streams[-1]
+
+
+class _ThrottledProvider(LocalEchoProvider):
+    """Answers 429 for the first ``failures`` calls, then streams ``chunks``."""
+
+    def __init__(self, failures: int, retry_after: float | None, chunks: list[str] | None = None) -> None:
+        self.name = "openai"
+        self.failures = failures
+        self.retry_after = retry_after
+        self.chunks = chunks or ["fine"]
+        self.calls = 0
+
+    def _maybe_throttle(self) -> None:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RateLimitError("openai provider request failed: 429", self.retry_after)
+
+    def chat(self, messages, *, model, temperature, timeout_seconds):
+        self._maybe_throttle()
+        return "".join(self.chunks)
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        self._maybe_throttle()
+        yield from self.chunks
+
+    async def achat(self, messages, *, model, temperature, timeout_seconds):
+        return self.chat(messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds)
+
+
+def _call(provider) -> str:
+    return provider.chat(MESSAGES, model="gpt-4.1", temperature=0.0, timeout_seconds=1.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_requests_per_minute_and_most_specific_key(self) -> None:
+        limiter = RateLimiter(
+            {"openai": RateLimit(rpm=2), "openai:gpt-4.1-mini": RateLimit(rpm=1)}, max_wait_seconds=0.5
+        )
+        for model in ("gpt-4.1", "o3"):
+            limiter.acquire("openai", model).release()
+        limiter.acquire("openai", "gpt-4.1-mini").release()
+
+        started = time.monotonic()
+        with self.assertRaisesRegex(RateLimitError, "openai: no rate limit capacity"):
+            limiter.acquire("openai", "gpt-4.1")
+        with self.assertRaisesRegex(RateLimitError, "openai:gpt-4.1-mini"):
+            limiter.acquire("openai", "gpt-4.1-mini")
+        # A bucket that refills after the deadline fails at once instead of waiting it out.
+        self.assertLess(time.monotonic() - started, 0.4)
+        limiter.acquire("anthropic", "claude").release()
+
+    def test_tokens_per_minute_counts_completion_tokens_afterwards(self) -> None:
+        limiter = RateLimiter({"openai": RateLimit(tpm=6000)}, max_wait_seconds=0.5)
+        permit = limiter.acquire("openai", "gpt-4.1", tokens=5000)
+        permit.release(completion_tokens=900)
+        limiter.acquire("openai", "gpt-4.1", tokens=50).release()
+
+        with self.assertRaises(RateLimitError):
+            limiter.acquire("openai", "gpt-4.1", tokens=500)
+        self.assertEqual(limiter.stats()["openai"].granted, 2)
+
+    def test_waiting_requests_are_served_round_robin_by_tenant(self) -> None:
+        limiter = RateLimiter({"openai": RateLimit(concurrency=1)}, max_wait_seconds=5)
+        holder = limiter.acquire("openai", "gpt-4.1")
+        order: list[str] = []
+
+        def request(tenant: str, label: str) -> None:
+            with tenant_scope(tenant):
+                permit = limiter.acquire("openai", "gpt-4.1")
+            order.append(label)
+            permit.release()
+
+        threads = []
+        for tenant, label in [("batch", "b1"), ("batch", "b2"), ("batch", "b3"), ("chat", "c1")]:
+            thread = threading.Thread(target=request, args=(tenant, label))
+            thread.start()
+            threads.append(thread)
+            while limiter.stats()["openai"].queued < len(threads):
+                time.sleep(0.001)
+        holder.release()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(order, ["b1", "c1", "b2", "b3"])
+        stats = limiter.stats()["openai"]
+        self.assertEqual((stats.queued, stats.active, stats.max_queue_depth, stats.waited), (0, 0, 4, 4))
+        self.assertGreater(stats.wait_p95, 0)
+
+    def test_retry_after_pauses_the_lane(self) -> None:
+        limiter = RateLimiter(max_wait_seconds=5)
+        limiter.throttled("openai", "gpt-4.1", 0.1)
+
+        started = time.monotonic()
+        limiter.acquire("openai", "gpt-4.1").release()
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+        self.assertEqual(limiter.stats()["openai:gpt-4.1"].rate_limited, 1)
+
+
+class TestRateLimitedProvider(unittest.TestCase):
+    def test_429_is_retried_on_the_same_route_after_retry_after(self) -> None:
+        inner = _ThrottledProvider(failures=2, retry_after=0.05)
+        limiter = RateLimiter(max_wait_seconds=5)
+
+        started = time.monotonic()
+        self.assertEqual(_call(RateLimitedProvider(inner, limiter)), "fine")
+
+        self.assertEqual(inner.calls, 3)
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertEqual(limiter.stats()["openai:gpt-4.1"].rate_limited, 2)
+
+    def test_429_is_raised_when_retry_after_exceeds_the_wait_budget(self) -> None:
+        inner = _ThrottledProvider(failures=1, retry_after=30)
+
+        with self.assertRaises(RateLimitError):
+            _call(RateLimitedProvider(inner, RateLimiter(max_wait_seconds=1)))
+        self.assertEqual(inner.calls, 1)
+
+    def test_streams_retry_before_the_first_chunk_and_release_their_permit(self) -> None:
+        limiter = RateLimiter({"openai": RateLimit(concurrency=1)}, max_wait_seconds=5)
+        provider = RateLimitedProvider(_ThrottledProvider(failures=1, retry_after=0, chunks=["a", "b"]), limiter)
+
+        chunks = list(provider.chat_stream(MESSAGES, model="gpt-4.1", temperature=0.0, timeout_seconds=1.0))
+        partial = provider.chat_stream(MESSAGES, model="gpt-4.1", temperature=0.0, timeout_seconds=1.0)
+        next(partial)
+        partial.close()
+
+        self.assertEqual(chunks, ["a", "b"])
+        self.assertEqual(limiter.stats()["openai"].active, 0)
+
+    def test_closing_a_stream_early_closes_the_provider_stream(self) -> None:
+        inner = _StreamingProvider()
+        provider = RateLimitedProvider(inner, RateLimiter({"openai": RateLimit(concurrency=1)}))
+
+        stream = provider.chat_stream(MESSAGES, model="gpt-4.1", temperature=0.0, timeout_seconds=1.0)
+        next(stream)
+        self.assertFalse(inner.streams[0].closed)
+        stream.close()
+
+        self.assertTrue(inner.streams[0].closed)
+
+
+class TestRateLimiterAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_waiters_leave_the_queue(self) -> None:
+        limiter = RateLimiter({"openai": RateLimit(concurrency=1)}, max_wait_seconds=5)
+        holder = await limiter.aacquire("openai", "gpt-4.1")
+        cancelled = asyncio.create_task(limiter.aacquire("openai", "gpt-4.1"))
+        waiting = asyncio.create_task(limiter.aacquire("openai", "gpt-4.1"))
+        await asyncio.sleep(0.01)
+        self.assertEqual(limiter.stats()["openai"].queued, 2)
+
+        cancelled.cancel()
+        await asyncio.sleep(0.01)
+        holder.release()
+        permit = await asyncio.wait_for(waiting, 1)
+        permit.release()
+
+        self.assertTrue(cancelled.cancelled())
+        self.assertEqual(limiter.stats()["openai"].queued, 0)
+
+    async def test_async_calls_retry_after_429(self) -> None:
+        inner = _ThrottledProvider(failures=1, retry_after=0.01)
+        provider = RateLimitedProvider(inner, RateLimiter(max_wait_seconds=5))
+
+        text = await provider.achat(MESSAGES, model="gpt-4.1", temperature=0.0, timeout_seconds=1.0)
+
+        self.assertEqual((text, inner.calls), ("fine", 2))
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_parses_milliseconds_seconds_and_http_dates(self) -> None:
+        later = format_datetime(datetime.now(UTC) + timedelta(seconds=30), usegmt=True)
+
+        self.assertEqual(retry_after_seconds({"retry-after-ms": "250"}), 0.25)
+        self.assertEqual(retry_after_seconds({"retry-after": "7"}), 7.0)
+        self.assertAlmostEqual(retry_after_seconds({"retry-after": later}), 30, delta=2)
+        self.assertIsNone(retry_after_seconds({"retry-after": "soon"}))
+        self.assertIsNone(retry_after_seconds(None))
+
+
+class TestRateLimitConfig(unittest.TestCase):
+    def test_limits_are_parsed_and_validated(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "starray.toml"
+            path.write_text(
+                '[ratelimit]\nmax_wait_seconds = 10\n\n[ratelimit.limits]\n"openai:gpt-4.1" = { rpm = 500, tpm = 30000, concurrency = 4 }\n',
+                encoding="utf-8",
+            )
+            cfg = load_config(path)
+            for invalid in (
+                '[ratelimit.limits]\nopenai = { rps = 5 }\n',
+                '[ratelimit.limits]\nopenai = { rpm = "fast" }\n',
+                '[ratelimit.limits]\nopenai = 5\n',
+                '[ratelimit]\nmax_wait_seconds = "soon"\n',
+            ):
+                path.write_text(invalid, encoding="utf-8")
+                with self.assertRaises(ConfigError, msg=invalid):
+                    load_config(path)
+
+        self.assertEqual(cfg.ratelimit_max_wait_seconds, 10)
+        self.assertEqual(cfg.ratelimit_limits, {"openai:gpt-4.1": {"rpm": 500, "tpm": 30000, "concurrency": 4}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import threading
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.analyst import AnalystRuntime
+from src.starray.config import load_config
+from src.starray.providers import LocalEchoProvider
+from src.starray.routing import CHEAPEST, FASTEST, RoutePrice, Router, RouteStatsStore, RoutingPolicy
+from tests.helpers import StaticFactory, analyst_config
+
+
+ROUTES = [("openai", "gpt-4.1"), ("openai", "gpt-4.1-mini"), ("anthropic", "claude"), ("local", "gpt-4.1")]
+
+
+def _record(store: RouteStatsStore, route: str, latency: float, times: int = 3) -> None:
+    for _ in range(times):
+        store.record_success(
+            route,
+            latency_seconds=latency,
+            first_token_seconds=latency / 2,
+            prompt_tokens=1000,
+            completion_tokens=200,
+            cost=0.0,
+        )
+
+
+class _NamedEcho(LocalEchoProvider):
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+class TestRouteStatsStore(unittest.TestCase):
+    def test_tracks_ewma_p95_and_error_rate_and_persists(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "routing.json"
+            store = RouteStatsStore(path, alpha=0.5)
+            for latency in [0.1] * 18 + [1.0, 2.0]:
+                _record(store, "openai:gpt-4.1", latency, times=1)
+            store.record_failure("openai:gpt-4.1")
+            store.close()
+
+            stats = RouteStatsStore.load(path).get("openai:gpt-4.1")
+
+            self.assertIsNotNone(stats)
+            self.assertEqual((stats.successes, stats.failures), (20, 1))
+            self.assertEqual(stats.p95_latency, 1.0)
+            self.assertAlmostEqual(stats.ewma_latency, 1.275)
+            self.assertEqual(stats.ewma_error_rate, 0.5)
+
+    def test_saves_are_debounced_and_flushed_on_close(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "routing.json"
+            now = [0.0]
+            store = RouteStatsStore(path, save_interval_seconds=10, clock=lambda: now[0])
+
+            _record(store, "openai:gpt-4.1", 0.2, times=5)
+            self.assertEqual(RouteStatsStore.load(path).get("openai:gpt-4.1").successes, 1)
+
+            now[0] += 10
+            store.record_failure("openai:gpt-4.1")
+            self.assertEqual(RouteStatsStore.load(path).get("openai:gpt-4.1").calls, 6)
+
+            store.record_failure("openai:gpt-4.1")
+            store.close()
+            self.assertEqual(RouteStatsStore.load(path).get("openai:gpt-4.1").failures, 2)
+
+    def test_concurrent_updates_never_leave_a_stale_file(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "routing.json"
+            store = RouteStatsStore(path, save_interval_seconds=0)
+            threads = [
+                threading.Thread(target=_record, args=(store, "openai:gpt-4.1", 0.1, 50)) for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(RouteStatsStore.load(path).get("openai:gpt-4.1").successes, 400)
+
+
+class TestRouter(unittest.TestCase):
+    def test_static_policy_keeps_configured_order(self) -> None:
+        router = Router(RouteStatsStore())
+        ranked = router.rank("analyst", ROUTES)
+        self.assertEqual([(r.provider, r.model) for r in ranked], ROUTES)
+
+    def test_cheapest_under_p95_limit_demotes_slow_cheap_route(self) -> None:
+        store = RouteStatsStore()
+        _record(store, "openai:gpt-4.1", 0.5)
+        _record(store, "openai:gpt-4.1-mini", 3.0)
+        router = Router(
+            store,
+            default_policy=RoutingPolicy(CHEAPEST, max_p95_ms=2000),
+            prices={
+                "openai:gpt-4.1": RoutePrice(0.002, 0.008),
+                "openai:gpt-4.1-mini": RoutePrice(0.0004, 0.0016),
+                "anthropic:claude": RoutePrice(0.001, 0.004),
+            },
+        )
+
+        ranked = router.rank("analyst", ROUTES)
+
+        # The unmeasured anthropic route is cheap and assumed fast until proven otherwise.
+        self.assertEqual(
+            [f"{r.provider}:{r.model}" for r in ranked],
+            ["anthropic:claude", "openai:gpt-4.1", "openai:gpt-4.1-mini", "local:gpt-4.1"],
+        )
+        self.assertIn("p95 over limit", ranked[2].reason)
+
+    def test_fastest_policy_ranks_by_p95_and_demotes_failing_routes(self) -> None:
+        store = RouteStatsStore()
+        _record(store, "openai:gpt-4.1", 1.2)
+        _record(store, "openai:gpt-4.1-mini", 0.4)
+        _record(store, "anthropic:claude", 0.1)
+        for _ in range(10):
+            store.record_failure("anthropic:claude")
+        router = Router(store, role_policies={"analyst": RoutingPolicy(FASTEST)})
+
+        ranked = router.rank("analyst", ROUTES)
+
+        self.assertEqual(
+            [f"{r.provider}:{r.model}" for r in ranked],
+            ["openai:gpt-4.1-mini", "openai:gpt-4.1", "anthropic:claude", "local:gpt-4.1"],
+        )
+        self.assertIn("error rate above limit", ranked[2].reason)
+        self.assertIn("Routing policy (analyst): fastest", router.explain("analyst", ROUTES))
+
+
+class TestAdaptiveRuntime(unittest.TestCase):
+    def test_runtime_routes_by_policy_and_records_calls(self) -> None:
+        cfg = analyst_config(
+            provider_fallbacks=["anthropic"],
+            routing_policy=CHEAPEST,
+            routing_prices={"openai:gpt-4.1": (0.002, 0.008), "anthropic:gpt-4.1": (0.001, 0.004)},
+        )
+        store = RouteStatsStore()
+        factory = StaticFactory({name: _NamedEcho(name) for name in ("openai", "anthropic", "local")})
+        runtime = AnalystRuntime(cfg, provider_factory=factory, stats=store)
+
+        response = runtime.respond("hi")
+
+        self.assertEqual(response.provider, "anthropic")
+        self.assertFalse(response.fallback_used)
+        stats = store.get("anthropic:gpt-4.1")
+        self.assertEqual(stats.successes, 1)
+        self.assertGreater(stats.cost, 0)
+        self.assertIn("Routing policy (analyst): cheapest", runtime.provider_summary())
+
+    def test_config_parses_routing_section(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "starray.toml"
+            path.write_text(
+                "[routing]\npolicy = 'fastest'\nmax_cost_per_call = 0.01\n"
+                "[routing.roles]\nsummarizer = 'cheapest'\n"
+                "[routing.prices.'openai:gpt-4.1']\ninput_per_1k = 0.002\noutput_per_1k = 0.008\n",
+                encoding="utf-8",
+            )
+            cfg = load_config(path)
+
+        self.assertEqual(cfg.routing_policy, FASTEST)
+        self.assertEqual(cfg.routing_role_policies, {"summarizer": CHEAPEST})
+        self.assertEqual(cfg.routing_max_cost_per_call, 0.01)
+        self.assertEqual(cfg.routing_prices["openai:gpt-4.1"], (0.002, 0.008))
+
+
+if __name__ == "__main__":
+    unittest.main()
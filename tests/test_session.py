@@ -1,8 +1,11 @@
+import json
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest import mock
 
-from src.starray.session import SessionState, load_session
+from src.starray import session as session_module
+from src.starray.session import SessionState, compact_session, load_session, session_path
 
 
 class TestSession(unittest.TestCase):
@@ -18,6 +21,200 @@ class TestSession(unittest.TestCase):
             self.assertEqual(len(loaded.turns), 1)
             self.assertEqual(loaded.turns[0]["content"], "hello")
 
+    def test_save_appends_only_new_turns(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            session = SessionState.new()
+            session.add_turn("user", "one")
+            path = session.save(session_dir)
+            session.save(session_dir)
+            session.add_turn("analyst", "two")
+            session.save(session_dir)
+
+            records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([r["type"] for r in records], ["header", "turn", "turn"])
+            self.assertEqual(records[0]["session_id"], session.session_id)
+            self.assertEqual(records[2]["content"], "two")
+
+    def test_load_trims_torn_final_record(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            session = SessionState.new()
+            session.add_turn("user", "kept")
+            path = session.save(session_dir)
+            with path.open("a", encoding="utf-8") as fh:
+                fh.write('{"type": "turn", "role": "user", "cont')
+
+            loaded = load_session(session_dir, session.session_id)
+            loaded.add_turn("user", "after crash")
+            loaded.save(session_dir)
+
+            reloaded = load_session(session_dir, session.session_id)
+            self.assertEqual([t["content"] for t in reloaded.turns], ["kept", "after crash"])
+
+    def test_legacy_json_session_is_migrated(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            legacy = session_dir / "abc.json"
+            legacy.write_text(
+                json.dumps(
+                    {
+                        "session_id": "abc",
+                        "created_at": "2026-01-01T00:00:00+00:00",
+                        "turns": [{"timestamp": "t", "role": "user", "content": "old"}],
+                    },
+                    indent=2,
+                ),
+                encoding="utf-8",
+            )
+
+            loaded = load_session(session_dir, "abc")
+
+            self.assertEqual(loaded.turns[0]["content"], "old")
+            self.assertFalse(legacy.exists())
+            self.assertTrue(session_path(session_dir, "abc").exists())
+
+    def test_compaction_keeps_turns(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            session = SessionState.new()
+            for index in range(3):
+                session.add_turn("user", f"turn {index}")
+                session.save(session_dir)
+
+            compact_session(session_dir, session.session_id)
+
+            loaded = load_session(session_dir, session.session_id)
+            self.assertEqual(len(loaded.turns), 3)
+            self.assertEqual(loaded.created_at, session.created_at)
+
+
+class TestSessionTailResume(unittest.TestCase):
+    def _write_session(self, session_dir: Path, count: int) -> SessionState:
+        session = SessionState.new()
+        for index in range(count):
+            session.add_turn("user", f"turn {index}")
+            session.save(session_dir)
+        return session
+
+    def test_tail_resume_loads_recent_turns_and_pages_history(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            session = self._write_session(session_dir, 12)
+
+            loaded = load_session(session_dir, session.session_id, tail_turns=3)
+
+            self.assertEqual([t["content"] for t in loaded.turns], ["turn 9", "turn 10", "turn 11"])
+            self.assertEqual(loaded.turn_count, 12)
+            pages = [[t["content"] for t in page] for page in loaded.iter_history(page_size=4)]
+            self.assertEqual(pages[0], ["turn 5", "turn 6", "turn 7", "turn 8"])
+            self.assertEqual(pages[-1], ["turn 0"])
+            self.assertEqual(len([t for t in loaded.iter_turns()]), 12)
+
+    def test_tail_resume_appends_after_existing_history(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            session = self._write_session(session_dir, 5)
+
+            loaded = load_session(session_dir, session.session_id, tail_turns=2)
+            loaded.add_turn("analyst", "new")
+            loaded.save(session_dir)
+
+            full = load_session(session_dir, session.session_id)
+            self.assertEqual(full.turn_count, 6)
+            self.assertEqual(full.turns[-1]["content"], "new")
+            self.assertEqual(full.turns[0]["content"], "turn 0")
+
+    def test_missing_or_stale_index_is_rebuilt(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            session = self._write_session(session_dir, 4)
+            index = session_path(session_dir, session.session_id).with_suffix(".idx")
+            index.write_bytes(index.read_bytes()[:8])
+
+            loaded = load_session(session_dir, session.session_id, tail_turns=1)
+            self.assertEqual(loaded.turn_count, 4)
+            self.assertEqual(loaded.turns[0]["content"], "turn 3")
+
+            index.unlink()
+            loaded = load_session(session_dir, session.session_id, tail_turns=1)
+            self.assertEqual(loaded.turn_count, 4)
+
+    def test_tail_resume_reads_only_the_tail_of_a_session_without_summary(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            session = self._write_session(session_dir, 200)
+            path = session_path(session_dir, session.session_id)
+            load_session(session_dir, session.session_id)
+            read = _BytesRead(path)
+
+            with mock.patch.object(Path, "open", lambda path, *args, **kwargs: read.open(path, *args, **kwargs)):
+                loaded = load_session(session_dir, session.session_id, tail_turns=2)
+
+            self.assertEqual(loaded.turn_count, 200)
+            self.assertIsNone(loaded.summary)
+            self.assertLess(read.total, path.stat().st_size / 10)
+
+    def test_summary_is_found_through_the_index_and_old_sidecars_are_rebuilt(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            session = self._write_session(session_dir, 4)
+            session.set_summary("early summary", upto=2)
+            for index in range(20):
+                session.add_turn("user", f"later {index}")
+                session.save(session_dir)
+            path = session_path(session_dir, session.session_id)
+
+            loaded = load_session(session_dir, session.session_id, tail_turns=2)
+            self.assertEqual((loaded.summary, loaded.summary_upto), ("early summary", 2))
+
+            # A sidecar written before summaries were indexed holds turn offsets only.
+            path.with_suffix(".idx").write_bytes(session_module._load_offsets(path).tobytes())
+            loaded = load_session(session_dir, session.session_id, tail_turns=2)
+            self.assertEqual((loaded.summary, loaded.turn_count), ("early summary", 24))
+
+
+class _BytesRead:
+    """Counts bytes read from one file through ``Path.open``."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.total = 0
+        self._open = Path.open
+
+    def open(self, path: Path, mode: str = "r", *args, **kwargs):
+        fh = self._open(path, mode, *args, **kwargs)
+        return _CountingFile(fh, self) if path == self.path and "r" in mode else fh
+
+
+class _CountingFile:
+    def __init__(self, fh, counter: _BytesRead) -> None:
+        self._fh = fh
+        self._counter = counter
+
+    def _count(self, data: bytes) -> bytes:
+        self._counter.total += len(data)
+        return data
+
+    def read(self, *args) -> bytes:
+        return self._count(self._fh.read(*args))
+
+    def readline(self, *args) -> bytes:
+        return self._count(self._fh.readline(*args))
+
+    def __iter__(self):
+        for line in self._fh:
+            yield self._count(line)
+
+    def __getattr__(self, name: str):
+        return getattr(self._fh, name)
+
+    def __enter__(self) -> "_CountingFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._fh.close()
+
 
 if __name__ == "__main__":
     unittest.main()
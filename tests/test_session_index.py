@@ -0,0 +1,132 @@
+import contextlib
+import io
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from src.starray.cli import main
+from src.starray.session import SessionState, load_session
+from src.starray.session_index import SessionIndex, SessionIndexError, fts_query
+
+
+def _chat(session_dir: Path, index: SessionIndex, *exchanges: tuple[str, str]) -> SessionState:
+    state = SessionState.new()
+    for question, answer in exchanges:
+        state.add_turn("user", question)
+        state.add_turn("analyst", answer, provider="openai", model="gpt-4.1")
+        state.save(session_dir, index)
+    return state
+
+
+class TestSessionIndex(unittest.TestCase):
+    def test_saves_are_indexed_incrementally(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            index = SessionIndex.for_sessions_dir(session_dir)
+            first = _chat(session_dir, index, ("How do I rotate logs?", "Use a rotating handler."))
+            second = _chat(
+                session_dir,
+                index,
+                ("Plan the database migration", "Start with a backup."),
+                ("And the rollback?", "Restore the backup."),
+            )
+
+            sessions = index.list_sessions()
+            self.assertEqual([s.session_id for s in sessions], [second.session_id, first.session_id])
+            self.assertEqual(sessions[0].turn_count, 4)
+            self.assertEqual(sessions[0].providers, ["openai"])
+            self.assertEqual(sessions[0].title, "Plan the database migration")
+
+            hits = index.search("backup")
+            self.assertEqual({(hit.session_id, hit.turn) for hit in hits}, {(second.session_id, 1), (second.session_id, 3)})
+            self.assertIn("[backup]", hits[0].snippet)
+            self.assertEqual(sorted(hit.turn for hit in index.search("rotat*")), [0, 1])
+            index.close()
+
+    def test_resumed_sessions_index_only_new_turns_at_their_absolute_position(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            index = SessionIndex.for_sessions_dir(session_dir)
+            state = _chat(session_dir, index, ("alpha", "beta"), ("gamma", "delta"))
+
+            resumed = load_session(session_dir, state.session_id, tail_turns=1)
+            resumed.add_turn("user", "epsilon")
+            resumed.save(session_dir, index)
+
+            self.assertEqual(index.list_sessions()[0].turn_count, 5)
+            self.assertEqual([hit.turn for hit in index.search("epsilon")], [4])
+            self.assertEqual(len(index.search("alpha")), 1)
+            index.close()
+
+    def test_rebuild_indexes_existing_and_legacy_files(self) -> None:
+        with TemporaryDirectory() as tmp:
+            session_dir = Path(tmp)
+            current = SessionState.new()
+            current.add_turn("user", "kubernetes rollout")
+            current.save(session_dir)
+            (session_dir / "legacy.json").write_text(
+                json.dumps(
+                    {
+                        "session_id": "legacy",
+                        "created_at": "2024-01-01T00:00:00+00:00",
+                        "turns": [{"timestamp": "2024-01-01T00:00:01+00:00", "role": "user", "content": "old rollout"}],
+                    }
+                ),
+                encoding="utf-8",
+            )
+            (session_dir / "broken.jsonl").write_text("not json\nat all\n", encoding="utf-8")
+
+            index = SessionIndex.for_sessions_dir(session_dir)
+            self.assertEqual(index.search("rollout"), [])
+            self.assertEqual(index.rebuild(session_dir), 2)
+            self.assertEqual(index.rebuild(session_dir), 2)
+
+            self.assertEqual({hit.session_id for hit in index.search("rollout")}, {current.session_id, "legacy"})
+            self.assertEqual(index.count(), 2)
+            index.close()
+
+    def test_query_syntax_is_escaped(self) -> None:
+        self.assertEqual(fts_query('say "hi" OR near*'), '"say" """hi""" "OR" "near"*')
+        with TemporaryDirectory() as tmp:
+            index = SessionIndex.for_sessions_dir(Path(tmp))
+            self.assertEqual(index.search("NEAR( AND -"), [])
+            index.close()
+
+
+class TestSessionsCommand(unittest.TestCase):
+    def test_list_search_and_rebuild(self) -> None:
+        with TemporaryDirectory() as tmp:
+            cfg = Path(tmp) / "starray.toml"
+            cfg.write_text(f"[storage]\ndata_dir = '{Path(tmp).as_posix()}'\n", encoding="utf-8")
+            state = SessionState.new()
+            state.add_turn("user", "where is the retry budget configured")
+            state.save(Path(tmp) / "sessions")
+
+            outputs = []
+            for argv in (["rebuild"], ["list"], ["search", "retry"]):
+                out = io.StringIO()
+                with contextlib.redirect_stdout(out):
+                    self.assertEqual(main(["sessions", "-c", str(cfg), *argv]), 0)
+                outputs.append(out.getvalue())
+
+        self.assertIn("Indexed 1 sessions", outputs[0])
+        self.assertIn(state.session_id, outputs[1])
+        self.assertIn("1 turns", outputs[1])
+        self.assertIn("[retry]", outputs[2])
+
+    def test_index_is_closed_when_a_command_fails(self) -> None:
+        with TemporaryDirectory() as tmp:
+            cfg = Path(tmp) / "starray.toml"
+            cfg.write_text(f"[storage]\ndata_dir = '{Path(tmp).as_posix()}'\n", encoding="utf-8")
+            failing = mock.patch.object(SessionIndex, "search", side_effect=SessionIndexError("locked"))
+            with failing, mock.patch.object(SessionIndex, "close", autospec=True) as close:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(main(["sessions", "-c", str(cfg), "search", "retry"]), 1)
+
+        close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
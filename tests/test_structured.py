@@ -0,0 +1,243 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.analyst import AnalystRuntime
+from src.starray.cache import CachingProvider, ResponseCache
+from src.starray.config import ConfigError, load_config
+from src.starray.providers import ChatMessage, LocalEchoProvider, ProviderError
+from src.starray.roles import RoleRuntime
+from src.starray.structured import (
+    JsonStreamChecker,
+    StructuredOutputError,
+    compile_schema,
+    parse_structured,
+    placeholder,
+)
+from tests.helpers import StaticFactory, analyst_config
+
+
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string", "minLength": 1},
+        "steps": {"type": "array", "items": {"$ref": "#/$defs/step"}, "minItems": 1},
+        "risk": {"enum": ["low", "medium", "high"]},
+    },
+    "required": ["summary", "steps"],
+    "additionalProperties": False,
+    "$defs": {
+        "step": {
+            "type": "object",
+            "properties": {"title": {"type": "string"}, "estimate": {"type": "number", "minimum": 0}},
+            "required": ["title"],
+        }
+    },
+}
+VALID = '{"summary": "ship it", "steps": [{"title": "test", "estimate": 1.5}], "risk": "low"}'
+
+
+class _ScriptedProvider(LocalEchoProvider):
+    """Streams one scripted reply per call and records how many chunks each call consumed."""
+
+    def __init__(self, name: str, replies: list[list[str] | Exception]) -> None:
+        self.name = name
+        self._replies = replies
+        self.requests: list[list[ChatMessage]] = []
+        self.consumed: list[int] = []
+
+    def structured_stream(self, messages, *, model, schema, temperature, timeout_seconds):
+        self.requests.append(messages)
+        reply = self._replies[min(len(self.requests), len(self._replies)) - 1]
+        if isinstance(reply, Exception):
+            raise reply
+        self.consumed.append(0)
+        for chunk in reply:
+            self.consumed[-1] += 1
+            yield chunk
+
+
+def _runtime(providers: dict[str, LocalEchoProvider], fallbacks: list[str] | None = None) -> AnalystRuntime:
+    cfg = analyst_config(
+        provider_fallbacks=fallbacks or [],
+        role_models={},
+        role_fallback_models={},
+        temperature=0.0,
+        request_timeout_seconds=5.0,
+    )
+    return AnalystRuntime(cfg, provider_factory=StaticFactory({"local": LocalEchoProvider(), **providers}))
+
+
+def _messages() -> list[ChatMessage]:
+    return [ChatMessage(role="system", content="You plan."), ChatMessage(role="user", content="Plan the release")]
+
+
+class TestSchemaValidation(unittest.TestCase):
+    def test_reports_every_violation_with_its_path(self) -> None:
+        errors = compile_schema(PLAN_SCHEMA).validate(
+            {"summary": "", "steps": [{"estimate": -1}, {"title": 3}], "risk": "none", "owner": "me"}
+        )
+
+        self.assertEqual(
+            errors,
+            [
+                "$.summary: shorter than 1 characters",
+                "$.steps[0]: missing required property 'title'",
+                "$.steps[0].estimate: expected a value at least 0",
+                "$.steps[1].title: expected string, got number",
+                "$.risk: 'none' is not one of ['low', 'medium', 'high']",
+                "$: unexpected property 'owner'",
+            ],
+        )
+
+    def test_equal_schemas_share_one_compiled_validator(self) -> None:
+        copy = {key: PLAN_SCHEMA[key] for key in reversed(list(PLAN_SCHEMA))}
+        self.assertIs(compile_schema(PLAN_SCHEMA), compile_schema(copy))
+
+    def test_placeholder_satisfies_the_schema(self) -> None:
+        recursive = {
+            "type": "object",
+            "properties": {"name": {"type": "string"}, "child": {"$ref": "#"}},
+            "required": ["name"],
+        }
+        for schema in (PLAN_SCHEMA, recursive):
+            self.assertEqual(compile_schema(schema).validate(placeholder(schema)), [])
+
+
+class TestJsonStreamChecker(unittest.TestCase):
+    def _feed(self, chunks: list[str]) -> JsonStreamChecker:
+        checker = JsonStreamChecker(compile_schema(PLAN_SCHEMA))
+        for chunk in chunks:
+            if checker.feed(chunk) is not None:
+                break
+        return checker
+
+    def test_tolerates_fences_trailing_commas_and_text_after_the_document(self) -> None:
+        text = 'Here you go:\n```json\n{"summary": "s", "steps": [{"title": "t",},],}\n```\nAnything else?'
+        checker = self._feed([text[i : i + 7] for i in range(0, len(text), 7)])
+
+        self.assertIsNone(checker.error)
+        self.assertTrue(checker.complete)
+        self.assertEqual(checker.document(text), '{"summary": "s", "steps": [{"title": "t"}]}')
+
+    def test_rejects_as_soon_as_the_reply_cannot_be_valid(self) -> None:
+        cases = {
+            '{"summary": "s", "owner"': "$: unexpected property 'owner'",
+            '{"steps": "one': "$.steps: expected array, got string",
+            '{"risk": nul}': "invalid token 'nul'",
+            '{"summary": "a\\q': "invalid escape sequence '\\q'",
+            '{"summary" "s"': "expected ':', got '\"'",
+            "I cannot help with that. " * 20: "no JSON document within the first 256 characters",
+        }
+        for text, error in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(self._feed([text]).error, error)
+
+    def test_truncated_and_complete_replies(self) -> None:
+        self.assertEqual(
+            parse_structured(VALID, PLAN_SCHEMA)["steps"], [{"title": "test", "estimate": 1.5}]
+        )
+        with self.assertRaisesRegex(StructuredOutputError, "ended before the JSON document was complete"):
+            parse_structured(VALID[:-1], PLAN_SCHEMA)
+        with self.assertRaisesRegex(StructuredOutputError, "missing required property 'steps'"):
+            parse_structured('{"summary": "s"}', PLAN_SCHEMA)
+
+
+class TestStructuredRuntime(unittest.TestCase):
+    def test_valid_stream_is_parsed_and_closed_once_complete(self) -> None:
+        provider = _ScriptedProvider("openai", [[VALID[:30], VALID[30:], "\n```", " trailing chatter"]])
+
+        response = _runtime({"openai": provider}).structured(_messages(), PLAN_SCHEMA)
+
+        self.assertEqual(response.payload["risk"], "low")
+        self.assertEqual((response.provider, response.repairs, response.fallback_used), ("openai", 0, False))
+        self.assertEqual(provider.consumed, [2])
+        self.assertIn('"additionalProperties":false', provider.requests[0][1].content)
+        self.assertEqual(provider.requests[0][1].role, "system")
+
+    def test_invalid_stream_is_aborted_and_repaired_on_the_same_route(self) -> None:
+        bad = ['{"summary": "s", ', '"owner": "me", ', '"steps": []}', "never read"]
+        provider = _ScriptedProvider("openai", [bad, [VALID]])
+        runtime = _runtime({"openai": provider})
+
+        response = runtime.structured(_messages(), PLAN_SCHEMA)
+
+        self.assertEqual((response.provider, response.repairs), ("openai", 1))
+        self.assertEqual(provider.consumed, [2, 1])
+        repair = provider.requests[1]
+        self.assertEqual(repair[-2].role, "assistant")
+        self.assertEqual(repair[-2].content, '{"summary": "s", "owner": "me", ')
+        self.assertIn("unexpected property 'owner'", repair[-1].content)
+        summary = runtime.metrics.aggregator.summarize()["openai:gpt-4.1"]
+        self.assertEqual((summary.calls, summary.errors), (2, 1))
+
+    def test_falls_back_after_repairs_are_exhausted(self) -> None:
+        primary = _ScriptedProvider("openai", [['{"summary": 1}']])
+        backup = _ScriptedProvider("anthropic", [[VALID]])
+
+        response = _runtime({"openai": primary, "anthropic": backup}, ["anthropic"]).structured(
+            _messages(), PLAN_SCHEMA
+        )
+
+        self.assertEqual(len(primary.requests), 2)
+        self.assertEqual(response.provider, "anthropic")
+        self.assertTrue(response.fallback_used)
+        self.assertIn("$.summary: expected string, got number", response.fallback_reason)
+
+    def test_provider_errors_fall_back_without_repair_and_local_satisfies_the_schema(self) -> None:
+        primary = _ScriptedProvider("openai", [ProviderError("openai down")])
+
+        response = _runtime({"openai": primary}).structured(_messages(), PLAN_SCHEMA)
+
+        self.assertEqual(len(primary.requests), 1)
+        self.assertEqual(response.provider, "local")
+        self.assertEqual(compile_schema(PLAN_SCHEMA).validate(response.payload), [])
+        self.assertEqual(response.fallback_reason, "openai:gpt-4.1: openai down")
+
+    def test_raises_when_no_route_produces_valid_output(self) -> None:
+        runtime = _runtime({"openai": _ScriptedProvider("openai", [ProviderError("openai down")])})
+        schema = {"type": "object", "properties": {"id": {"type": "string", "pattern": "^[0-9]+$"}}}
+        with self.assertRaisesRegex(StructuredOutputError, r"local:gpt-4\.1: invalid structured output"):
+            runtime.structured(_messages(), {**schema, "required": ["id"]})
+
+    def test_cached_provider_replays_validated_replies_only(self) -> None:
+        with TemporaryDirectory() as tmp:
+            inner = _ScriptedProvider("openai", [['{"summary": 1}'], [VALID], ['{"summary": 1}']])
+            cache = ResponseCache(Path(tmp))
+            provider = CachingProvider(inner, cache, max_temperature=0.3)
+            runtime = _runtime({"openai": provider})
+
+            first = runtime.structured(_messages(), PLAN_SCHEMA)
+            second = runtime.structured(_messages(), PLAN_SCHEMA)
+
+        self.assertEqual(first.repairs, 1)
+        self.assertEqual(second.repairs, 1)
+        self.assertEqual(second.payload, first.payload)
+        self.assertEqual(len(inner.requests), 3)
+        self.assertEqual(cache.stats.hits, 1)
+
+
+class TestStructuredAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_astructured_repairs_and_roles_share_the_engine(self) -> None:
+        provider = _ScriptedProvider("openai", [['{"summary": "s", "steps": ['], [VALID]])
+        role = RoleRuntime(_runtime({"openai": provider}), "planner")
+
+        response = await role.arun_structured("Plan the release", PLAN_SCHEMA)
+
+        self.assertEqual((response.provider, response.repairs), ("openai", 1))
+        self.assertIn("ended before the JSON document was complete", provider.requests[1][-1].content)
+
+
+class TestStructuredConfig(unittest.TestCase):
+    def test_max_repairs_is_configurable(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "starray.toml"
+            path.write_text("[structured]\nmax_repairs = 0\n", encoding="utf-8")
+            self.assertEqual(load_config(path).structured_max_repairs, 0)
+            path.write_text("[structured]\nmax_repairs = -1\n", encoding="utf-8")
+            with self.assertRaises(ConfigError):
+                load_config(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray.analyst import AnalystRuntime
+from src.starray.config import AppConfig, load_config
+from src.starray.providers import ChatMessage, LocalEchoProvider
+from src.starray.tokens import MESSAGE_OVERHEAD_TOKENS, TokenEstimator, model_family
+from tests.helpers import analyst_config
+
+
+class _RecordingProvider(LocalEchoProvider):
+    def __init__(self, name: str, calls: list[str]) -> None:
+        self.name = name
+        self._calls = calls
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        self._calls.append(f"{self.name}:{model}")
+        return super().chat_stream(messages, model=model, temperature=temperature, timeout_seconds=timeout_seconds)
+
+
+class _RecordingFactory:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    def get(self, provider_name: str) -> LocalEchoProvider:
+        return _RecordingProvider(provider_name, self.calls)
+
+
+def _config(**overrides) -> AppConfig:
+    overrides.setdefault("provider_fallbacks", ["anthropic"])
+    return analyst_config(**overrides)
+
+
+class TestTokenEstimator(unittest.TestCase):
+    def test_heuristic_depends_on_family_and_counts_non_ascii_by_bytes(self) -> None:
+        estimator = TokenEstimator()
+        text = "x" * 700
+
+        self.assertEqual(model_family("openrouter/anthropic/claude-3-haiku"), "anthropic")
+        self.assertEqual(model_family("my-finetune", provider="gemini"), "google")
+        self.assertEqual(estimator.count(text, "gpt-4.1"), 175)
+        self.assertEqual(estimator.count(text, "claude-sonnet-4-6"), 200)
+        self.assertEqual(estimator.count("日本語", "gpt-4.1"), 3)
+
+    def test_registered_tokenizer_and_context_window_overrides(self) -> None:
+        estimator = TokenEstimator(context_windows={"openai:gpt-4.1": 32000, "custom": 4096})
+        estimator.register("openai", lambda text: len(text.split()))
+        messages = [ChatMessage(role="user", content="one two three")]
+
+        self.assertEqual(estimator.count_messages(messages, "gpt-4o"), 3 + MESSAGE_OVERHEAD_TOKENS)
+        self.assertEqual(estimator.context_window("openai", "gpt-4.1"), 32000)
+        self.assertEqual(estimator.context_window("azure", "gpt-4.1"), 1_047_576)
+        self.assertEqual(estimator.context_window("openai", "gpt-4-0613"), 8192)
+        self.assertEqual(estimator.context_window("local", "custom"), 4096)
+        self.assertIsNone(estimator.context_window("local", "local-echo"))
+
+
+class TestPreflightRouting(unittest.TestCase):
+    def test_routes_that_cannot_fit_are_skipped_without_a_call(self) -> None:
+        factory = _RecordingFactory()
+        cfg = _config(context_windows={"openai:gpt-4.1": 1500}, reserve_output_tokens=1024)
+        runtime = AnalystRuntime(cfg, provider_factory=factory)
+
+        response = runtime.respond("word " * 600)
+
+        self.assertEqual(factory.calls, ["anthropic:gpt-4.1"])
+        self.assertEqual(response.provider, "anthropic")
+        self.assertTrue(response.fallback_used)
+        self.assertIn("1500-token context window", response.fallback_reason)
+        self.assertEqual(len(runtime.metrics.aggregator), 1)
+
+    def test_role_budget_caps_prompt_size(self) -> None:
+        factory = _RecordingFactory()
+        runtime = AnalystRuntime(_config(role_token_budgets={"analyst": 50}), provider_factory=factory)
+
+        response = runtime.respond("word " * 100)
+
+        self.assertEqual(factory.calls, ["local:gpt-4.1"])
+        self.assertIn("exceeds the analyst budget of 50", response.fallback_reason)
+
+    def test_config_parses_budgets_and_windows(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "starray.toml"
+            path.write_text(
+                "[provider]\nreserve_output_tokens = 512\n"
+                "[provider.role_token_budgets]\nanalyst = 8000\n"
+                "[provider.context_windows]\n'openai:gpt-4.1' = 32000\n",
+                encoding="utf-8",
+            )
+            cfg = load_config(path)
+
+        self.assertEqual(cfg.reserve_output_tokens, 512)
+        self.assertEqual(cfg.role_token_budgets, {"analyst": 8000})
+        self.assertEqual(cfg.context_windows, {"openai:gpt-4.1": 32000})
+
+
+if __name__ == "__main__":
+    unittest.main()
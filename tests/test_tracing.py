@@ -0,0 +1,128 @@
+import json
+import logging
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.starray import tracing
+from src.starray.analyst import AnalystRuntime
+from src.starray.app import configure_tracing, run_turn
+from src.starray.config import load_config
+from src.starray.providers import LocalEchoProvider, ProviderError
+from src.starray.session import SessionState
+from tests.helpers import StaticFactory, analyst_config
+
+
+class _ListExporter:
+    def __init__(self) -> None:
+        self.batches: list[list[tracing.Span]] = []
+
+    def export(self, spans: list[tracing.Span]) -> None:
+        self.batches.append(spans)
+
+
+class _FailingProvider(LocalEchoProvider):
+    name = "openai"
+
+    def chat_stream(self, messages, *, model, temperature, timeout_seconds):
+        raise ProviderError("openai provider request failed: boom")
+        yield ""  # pragma: no cover - makes this a generator
+
+
+class TestTracer(unittest.TestCase):
+    def tearDown(self) -> None:
+        tracing.set_tracer(None)
+
+    def test_disabled_tracer_returns_shared_noop_span(self) -> None:
+        first = tracing.span("a", key="value")
+        with first as entered, tracing.use_span(entered):
+            second = tracing.span("b")
+        self.assertIs(first, tracing.NOOP_SPAN)
+        self.assertIs(second, tracing.NOOP_SPAN)
+
+    def test_children_are_buffered_until_the_root_ends(self) -> None:
+        exporter = _ListExporter()
+        tracing.set_tracer(tracing.Tracer(exporter))
+
+        with tracing.span("root") as root:
+            with tracing.span("child", n=1):
+                pass
+            detached = tracing.span("detached")
+            self.assertEqual(exporter.batches, [])
+        detached.end("late failure")
+
+        self.assertEqual([[s.name for s in batch] for batch in exporter.batches], [["child", "root"], ["detached"]])
+        child = exporter.batches[0][0]
+        self.assertEqual((child.trace_id, child.parent_id), (root.trace_id, root.span_id))
+        self.assertIsNone(root.parent_id)
+        self.assertEqual(exporter.batches[1][0].error, "late failure")
+
+    def test_file_exporter_writes_otlp_json_lines(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "traces.jsonl"
+            tracing.set_tracer(tracing.Tracer(tracing.OtlpJsonFileExporter(path)))
+            with self.assertRaises(ValueError):
+                with tracing.span("root", ok=True, count=2, ratio=0.5):
+                    raise ValueError("bad input")
+
+            request = json.loads(path.read_text(encoding="utf-8"))
+
+        span = request["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual((len(span["traceId"]), len(span["spanId"])), (32, 16))
+        self.assertEqual(span["status"], {"code": 2, "message": "ValueError: bad input"})
+        self.assertEqual(
+            {a["key"]: a["value"] for a in span["attributes"]},
+            {"ok": {"boolValue": True}, "count": {"intValue": "2"}, "ratio": {"doubleValue": 0.5}},
+        )
+        self.assertLessEqual(int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"]))
+
+
+class TestTurnTracing(unittest.TestCase):
+    def tearDown(self) -> None:
+        tracing.set_tracer(None)
+
+    def test_turn_trace_covers_attempts_log_and_save_across_hedge_threads(self) -> None:
+        exporter = _ListExporter()
+        tracing.set_tracer(tracing.Tracer(exporter))
+        with TemporaryDirectory() as tmp:
+            cfg = analyst_config(data_dir=Path(tmp), hedging=True, hedge_delay_seconds=5.0)
+            factory = StaticFactory({"openai": _FailingProvider()}, default=LocalEchoProvider())
+            runtime = AnalystRuntime(cfg, provider_factory=factory)
+            logger = logging.getLogger("starray.test.tracing")
+            logger.addHandler(logging.NullHandler())
+            logger.propagate = False
+
+            run_turn("hi", runtime, SessionState.new(), Path(tmp) / "sessions", logger)
+
+        self.assertEqual(len(exporter.batches), 1)
+        spans = {span.name: span for span in exporter.batches[0] if span.name != "analyst.attempt"}
+        attempts = sorted(
+            (span for span in exporter.batches[0] if span.name == "analyst.attempt"),
+            key=lambda span: span.attributes["attempt"],
+        )
+        turn, respond = spans["starray.turn"], spans["analyst.respond"]
+        self.assertEqual(set(spans), {"starray.turn", "analyst.respond", "session.log", "session.save"})
+        self.assertEqual({span.trace_id for span in exporter.batches[0]}, {turn.trace_id})
+        self.assertEqual(respond.parent_id, turn.span_id)
+        self.assertEqual(spans["session.save"].parent_id, turn.span_id)
+        self.assertEqual([a.attributes["route"] for a in attempts], ["openai:gpt-4.1", "local:gpt-4.1"])
+        self.assertEqual({a.parent_id for a in attempts}, {respond.span_id})
+        self.assertIn("boom", attempts[0].error)
+        self.assertIsNone(attempts[1].error)
+        self.assertEqual(respond.attributes["route"], "local:gpt-4.1")
+
+    def test_config_enables_file_tracer(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "starray.toml"
+            path.write_text(f"[tracing]\nenabled = true\npath = '{tmp}/t.jsonl'\n", encoding="utf-8")
+            cfg = load_config(path)
+            configure_tracing(cfg)
+            with tracing.span("root"):
+                pass
+
+            self.assertTrue(cfg.tracing_enabled)
+            self.assertTrue((Path(tmp) / "t.jsonl").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import asyncio
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from src.starray.analyst import AnalystRuntime
+from src.starray.config import load_config
+from src.starray.providers import LocalEchoProvider
+from src.starray.roles import ROLE_SYSTEM_PROMPTS, RoleRuntime
+from src.starray.workflow import (
+    FAILED,
+    OK,
+    SKIPPED,
+    TIMED_OUT,
+    Workflow,
+    WorkflowError,
+    WorkflowExecutor,
+    WorkflowStep,
+    specialist_workflow,
+)
+from tests.helpers import StaticFactory, analyst_config
+
+
+class _SleepyProvider(LocalEchoProvider):
+    """Sleeps for the number of seconds in the model name, e.g. ``sleep-0.2``."""
+
+    name = "openai"
+
+    def chat(self, messages, *, model, temperature, timeout_seconds):
+        time.sleep(float(model.split("-", 1)[1]))
+        return self._answer(messages, model)
+
+    async def achat(self, messages, *, model, temperature, timeout_seconds):
+        await asyncio.sleep(float(model.split("-", 1)[1]))
+        return self._answer(messages, model)
+
+    @staticmethod
+    def _answer(messages, model: str) -> str:
+        return f"{model} saw {len(messages)} messages; system: {messages[0].content[:24]}"
+
+
+def _runtime(**role_models: str) -> AnalystRuntime:
+    cfg = analyst_config(default_model="sleep-0", role_models=role_models, role_fallback_models={})
+    factory = StaticFactory({"openai": _SleepyProvider()}, default=LocalEchoProvider())
+    return AnalystRuntime(cfg, provider_factory=factory)
+
+
+class TestRoleRuntime(unittest.TestCase):
+    def test_role_uses_its_model_prompt_and_upstream_inputs(self) -> None:
+        role = RoleRuntime(_runtime(tester="sleep-0.01"), "tester")
+
+        response = role.run("review it", {"implement": "diff --git a b"})
+
+        self.assertEqual((response.provider, response.model), ("openai", "sleep-0.01"))
+        self.assertIn("saw 3 messages", response.content)
+        self.assertIn(ROLE_SYSTEM_PROMPTS["tester"][:24], response.content)
+        self.assertEqual(role.runtime.metrics.aggregator.summarize("role")["tester"].calls, 1)
+
+
+class TestWorkflow(unittest.TestCase):
+    def test_rejects_unknown_dependencies_and_cycles(self) -> None:
+        with self.assertRaises(WorkflowError):
+            Workflow([WorkflowStep("a", "planner", ("missing",))])
+        with self.assertRaises(WorkflowError):
+            Workflow([WorkflowStep("a", "planner", ("b",)), WorkflowStep("b", "tester", ("a",))])
+        order = [step.name for step in specialist_workflow().order]
+        self.assertEqual(order, ["plan", "design", "implement", "test", "security"])
+
+    def test_independent_roles_run_concurrently_and_merge_in_order(self) -> None:
+        runtime = _runtime(planner="sleep-0.05", tester="sleep-0.3", security="sleep-0.2")
+        workflow = Workflow(
+            [
+                WorkflowStep("plan", "planner"),
+                WorkflowStep("test", "tester", ("plan",)),
+                WorkflowStep("security", "security", ("plan",)),
+            ]
+        )
+
+        result = WorkflowExecutor(runtime).run(workflow, "add a flag")
+
+        self.assertTrue(result.ok)
+        self.assertEqual([step.name for step in result.steps], ["plan", "test", "security"])
+        self.assertLess(result.latency_seconds, 0.5)  # sequential would be 0.55s
+        self.assertAlmostEqual(result.critical_path_seconds, 0.35, delta=0.1)
+        self.assertIn("saw 3 messages", result.get("security").content)
+        self.assertTrue(result.merged().startswith("## plan (planner)\n"))
+
+    def test_role_concurrency_limit_serializes_steps(self) -> None:
+        runtime = _runtime(tester="sleep-0.15")
+        workflow = Workflow([WorkflowStep("unit", "tester"), WorkflowStep("e2e", "tester")])
+
+        result = WorkflowExecutor(runtime, role_concurrency={"tester": 1}).run(workflow, "test")
+
+        self.assertGreaterEqual(result.latency_seconds, 0.3)
+        starts = sorted(step.started_seconds for step in result.steps)
+        self.assertGreaterEqual(starts[1] - starts[0], 0.14)
+
+    def test_missed_deadline_times_out_and_skips_dependents(self) -> None:
+        runtime = _runtime(planner="sleep-0.01", security="sleep-0.5")
+        workflow = Workflow(
+            [
+                WorkflowStep("plan", "planner"),
+                WorkflowStep("security", "security", ("plan",)),
+                WorkflowStep("report", "planner", ("security",)),
+            ]
+        )
+
+        result = WorkflowExecutor(runtime, role_deadlines={"security": 0.05}).run(workflow, "audit")
+
+        self.assertEqual([step.status for step in result.steps], [OK, TIMED_OUT, SKIPPED])
+        self.assertLess(result.latency_seconds, 0.4)
+        self.assertIn("[timeout] no result within 0.05s", result.merged())
+
+    def test_step_that_raises_fails_without_cancelling_siblings(self) -> None:
+        runtime = _runtime(planner="sleep-0.01", tester="sleep-0.1")
+        workflow = Workflow(
+            [
+                WorkflowStep("plan", "planner"),
+                WorkflowStep("security", "security", ("plan",)),
+                WorkflowStep("test", "tester", ("plan",)),
+                WorkflowStep("report", "planner", ("security",)),
+            ]
+        )
+        arun = RoleRuntime.arun
+
+        async def flaky_arun(role, task, inputs=None):
+            if role.role == "security":
+                raise ValueError("bad prompt template")
+            return await arun(role, task, inputs)
+
+        with mock.patch.object(RoleRuntime, "arun", flaky_arun):
+            result = WorkflowExecutor(runtime).run(workflow, "audit")
+
+        self.assertEqual([step.status for step in result.steps], [OK, FAILED, OK, SKIPPED])
+        self.assertEqual(result.get("security").error, "ValueError: bad prompt template")
+        self.assertIn("sleep-0.1 saw 3 messages", result.get("test").content)
+
+    def test_config_parses_workflow_section(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "starray.toml"
+            path.write_text(
+                "[workflow]\nmax_concurrency = 2\n[workflow.role_concurrency]\nimplementer = 1\n"
+                "[workflow.role_deadlines]\ntester = 90\n",
+                encoding="utf-8",
+            )
+            cfg = load_config(path)
+
+        self.assertEqual(cfg.workflow_max_concurrency, 2)
+        self.assertEqual(cfg.workflow_role_concurrency, {"implementer": 1})
+        self.assertEqual(cfg.workflow_role_deadlines, {"tester": 90.0})
+
+
+if __name__ == "__main__":
+    unittest.main()